@@ -1,11 +1,34 @@
+import inspect
 import logging
+from collections.abc import Awaitable, Callable, Set
+from dataclasses import replace
 from typing import Protocol
 
-from app.domain.entities import Command, CommandResult, Obstacle, Position
-from app.domain.services import execute_commands
+from app.application.execution_cache import ExecutionCache
+from app.domain.compact import execute_compact, reach_envelope
+from app.domain.entities import (
+    CanonicalCommand,
+    Command,
+    CommandResult,
+    CompactCommand,
+    Obstacle,
+    Position,
+    PositionPath,
+)
+from app.domain.exceptions import OffMapException
+from app.domain.pose import in_plane, reach_in_plane
+from app.domain.services import (
+    DEFAULT_CHUNK_SIZE,
+    canonicalize_command,
+    execute_commands,
+    execute_commands_iter,
+)
 
 logger = logging.getLogger(__name__)
 
+# Commands longer than this are executed and persisted chunk by chunk
+STREAM_THRESHOLD = 100_000
+
 
 class PositionRepository(Protocol):
     async def get_current_position(self) -> Position | None: ...
@@ -18,10 +41,116 @@ class StartPositionProvider(Protocol):
 class CommandRepository(Protocol):
     async def save_command(self, command_result: CommandResult) -> None: ...
 
+    async def create_command(self, command: Command) -> int: ...
+
+    async def complete_command(
+        self, command_id: int, command_result: CommandResult
+    ) -> None: ...
+
 
 class ObstacleRepository(Protocol):
+    """Source of the obstacle map.
+
+    Database-backed repositories implement the queries as coroutines;
+    ``get_version`` and ``get_obstacles_in_box`` are awaited when they
+    return an awaitable.
+    """
+
     def get_obstacles(self) -> set[Obstacle]: ...
 
+    def get_version(self) -> str | Awaitable[str]: ...
+
+    def contains(self, x: int, y: int) -> bool | Awaitable[bool]: ...
+
+    def get_obstacles_in_box(
+        self, min_x: int, min_y: int, max_x: int, max_y: int
+    ) -> Set[Obstacle] | Awaitable[Set[Obstacle]]: ...
+
+
+async def _resolve(value):
+    """Await the result of a repository query if it is awaitable"""
+    return await value if inspect.isawaitable(value) else value
+
+
+async def fetch_version(obstacle_repo: ObstacleRepository) -> str:
+    """Current map version, awaited when the repository is async"""
+    return await _resolve(obstacle_repo.get_version())
+
+
+async def fetch_obstacles_in_box(
+    obstacle_repo: ObstacleRepository,
+    box: tuple[int, int, int, int],
+    version: str | None = None,
+) -> tuple[Set[Obstacle], str]:
+    """Obstacles inside an inclusive box with the version they belong to.
+
+    The map version is read before and after the query and the query
+    repeated until they agree, so a concurrent write cannot mix two maps and
+    readers never lock out writers.
+
+    Args:
+        obstacle_repo: Repository answering the query
+        box: Inclusive box as (min_x, min_y, max_x, max_y)
+        version: Version already read before the query, if any
+
+    Returns:
+        Obstacles in the box and the version of the map they came from
+    """
+    return await _consistent(
+        obstacle_repo, lambda: obstacle_repo.get_obstacles_in_box(*box), version
+    )
+
+
+async def fetch_obstacle_map(
+    obstacle_repo: ObstacleRepository, version: str | None = None
+) -> tuple[Set[Obstacle], str]:
+    """Whole obstacle map with its version, read like ``fetch_obstacles_in_box``.
+
+    In-memory repositories return their prepared map, whose keys and index
+    are built once per version and shared by every request.
+    """
+    return await _consistent(obstacle_repo, obstacle_repo.get_obstacles, version)
+
+
+async def _consistent(
+    obstacle_repo: ObstacleRepository,
+    query: Callable[[], Set[Obstacle] | Awaitable[Set[Obstacle]]],
+    version: str | None,
+) -> tuple[Set[Obstacle], str]:
+    """Run a query until the map version before and after it agree"""
+    if version is None:
+        version = await _resolve(obstacle_repo.get_version())
+    while True:
+        obstacles = await _resolve(query())
+        current = await _resolve(obstacle_repo.get_version())
+        if current == version:
+            return obstacles, version
+        logger.info('Obstacle map changed during query, retrying')
+        version = current
+
+
+def _stays_on_map(command: Command | CompactCommand, start_position: Position) -> bool:
+    """Check whether every position the command can reach fits in int32"""
+    x, y = start_position.coordinates()
+    if isinstance(command, Command) and reach_in_plane(x, y, len(command.program)):
+        return True
+    min_x, min_y, max_x, max_y = reach_envelope(command, start_position)
+    return in_plane(min_x, min_y) and in_plane(max_x, max_y)
+
+
+def _check_on_map(path: PositionPath | None, final_position: Position) -> None:
+    """Reject positions the int32 position columns cannot store.
+
+    Raises:
+        OffMapException: If the path or the final position leaves the map
+    """
+    if path and not (
+        in_plane(min(path.xs), min(path.ys)) and in_plane(max(path.xs), max(path.ys))
+    ):
+        final_position = next(p for p in path if not in_plane(p.x, p.y))
+    if not in_plane(final_position.x, final_position.y):
+        raise OffMapException(final_position.point)
+
 
 class CommandService:
     def __init__(
@@ -31,19 +160,31 @@ class CommandService:
         position_repo: PositionRepository,
         start_position_provider: StartPositionProvider,
         uow,
+        stream_threshold: int = STREAM_THRESHOLD,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        execution_cache: ExecutionCache | None = None,
+        prune_obstacles: bool = False,
     ):
         self._repo = repo
         self._obstacle_repo = obstacle_repo
         self._position_repo = position_repo
         self._start_position_provider = start_position_provider
         self._uow = uow
+        self._stream_threshold = stream_threshold
+        self._chunk_size = chunk_size
+        self._execution_cache = execution_cache
+        # Load only the reach envelope; worth it where every cell is a row
+        # read, while in-memory maps are served whole with their index
+        self._prune_obstacles = prune_obstacles
 
-    async def execute_command(self, command: str) -> CommandResult:
+    async def execute_command(
+        self, command: str | Command | CompactCommand
+    ) -> CommandResult:
         logger.info('Starting command execution: %s', command)
 
-        initial_command = Command(command)
-        obstacles: set[Obstacle] = self._obstacle_repo.get_obstacles()
+        initial_command = command if not isinstance(command, str) else Command(command)
         current_position: Position = await self._get_current_position()
+        obstacle_version = await _resolve(self._obstacle_repo.get_version())
 
         logger.info(
             'Executing from position: x=%d, y=%d, direction=%s',
@@ -52,12 +193,169 @@ class CommandService:
             current_position.direction.name,
         )
 
-        command_result: CommandResult = execute_commands(
+        if (
+            isinstance(initial_command, Command)
+            and len(initial_command.command_string) > self._stream_threshold
+        ):
+            obstacles, obstacle_version = await self._get_reachable_obstacles(
+                initial_command, current_position, obstacle_version
+            )
+            command_result = await self._execute_streaming(
+                initial_command, current_position, obstacles, obstacle_version
+            )
+            self._log_completed(command_result)
+            return command_result
+
+        # A cached result needs only the map version, so no obstacles are read
+        command_result: CommandResult | None = None
+        if self._execution_cache is not None:
+            command_result = self._execution_cache.get(
+                ExecutionCache.key(current_position, initial_command, obstacle_version)
+            )
+
+        if command_result is None:
+            obstacles, obstacle_version = await self._get_reachable_obstacles(
+                initial_command, current_position, obstacle_version
+            )
+            # Compact commands run without expansion and record only the final position
+            execute = (
+                execute_compact
+                if isinstance(initial_command, CompactCommand)
+                else execute_commands
+            )
+            command_result = replace(
+                execute(
+                    command=initial_command,
+                    start_position=current_position,
+                    obstacles=obstacles,
+                ),
+                obstacle_map_version=obstacle_version,
+            )
+            if not _stays_on_map(initial_command, current_position):
+                _check_on_map(command_result.path, command_result.final_position)
+            if self._execution_cache is not None:
+                self._execution_cache.put(
+                    ExecutionCache.key(
+                        current_position, initial_command, obstacle_version
+                    ),
+                    command_result,
+                )
+        else:
+            logger.info('Execution result served from cache')
+
+        self._log_completed(command_result)
+
+        async with self._uow as uow:
+            command_id = await uow.commands.save_command(command_result)
+            logger.info('Command result saved with ID: %s', command_id)
+            path = getattr(command_result, 'path', None)
+            if path:
+                await uow.positions.save_positions_bulk(command_id, path)
+                logger.info('Position path saved: %d positions', len(path))
+
+        return command_result
+
+    async def canonicalize_command(self, command: str | Command) -> CanonicalCommand:
+        """Rewrite command into its shortest equivalent from the current position.
+
+        Nothing is executed or saved; the rewrite is checked against the
+        current obstacle map only.
+        """
+        initial_command = command if isinstance(command, Command) else Command(command)
+        current_position: Position = await self._get_current_position()
+        obstacles, _ = await self._get_reachable_obstacles(
+            initial_command, current_position
+        )
+
+        canonical = canonicalize_command(
             command=initial_command,
             start_position=current_position,
             obstacles=obstacles,
         )
+        logger.info(
+            'Command canonicalized: %d -> %d steps',
+            len(initial_command.command_string),
+            len(canonical.canonical_command.command_string),
+        )
+        return canonical
+
+    async def _execute_streaming(
+        self,
+        command: Command,
+        start_position: Position,
+        obstacles: Set[Obstacle],
+        obstacle_version: str,
+    ) -> CommandResult:
+        """Execute and persist a long command chunk by chunk.
+
+        The command row is created first with EXECUTING status, each path
+        chunk is saved as soon as it is computed, and the row is completed
+        with the outcome at the end, so memory stays bounded by the chunk size.
+        """
+        logger.info('Streaming command execution in chunks of %d', self._chunk_size)
+
+        async with self._uow as uow:
+            command_id = await uow.commands.create_command(command)
+            logger.info('Command created with ID: %s', command_id)
+
+            steps = execute_commands_iter(
+                command=command,
+                start_position=start_position,
+                obstacles=obstacles,
+                chunk_size=self._chunk_size,
+            )
+            on_map = _stays_on_map(command, start_position)
+            saved = 0
+            while True:
+                try:
+                    chunk = next(steps)
+                except StopIteration as stop:
+                    command_result: CommandResult = replace(
+                        stop.value, obstacle_map_version=obstacle_version
+                    )
+                    break
+                if not on_map:
+                    _check_on_map(chunk, chunk[-1])
+                await uow.positions.save_positions_bulk(command_id, chunk)
+                saved += len(chunk)
+
+            await uow.commands.complete_command(command_id, command_result)
+            logger.info('Position path saved: %d positions', saved)
+
+        return command_result
+
+    async def _get_reachable_obstacles(
+        self,
+        command: Command | CompactCommand,
+        start_position: Position,
+        version: str | None = None,
+    ) -> tuple[Set[Obstacle], str]:
+        """Obstacles the command could run into.
+
+        When pruning, only the bounding box the command could visit is
+        loaded; cells outside the unobstructed route's box can never be
+        reached, so the result matches the full map for this command.
+        Otherwise the repository's prepared map is returned as is.
+
+        Returns:
+            The obstacles and the version of the map they came from
+        """
+        if not self._prune_obstacles:
+            return await fetch_obstacle_map(self._obstacle_repo, version)
+
+        box = reach_envelope(command, start_position)
+        obstacles, version = await fetch_obstacles_in_box(
+            self._obstacle_repo, box, version
+        )
+        logger.info(
+            'Loaded %d obstacles within %s, map version %s',
+            len(obstacles),
+            box,
+            version,
+        )
+        return obstacles, version
 
+    def _log_completed(self, command_result: CommandResult) -> None:
         logger.info(
             'Command execution completed: final position x=%d, y=%d, direction=%s, stopped_by_obstacle=%s',
             command_result.final_position.x,
@@ -66,16 +364,6 @@ class CommandService:
             command_result.stopped_by_obstacle,
         )
 
-        async with self._uow as uow:
-            command_id = await uow.commands.save_command(command_result)
-            logger.info('Command result saved with ID: %s', command_id)
-            path = getattr(command_result, 'path', None)
-            if path:
-                await uow.positions.save_positions_bulk(command_id, path)
-                logger.info('Position path saved: %d positions', len(path))
-
-        return command_result
-
     async def _get_current_position(self) -> Position:
         position = await self._position_repo.get_current_position()
         if position is None:
@@ -0,0 +1,110 @@
+import hashlib
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from app.domain.entities import Command, CommandResult, CompactCommand, Position
+
+logger = logging.getLogger(__name__)
+
+# Default bounds: number of cached results and total positions across their paths
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_MAX_POSITIONS = 2_000_000
+
+CacheKey = tuple[Position, bytes, str]
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    hits: int
+    misses: int
+    evictions: int
+    entries: int
+    positions: int
+
+
+def command_digest(command: Command | CompactCommand) -> bytes:
+    """Digest identifying a command's syntax and text"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(type(command).__name__.encode())
+    digest.update(b'\0')
+    digest.update(command.command_string.encode())
+    return digest.digest()
+
+
+class ExecutionCache:
+    """LRU cache of execution results.
+
+    Results are keyed by start position, command digest and obstacle map
+    version, so a changed obstacle map never serves stale results; its old
+    entries simply age out. The cache is bounded both by entry count and by
+    the total number of path positions it holds.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_positions: int = DEFAULT_MAX_POSITIONS,
+    ):
+        self._max_entries = max_entries
+        self._max_positions = max_positions
+        self._entries: OrderedDict[CacheKey, CommandResult] = OrderedDict()
+        self._positions = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(
+        start_position: Position,
+        command: Command | CompactCommand,
+        obstacle_version: str,
+    ) -> CacheKey:
+        return start_position, command_digest(command), obstacle_version
+
+    def get(self, key: CacheKey) -> CommandResult | None:
+        result = self._entries.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return result
+
+    def put(self, key: CacheKey, result: CommandResult) -> None:
+        size = _size(result)
+        if size > self._max_positions:
+            logger.info('Result with %d positions is too large to cache', size)
+            return
+
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._positions -= _size(previous)
+
+        self._entries[key] = result
+        self._positions += size
+
+        while (
+            len(self._entries) > self._max_entries
+            or self._positions > self._max_positions
+        ):
+            _, evicted = self._entries.popitem(last=False)
+            self._positions -= _size(evicted)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._positions = 0
+
+    def stats(self) -> CacheStats:
+        return CacheStats(
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+            entries=len(self._entries),
+            positions=self._positions,
+        )
+
+
+def _size(result: CommandResult) -> int:
+    return len(result.path) if result.path else 0
@@ -0,0 +1,145 @@
+import logging
+from collections import OrderedDict
+from typing import Protocol
+
+from app.domain.entities import Position, StoredCommand
+from app.domain.exceptions import CommandNotFoundException
+from app.domain.transforms import (
+    CompactTransforms,
+    Transform,
+    TransformTree,
+    build_transforms,
+)
+
+logger = logging.getLogger(__name__)
+
+# Bounds of the transform cache: number of commands and their total length
+TRANSFORM_CACHE_SIZE = 64
+TRANSFORM_CACHE_LENGTH = 4_000_000
+
+
+class CommandHistoryRepository(Protocol):
+    async def get_command(self, command_id: int) -> StoredCommand | None: ...
+
+
+class PositionHistoryRepository(Protocol):
+    async def get_position_before_command(self, command_id: int) -> Position | None: ...
+
+
+class StartPositionProvider(Protocol):
+    def get_start_position(self) -> Position: ...
+
+
+class TransformCache:
+    """LRU cache of per-command transform indexes keyed by command ID.
+
+    Stored commands never change, so the ID alone identifies an index. An
+    index grows with the text of its command, so besides the entry count
+    the cache bounds the total command length it holds.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = TRANSFORM_CACHE_SIZE,
+        max_length: int = TRANSFORM_CACHE_LENGTH,
+    ):
+        self._max_entries = max_entries
+        self._max_length = max_length
+        self._entries: OrderedDict[
+            int, tuple[TransformTree | CompactTransforms, int]
+        ] = OrderedDict()
+        self._length = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, command: StoredCommand) -> TransformTree | CompactTransforms:
+        """Transform index of a command's executed steps, built on a miss"""
+        entry = self._entries.get(command.id)
+        if entry is not None:
+            self._entries.move_to_end(command.id)
+            return entry[0]
+
+        transforms = build_transforms(command.executed_command)
+        length = len(command.executed_command.command_string)
+        if length > self._max_length:
+            logger.info('Command %d is too long to cache its transforms', command.id)
+            return transforms
+
+        self._entries[command.id] = transforms, length
+        self._length += length
+        while len(self._entries) > self._max_entries or self._length > self._max_length:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._length -= evicted
+        return transforms
+
+
+class CommandHistoryService:
+    """Pose queries over stored commands without reading their paths.
+
+    A command's poses follow from its start pose and the composed transforms
+    of its executed steps, so only the command row and the pose it started
+    from are read.
+    """
+
+    def __init__(
+        self,
+        command_repo: CommandHistoryRepository,
+        position_repo: PositionHistoryRepository,
+        start_position_provider: StartPositionProvider,
+        transform_cache: TransformCache | None = None,
+    ):
+        self._command_repo = command_repo
+        self._position_repo = position_repo
+        self._start_position_provider = start_position_provider
+        self._transforms = (
+            transform_cache if transform_cache is not None else TransformCache()
+        )
+
+    async def get_pose(self, command_id: int, step: int) -> Position:
+        """Pose of the rover after ``step`` executed steps of a command.
+
+        Raises:
+            CommandNotFoundException: If the command does not exist
+            ValueError: If ``step`` exceeds the executed length
+        """
+        command = await self._get_command(command_id)
+        transform = self._transforms.get(command).prefix(step)
+
+        start_position = await self._position_repo.get_position_before_command(
+            command_id
+        )
+        if start_position is None:
+            start_position = self._start_position_provider.get_start_position()
+
+        return transform.apply(start_position)
+
+    async def get_transform(
+        self, command_id: int, start: int = 0, stop: int | None = None
+    ) -> tuple[Transform, int]:
+        """Net transform of executed steps ``start`` to ``stop`` of a command.
+
+        Args:
+            command_id: Stored command ID
+            start: First step of the range
+            stop: End of the range (exclusive); all executed steps when omitted
+
+        Returns:
+            Tuple of the transform and the resolved ``stop``
+
+        Raises:
+            CommandNotFoundException: If the command does not exist
+            ValueError: If the range exceeds the executed length
+        """
+        command = await self._get_command(command_id)
+        transforms = self._transforms.get(command)
+        if stop is None:
+            stop = len(transforms)
+        return transforms.range(start, stop), stop
+
+    async def _get_command(self, command_id: int) -> StoredCommand:
+        command = await self._command_repo.get_command(command_id)
+        if command is None:
+            logger.info('Command %d not found', command_id)
+            raise CommandNotFoundException(command_id)
+        return command
@@ -0,0 +1,146 @@
+import logging
+from collections.abc import AsyncIterable, AsyncIterator, Callable, Iterable, Set
+from dataclasses import dataclass
+from typing import Protocol
+
+from app.application.command_service import (
+    ObstacleRepository,
+    fetch_obstacles_in_box,
+)
+from app.domain.entities import Obstacle, ObstacleEdit, Point
+from app.domain.exceptions import ObstacleMapReadOnlyException
+from app.domain.obstacle_stream import Cell, ObstacleStreamParser
+
+logger = logging.getLogger(__name__)
+
+# Box covering every cell of the int32 coordinate range
+WHOLE_MAP = (-(2**31), -(2**31), 2**31 - 1, 2**31 - 1)
+
+# Cells handed to the store at a time during an import
+IMPORT_BATCH_SIZE = 50_000
+
+
+@dataclass(frozen=True)
+class ImportResult:
+    version: str
+    rows: int
+
+
+class ObstacleStore(Protocol):
+    async def add_obstacles(
+        self,
+        obstacles: Iterable[Point],
+        on_edit: Callable[[ObstacleEdit], None] | None = None,
+    ) -> str: ...
+
+    async def remove_obstacles(
+        self,
+        obstacles: Iterable[Point],
+        on_edit: Callable[[ObstacleEdit], None] | None = None,
+    ) -> str: ...
+
+    async def replace_obstacles(self, obstacles: Iterable[Point]) -> str: ...
+
+    async def import_obstacles(self, batches: AsyncIterable[list[Cell]]) -> str: ...
+
+
+class ObstacleService:
+    """Reads and edits the obstacle map.
+
+    Every write publishes a new map version; commands already running keep
+    the version they started with, and results cached for older versions
+    age out because the version is part of their key.
+
+    The cells changed by ``add_obstacles`` and ``remove_obstacles`` are
+    passed to ``on_edit``, so active routes repair just those cells.
+    Replacements and imports are not passed on; readers notice them by
+    the version alone.
+    """
+
+    def __init__(
+        self,
+        obstacle_repo: ObstacleRepository,
+        store: ObstacleStore | None = None,
+        on_edit: Callable[[ObstacleEdit], None] | None = None,
+    ):
+        self._obstacle_repo = obstacle_repo
+        self._store = store
+        self._on_edit = on_edit
+
+    async def get_obstacles(
+        self, box: tuple[int, int, int, int] = WHOLE_MAP
+    ) -> tuple[Set[Obstacle], str]:
+        """Obstacles inside the inclusive box and the current map version"""
+        return await fetch_obstacles_in_box(self._obstacle_repo, box)
+
+    async def add_obstacles(self, obstacles: Iterable[Point]) -> str:
+        """Block cells, returning the new map version.
+
+        Raises:
+            ObstacleMapReadOnlyException: If the map cannot be written
+        """
+        version = await self._writable().add_obstacles(obstacles, self._on_edit)
+        logger.info('Obstacles added, map version %s', version)
+        return version
+
+    async def remove_obstacles(self, obstacles: Iterable[Point]) -> str:
+        """Clear cells, returning the new map version.
+
+        Raises:
+            ObstacleMapReadOnlyException: If the map cannot be written
+        """
+        version = await self._writable().remove_obstacles(obstacles, self._on_edit)
+        logger.info('Obstacles removed, map version %s', version)
+        return version
+
+    async def replace_obstacles(self, obstacles: Iterable[Point]) -> str:
+        """Replace the whole map, returning the new map version.
+
+        Raises:
+            ObstacleMapReadOnlyException: If the map cannot be written
+        """
+        version = await self._writable().replace_obstacles(obstacles)
+        logger.info('Obstacle map replaced, map version %s', version)
+        return version
+
+    async def import_obstacles(
+        self, chunks: AsyncIterable[bytes], fmt: str
+    ) -> ImportResult:
+        """Replace the whole map with an NDJSON or CSV stream.
+
+        The stream is parsed as it arrives and handed to the store in
+        batches, so the body is never held whole. The current map keeps
+        serving until the store publishes the imported one.
+
+        Raises:
+            ObstacleMapReadOnlyException: If the map cannot be written
+            ValueError: If the format is unknown or a line is invalid
+        """
+        parser = ObstacleStreamParser(fmt)
+        version = await self._writable().import_obstacles(_batches(chunks, parser))
+        logger.info(
+            'Obstacle map imported: %d rows from %d lines, map version %s',
+            parser.rows,
+            parser.lines,
+            version,
+        )
+        return ImportResult(version=version, rows=parser.rows)
+
+    def _writable(self) -> ObstacleStore:
+        if self._store is None:
+            raise ObstacleMapReadOnlyException()
+        return self._store
+
+
+async def _batches(
+    chunks: AsyncIterable[bytes], parser: ObstacleStreamParser
+) -> AsyncIterator[list[Cell]]:
+    batch: list[Cell] = []
+    async for chunk in chunks:
+        batch += parser.feed(chunk)
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            yield batch
+            batch = []
+    batch += parser.close()
+    if batch:
+        yield batch
@@ -0,0 +1,348 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+
+from app.application.command_service import (
+    ObstacleRepository,
+    fetch_obstacles_in_box,
+    fetch_version,
+)
+from app.application.position_service import PositionService
+from app.application.route_service import (
+    DEFAULT_SEARCH_MARGIN,
+    PlannerStats,
+    search_box,
+)
+from app.domain.dstar import DStarLite
+from app.domain.entities import Direction, Obstacle, ObstacleEdit, Point, Position
+from app.domain.exceptions import (
+    MissionException,
+    NoRouteException,
+    RouteBudgetExceededException,
+    RouteNotFoundException,
+)
+from app.domain.planner import DEFAULT_MAX_EXPANSIONS, RoutePlan
+
+logger = logging.getLogger(__name__)
+
+# Routes kept for replanning; the least recently used is dropped beyond this
+MAX_ACTIVE_ROUTES = 64
+
+# Edits queued on a route between replans; beyond this the next replan
+# reads its box again
+MAX_QUEUED_EDITS = 256
+
+
+@dataclass
+class ActiveRoute:
+    """Search state kept for one target between replans"""
+
+    planner: DStarLite
+    # Obstacles inside the planner's box as of ``version``
+    cells: set[Obstacle]
+    version: str
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    # Map edits since ``version``, cut to the planner's box
+    edits: list[ObstacleEdit] = field(default_factory=list)
+
+    def queue(self, edit: ObstacleEdit) -> None:
+        if len(self.edits) >= MAX_QUEUED_EDITS:
+            self.edits.clear()
+        covers = self.planner.covers
+        self.edits.append(
+            ObstacleEdit(
+                edit.previous,
+                edit.version,
+                frozenset(o for o in edit.added if covers(o)),
+                frozenset(o for o in edit.removed if covers(o)),
+            )
+        )
+
+    def take_edits(self, version: str) -> list[ObstacleEdit] | None:
+        """Queued edits leading from the route's version to ``version``.
+
+        Returns None when the chain has a gap, such as a write from another
+        process or a whole-map replacement; edits up to ``version`` are
+        dropped either way.
+        """
+        edits, self.edits = self.edits, []
+        start = next(
+            (i for i, e in enumerate(edits) if e.previous == self.version), None
+        )
+        if start is not None:
+            for end in range(start, len(edits)):
+                if end > start and edits[end].previous != edits[end - 1].version:
+                    break
+                if edits[end].version == version:
+                    self.edits = edits[end + 1 :]
+                    return edits[start : end + 1]
+        # Keep the edits written after ``version`` for the next replan
+        rest = next((i for i, e in enumerate(edits) if e.previous == version), None)
+        if rest is not None:
+            self.edits = edits[rest:]
+        return None
+
+
+@dataclass(frozen=True)
+class Replan:
+    route_id: int
+    start: Position
+    plan: RoutePlan
+    obstacle_map_version: str
+    # Cells inside the route's box that changed since its last plan
+    changed_cells: int = 0
+
+
+class ActiveRoutes:
+    """Active routes shared by all requests, least recently used first"""
+
+    def __init__(self, max_routes: int = MAX_ACTIVE_ROUTES):
+        self._max_routes = max_routes
+        self._routes: OrderedDict[int, ActiveRoute] = OrderedDict()
+        self._next_id = 1
+
+    def __len__(self) -> int:
+        return len(self._routes)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(list(self._routes))
+
+    def add(self, route: ActiveRoute) -> int:
+        route_id = self._next_id
+        self._next_id += 1
+        self._routes[route_id] = route
+        while len(self._routes) > self._max_routes:
+            evicted, _ = self._routes.popitem(last=False)
+            logger.info('Active route %d evicted', evicted)
+        return route_id
+
+    def get(self, route_id: int) -> ActiveRoute:
+        route = self._routes.get(route_id)
+        if route is None:
+            raise RouteNotFoundException(route_id)
+        self._routes.move_to_end(route_id)
+        return route
+
+    def remove(self, route_id: int) -> None:
+        if self._routes.pop(route_id, None) is None:
+            raise RouteNotFoundException(route_id)
+
+    def record(self, edit: ObstacleEdit) -> None:
+        """Queue a map edit on every route for its next replan"""
+        for route in self._routes.values():
+            route.queue(edit)
+
+
+class ReplanningService:
+    """Routes to fixed targets that are repaired as the map changes.
+
+    Each active route keeps a D* Lite search over a box around the rover
+    and its target. A replan reads the rover's pose and the map version;
+    an unchanged version goes straight to the search. Otherwise the cells
+    edited since the route's version, queued on it by ``ActiveRoutes.record``,
+    are handed to the search, which revisits just the poses whose cost they
+    change. When some edits were not seen, the box is read again and
+    diffed. A rover that left the box gets a fresh search around its pose.
+
+    Args:
+        position_service: Source of the current pose
+        obstacle_repo: Repository answering box queries
+        routes: Active routes shared across requests
+        stats: Totals updated by every plan
+        margin: Cells a new box extends past the rover and the target
+    """
+
+    def __init__(
+        self,
+        position_service: PositionService,
+        obstacle_repo: ObstacleRepository,
+        routes: ActiveRoutes,
+        stats: PlannerStats | None = None,
+        margin: int = DEFAULT_SEARCH_MARGIN,
+    ):
+        self._position_service = position_service
+        self._obstacle_repo = obstacle_repo
+        self._routes = routes
+        self._stats = stats if stats is not None else PlannerStats()
+        self._margin = margin
+
+    async def start(
+        self,
+        target: Point,
+        direction: Direction | None = None,
+        max_expansions: int = DEFAULT_MAX_EXPANSIONS,
+    ) -> Replan:
+        """Plan a route to ``target`` and keep it for replanning.
+
+        Like a one-off plan, the box is widened while no route stays
+        inside it.
+
+        Raises:
+            LandingObstacleException: If the current pose holds an obstacle
+            NoRouteException: If the target holds an obstacle or is unreachable
+            RouteBudgetExceededException: If ``max_expansions`` runs out
+        """
+        start = await self._position_service.get_current_position()
+        route, plan = await self._timed(
+            self._build(start, target, direction, max_expansions)
+        )
+        route_id = self._routes.add(route)
+        logger.info(
+            'Active route %d to (%d, %d) started', route_id, *target.coordinates()
+        )
+        return Replan(route_id, start, plan, route.version)
+
+    async def replan(
+        self, route_id: int, max_expansions: int = DEFAULT_MAX_EXPANSIONS
+    ) -> Replan:
+        """Repair an active route for the current pose and map.
+
+        A route without a way through stays active, so it is found again
+        once the obstacles clear.
+
+        Raises:
+            RouteNotFoundException: If the route is not active
+            LandingObstacleException: If the current pose holds an obstacle
+            NoRouteException: If the target is unreachable
+            RouteBudgetExceededException: If ``max_expansions`` runs out;
+                the next replan resumes the search
+        """
+        route = self._routes.get(route_id)
+        async with route.lock:
+            start = await self._position_service.get_current_position()
+            self._stats.replans += 1
+            return await self._timed(
+                self._replan(route_id, route, start, max_expansions)
+            )
+
+    async def replan_all(
+        self, max_expansions: int = DEFAULT_MAX_EXPANSIONS
+    ) -> dict[int, Replan | MissionException]:
+        """Replan every active route, collecting failures per route"""
+        results: dict[int, Replan | MissionException] = {}
+        for route_id in self._routes:
+            try:
+                results[route_id] = await self.replan(route_id, max_expansions)
+            except MissionException as e:
+                results[route_id] = e
+        return results
+
+    def stop(self, route_id: int) -> None:
+        """Forget an active route.
+
+        Raises:
+            RouteNotFoundException: If the route is not active
+        """
+        self._routes.remove(route_id)
+        logger.info('Active route %d stopped', route_id)
+
+    async def _replan(
+        self, route_id: int, route: ActiveRoute, start: Position, max_expansions: int
+    ) -> Replan:
+        planner = route.planner
+        if not planner.covers(start.point):
+            logger.info('Rover left the box of route %d, searching anew', route_id)
+            fresh, plan = await self._build(
+                start, planner.target, planner.direction, max_expansions
+            )
+            route.planner, route.cells, route.version = (
+                fresh.planner,
+                fresh.cells,
+                fresh.version,
+            )
+            # Queued edits were cut to the old box
+            route.edits = []
+            return Replan(route_id, start, plan, route.version)
+
+        changed = 0
+        version = await fetch_version(self._obstacle_repo)
+        if version != route.version:
+            edits = route.take_edits(version)
+            if edits is None:
+                obstacles, version = await fetch_obstacles_in_box(
+                    self._obstacle_repo, planner.box, version
+                )
+                cells = set(obstacles)
+                changed = planner.update_obstacles(
+                    cells - route.cells, route.cells - cells
+                )
+                route.cells = cells
+            else:
+                for edit in edits:
+                    added = edit.added - route.cells
+                    removed = edit.removed & route.cells
+                    route.cells |= added
+                    route.cells -= removed
+                    changed += planner.update_obstacles(added, removed)
+            route.version = version
+            self._stats.changed_cells += changed
+            logger.info(
+                'Route %d: %d cells changed up to map version %s',
+                route_id,
+                changed,
+                version,
+            )
+
+        plan = await self._plan(planner, start, max_expansions)
+        return Replan(route_id, start, plan, version, changed)
+
+    async def _build(
+        self,
+        start: Position,
+        target: Point,
+        direction: Direction | None,
+        max_expansions: int,
+    ) -> tuple[ActiveRoute, RoutePlan]:
+        """New search around the start and the target, widened as needed"""
+        margin = self._margin
+        spent = 0
+        box = None
+        while True:
+            previous, box = box, search_box(start.point, target, margin)
+            obstacles, version = await fetch_obstacles_in_box(self._obstacle_repo, box)
+            cells = set(obstacles)
+            if Obstacle(target.x, target.y) in cells:
+                raise NoRouteException(target)
+            planner = DStarLite(start, target, box, cells, direction)
+            try:
+                plan = await self._plan(planner, start, max_expansions - spent)
+            except NoRouteException as e:
+                spent += e.expansions
+                if box == previous:
+                    raise NoRouteException(target, spent) from e
+                margin *= 4
+                continue
+            except RouteBudgetExceededException as e:
+                raise RouteBudgetExceededException(target, spent + e.expansions) from e
+            plan = RoutePlan(plan.command, plan.final_position, spent + plan.expansions)
+            return ActiveRoute(planner, cells, version), plan
+
+    async def _plan(
+        self, planner: DStarLite, start: Position, max_expansions: int
+    ) -> RoutePlan:
+        try:
+            plan = await asyncio.to_thread(planner.plan, start, max_expansions)
+        except (NoRouteException, RouteBudgetExceededException) as e:
+            self._stats.expansions += e.expansions
+            raise
+        self._stats.expansions += plan.expansions
+        return plan
+
+    async def _timed(self, planning):
+        """Await a planning step, counting its outcome and time"""
+        started = time.perf_counter()
+        try:
+            result = await planning
+        except RouteBudgetExceededException:
+            self._stats.budget_exhausted += 1
+            raise
+        except NoRouteException:
+            self._stats.failures += 1
+            raise
+        finally:
+            self._stats.seconds += time.perf_counter() - started
+        self._stats.plans += 1
+        return result
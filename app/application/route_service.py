@@ -0,0 +1,186 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+
+from app.application.command_service import (
+    CommandService,
+    ObstacleRepository,
+    fetch_obstacles_in_box,
+)
+from app.application.obstacle_service import WHOLE_MAP
+from app.application.position_service import PositionService
+from app.domain.entities import CommandResult, Direction, Obstacle, Point, Position
+from app.domain.exceptions import NoRouteException, RouteBudgetExceededException
+from app.domain.planner import DEFAULT_MAX_EXPANSIONS, RoutePlan, plan_route
+
+logger = logging.getLogger(__name__)
+
+# Cells the first search box extends past the start and the target
+DEFAULT_SEARCH_MARGIN = 64
+
+Box = tuple[int, int, int, int]
+
+
+@dataclass
+class PlannerStats:
+    """Running totals of route planning, exported as metrics"""
+
+    plans: int = 0
+    failures: int = 0
+    budget_exhausted: int = 0
+    expansions: int = 0
+    seconds: float = 0.0
+    replans: int = 0
+    changed_cells: int = 0
+
+
+@dataclass(frozen=True)
+class PlannedRoute:
+    start: Position
+    plan: RoutePlan
+    obstacle_map_version: str
+    # Outcome of driving the route, when it was executed
+    result: CommandResult | None = None
+
+
+class RoutePlannerService:
+    """Plans obstacle-avoiding routes from the current pose.
+
+    The search starts in a box around the start and the target, widened by
+    ``margin`` cells, and is repeated in a box four times wider whenever no
+    route stays inside, until the box covers the int32 map. Obstacles are
+    loaded per box, and the expansion budget is shared by all attempts.
+
+    Args:
+        position_service: Source of the current pose
+        obstacle_repo: Repository answering box queries
+        command_service: Executes a route when asked to
+        stats: Totals updated by every plan
+        margin: Cells the first box extends past both ends
+    """
+
+    def __init__(
+        self,
+        position_service: PositionService,
+        obstacle_repo: ObstacleRepository,
+        command_service: CommandService,
+        stats: PlannerStats | None = None,
+        margin: int = DEFAULT_SEARCH_MARGIN,
+    ):
+        self._position_service = position_service
+        self._obstacle_repo = obstacle_repo
+        self._command_service = command_service
+        self._stats = stats if stats is not None else PlannerStats()
+        self._margin = margin
+
+    async def plan(
+        self,
+        target: Point,
+        direction: Direction | None = None,
+        execute: bool = False,
+        max_expansions: int = DEFAULT_MAX_EXPANSIONS,
+        weight: float = 1.0,
+    ) -> PlannedRoute:
+        """Plan a route to ``target`` and optionally drive it.
+
+        The route is executed through the command service like any other
+        command, so if the map changed after planning the rover stops at
+        the first new obstacle.
+
+        Args:
+            target: Cell to reach
+            direction: Required heading on arrival, any when None
+            execute: Drive the route once planned
+            max_expansions: Poses expanded over all attempts before giving up
+            weight: Factor on the distance estimate, trading length for speed
+
+        Raises:
+            LandingObstacleException: If the current pose holds an obstacle
+            NoRouteException: If the target holds an obstacle or is unreachable
+            RouteBudgetExceededException: If ``max_expansions`` runs out
+        """
+        start = await self._position_service.get_current_position()
+        started = time.perf_counter()
+        try:
+            plan, version = await self._search(
+                start, target, direction, max_expansions, weight
+            )
+        except RouteBudgetExceededException:
+            self._stats.budget_exhausted += 1
+            raise
+        except NoRouteException:
+            self._stats.failures += 1
+            raise
+        finally:
+            self._stats.seconds += time.perf_counter() - started
+
+        self._stats.plans += 1
+        logger.info(
+            'Planned route to (%d, %d) of %d steps after %d expansions',
+            target.x,
+            target.y,
+            len(plan.command.command_string),
+            plan.expansions,
+        )
+
+        result = None
+        if execute and not plan.command.is_empty():
+            result = await self._command_service.execute_command(plan.command)
+        return PlannedRoute(start, plan, version, result)
+
+    async def _search(
+        self,
+        start: Position,
+        target: Point,
+        direction: Direction | None,
+        max_expansions: int,
+        weight: float,
+    ) -> tuple[RoutePlan, str]:
+        margin = self._margin
+        spent = 0
+        box = None
+        while True:
+            previous, box = box, search_box(start.point, target, margin)
+            obstacles, version = await fetch_obstacles_in_box(self._obstacle_repo, box)
+            if Obstacle(target.x, target.y) in obstacles:
+                raise NoRouteException(target)
+            try:
+                plan = await asyncio.to_thread(
+                    plan_route,
+                    start,
+                    target,
+                    obstacles,
+                    box,
+                    direction,
+                    max_expansions - spent,
+                    weight,
+                )
+            except NoRouteException as e:
+                spent += e.expansions
+                self._stats.expansions += e.expansions
+                if box == previous:
+                    raise NoRouteException(target, spent) from e
+                logger.info('No route inside %s, widening the search', box)
+                margin *= 4
+                continue
+            except RouteBudgetExceededException as e:
+                self._stats.expansions += e.expansions
+                raise RouteBudgetExceededException(target, spent + e.expansions) from e
+
+            self._stats.expansions += plan.expansions
+            return (
+                RoutePlan(plan.command, plan.final_position, spent + plan.expansions),
+                version,
+            )
+
+
+def search_box(start: Point, target: Point, margin: int) -> Box:
+    """Box around both points widened by ``margin``, clipped to the int32 map"""
+    min_x, min_y, max_x, max_y = WHOLE_MAP
+    return (
+        max(min(start.x, target.x) - margin, min_x),
+        max(min(start.y, target.y) - margin, min_y),
+        min(max(start.x, target.x) + margin, max_x),
+        min(max(start.y, target.y) + margin, max_y),
+    )
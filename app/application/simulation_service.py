@@ -0,0 +1,126 @@
+import asyncio
+import logging
+from collections.abc import Set
+from concurrent.futures import Executor
+
+from app.application.command_service import (
+    ObstacleRepository,
+    fetch_obstacle_map,
+    fetch_obstacles_in_box,
+)
+from app.application.position_service import PositionService
+from app.domain.compact import execute_compact, reach_envelope
+from app.domain.entities import (
+    Command,
+    CommandResult,
+    CompactCommand,
+    Obstacle,
+    Position,
+)
+from app.domain.fleet import simulate_fleet
+
+logger = logging.getLogger(__name__)
+
+# Candidates per pool task when a batch is simulated in parallel
+SIMULATION_SHARD_SIZE = 256
+
+
+class SimulationService:
+    """Read-only what-if execution of candidate commands.
+
+    Candidates run against the current obstacle map from the current or a
+    supplied pose. Nothing is persisted and no lock is taken.
+
+    Args:
+        position_service: Source of the current pose
+        obstacle_repo: Source of the obstacle map
+        executor: Long-lived thread pool sharing large batches on the NumPy
+            path, owned by the caller
+        shard_size: Candidates per pool task
+        prune_obstacles: Load only the box all candidates could reach, as
+            ``CommandService`` does for the database backend
+    """
+
+    def __init__(
+        self,
+        position_service: PositionService,
+        obstacle_repo: ObstacleRepository,
+        executor: Executor | None = None,
+        shard_size: int = SIMULATION_SHARD_SIZE,
+        prune_obstacles: bool = False,
+    ):
+        self._position_service = position_service
+        self._obstacle_repo = obstacle_repo
+        self._executor = executor
+        self._shard_size = shard_size
+        self._prune_obstacles = prune_obstacles
+
+    async def simulate(
+        self,
+        commands: list[Command | CompactCommand],
+        start_position: Position | None = None,
+    ) -> list[CommandResult]:
+        """Simulate every candidate from the same start position.
+
+        Plain commands are batched through the fleet simulator, which shards
+        large batches across the executor; compact commands run one by one.
+        The work runs in a thread so the event loop stays responsive.
+
+        Returns:
+            One CommandResult per candidate, in input order
+
+        Raises:
+            LandingObstacleException: If the start position holds an obstacle
+        """
+        if start_position is None:
+            start_position = await self._position_service.get_current_position()
+        obstacles = await self._get_obstacles(commands, start_position)
+
+        logger.info(
+            'Simulating %d candidates from x=%d, y=%d, direction=%s',
+            len(commands),
+            start_position.x,
+            start_position.y,
+            start_position.direction.name,
+        )
+        return await asyncio.to_thread(
+            self._simulate, commands, start_position, obstacles
+        )
+
+    async def _get_obstacles(
+        self, commands: list[Command | CompactCommand], start_position: Position
+    ) -> Set[Obstacle]:
+        """The whole map, or the obstacles in the box every candidate fits"""
+        if not self._prune_obstacles:
+            obstacles, _ = await fetch_obstacle_map(self._obstacle_repo)
+            return obstacles
+        boxes = [reach_envelope(command, start_position) for command in commands]
+        box = (
+            min(b[0] for b in boxes),
+            min(b[1] for b in boxes),
+            max(b[2] for b in boxes),
+            max(b[3] for b in boxes),
+        )
+        obstacles, _ = await fetch_obstacles_in_box(self._obstacle_repo, box)
+        return obstacles
+
+    def _simulate(self, commands, start_position, obstacles) -> list[CommandResult]:
+        plain = [
+            (i, command)
+            for i, command in enumerate(commands)
+            if not isinstance(command, CompactCommand)
+        ]
+        fleet_results = simulate_fleet(
+            [(start_position, command) for _, command in plain],
+            obstacles,
+            shard_size=self._shard_size,
+            executor=self._executor,
+        )
+
+        results: list[CommandResult | None] = [None] * len(commands)
+        for (i, _), result in zip(plain, fleet_results, strict=True):
+            results[i] = result
+        for i, command in enumerate(commands):
+            if isinstance(command, CompactCommand):
+                results[i] = execute_compact(command, start_position, obstacles)
+        return results
@@ -0,0 +1,137 @@
+import asyncio
+import heapq
+from collections.abc import Callable, Iterable, Set
+from dataclasses import dataclass
+from itertools import islice
+
+from app.application.command_service import (
+    ObstacleRepository,
+    fetch_obstacles_in_box,
+)
+from app.application.obstacle_service import WHOLE_MAP
+from app.domain.entities import Obstacle
+from app.domain.kdtree import SpatialIndex, distance2
+from app.domain.obstacle_stream import Cell
+from app.domain.snapshot import spatial_index
+
+Box = tuple[int, int, int, int]
+
+
+@dataclass(frozen=True)
+class SpatialResult:
+    version: str
+    cells: list[Cell]
+    truncated: bool = False
+
+
+class SpatialQueryService:
+    """Viewport, radius and nearest-obstacle queries.
+
+    Maps that keep a k-d tree (JSON snapshots and compiled maps) answer
+    from it in a worker thread, since the tree is built on first use and
+    then carried across edits. Other maps, and the database backend,
+    answer from box queries of the obstacle repository; a nearest query
+    widens its box until it holds enough obstacles.
+
+    Args:
+        obstacle_repo: Repository answering box queries
+        obstacle_map: Returns the process-wide map, when there is one
+    """
+
+    def __init__(
+        self,
+        obstacle_repo: ObstacleRepository,
+        obstacle_map: Callable[[], Set[Obstacle]] | None = None,
+    ):
+        self._obstacle_repo = obstacle_repo
+        self._obstacle_map = obstacle_map
+
+    async def in_box(self, box: Box, limit: int) -> SpatialResult:
+        """Obstacles inside the inclusive box, sorted by x then y.
+
+        At most ``limit`` are returned; a truncated result holds an
+        arbitrary subset of the box.
+        """
+        indexed = await self._query(lambda index: index.in_box(*box, limit=limit + 1))
+        if indexed is not None:
+            return _truncate(*indexed, limit)
+        obstacles, version = await fetch_obstacles_in_box(self._obstacle_repo, box)
+        cells = sorted(islice(_cells(obstacles), limit + 1))
+        return _truncate(cells, version, limit)
+
+    async def within_radius(
+        self, x: int, y: int, radius: int, limit: int
+    ) -> SpatialResult:
+        """Obstacles at most ``radius`` from (x, y), nearest first.
+
+        At most ``limit`` of the nearest are returned.
+        """
+        indexed = await self._query(
+            lambda index: index.within_radius(x, y, radius, limit + 1)
+        )
+        if indexed is not None:
+            return _truncate(*indexed, limit)
+        box = _square(x, y, radius)
+        obstacles, version = await fetch_obstacles_in_box(self._obstacle_repo, box)
+        r2 = radius * radius
+        cells = (c for c in _cells(obstacles) if distance2(x, y, c) <= r2)
+        return _truncate(_nearest(x, y, cells, limit + 1), version, limit)
+
+    async def nearest(self, x: int, y: int, k: int) -> SpatialResult:
+        """The k obstacles closest to (x, y), nearest first, ties by x then y"""
+        indexed = await self._query(lambda index: index.nearest(x, y, k))
+        if indexed is not None:
+            return SpatialResult(version=indexed[1], cells=indexed[0])
+
+        radius = 1
+        while True:
+            box = _square(x, y, radius)
+            obstacles, version = await fetch_obstacles_in_box(self._obstacle_repo, box)
+            cells = list(_cells(obstacles))
+            # Cells outside the box are farther than radius, so k cells
+            # within it are the k nearest
+            r2 = radius * radius
+            enough = sum(distance2(x, y, c) <= r2 for c in cells) >= k
+            if enough or box == WHOLE_MAP:
+                return SpatialResult(version=version, cells=_nearest(x, y, cells, k))
+            radius *= 4
+
+    async def _query(
+        self, query: Callable[[SpatialIndex], list[Cell]]
+    ) -> tuple[list[Cell], str] | None:
+        if self._obstacle_map is None:
+            return None
+        obstacles = self._obstacle_map()
+
+        def run() -> tuple[list[Cell], str] | None:
+            index = spatial_index(obstacles)
+            if index is None:
+                return None
+            return query(index), obstacles.version
+
+        return await asyncio.to_thread(run)
+
+
+def _cells(obstacles: Iterable[Obstacle]) -> Iterable[Cell]:
+    return ((o.x, o.y) for o in obstacles)
+
+
+def _nearest(x: int, y: int, cells: Iterable[Cell], k: int) -> list[Cell]:
+    return heapq.nsmallest(k, cells, key=lambda c: (distance2(x, y, c), c[0], c[1]))
+
+
+def _square(x: int, y: int, radius: int) -> Box:
+    """Box of side ``2 * radius + 1`` around (x, y), clipped to the int32 map"""
+    min_x, min_y, max_x, max_y = WHOLE_MAP
+    return (
+        max(x - radius, min_x),
+        max(y - radius, min_y),
+        min(x + radius, max_x),
+        min(y + radius, max_y),
+    )
+
+
+def _truncate(cells: list[Cell], version: str, limit: int) -> SpatialResult:
+    return SpatialResult(
+        version=version, cells=cells[:limit], truncated=len(cells) > limit
+    )
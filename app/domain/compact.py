@@ -0,0 +1,285 @@
+"""Execution of compact commands without expanding repeated groups"""
+
+from dataclasses import dataclass
+
+from app.domain.compiler import OP_LEFT, CompactNode, RepeatNode, RunNode
+from app.domain.entities import (
+    Command,
+    CommandResult,
+    CompactCommand,
+    Obstacle,
+    Position,
+    PositionPath,
+)
+from app.domain.exceptions import LandingObstacleException
+from app.domain.obstacle_index import ObstacleLookup
+from app.domain.pose import MOVE_X, MOVE_Y
+from app.domain.snapshot import obstacle_index
+
+
+@dataclass(frozen=True, slots=True)
+class _Summary:
+    """Net effect of a program started at the origin with a given heading.
+
+    The bounding box covers every cell visited on the way, relative to the
+    start cell.
+    """
+
+    dx: int
+    dy: int
+    direction: int
+    min_x: int
+    min_y: int
+    max_x: int
+    max_y: int
+
+    def then(self, other: '_Summary') -> '_Summary':
+        """Compose with a summary that starts where this one ends"""
+        return _Summary(
+            self.dx + other.dx,
+            self.dy + other.dy,
+            other.direction,
+            min(self.min_x, self.dx + other.min_x),
+            min(self.min_y, self.dy + other.min_y),
+            max(self.max_x, self.dx + other.max_x),
+            max(self.max_y, self.dy + other.max_y),
+        )
+
+    def repeated(self, times: int) -> '_Summary':
+        """Summary of ``times`` back-to-back copies of a heading-preserving program"""
+        last_x = self.dx * (times - 1)
+        last_y = self.dy * (times - 1)
+        return _Summary(
+            self.dx * times,
+            self.dy * times,
+            self.direction,
+            self.min_x + min(0, last_x),
+            self.min_y + min(0, last_y),
+            self.max_x + max(0, last_x),
+            self.max_y + max(0, last_y),
+        )
+
+
+def _period(rotation: int) -> int:
+    """Iterations after which a body turning by ``rotation`` restores heading"""
+    return 1 if rotation == 0 else 2 if rotation == 2 else 4
+
+
+def _turn(op: int, direction: int, count: int) -> int:
+    return (direction + (-count if op == OP_LEFT else count)) % 4
+
+
+class _CompactRun:
+    """Mutable rover state while a compact program is executed"""
+
+    def __init__(self, index: ObstacleLookup, x: int, y: int, direction: int):
+        self.index = index
+        self.x = x
+        self.y = y
+        self.direction = direction
+        self.executed = 0
+        self._summaries: dict[tuple[int, int], _Summary] = {}
+
+    def run(self, nodes: tuple[CompactNode, ...]) -> bool:
+        """Execute nodes, returning True if an obstacle stopped the rover"""
+        for node in nodes:
+            if isinstance(node, RepeatNode):
+                if self._repeat(node):
+                    return True
+            elif node.op >= OP_LEFT:
+                self.direction = _turn(node.op, self.direction, node.count)
+                self.executed += node.count
+            else:
+                dx = MOVE_X[node.op][self.direction]
+                dy = MOVE_Y[node.op][self.direction]
+                free = self.index.free_steps(self.x, self.y, dx, dy, node.count)
+                self.x += dx * free
+                self.y += dy * free
+                self.executed += free
+                if free < node.count:
+                    return True
+        return False
+
+    def _repeat(self, node: RepeatNode) -> bool:
+        body_steps = node.steps // node.count
+        period = _period(self._summary(node.body, 0).direction)
+        done = 0
+
+        while done < node.count:
+            remaining = node.count - done
+            if remaining < period:
+                if self.run(node.body):
+                    return True
+                done += 1
+                continue
+
+            cycle = self._period_summary(node.body, self.direction, period)
+            if cycle.dx == 0 and cycle.dy == 0:
+                # Closed loop: after one clean period the rest revisit the same cells
+                for _ in range(period):
+                    if self.run(node.body):
+                        return True
+                skipped = (remaining - period) // period * period
+                self.executed += skipped * body_steps
+                done += period + skipped
+                continue
+
+            # Drifting loop: skip as many periods as have an obstacle-free box
+            periods = remaining // period
+            while periods and self._blocked(cycle.repeated(periods)):
+                periods //= 2
+
+            if periods:
+                self.x += cycle.dx * periods
+                self.y += cycle.dy * periods
+                self.executed += periods * period * body_steps
+                done += periods * period
+            else:
+                if self.run(node.body):
+                    return True
+                done += 1
+
+        return False
+
+    def _blocked(self, summary: _Summary) -> bool:
+        return self.index.any_in_box(
+            self.x + summary.min_x,
+            self.y + summary.min_y,
+            self.x + summary.max_x,
+            self.y + summary.max_y,
+        )
+
+    def _period_summary(
+        self, body: tuple[CompactNode, ...], direction: int, period: int
+    ) -> _Summary:
+        summary = self._summary(body, direction)
+        for _ in range(period - 1):
+            summary = summary.then(self._summary(body, summary.direction))
+        return summary
+
+    def _summary(self, nodes: tuple[CompactNode, ...], direction: int) -> _Summary:
+        # Programs are immutable and outlive the run, so identity is a safe key
+        key = (id(nodes), direction)
+        summary = self._summaries.get(key)
+        if summary is not None:
+            return summary
+
+        summary = _Summary(0, 0, direction, 0, 0, 0, 0)
+        for node in nodes:
+            if isinstance(node, RepeatNode):
+                step = self._repeat_summary(node, summary.direction)
+            elif node.op >= OP_LEFT:
+                step = _Summary(
+                    0, 0, _turn(node.op, summary.direction, node.count), 0, 0, 0, 0
+                )
+            else:
+                dx = MOVE_X[node.op][summary.direction] * node.count
+                dy = MOVE_Y[node.op][summary.direction] * node.count
+                step = _Summary(
+                    dx,
+                    dy,
+                    summary.direction,
+                    min(0, dx),
+                    min(0, dy),
+                    max(0, dx),
+                    max(0, dy),
+                )
+            summary = summary.then(step)
+
+        self._summaries[key] = summary
+        return summary
+
+    def _repeat_summary(self, node: RepeatNode, direction: int) -> _Summary:
+        period = _period(self._summary(node.body, 0).direction)
+        periods, rest = divmod(node.count, period)
+
+        summary = _Summary(0, 0, direction, 0, 0, 0, 0)
+        if periods:
+            cycle = self._period_summary(node.body, direction, period)
+            summary = cycle.repeated(periods)
+        for _ in range(rest):
+            summary = summary.then(self._summary(node.body, summary.direction))
+        return summary
+
+
+def execute_compact(
+    command: CompactCommand,
+    start_position: Position,
+    obstacles: set[Obstacle],
+    index: ObstacleLookup | None = None,
+) -> CommandResult:
+    """
+    Execute a compact command without expanding it.
+
+    Runs such as ``F100`` are resolved with one index lookup. For a repeated
+    group the net displacement and bounding box of one heading period are
+    computed analytically: a group that returns to its start cell is executed
+    for one period only, and a drifting group skips every stretch of periods
+    whose bounding box holds no obstacle, so the cost depends on the size of
+    the program and the obstacles near the route rather than the expanded
+    length. The final pose and stop point match ``execute_commands`` on the
+    expanded command.
+
+    Args:
+        command: Compact command
+        start_position: Starting position
+        obstacles: Set of obstacles
+        index: Prebuilt index of ``obstacles``; built on the fly when omitted
+
+    Returns:
+        CommandResult whose path holds only the final position, or nothing if
+        no step was executed
+
+    Raises:
+        LandingObstacleException: If obstacle is detected at starting position
+    """
+    if index is None:
+        index = obstacle_index(obstacles)
+
+    # Critical safety check: verify no obstacle at landing position
+    if index.contains(start_position.x, start_position.y):
+        raise LandingObstacleException(start_position.coordinates())
+
+    state = _CompactRun(
+        index, start_position.x, start_position.y, int(start_position.direction)
+    )
+    stopped = state.run(command.program)
+
+    path = PositionPath()
+    if state.executed:
+        path.append(state.x, state.y, state.direction)
+
+    return CommandResult(
+        final_position=path[-1] if path else start_position,
+        stopped_by_obstacle=stopped,
+        path=path,
+        executed_command=command.truncate(state.executed) if stopped else command,
+        initial_command=command,
+    )
+
+
+def reach_envelope(
+    command: Command | CompactCommand, start_position: Position
+) -> tuple[int, int, int, int]:
+    """Bounding box of every cell the command could visit from the start.
+
+    The box is that of the unobstructed route; obstacles only cut the route
+    short, so it covers the cells visited whatever the obstacle map holds.
+    Compact commands are summarized without expansion and plain commands
+    run by run.
+
+    Returns:
+        Inclusive ``(min_x, min_y, max_x, max_y)``
+    """
+    if isinstance(command, CompactCommand):
+        nodes = command.program
+    else:
+        nodes = tuple(RunNode(op, count) for op, _, count in command.program.runs())
+
+    summary = _CompactRun(None, 0, 0, 0)._summary(nodes, int(start_position.direction))
+    return (
+        start_position.x + summary.min_x,
+        start_position.y + summary.min_y,
+        start_position.x + summary.max_x,
+        start_position.y + summary.max_y,
+    )
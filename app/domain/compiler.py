@@ -0,0 +1,213 @@
+"""Compilers from command strings to opcode buffers and compact programs"""
+
+import re
+from dataclasses import dataclass, field
+
+# Opcodes, one byte per command character
+OP_FORWARD = 0
+OP_BACKWARD = 1
+OP_LEFT = 2
+OP_RIGHT = 3
+
+OPCODE_CHARS = 'FBLR'
+
+_INVALID = 0xFF
+_ENCODE = bytes(
+    OPCODE_CHARS.index(chr(b)) if chr(b) in OPCODE_CHARS else _INVALID
+    for b in range(256)
+)
+_DECODE = bytes.maketrans(bytes(range(len(OPCODE_CHARS))), OPCODE_CHARS.encode())
+
+# Maximal runs of one repeated opcode
+_RUN_PATTERN = re.compile(rb'\x00+|\x01+|\x02+|\x03+')
+
+
+class CompiledCommand:
+    """Validated command as a buffer of opcodes.
+
+    Truncation slices the underlying buffer through a memoryview, so it never
+    copies or rescans the opcodes.
+    """
+
+    __slots__ = ('opcodes', '_runs')
+
+    def __init__(self, opcodes: bytes | memoryview):
+        self.opcodes = opcodes
+        self._runs: list[tuple[int, int, int]] | None = None
+
+    def __len__(self) -> int:
+        return len(self.opcodes)
+
+    def __reduce__(self):
+        return CompiledCommand, (bytes(self.opcodes),)
+
+    def truncate(self, length: int) -> 'CompiledCommand':
+        """Return the first ``length`` opcodes without copying"""
+        if length < 0:
+            raise ValueError('Length cannot be negative')
+        return CompiledCommand(memoryview(self.opcodes)[:length])
+
+    def runs(self) -> list[tuple[int, int, int]]:
+        """Run-length metadata as (opcode, start, count) tuples, computed once"""
+        if self._runs is None:
+            self._runs = [
+                (run.group()[0], run.start(), run.end() - run.start())
+                for run in _RUN_PATTERN.finditer(self.opcodes)
+            ]
+        return self._runs
+
+    def decode(self) -> str:
+        """Convert opcodes back to the command string"""
+        return bytes(self.opcodes).translate(_DECODE).decode('ascii')
+
+
+def compile_command(command_string: str) -> CompiledCommand:
+    """Validate a command string and encode it as opcodes in one pass.
+
+    Raises:
+        ValueError: If the string contains characters other than F, B, L, R
+    """
+    # Strict validation: lunar rover protocol requires exact uppercase commands.
+    try:
+        data = command_string.encode('ascii')
+    except UnicodeEncodeError:
+        data = None
+
+    opcodes = data.translate(_ENCODE) if data is not None else None
+    if opcodes is None or _INVALID in opcodes:
+        invalid_chars = set(command_string) - set(OPCODE_CHARS)
+        raise ValueError(f'Invalid command characters: {invalid_chars}')
+
+    return CompiledCommand(opcodes)
+
+
+@dataclass(frozen=True, slots=True)
+class RunNode:
+    """One opcode repeated ``count`` times, written ``F`` or ``F100``"""
+
+    op: int
+    count: int
+
+    @property
+    def steps(self) -> int:
+        return self.count
+
+
+@dataclass(frozen=True, slots=True)
+class RepeatNode:
+    """Group repeated ``count`` times, written ``(...)`` or ``(...)x500``"""
+
+    body: tuple['RunNode | RepeatNode', ...]
+    count: int
+    steps: int = field(compare=False)
+
+
+CompactNode = RunNode | RepeatNode
+
+# Upper bound on the expanded length of a compact command, kept within the
+# int32 range of stored coordinates and step counts
+MAX_COMPACT_STEPS = 2**31 - 1
+
+_COMPACT_TOKEN = re.compile(
+    r'(?P<op>[FBLR])(?P<count>[0-9]*)|(?P<open>\()|\)(?:x(?P<repeat>[0-9]+))?'
+)
+
+
+def _parse_count(digits: str, position: int) -> int:
+    count = int(digits)
+    if count < 1:
+        raise ValueError(f'Count must be positive at position {position}')
+    return count
+
+
+def parse_compact(command_string: str) -> tuple[CompactNode, ...]:
+    """Parse the compact command syntax into a tree of runs and groups.
+
+    ``F100`` is one hundred ``F`` steps and ``(FFRFFR)x500`` repeats the group
+    five hundred times; groups nest and a group without ``x`` runs once.
+
+    Raises:
+        ValueError: If the string is not a valid compact command
+    """
+    stack: list[list[CompactNode]] = [[]]
+    opened: list[int] = []
+    position = 0
+
+    while position < len(command_string):
+        token = _COMPACT_TOKEN.match(command_string, position)
+        if token is None:
+            raise ValueError(
+                f'Invalid compact command character '
+                f'{command_string[position]!r} at position {position}'
+            )
+
+        if token['op']:
+            count = _parse_count(token['count'] or '1', position)
+            stack[-1].append(RunNode(OPCODE_CHARS.index(token['op']), count))
+        elif token['open']:
+            stack.append([])
+            opened.append(position)
+        else:
+            if not opened:
+                raise ValueError(f'Unmatched ")" at position {position}')
+            body = tuple(stack.pop())
+            if not body:
+                raise ValueError(f'Empty group at position {opened[-1]}')
+            opened.pop()
+            count = _parse_count(token['repeat'] or '1', position)
+            steps = count * sum(node.steps for node in body)
+            stack[-1].append(RepeatNode(body, count, steps))
+
+        position = token.end()
+
+    if opened:
+        raise ValueError(f'Unmatched "(" at position {opened[-1]}')
+
+    nodes = tuple(stack[0])
+    if sum(node.steps for node in nodes) > MAX_COMPACT_STEPS:
+        raise ValueError(f'Command expands to more than {MAX_COMPACT_STEPS} steps')
+    return nodes
+
+
+def format_compact(nodes: tuple[CompactNode, ...]) -> str:
+    """Write a compact program back in compact syntax"""
+    parts = []
+    for node in nodes:
+        if isinstance(node, RunNode):
+            char = OPCODE_CHARS[node.op]
+            parts.append(char if node.count == 1 else f'{char}{node.count}')
+        else:
+            body = format_compact(node.body)
+            parts.append(f'({body})' if node.count == 1 else f'({body})x{node.count}')
+    return ''.join(parts)
+
+
+def truncate_compact(
+    nodes: tuple[CompactNode, ...], steps: int
+) -> tuple[CompactNode, ...]:
+    """Return the program made of the first ``steps`` expanded steps"""
+    if steps < 0:
+        raise ValueError('Length cannot be negative')
+
+    truncated: list[CompactNode] = []
+    for node in nodes:
+        if steps <= 0:
+            break
+        if node.steps <= steps:
+            truncated.append(node)
+            steps -= node.steps
+            continue
+
+        # Partial node: keep whole iterations, then a prefix of one more
+        if isinstance(node, RunNode):
+            truncated.append(RunNode(node.op, steps))
+        else:
+            body_steps = node.steps // node.count
+            full, rest = divmod(steps, body_steps)
+            if full:
+                truncated.append(RepeatNode(node.body, full, full * body_steps))
+            if rest:
+                truncated.extend(truncate_compact(node.body, rest))
+        break
+
+    return tuple(truncated)
@@ -0,0 +1,258 @@
+"""D* Lite: routes to a fixed target repaired as the map and the pose change.
+
+The search runs backwards from the target over the poses ``plan_route``
+searches, where every ``F``, ``B``, ``L`` and ``R`` costs one. Cost-to-go
+values and the open queue survive between plans, so when cells are blocked
+or cleared only the poses whose cost-to-go depends on them are revisited,
+and a rover that moved reuses the values by raising the key modifier
+instead of re-sorting the queue.
+"""
+
+import heapq
+from collections.abc import Iterable, Iterator
+
+from app.domain.entities import Command, Direction, Point, Position
+from app.domain.exceptions import (
+    LandingObstacleException,
+    NoRouteException,
+    RouteBudgetExceededException,
+)
+from app.domain.planner import DEFAULT_MAX_EXPANSIONS, Box, RoutePlan
+from app.domain.pose import DIRECTIONS, STEP_X, STEP_Y, TURN_LEFT, TURN_RIGHT
+
+INFINITY = float('inf')
+
+Pose = tuple[int, int, int]
+
+
+class DStarLite:
+    """Incremental shortest route from a moving pose to a fixed target.
+
+    Only cells inside the inclusive box are searched; cells outside count
+    as blocked.
+
+    Args:
+        start: Pose the first route starts from
+        target: Cell to reach
+        box: Search area as (min_x, min_y, max_x, max_y)
+        obstacles: Obstacles of the map, at least those inside ``box``
+        direction: Required heading on arrival, any when None
+    """
+
+    def __init__(
+        self,
+        start: Position,
+        target: Point,
+        box: Box,
+        obstacles: Iterable[Point],
+        direction: Direction | None = None,
+    ):
+        self.target = target
+        self.box = box
+        self.direction = direction
+        if not self.covers(start.point) or not self.covers(target):
+            raise ValueError(f'Search box {box} must hold the start and the target')
+
+        self._blocked = {(o.x, o.y) for o in obstacles if self.covers(o)}
+        self._g: dict[Pose, float] = {}
+        self._rhs: dict[Pose, float] = {}
+        # Heap of (key, pose); entries whose key no longer matches _queued
+        # are stale and skipped
+        self._heap: list[tuple[tuple[float, float], Pose]] = []
+        self._queued: dict[Pose, tuple[float, float]] = {}
+        self._start = _pose(start)
+        self._km = 0
+
+        for d in range(4):
+            if direction is None or d == direction:
+                self._update((target.x, target.y, d))
+
+    def covers(self, point: Point) -> bool:
+        """Check whether a cell lies inside the search box"""
+        min_x, min_y, max_x, max_y = self.box
+        return min_x <= point.x <= max_x and min_y <= point.y <= max_y
+
+    def update_obstacles(
+        self, added: Iterable[Point] = (), removed: Iterable[Point] = ()
+    ) -> int:
+        """Block and clear cells, returning how many inside the box changed.
+
+        Only the poses on and next to a changed cell are re-queued; the
+        next ``plan`` propagates the change as far as it matters.
+        """
+        changed = []
+        for o in added:
+            cell = (o.x, o.y)
+            if cell not in self._blocked and self.covers(o):
+                self._blocked.add(cell)
+                changed.append(cell)
+        for o in removed:
+            cell = (o.x, o.y)
+            if cell in self._blocked:
+                self._blocked.discard(cell)
+                changed.append(cell)
+
+        for x, y in changed:
+            for d in range(4):
+                pose = (x, y, d)
+                self._update(pose)
+                for neighbour in _neighbours(pose):
+                    self._update(neighbour)
+        return len(changed)
+
+    def plan(
+        self, start: Position, max_expansions: int = DEFAULT_MAX_EXPANSIONS
+    ) -> RoutePlan:
+        """Shortest route from ``start``, repairing the search as needed.
+
+        A plan that runs out of expansions leaves the search consistent, so
+        the next call picks up where it stopped.
+
+        Raises:
+            ValueError: If ``start`` lies outside the search box
+            LandingObstacleException: If the start holds an obstacle
+            NoRouteException: If no route inside the box reaches the target
+            RouteBudgetExceededException: If ``max_expansions`` runs out
+        """
+        if not self.covers(start.point):
+            raise ValueError(f'Start {start.coordinates()} is outside {self.box}')
+        if (start.x, start.y) in self._blocked:
+            raise LandingObstacleException(start.point)
+
+        pose = _pose(start)
+        self._km += _distance(self._start, pose)
+        self._start = pose
+
+        expansions = self._compute(pose, max_expansions)
+        if self._g.get(pose, INFINITY) == INFINITY:
+            raise NoRouteException(self.target, expansions)
+        command, final = self._route(pose)
+        return RoutePlan(
+            Command(command),
+            Position(Point(final[0], final[1]), DIRECTIONS[final[2]]),
+            expansions,
+        )
+
+    def _compute(self, start: Pose, max_expansions: int) -> int:
+        g, rhs, heap, queued = self._g, self._rhs, self._heap, self._queued
+        expansions = 0
+        while heap:
+            key, pose = heap[0]
+            if queued.get(pose) != key:
+                heapq.heappop(heap)
+                continue
+            # Stop once nothing queued can still lower the start's cost and
+            # the start itself is settled
+            start_g = g.get(start, INFINITY)
+            if key >= self._key(start) and rhs.get(start, INFINITY) == start_g:
+                break
+            if expansions == max_expansions:
+                raise RouteBudgetExceededException(self.target, expansions)
+            expansions += 1
+
+            heapq.heappop(heap)
+            del queued[pose]
+            current = self._key(pose)
+            pose_g = g.get(pose, INFINITY)
+            pose_rhs = rhs.get(pose, INFINITY)
+            if key < current:
+                self._push(pose, current)
+            elif pose_g > pose_rhs:
+                # Lowering a cost can only lower the neighbours' lookahead,
+                # so it is relaxed without rescanning their neighbours
+                g[pose] = pose_rhs
+                for neighbour in _neighbours(pose):
+                    if pose_rhs + 1 < rhs.get(neighbour, INFINITY) and self._free(
+                        neighbour
+                    ):
+                        rhs[neighbour] = pose_rhs + 1
+                        self._requeue(neighbour)
+            else:
+                g[pose] = INFINITY
+                self._update(pose)
+                for neighbour in _neighbours(pose):
+                    self._update(neighbour)
+        return expansions
+
+    def _route(self, pose: Pose) -> tuple[str, Pose]:
+        """Follow the cost-to-go downhill from ``pose`` to the target"""
+        letters = []
+        g = self._g
+        while not self._is_goal(pose):
+            best, letter = None, ''
+            for candidate, move in zip(_neighbours(pose), 'LRFB', strict=True):
+                if not self._free(candidate):
+                    continue
+                if best is None or g.get(candidate, INFINITY) < g.get(best, INFINITY):
+                    best, letter = candidate, move
+            letters.append(letter)
+            pose = best
+        return ''.join(letters), pose
+
+    def _update(self, pose: Pose) -> None:
+        """Recompute the one-step lookahead of a pose and re-queue it"""
+        if self._is_goal(pose):
+            value = 0
+        elif not self._free(pose):
+            value = INFINITY
+        else:
+            g = self._g
+            value = INFINITY
+            for neighbour in _neighbours(pose):
+                if self._free(neighbour):
+                    value = min(value, g.get(neighbour, INFINITY) + 1)
+        self._rhs[pose] = value
+        self._requeue(pose)
+
+    def _requeue(self, pose: Pose) -> None:
+        """Queue a pose whose cost and lookahead disagree, else drop it"""
+        if self._g.get(pose, INFINITY) != self._rhs[pose]:
+            self._push(pose, self._key(pose))
+        else:
+            self._queued.pop(pose, None)
+
+    def _push(self, pose: Pose, key: tuple[float, float]) -> None:
+        self._queued[pose] = key
+        heapq.heappush(self._heap, (key, pose))
+
+    def _key(self, pose: Pose) -> tuple[float, float]:
+        best = min(self._g.get(pose, INFINITY), self._rhs.get(pose, INFINITY))
+        return best + _distance(self._start, pose) + self._km, best
+
+    def _free(self, pose: Pose) -> bool:
+        x, y, _ = pose
+        min_x, min_y, max_x, max_y = self.box
+        return (
+            min_x <= x <= max_x and min_y <= y <= max_y and (x, y) not in self._blocked
+        )
+
+    def _is_goal(self, pose: Pose) -> bool:
+        x, y, d = pose
+        return (
+            x == self.target.x
+            and y == self.target.y
+            and (self.direction is None or d == self.direction)
+            and (x, y) not in self._blocked
+        )
+
+
+def _pose(position: Position) -> Pose:
+    return position.x, position.y, int(position.direction)
+
+
+def _distance(a: Pose, b: Pose) -> int:
+    return abs(a[0] - b[0]) + abs(a[1] - b[1])
+
+
+def _neighbours(pose: Pose) -> Iterator[Pose]:
+    """Poses one letter away, in ``L``, ``R``, ``F``, ``B`` order.
+
+    Every letter can be undone by one letter, so these are both the
+    successors and the predecessors of the pose.
+    """
+    x, y, d = pose
+    dx, dy = STEP_X[d], STEP_Y[d]
+    yield x, y, TURN_LEFT[d]
+    yield x, y, TURN_RIGHT[d]
+    yield x + dx, y + dy, d
+    yield x - dx, y - dy, d
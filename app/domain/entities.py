@@ -1,6 +1,17 @@
-from dataclasses import dataclass
+from array import array
+from collections.abc import Iterable, Iterator, Sequence
+from dataclasses import dataclass, field
 from enum import IntEnum
 
+from app.domain.compiler import (
+    CompactNode,
+    CompiledCommand,
+    compile_command,
+    format_compact,
+    parse_compact,
+    truncate_compact,
+)
+
 # Direction vectors: (dx, dy) for each direction
 DIR_VECTORS = ((0, 1), (1, 0), (0, -1), (-1, 0))
 
@@ -14,7 +25,14 @@ class Direction(IntEnum):
     WEST = 3
 
 
-@dataclass(frozen=True)
+# Heading after a left/right turn, indexed by current direction
+LEFT_OF = (Direction.WEST, Direction.NORTH, Direction.EAST, Direction.SOUTH)
+RIGHT_OF = (Direction.EAST, Direction.SOUTH, Direction.WEST, Direction.NORTH)
+
+_DIRECTIONS = tuple(Direction)
+
+
+@dataclass(frozen=True, slots=True)
 class Point:
     """Point on the lunar surface"""
 
@@ -28,12 +46,12 @@ class Point:
         return self.x == value.x and self.y == value.y
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Obstacle(Point):
     pass
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Position:
     """Robot position on the lunar surface"""
 
@@ -64,24 +82,91 @@ class Position:
 
     def turn_left(self) -> 'Position':
         """Turn 90 degrees left"""
-        new_direction = Direction((self.direction - 1) % 4)
-        return Position(self.point, new_direction)
+        return Position(self.point, LEFT_OF[self.direction])
 
     def turn_right(self) -> 'Position':
         """Turn 90 degrees right"""
-        new_direction = Direction((self.direction + 1) % 4)
-        return Position(self.point, new_direction)
+        return Position(self.point, RIGHT_OF[self.direction])
 
     def coordinates(self) -> tuple[int, int]:
         """Get coordinates as tuple"""
         return self.point.coordinates()
 
 
+class PositionPath(Sequence[Position]):
+    """Path of positions stored column-wise in typed arrays.
+
+    Coordinates live in ``array('q')`` columns and headings in a bytearray,
+    so a long path costs 17 bytes per step. The int64 columns hold a rover
+    that drove off the int32 plane. ``Position`` objects are only created
+    when items are accessed.
+    """
+
+    __slots__ = ('xs', 'ys', 'directions')
+
+    def __init__(
+        self,
+        xs: array | None = None,
+        ys: array | None = None,
+        directions: bytearray | None = None,
+    ):
+        self.xs = xs if xs is not None else array('q')
+        self.ys = ys if ys is not None else array('q')
+        self.directions = directions if directions is not None else bytearray()
+
+    @classmethod
+    def from_positions(cls, positions: Iterable[Position]) -> 'PositionPath':
+        """Create path from position objects"""
+        path = cls()
+        for position in positions:
+            path.append(position.x, position.y, position.direction)
+        return path
+
+    def append(self, x: int, y: int, direction: int) -> None:
+        """Append one position given as coordinates and heading"""
+        self.xs.append(x)
+        self.ys.append(y)
+        self.directions.append(direction)
+
+    def __len__(self) -> int:
+        return len(self.directions)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return PositionPath(self.xs[index], self.ys[index], self.directions[index])
+        return Position(
+            Point(self.xs[index], self.ys[index]), _DIRECTIONS[self.directions[index]]
+        )
+
+    def __iter__(self) -> Iterator[Position]:
+        for x, y, direction in zip(self.xs, self.ys, self.directions, strict=True):
+            yield Position(Point(x, y), _DIRECTIONS[direction])
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, PositionPath):
+            return (
+                self.directions == other.directions
+                and self.xs == other.xs
+                and self.ys == other.ys
+            )
+        if isinstance(other, Sequence) and not isinstance(other, str):
+            return len(self) == len(other) and all(
+                a == b for a, b in zip(self, other, strict=True)
+            )
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f'PositionPath(<{len(self)} positions>)'
+
+
 @dataclass(frozen=True)
 class Command:
     """Robot command with validation"""
 
     command_string: str
+    program: CompiledCommand | None = field(default=None, compare=False, repr=False)
 
     def __post_init__(self):
         """Validate command string on creation"""
@@ -90,33 +175,112 @@ class Command:
 
         # Strict validation: lunar rover protocol requires exact uppercase commands.
         # Lowercase letters are invalid commands to ensure protocol compliance.
-        valid_chars = set('FBLR')
-        invalid_chars = set(self.command_string) - valid_chars
-        if invalid_chars:
-            raise ValueError(f'Invalid command characters: {invalid_chars}')
+        # A program passed in is never trusted; it is compiled again.
+        object.__setattr__(self, 'program', compile_command(self.command_string))
 
     @classmethod
     def from_string(cls, command_string: str) -> 'Command':
         """Create command from string with strict validation"""
         return cls(command_string)
 
+    @classmethod
+    def _from_program(cls, command_string: str, program: CompiledCommand) -> 'Command':
+        """Create command from a program compiled from ``command_string`` already"""
+        command = object.__new__(cls)
+        object.__setattr__(command, 'command_string', command_string)
+        object.__setattr__(command, 'program', program)
+        return command
+
     def is_empty(self) -> bool:
         """Check if command is empty"""
         return len(self.command_string) == 0
 
     def truncate(self, length: int) -> 'Command':
-        """Create truncated command"""
+        """Create truncated command reusing the compiled opcodes"""
         if length < 0:
             raise ValueError('Length cannot be negative')
-        return Command(self.command_string[:length])
+        return Command._from_program(
+            self.command_string[:length], self.program.truncate(length)
+        )
+
+
+@dataclass(frozen=True)
+class CompactCommand:
+    """Robot command in compact syntax with counts and repeated groups"""
+
+    command_string: str
+    program: tuple[CompactNode, ...] | None = field(
+        default=None, compare=False, repr=False
+    )
+
+    def __post_init__(self):
+        """Parse command string on creation"""
+        if not isinstance(self.command_string, str):
+            raise ValueError('Command must be a string')
+
+        if self.program is None:
+            object.__setattr__(self, 'program', parse_compact(self.command_string))
+
+    @property
+    def steps(self) -> int:
+        """Number of steps of the expanded command"""
+        return sum(node.steps for node in self.program)
+
+    def is_empty(self) -> bool:
+        """Check if command is empty"""
+        return not self.program
+
+    def truncate(self, length: int) -> 'CompactCommand':
+        """Create command of the first ``length`` expanded steps"""
+        program = truncate_compact(self.program, length)
+        return CompactCommand(format_compact(program), program)
 
 
 @dataclass(frozen=True)
 class CommandResult:
     """Result of command execution"""
 
-    executed_command: Command
+    executed_command: Command | CompactCommand
+    initial_command: Command | CompactCommand
+    final_position: Position
+    stopped_by_obstacle: bool
+    path: PositionPath | list[Position] | None = None
+    # Version of the obstacle map the command ran against
+    obstacle_map_version: str | None = field(default=None, compare=False)
+
+
+@dataclass(frozen=True)
+class CanonicalCommand:
+    """Shortest equivalent of a command against a fixed obstacle map"""
+
     initial_command: Command
+    canonical_command: Command
     final_position: Position
     stopped_by_obstacle: bool
-    path: list[Position] | None = None
+
+    @property
+    def saved_steps(self) -> int:
+        """Number of steps removed by the rewrite"""
+        return len(self.initial_command.command_string) - len(
+            self.canonical_command.command_string
+        )
+
+
+@dataclass(frozen=True)
+class StoredCommand:
+    """Command as recorded in the command history"""
+
+    id: int
+    received_command: Command | CompactCommand
+    executed_command: Command | CompactCommand
+    stopped_by_obstacle: bool
+
+
+@dataclass(frozen=True)
+class ObstacleEdit:
+    """Cells one write blocked and cleared, from map ``previous`` to ``version``"""
+
+    previous: str
+    version: str
+    added: frozenset[Obstacle]
+    removed: frozenset[Obstacle]
@@ -16,3 +16,57 @@ class LandingObstacleException(MissionException):
         super().__init__(
             f'Cannot start lunar mission: obstacle detected at landing position {coords}. Mission aborted for safety.'
         )
+
+
+class CommandNotFoundException(MissionException):
+    """Exception raised when a stored command does not exist"""
+
+    def __init__(self, command_id: int):
+        self.command_id = command_id
+        super().__init__(f'Command {command_id} not found')
+
+
+class ObstacleMapReadOnlyException(MissionException):
+    """Exception raised when the configured obstacle map cannot be written"""
+
+    def __init__(self):
+        super().__init__('The configured obstacle map is read-only')
+
+
+class NoRouteException(MissionException):
+    """Exception raised when no route reaches the planning target"""
+
+    def __init__(self, target: Point, expansions: int = 0):
+        self.target = target.coordinates()
+        self.expansions = expansions
+        super().__init__(f'No obstacle-free route to {self.target}')
+
+
+class RouteBudgetExceededException(MissionException):
+    """Exception raised when route planning expands too many nodes"""
+
+    def __init__(self, target: Point, expansions: int):
+        self.target = target.coordinates()
+        self.expansions = expansions
+        super().__init__(
+            f'Route planning to {self.target} gave up after {expansions} expansions'
+        )
+
+
+class RouteNotFoundException(MissionException):
+    """Exception raised when an active route does not exist"""
+
+    def __init__(self, route_id: int):
+        self.route_id = route_id
+        super().__init__(f'Active route {route_id} not found')
+
+
+class OffMapException(MissionException):
+    """Exception raised when a command would drive the rover off the stored map"""
+
+    def __init__(self, position: Point):
+        self.position = position.coordinates()
+        super().__init__(
+            f'Command leaves the int32 map at {self.position}; positions '
+            'outside it cannot be recorded'
+        )
@@ -0,0 +1,231 @@
+"""Batch simulation of many rovers against a shared obstacle map"""
+
+from array import array
+from collections.abc import Callable, Sequence
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
+
+from app.domain.compiler import OP_BACKWARD, OP_FORWARD, OP_LEFT, OP_RIGHT
+from app.domain.entities import (
+    DIR_VECTORS,
+    Command,
+    CommandResult,
+    Obstacle,
+    Position,
+    PositionPath,
+)
+from app.domain.exceptions import LandingObstacleException
+from app.domain.grid import OccupancyGrid
+from app.domain.pose import reach_in_plane
+from app.domain.services import execute_commands
+from app.domain.snapshot import RegionObstacles
+from app.domain.tiles import TiledObstacles
+from app.domain.vectorized import encode_obstacles, np, pack_keys
+
+# Rovers per task when a fleet is sharded across processes
+DEFAULT_SHARD_SIZE = 2048
+
+# Maps answering cell lookups themselves; encoding them into one key array
+# would scan a whole grid or load every tile
+_PER_ROVER_MAPS = (RegionObstacles, OccupancyGrid, TiledObstacles)
+
+RoverTask = tuple[Position, Command]
+
+
+def simulate_fleet(
+    rovers: Sequence[RoverTask],
+    obstacles: set[Obstacle],
+    processes: int | None = None,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+    executor: Executor | None = None,
+) -> list[CommandResult]:
+    """
+    Simulate a fleet of rovers, each with its own start position and command.
+
+    With NumPy installed the rovers are held in arrays and advanced in
+    lockstep: every step applies one opcode per rover and checks all moved
+    rovers against the sorted obstacle keys with one binary search. Without
+    NumPy, or for a map with rectangular regions, an occupancy grid or
+    tiles, every rover is executed with ``execute_commands``. Each result
+    is identical to ``execute_commands`` for that rover.
+
+    Args:
+        rovers: Pairs of start position and command
+        obstacles: Set of obstacles shared by all rovers
+        processes: Number of worker processes; fleets larger than
+            ``shard_size`` are split into shards executed in parallel
+        shard_size: Maximum number of rovers per shard
+        executor: Long-lived thread pool running the shards instead of a
+            process pool started for this call. It is used only when the
+            shards run in NumPy lockstep, whose array operations release the
+            GIL; pure-Python shards would hold it, so they run in the calling
+            thread
+
+    Returns:
+        One CommandResult per rover, in input order
+
+    Raises:
+        LandingObstacleException: If any rover starts on an obstacle
+    """
+    if shard_size <= 0:
+        raise ValueError('Shard size must be positive')
+
+    parallel = executor is not None or (processes is not None and processes > 1)
+    if not parallel or len(rovers) <= shard_size:
+        return _simulate_shard(rovers, obstacles)
+
+    if executor is not None and not _lockstep(obstacles):
+        return _simulate_shard(rovers, obstacles)
+
+    shards = [rovers[i : i + shard_size] for i in range(0, len(rovers), shard_size)]
+    if executor is not None:
+        # Threads see the map itself; tasks carry only their shard
+        return _map_shards(
+            executor, shards, partial(_simulate_shard, obstacles=obstacles)
+        )
+    # Each worker receives the map once when it starts rather than with
+    # every shard
+    with ProcessPoolExecutor(
+        max_workers=processes, initializer=_init_worker, initargs=(obstacles,)
+    ) as pool:
+        return _map_shards(pool, shards, _simulate_worker_shard)
+
+
+# Obstacle map of a fleet worker process, set by its initializer
+_worker_obstacles: set[Obstacle] | None = None
+
+
+def _init_worker(obstacles: set[Obstacle]) -> None:
+    global _worker_obstacles
+    _worker_obstacles = obstacles
+
+
+def _simulate_worker_shard(rovers: Sequence[RoverTask]) -> list[CommandResult]:
+    return _simulate_shard(rovers, _worker_obstacles)
+
+
+def _map_shards(
+    executor: Executor,
+    shards: list[Sequence[RoverTask]],
+    simulate: Callable[[Sequence[RoverTask]], list[CommandResult]],
+) -> list[CommandResult]:
+    results: list[CommandResult] = []
+    for shard_results in executor.map(simulate, shards):
+        results.extend(shard_results)
+    return results
+
+
+def _lockstep(obstacles: set[Obstacle]) -> bool:
+    """Whether rovers on this map can be advanced together in NumPy arrays"""
+    return np is not None and not isinstance(obstacles, _PER_ROVER_MAPS)
+
+
+def _simulate_shard(
+    rovers: Sequence[RoverTask], obstacles: set[Obstacle]
+) -> list[CommandResult]:
+    if (
+        not _lockstep(obstacles)
+        # Keys of cells off the int32 plane could alias cells on it
+        or not all(reach_in_plane(p.x, p.y, len(c.program)) for p, c in rovers)
+    ):
+        return [
+            execute_commands(command, start_position, obstacles)
+            for start_position, command in rovers
+        ]
+    return _simulate_lockstep(rovers, obstacles)
+
+
+def _simulate_lockstep(
+    rovers: Sequence[RoverTask], obstacles: set[Obstacle]
+) -> list[CommandResult]:
+    n = len(rovers)
+    if n == 0:
+        return []
+
+    keys = encode_obstacles(obstacles)
+    x = np.array([p.x for p, _ in rovers], dtype=np.int64)
+    y = np.array([p.y for p, _ in rovers], dtype=np.int64)
+    heading = np.array([int(p.direction) for p, _ in rovers], dtype=np.int64)
+
+    # Critical safety check: verify no obstacle at any landing position
+    landed = _hits(keys, x, y)
+    if landed.any():
+        raise LandingObstacleException(rovers[int(np.argmax(landed))][0].coordinates())
+
+    # Opcodes and poses of all rovers are laid end to end, so memory grows
+    # with the total command length rather than the longest command
+    lengths = np.array([len(c.program) for _, c in rovers], dtype=np.int64)
+    offsets = np.zeros(n, dtype=np.int64)
+    np.cumsum(lengths[:-1], out=offsets[1:])
+    ops = np.frombuffer(b''.join(c.program.opcodes for _, c in rovers), dtype=np.uint8)
+
+    turns = np.zeros(4, dtype=np.int64)
+    turns[OP_LEFT], turns[OP_RIGHT] = -1, 1
+    signs = np.zeros(4, dtype=np.int64)
+    signs[OP_FORWARD], signs[OP_BACKWARD] = 1, -1
+    step_x = np.array([dx for dx, _ in DIR_VECTORS], dtype=np.int64)
+    step_y = np.array([dy for _, dy in DIR_VECTORS], dtype=np.int64)
+
+    # Every rover stays on the int32 plane here
+    xs = np.empty(ops.size, dtype=np.int32)
+    ys = np.empty(ops.size, dtype=np.int32)
+    headings = np.empty(ops.size, dtype=np.uint8)
+    executed = np.zeros(n, dtype=np.int64)
+    stopped = np.zeros(n, dtype=bool)
+    active = lengths > 0
+
+    for t in range(int(lengths.max())):
+        rows = np.flatnonzero(active)
+        if rows.size == 0:
+            break
+
+        done = lengths[rows] == t
+        active[rows[done]] = False
+        rows = rows[~done]
+        at = offsets[rows] + t
+
+        op = ops[at]
+        d = (heading[rows] + turns[op]) % 4
+        sign = signs[op]
+        nx = x[rows] + sign * step_x[d]
+        ny = y[rows] + sign * step_y[d]
+
+        # Turns never collide; a blocked move leaves the rover where it was
+        blocked = (sign != 0) & _hits(keys, nx, ny)
+        stopped[rows[blocked]] = True
+        active[rows[blocked]] = False
+
+        moved = ~blocked
+        rows, at = rows[moved], at[moved]
+        x[rows], y[rows], heading[rows] = nx[moved], ny[moved], d[moved]
+        xs[at], ys[at], headings[at] = nx[moved], ny[moved], d[moved]
+        executed[rows] += 1
+
+    results = []
+    for i, (start_position, command) in enumerate(rovers):
+        length = int(executed[i])
+        span = slice(int(offsets[i]), int(offsets[i]) + length)
+        path = PositionPath(
+            array('q', xs[span].astype(np.int64).tobytes()),
+            array('q', ys[span].astype(np.int64).tobytes()),
+            bytearray(headings[span].tobytes()),
+        )
+        results.append(
+            CommandResult(
+                final_position=path[-1] if path else start_position,
+                stopped_by_obstacle=bool(stopped[i]),
+                path=path,
+                executed_command=command.truncate(length) if stopped[i] else command,
+                initial_command=command,
+            )
+        )
+    return results
+
+
+def _hits(keys, xs, ys):
+    """Boolean mask of cells that hold an obstacle"""
+    if keys.size == 0:
+        return np.zeros(xs.shape, dtype=bool)
+    cells = pack_keys(xs, ys)
+    found = np.minimum(np.searchsorted(keys, cells), keys.size - 1)
+    return keys[found] == cells
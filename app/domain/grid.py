@@ -0,0 +1,124 @@
+"""Dense occupancy bitmap for obstacle maps of a bounded mission area"""
+
+from collections.abc import Iterable, Iterator, Set
+
+from app.domain.entities import Obstacle, Point
+from app.domain.obstacle_index import ObstacleIndex
+from app.domain.pose import in_plane, pack_obstacles, pack_point, unpack_point
+
+# Largest bitmap built, in cells (512 MiB)
+MAX_GRID_CELLS = 1 << 32
+
+Bounds = tuple[int, int, int, int]
+
+
+class OccupancyGrid(Set):
+    """Read-only obstacle set stored as one bit per cell of a rectangle.
+
+    Cell ``(x, y)`` inside the inclusive ``bounds`` maps to bit
+    ``(y - min_y) * width + (x - min_x)`` of ``bits``; obstacles outside the
+    rectangle are kept in the sparse ``outside`` set of packed keys. Packed
+    cell keys are members too, so the grid stands in for the engines' key
+    set, and ``execute_commands`` tests the bitmap directly.
+
+    Args:
+        obstacles: Obstacles to store
+        bounds: Inclusive ``(min_x, min_y, max_x, max_y)`` of the bitmap;
+            the bounding box of the obstacles when omitted
+        version: Version of the source map
+
+    Raises:
+        ValueError: If the bounds are empty or the bitmap would be too large
+    """
+
+    def __init__(
+        self,
+        obstacles: Iterable[Point],
+        bounds: Bounds | None = None,
+        version: str = '',
+    ):
+        obstacles = list(obstacles)
+        if bounds is None:
+            if obstacles:
+                bounds = (
+                    min(o.x for o in obstacles),
+                    min(o.y for o in obstacles),
+                    max(o.x for o in obstacles),
+                    max(o.y for o in obstacles),
+                )
+            else:
+                bounds = (0, 0, 0, 0)
+
+        min_x, min_y, max_x, max_y = bounds
+        width, height = max_x - min_x + 1, max_y - min_y + 1
+        if width <= 0 or height <= 0:
+            raise ValueError(f'Grid bounds {bounds} are empty')
+        if width * height > MAX_GRID_CELLS:
+            raise ValueError(f'Grid of {width}x{height} cells is too large')
+
+        bits = bytearray((width * height + 7) >> 3)
+        outside = []
+        for o in obstacles:
+            column, row = o.x - min_x, o.y - min_y
+            if 0 <= column < width and 0 <= row < height:
+                cell = row * width + column
+                bits[cell >> 3] |= 1 << (cell & 7)
+            else:
+                outside.append(o)
+
+        self.version = version
+        self.bounds = bounds
+        self.min_x, self.min_y = min_x, min_y
+        self.width, self.height = width, height
+        self.bits = bits
+        self.outside = pack_obstacles(outside)
+        self.keys = self
+        self._size = sum(byte.bit_count() for byte in bits) + len(self.outside)
+        self._index: ObstacleIndex | None = None
+
+    def __repr__(self) -> str:
+        return (
+            f'OccupancyGrid(<{len(self)} obstacles>, bounds={self.bounds}, '
+            f'version={self.version!r})'
+        )
+
+    def __reduce__(self):
+        return OccupancyGrid, (list(self), self.bounds, self.version)
+
+    def contains(self, x: int, y: int) -> bool:
+        """Check whether cell (x, y) holds an obstacle"""
+        column, row = x - self.min_x, y - self.min_y
+        if 0 <= column < self.width and 0 <= row < self.height:
+            cell = row * self.width + column
+            return bool(self.bits[cell >> 3] >> (cell & 7) & 1)
+        return in_plane(x, y) and pack_point(x, y) in self.outside
+
+    def __contains__(self, item: object) -> bool:
+        if isinstance(item, Point):
+            return self.contains(item.x, item.y)
+        if isinstance(item, int):
+            return self.contains(*unpack_point(item))
+        return False
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[Obstacle]:
+        width, min_x, min_y = self.width, self.min_x, self.min_y
+        for i, byte in enumerate(self.bits):
+            while byte:
+                low = byte & -byte
+                row, column = divmod((i << 3) + low.bit_length() - 1, width)
+                yield Obstacle(min_x + column, min_y + row)
+                byte ^= low
+        for key in self.outside:
+            yield Obstacle(*unpack_point(key))
+
+    __hash__ = Set._hash
+
+    @property
+    def index(self) -> ObstacleIndex:
+        """Row/column index of the obstacles for the run-based engines"""
+        if self._index is None:
+            self._index = ObstacleIndex(self)
+        return self._index
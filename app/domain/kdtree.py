@@ -0,0 +1,256 @@
+"""k-d trees over obstacle cells for range, radius and nearest queries"""
+
+import heapq
+from array import array
+from collections.abc import Iterable, Iterator, Set
+from itertools import islice
+from operator import itemgetter
+
+from app.domain.entities import Point
+from app.domain.obstacle_stream import Cell
+
+# Largest slice scanned linearly instead of split further
+LEAF_SIZE = 16
+
+# Pending changes a SpatialIndex absorbs before rebuilding its tree
+DEFAULT_DELTA_LIMIT = 16_384
+
+_AXIS_KEYS = (itemgetter(0), itemgetter(1))
+
+
+def distance2(x: int, y: int, cell: Cell) -> int:
+    """Squared Euclidean distance from (x, y) to a cell"""
+    dx, dy = cell[0] - x, cell[1] - y
+    return dx * dx + dy * dy
+
+
+class KDTree:
+    """Static balanced k-d tree over distinct cells.
+
+    The tree is implicit: cells are reordered so that every subtree is a
+    contiguous slice of two coordinate arrays whose middle cell splits it,
+    on x at even depths and on y at odd depths. Slices of at most
+    ``LEAF_SIZE`` cells are scanned.
+    """
+
+    def __init__(self, cells: Iterable[Cell]):
+        points = list(cells)
+        stack = [(0, len(points), 0)]
+        while stack:
+            lo, hi, axis = stack.pop()
+            if hi - lo <= LEAF_SIZE:
+                continue
+            points[lo:hi] = sorted(points[lo:hi], key=_AXIS_KEYS[axis])
+            mid = (lo + hi) // 2
+            stack.append((lo, mid, 1 - axis))
+            stack.append((mid + 1, hi, 1 - axis))
+        self._xs = array('q', [x for x, _ in points])
+        self._ys = array('q', [y for _, y in points])
+
+    def __len__(self) -> int:
+        return len(self._xs)
+
+    def __iter__(self) -> Iterator[Cell]:
+        return zip(self._xs, self._ys, strict=True)
+
+    def in_box(self, min_x: int, min_y: int, max_x: int, max_y: int) -> Iterator[Cell]:
+        """Yield the cells inside the inclusive box, in tree order"""
+        xs, ys = self._xs, self._ys
+        stack = [(0, len(xs), 0)]
+        while stack:
+            lo, hi, axis = stack.pop()
+            if hi - lo <= LEAF_SIZE:
+                for i in range(lo, hi):
+                    x, y = xs[i], ys[i]
+                    if min_x <= x <= max_x and min_y <= y <= max_y:
+                        yield x, y
+                continue
+
+            mid = (lo + hi) // 2
+            x, y = xs[mid], ys[mid]
+            if min_x <= x <= max_x and min_y <= y <= max_y:
+                yield x, y
+            split, low, high = (x, min_x, max_x) if axis == 0 else (y, min_y, max_y)
+            # Cells left of the middle are <= split, cells right of it >= split
+            if low <= split:
+                stack.append((lo, mid, 1 - axis))
+            if split <= high:
+                stack.append((mid + 1, hi, 1 - axis))
+
+    def nearest(
+        self, x: int, y: int, k: int, skip: Set[Cell] = frozenset()
+    ) -> list[Cell]:
+        """The k cells closest to (x, y), nearest first.
+
+        Ties are broken by x, then y. Cells in ``skip`` are ignored.
+        """
+        if k <= 0:
+            return []
+        xs, ys = self._xs, self._ys
+        # Max-heap of the best cells so far as negated (distance², x, y)
+        best: list[tuple[int, int, int]] = []
+
+        def consider(i: int) -> None:
+            px, py = xs[i], ys[i]
+            if skip and (px, py) in skip:
+                return
+            dx, dy = px - x, py - y
+            item = (-(dx * dx + dy * dy), -px, -py)
+            if len(best) < k:
+                heapq.heappush(best, item)
+            elif item > best[0]:
+                heapq.heapreplace(best, item)
+
+        def search(lo: int, hi: int, axis: int) -> None:
+            if hi - lo <= LEAF_SIZE:
+                for i in range(lo, hi):
+                    consider(i)
+                return
+            mid = (lo + hi) // 2
+            consider(mid)
+            diff = x - xs[mid] if axis == 0 else y - ys[mid]
+            if diff <= 0:
+                near, far = (lo, mid), (mid + 1, hi)
+            else:
+                near, far = (mid + 1, hi), (lo, mid)
+            search(*near, 1 - axis)
+            # The far side can only help if the splitting line is close enough
+            if len(best) < k or diff * diff <= -best[0][0]:
+                search(*far, 1 - axis)
+
+        search(0, len(xs), 0)
+        return [(-nx, -ny) for _, nx, ny in sorted(best, reverse=True)]
+
+
+class SpatialIndex:
+    """k-d tree over the cells of an obstacle map that follows its edits.
+
+    A write does not rebuild the tree: cells added since it was built live
+    in a second, small tree and removed cells are masked, until together
+    they exceed ``delta_limit`` and the next update builds one tree again.
+    Every query merges the two trees, so results always match the map.
+
+    Args:
+        base: Tree over the cells the index was built from
+        added: Tree over the cells added since
+        removed: Cells of ``base`` removed since
+        delta_limit: Pending changes absorbed before a rebuild
+    """
+
+    def __init__(
+        self,
+        base: KDTree,
+        added: KDTree | None = None,
+        removed: frozenset[Cell] = frozenset(),
+        delta_limit: int = DEFAULT_DELTA_LIMIT,
+    ):
+        self._base = base
+        self._added = added if added is not None else KDTree(())
+        self._removed = removed
+        self.delta_limit = delta_limit
+
+    @classmethod
+    def from_obstacles(
+        cls, obstacles: Iterable[Point], delta_limit: int = DEFAULT_DELTA_LIMIT
+    ) -> 'SpatialIndex':
+        return cls(KDTree({(o.x, o.y) for o in obstacles}), delta_limit=delta_limit)
+
+    def __len__(self) -> int:
+        return len(self._base) - len(self._removed) + len(self._added)
+
+    @property
+    def pending(self) -> int:
+        """Changes absorbed since the tree was last built"""
+        return len(self._added) + len(self._removed)
+
+    def updated(
+        self, added: Iterable[Point], removed: Iterable[Point]
+    ) -> 'SpatialIndex':
+        """Index of the map after an edit; this index is left unchanged.
+
+        Args:
+            added: Cells that were not in the map and now are
+            removed: Cells that were in the map and no longer are
+        """
+        pending = set(self._added)
+        masked = set(self._removed)
+        for o in removed:
+            cell = (o.x, o.y)
+            if cell in pending:
+                pending.discard(cell)
+            else:
+                masked.add(cell)
+        for o in added:
+            cell = (o.x, o.y)
+            if cell in masked:
+                masked.discard(cell)
+            else:
+                pending.add(cell)
+
+        if len(pending) + len(masked) > self.delta_limit:
+            cells = (c for c in self._base if c not in masked)
+            return SpatialIndex(
+                KDTree([*cells, *pending]), delta_limit=self.delta_limit
+            )
+        return SpatialIndex(
+            self._base, KDTree(pending), frozenset(masked), self.delta_limit
+        )
+
+    def in_box(
+        self,
+        min_x: int,
+        min_y: int,
+        max_x: int,
+        max_y: int,
+        limit: int | None = None,
+    ) -> list[Cell]:
+        """Cells inside the inclusive box, sorted by x then y.
+
+        With ``limit`` the scan stops after that many cells, so a truncated
+        result holds an arbitrary subset of the box.
+        """
+        cells = self.iter_box(min_x, min_y, max_x, max_y)
+        return sorted(cells if limit is None else islice(cells, limit))
+
+    def iter_box(
+        self, min_x: int, min_y: int, max_x: int, max_y: int
+    ) -> Iterator[Cell]:
+        """Yield the cells inside the inclusive box in no particular order"""
+        removed = self._removed
+        for cell in self._base.in_box(min_x, min_y, max_x, max_y):
+            if cell not in removed:
+                yield cell
+        yield from self._added.in_box(min_x, min_y, max_x, max_y)
+
+    def within_radius(
+        self, x: int, y: int, radius: int, limit: int | None = None
+    ) -> list[Cell]:
+        """Cells at most ``radius`` from (x, y), nearest first.
+
+        With ``limit`` only that many of the nearest are returned.
+        """
+        r2 = radius * radius
+        cells = (
+            cell
+            for cell in self.iter_box(x - radius, y - radius, x + radius, y + radius)
+            if distance2(x, y, cell) <= r2
+        )
+        key = _distance_key(x, y)
+        if limit is None:
+            return sorted(cells, key=key)
+        return heapq.nsmallest(limit, cells, key=key)
+
+    def nearest(self, x: int, y: int, k: int) -> list[Cell]:
+        """The k cells closest to (x, y), nearest first, ties by x then y"""
+        candidates = [
+            *self._base.nearest(x, y, k, self._removed),
+            *self._added.nearest(x, y, k),
+        ]
+        return heapq.nsmallest(k, candidates, key=_distance_key(x, y))
+
+
+def _distance_key(x: int, y: int):
+    def key(cell: Cell) -> tuple[int, int, int]:
+        return distance2(x, y, cell), cell[0], cell[1]
+
+    return key
@@ -0,0 +1,283 @@
+"""Obstacle index for resolving straight runs with a single lookup"""
+
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterable, Iterator, Sequence, Set
+from typing import Protocol
+
+from app.domain.entities import Obstacle, Point
+
+
+class ObstacleLookup(Protocol):
+    """Queries the run-based engines make against an obstacle map"""
+
+    def contains(self, x: int, y: int) -> bool: ...
+
+    def free_steps(self, x: int, y: int, dx: int, dy: int, steps: int) -> int: ...
+
+    def any_in_box(self, min_x: int, min_y: int, max_x: int, max_y: int) -> bool: ...
+
+    def cells_in_box(
+        self, min_x: int, min_y: int, max_x: int, max_y: int
+    ) -> Iterator[tuple[int, int]]: ...
+
+    def bounds(self) -> tuple[int, int, int, int] | None: ...
+
+
+def obstacles_in_box(
+    index: ObstacleLookup,
+    min_x: int,
+    min_y: int,
+    max_x: int,
+    max_y: int,
+    whole: Set[Obstacle] | None = None,
+) -> Set[Obstacle]:
+    """Obstacles of an index inside the inclusive box.
+
+    Args:
+        index: Index of the obstacle map
+        min_x: Left edge of the box
+        min_y: Bottom edge of the box
+        max_x: Right edge of the box
+        max_y: Top edge of the box
+        whole: The full map ``index`` was built from; returned as is when
+            the box covers all of it, keeping its prepared keys and index
+    """
+    bounds = index.bounds()
+    if whole is not None and (
+        bounds is None
+        or (
+            min_x <= bounds[0]
+            and min_y <= bounds[1]
+            and bounds[2] <= max_x
+            and bounds[3] <= max_y
+        )
+    ):
+        return whole
+    return {Obstacle(x, y) for x, y in index.cells_in_box(min_x, min_y, max_x, max_y)}
+
+
+class ObstacleIndex:
+    """Obstacles grouped by row and column with sorted coordinates.
+
+    Every row ``y`` keeps the sorted ``x`` values of its obstacles and every
+    column ``x`` keeps the sorted ``y`` values, so the first obstacle hit by a
+    straight run is found with one binary search.
+    """
+
+    def __init__(self, obstacles: Iterable[Point]):
+        rows: dict[int, list[int]] = {}
+        columns: dict[int, list[int]] = {}
+        for obstacle in obstacles:
+            rows.setdefault(obstacle.y, []).append(obstacle.x)
+            columns.setdefault(obstacle.x, []).append(obstacle.y)
+
+        for xs in rows.values():
+            xs.sort()
+        for ys in columns.values():
+            ys.sort()
+
+        self._rows = rows
+        self._columns = columns
+        self._row_keys = sorted(rows)
+        self._column_keys = sorted(columns)
+
+    def __len__(self) -> int:
+        return sum(len(xs) for xs in self._rows.values())
+
+    def contains(self, x: int, y: int) -> bool:
+        """Check whether cell (x, y) holds an obstacle"""
+        xs = self._rows.get(y)
+        if not xs:
+            return False
+        i = bisect_left(xs, x)
+        return i < len(xs) and xs[i] == x
+
+    def free_steps(self, x: int, y: int, dx: int, dy: int, steps: int) -> int:
+        """Count steps that can be taken from (x, y) along (dx, dy).
+
+        Args:
+            x: Start X coordinate
+            y: Start Y coordinate
+            dx: Unit step along X (-1, 0 or 1)
+            dy: Unit step along Y (-1, 0 or 1)
+            steps: Requested number of steps
+
+        Returns:
+            Number of steps, at most ``steps``, before the next cell is blocked
+        """
+        if dy == 0:
+            line, coord, delta = self._rows.get(y), x, dx
+        else:
+            line, coord, delta = self._columns.get(x), y, dy
+
+        if not line:
+            return steps
+
+        if delta > 0:
+            i = bisect_right(line, coord)
+            if i < len(line):
+                return min(steps, line[i] - coord - 1)
+        else:
+            i = bisect_left(line, coord)
+            if i > 0:
+                return min(steps, coord - line[i - 1] - 1)
+        return steps
+
+    def any_in_box(self, min_x: int, min_y: int, max_x: int, max_y: int) -> bool:
+        """Check whether any obstacle lies inside the inclusive box"""
+        row_start = bisect_left(self._row_keys, min_y)
+        row_end = bisect_right(self._row_keys, max_y)
+        column_start = bisect_left(self._column_keys, min_x)
+        column_end = bisect_right(self._column_keys, max_x)
+
+        # Scan whichever axis has fewer occupied lines inside the box
+        if row_end - row_start <= column_end - column_start:
+            lines, keys, low, high = self._rows, self._row_keys, min_x, max_x
+            start, end = row_start, row_end
+        else:
+            lines, keys, low, high = self._columns, self._column_keys, min_y, max_y
+            start, end = column_start, column_end
+
+        for i in range(start, end):
+            line = lines[keys[i]]
+            j = bisect_left(line, low)
+            if j < len(line) and line[j] <= high:
+                return True
+        return False
+
+    def cells_in_box(
+        self, min_x: int, min_y: int, max_x: int, max_y: int
+    ) -> Iterator[tuple[int, int]]:
+        """Yield the (x, y) of every obstacle inside the inclusive box"""
+        keys = self._row_keys
+        for i in range(bisect_left(keys, min_y), bisect_right(keys, max_y)):
+            y = keys[i]
+            xs = self._rows[y]
+            for j in range(bisect_left(xs, min_x), bisect_right(xs, max_x)):
+                yield xs[j], y
+
+    def bounds(self) -> tuple[int, int, int, int] | None:
+        """Bounding box of the obstacles, or None when there are none"""
+        if not self._row_keys:
+            return None
+        return (
+            self._column_keys[0],
+            self._row_keys[0],
+            self._column_keys[-1],
+            self._row_keys[-1],
+        )
+
+
+# Packed keys of one line span [line << 32 - 2**31, line << 32 + 2**31)
+_LINE_BITS = 32
+_LINE_HALF = 1 << (_LINE_BITS - 1)
+
+
+class SortedObstacleIndex:
+    """Obstacle index over two sorted sequences of packed cell keys.
+
+    ``xy_keys`` holds ``x * 2**32 + y`` and ``yx_keys`` holds ``y * 2**32 + x``
+    for every obstacle, both sorted ascending. Each column is a contiguous run
+    of ``xy_keys`` and each row a contiguous run of ``yx_keys``, so lookups
+    bisect the sequences directly without building per-line lists. Any
+    sequence of ints works, including a memory-mapped ``memoryview``.
+    """
+
+    def __init__(self, xy_keys: Sequence[int], yx_keys: Sequence[int]):
+        if len(xy_keys) != len(yx_keys):
+            raise ValueError('Key sections must have the same length')
+        self._xy = xy_keys
+        self._yx = yx_keys
+
+    @classmethod
+    def from_obstacles(cls, obstacles: Iterable[Point]) -> 'SortedObstacleIndex':
+        cells = {(o.x, o.y) for o in obstacles}
+        xy = sorted((x << _LINE_BITS) + y for x, y in cells)
+        yx = sorted((y << _LINE_BITS) + x for x, y in cells)
+        return cls(xy, yx)
+
+    def __len__(self) -> int:
+        return len(self._xy)
+
+    def contains(self, x: int, y: int) -> bool:
+        """Check whether cell (x, y) holds an obstacle"""
+        return _has_key(self._xy, (x << _LINE_BITS) + y)
+
+    def free_steps(self, x: int, y: int, dx: int, dy: int, steps: int) -> int:
+        """Count steps that can be taken from (x, y) along (dx, dy).
+
+        Same contract as ``ObstacleIndex.free_steps``.
+        """
+        if dy == 0:
+            keys, line, coord, delta = self._yx, y, x, dx
+        else:
+            keys, line, coord, delta = self._xy, x, y, dy
+
+        base = line << _LINE_BITS
+        key = base + coord
+        if delta > 0:
+            i = bisect_right(keys, key)
+            if i < len(keys) and keys[i] < base + _LINE_HALF:
+                return min(steps, keys[i] - key - 1)
+        else:
+            i = bisect_left(keys, key)
+            if i > 0 and keys[i - 1] >= base - _LINE_HALF:
+                return min(steps, key - keys[i - 1] - 1)
+        return steps
+
+    def any_in_box(self, min_x: int, min_y: int, max_x: int, max_y: int) -> bool:
+        """Check whether any obstacle lies inside the inclusive box"""
+        return next(self._scan_box(min_x, min_y, max_x, max_y), None) is not None
+
+    def cells_in_box(
+        self, min_x: int, min_y: int, max_x: int, max_y: int
+    ) -> Iterator[tuple[int, int]]:
+        """Yield the (x, y) of every obstacle inside the inclusive box"""
+        columns = max_x - min_x <= max_y - min_y
+        for line, coord in self._scan_box(min_x, min_y, max_x, max_y):
+            yield (line, coord) if columns else (coord, line)
+
+    def bounds(self) -> tuple[int, int, int, int] | None:
+        """Bounding box of the obstacles, or None when there are none"""
+        if not len(self._xy):
+            return None
+        return (
+            _line(self._xy[0]),
+            _line(self._yx[0]),
+            _line(self._xy[-1]),
+            _line(self._yx[-1]),
+        )
+
+    def _scan_box(
+        self, min_x: int, min_y: int, max_x: int, max_y: int
+    ) -> Iterator[tuple[int, int]]:
+        # Walk the narrower side's lines, skipping between occupied ones
+        if max_x - min_x <= max_y - min_y:
+            keys, first, last, low, high = self._xy, min_x, max_x, min_y, max_y
+        else:
+            keys, first, last, low, high = self._yx, min_y, max_y, min_x, max_x
+
+        i = bisect_left(keys, (first << _LINE_BITS) + low)
+        n = len(keys)
+        while i < n:
+            key = keys[i]
+            line = (key + _LINE_HALF) >> _LINE_BITS
+            if line > last:
+                return
+            coord = key - (line << _LINE_BITS)
+            if coord < low:
+                i = bisect_left(keys, (line << _LINE_BITS) + low, i)
+            elif coord <= high:
+                yield line, coord
+                i += 1
+            else:
+                i = bisect_left(keys, ((line + 1) << _LINE_BITS) + low, i)
+
+
+def _line(key: int) -> int:
+    return (key + _LINE_HALF) >> _LINE_BITS
+
+
+def _has_key(keys: Sequence[int], key: int) -> bool:
+    i = bisect_left(keys, key)
+    return i < len(keys) and keys[i] == key
@@ -0,0 +1,109 @@
+"""Incremental parsing of obstacle streams in NDJSON or CSV"""
+
+import json
+
+NDJSON = 'ndjson'
+CSV = 'csv'
+STREAM_FORMATS = (NDJSON, CSV)
+
+# Longest line accepted, so a stream without newlines cannot grow the buffer
+MAX_LINE_LENGTH = 1024
+
+# Coordinates are stored as int32
+_COORD_MIN = -(2**31)
+_COORD_MAX = 2**31 - 1
+
+Cell = tuple[int, int]
+
+
+class ObstacleStreamParser:
+    """Parses an obstacle stream chunk by chunk without holding the body.
+
+    NDJSON streams hold one ``[x, y]`` array or ``{"x": .., "y": ..}``
+    object per line. CSV streams hold one ``x,y`` pair per line; a
+    non-numeric first line is taken as a header and lines starting with
+    ``#`` are skipped. Blank lines are skipped in both formats.
+
+    Args:
+        fmt: ``ndjson`` or ``csv``
+
+    Raises:
+        ValueError: If the format is unknown
+    """
+
+    def __init__(self, fmt: str):
+        if fmt not in STREAM_FORMATS:
+            raise ValueError(f'Unsupported obstacle stream format: {fmt}')
+        self.fmt = fmt
+        self.lines = 0
+        self.rows = 0
+        self._parse_line = _parse_ndjson if fmt == NDJSON else _parse_csv
+        self._pending = b''
+
+    def feed(self, chunk: bytes) -> list[Cell]:
+        """Parse the complete lines of a chunk; the rest waits for the next.
+
+        Returns:
+            Cells of the lines completed by this chunk
+
+        Raises:
+            ValueError: If a line is invalid or too long
+        """
+        data = self._pending + chunk
+        end = data.rfind(b'\n')
+        if end < 0:
+            if len(data) > MAX_LINE_LENGTH:
+                raise ValueError(f'Line {self.lines + 1}: line too long')
+            self._pending = data
+            return []
+        self._pending = data[end + 1 :]
+        if len(self._pending) > MAX_LINE_LENGTH:
+            raise ValueError(f'Line {self.lines + 1}: line too long')
+        return self._parse_lines(data[:end].split(b'\n'))
+
+    def close(self) -> list[Cell]:
+        """Parse a last line left without a trailing newline"""
+        data, self._pending = self._pending, b''
+        return self._parse_lines([data]) if data else []
+
+    def _parse_lines(self, lines: list[bytes]) -> list[Cell]:
+        cells = []
+        parse_line = self._parse_line
+        for line in lines:
+            self.lines += 1
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                cells.append(parse_line(line))
+            except (ValueError, TypeError, KeyError) as e:
+                if self.fmt == CSV and (self.lines == 1 or line.startswith(b'#')):
+                    continue
+                raise ValueError(
+                    f'Line {self.lines}: expected an int32 x,y pair'
+                ) from e
+        self.rows += len(cells)
+        return cells
+
+
+def _cell(x: int, y: int) -> Cell:
+    if not (_COORD_MIN <= x <= _COORD_MAX and _COORD_MIN <= y <= _COORD_MAX):
+        raise ValueError('Obstacle coordinates must fit in int32')
+    return x, y
+
+
+def _parse_csv(line: bytes) -> Cell:
+    x, y = line.split(b',')
+    return _cell(int(x), int(y))
+
+
+def _parse_ndjson(line: bytes) -> Cell:
+    if line[:1] == b'[' and line[-1:] == b']':
+        # Plain pairs skip the JSON decoder
+        x, y = line[1:-1].split(b',')
+        return _cell(int(x), int(y))
+    item = json.loads(line)
+    x, y = item['x'], item['y']
+    if type(x) is not int or type(y) is not int:
+        raise TypeError('Obstacle coordinates must be integers')
+    return _cell(x, y)
@@ -0,0 +1,215 @@
+"""Shortest obstacle-avoiding routes expressed as F/B/L/R commands.
+
+Routes are found by A* over poses: every ``F``, ``B``, ``L`` and ``R`` costs
+one step, so the cheapest route is the shortest command. Like jump point
+search, straight moves do not stop on every cell. A turn inside a band of
+columns whose obstacles are identical (within the search box) can slide
+to the edge of the band without changing the route's length or hitting
+anything, so moves only stop on *stop lines*: columns and rows where the
+obstacle pattern changes, plus those of the start, the target and the box
+edges. Open ground is crossed in a single expansion.
+"""
+
+import heapq
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterable, Set
+from dataclasses import dataclass
+
+from app.domain.entities import Command, Direction, Obstacle, Point, Position
+from app.domain.exceptions import (
+    LandingObstacleException,
+    NoRouteException,
+    RouteBudgetExceededException,
+)
+from app.domain.pose import DIRECTIONS, STEP_X, STEP_Y, TURN_LEFT, TURN_RIGHT
+from app.domain.snapshot import RegionObstacles, obstacle_index
+
+# Poses expanded before planning gives up
+DEFAULT_MAX_EXPANSIONS = 200_000
+
+Box = tuple[int, int, int, int]
+
+
+@dataclass(frozen=True)
+class RoutePlan:
+    command: Command
+    final_position: Position
+    expansions: int
+
+
+def plan_route(
+    start: Position,
+    target: Point,
+    obstacles: Set[Obstacle],
+    box: Box,
+    direction: Direction | None = None,
+    max_expansions: int = DEFAULT_MAX_EXPANSIONS,
+    weight: float = 1.0,
+) -> RoutePlan:
+    """Shortest command driving from ``start`` to ``target`` inside ``box``.
+
+    The route never leaves the inclusive box, so it is the shortest one
+    among routes that stay inside it, or within ``weight`` of it.
+
+    Args:
+        start: Current pose
+        target: Cell to reach
+        obstacles: Obstacle map, at least the part inside ``box``
+        box: Search area as (min_x, min_y, max_x, max_y), holding both ends
+        direction: Required heading on arrival, any when None
+        max_expansions: Poses expanded before giving up
+        weight: Factor on the distance estimate; above 1 the search is
+            greedier and the route at most ``weight`` times the shortest
+
+    Returns:
+        The route and the number of poses expanded to find it
+
+    Raises:
+        LandingObstacleException: If the start holds an obstacle
+        NoRouteException: If the target holds an obstacle or is unreachable
+        RouteBudgetExceededException: If ``max_expansions`` runs out
+    """
+    min_x, min_y, max_x, max_y = box
+    sx, sy, tx, ty = start.x, start.y, target.x, target.y
+    if not (min_x <= sx <= max_x and min_y <= sy <= max_y) or not (
+        min_x <= tx <= max_x and min_y <= ty <= max_y
+    ):
+        raise ValueError(f'Search box {box} must hold the start and the target')
+
+    index = obstacle_index(obstacles)
+    if index.contains(sx, sy):
+        raise LandingObstacleException(start.point)
+    if index.contains(tx, ty):
+        raise NoRouteException(target)
+
+    stop_xs, stop_ys = _stop_lines(obstacles, box, (sx, sy), (tx, ty))
+    goal = None if direction is None else int(direction)
+
+    def estimate(x: int, y: int, d: int) -> int:
+        # Each move changes one coordinate by one; a change of axis and
+        # a change of heading at the target cost a turn each
+        dx, dy = tx - x, ty - y
+        if dx and dy:
+            turns = 1
+        elif dx:
+            turns = 0 if d & 1 else 1
+        elif dy:
+            turns = 1 if d & 1 else 0
+        else:
+            turns = 0 if goal is None else min((goal - d) % 4, (d - goal) % 4)
+        return abs(dx) + abs(dy) + turns
+
+    origin = (sx, sy, int(start.direction))
+    best = {origin: 0}
+    parents: dict[tuple[int, int, int], tuple[tuple[int, int, int], str, int]] = {}
+    # Ties prefer deeper poses, which walks straight down a corridor of
+    # equally good routes instead of widening across it
+    heap = [(weight * estimate(*origin), 0, origin)]
+    expansions = 0
+
+    while heap:
+        _, neg_cost, pose = heapq.heappop(heap)
+        cost = -neg_cost
+        if cost > best[pose]:
+            continue
+        x, y, d = pose
+        if x == tx and y == ty and (goal is None or d == goal):
+            return RoutePlan(
+                Command(_unwind(parents, pose)),
+                Position(Point(x, y), DIRECTIONS[d]),
+                expansions,
+            )
+        if expansions == max_expansions:
+            raise RouteBudgetExceededException(target, expansions)
+        expansions += 1
+
+        successors = [
+            ((x, y, TURN_LEFT[d]), 'L', 1),
+            ((x, y, TURN_RIGHT[d]), 'R', 1),
+        ]
+        for sign, letter in ((1, 'F'), (-1, 'B')):
+            vx, vy = STEP_X[d] * sign, STEP_Y[d] * sign
+            if vx:
+                limit = abs(_next_stop(stop_xs, x, vx) - x)
+            else:
+                limit = abs(_next_stop(stop_ys, y, vy) - y)
+            steps = index.free_steps(x, y, vx, vy, limit) if limit else 0
+            if steps:
+                successors.append(((x + vx * steps, y + vy * steps, d), letter, steps))
+
+        for successor, letter, steps in successors:
+            total = cost + steps
+            if total < best.get(successor, total + 1):
+                best[successor] = total
+                parents[successor] = (pose, letter, steps)
+                heapq.heappush(
+                    heap, (total + weight * estimate(*successor), -total, successor)
+                )
+
+    raise NoRouteException(target, expansions)
+
+
+def _unwind(
+    parents: dict[tuple[int, int, int], tuple[tuple[int, int, int], str, int]],
+    pose: tuple[int, int, int],
+) -> str:
+    """Command string of the moves that led to ``pose``"""
+    moves = []
+    while pose in parents:
+        pose, letter, steps = parents[pose]
+        moves.append(letter * steps)
+    return ''.join(reversed(moves))
+
+
+def _next_stop(stops: list[int], value: int, step: int) -> int:
+    """Nearest stop line strictly past ``value`` in the direction of ``step``.
+
+    The box edges are stop lines, so one always exists until the edge is
+    reached, where the value itself is returned.
+    """
+    if step > 0:
+        i = bisect_right(stops, value)
+        return stops[i] if i < len(stops) else value
+    i = bisect_left(stops, value)
+    return stops[i - 1] if i else value
+
+
+def _stop_lines(
+    obstacles: Set[Obstacle], box: Box, *ends: tuple[int, int]
+) -> tuple[list[int], list[int]]:
+    """Sorted columns and rows where a move may have to stop.
+
+    A column whose obstacles inside the box differ from those of its
+    neighbour is a stop line, and so is that neighbour. Obstacles change
+    the pattern at their own line and the one past it; a region changes it
+    only at its edges, however wide it is.
+    """
+    min_x, min_y, max_x, max_y = box
+    xs = {min_x, max_x}
+    ys = {min_y, max_y}
+    for x, y in ends:
+        xs.add(x)
+        ys.add(y)
+
+    for low_x, low_y, high_x, high_y in _blocks(obstacles, box):
+        # The pattern changes between low - 1 and low and between high
+        # and high + 1; both sides of each change are stop lines
+        xs.update((low_x - 1, low_x, high_x, high_x + 1))
+        ys.update((low_y - 1, low_y, high_y, high_y + 1))
+
+    return (
+        sorted(x for x in xs if min_x <= x <= max_x),
+        sorted(y for y in ys if min_y <= y <= max_y),
+    )
+
+
+def _blocks(obstacles: Set[Obstacle], box: Box) -> Iterable[Box]:
+    """Blocked rectangles covering the obstacles inside the box"""
+    if isinstance(obstacles, RegionObstacles):
+        for rect in obstacles.rects:
+            clipped = rect.clip(*box)
+            if clipped is not None:
+                yield clipped.min_x, clipped.min_y, clipped.max_x, clipped.max_y
+        obstacles = obstacles.cells
+    for x, y in obstacle_index(obstacles).cells_in_box(*box):
+        yield x, y, x, y
@@ -0,0 +1,80 @@
+"""Compact pose representation for the command execution hot path.
+
+A cell is packed into a single int key ``x * 2**32 + y``, so the obstacle set
+becomes a set of plain ints. Keys are exact for cells of the int32 plane,
+where every obstacle lies; cells off the plane may alias keys on it, so
+engines only pack them after checking ``in_plane``. Coordinates are stepped
+through per-opcode and per-direction lookup tables and headings are
+``Direction`` values as ints, turned through lookup tables. Public
+``Position``/``Point`` objects are only built when a result leaves the
+engine.
+"""
+
+from collections.abc import Iterable
+
+from app.domain.entities import DIR_VECTORS, Direction, Point, Position
+
+_Y_BITS = 32
+_Y_MASK = (1 << _Y_BITS) - 1
+_Y_OFFSET = 1 << (_Y_BITS - 1)
+
+# Bounds of the plane whose cells have exact keys, as int32
+COORD_MIN = -(2**31)
+COORD_MAX = 2**31 - 1
+
+DIRECTIONS = tuple(Direction)
+TURN_LEFT = tuple((d - 1) % 4 for d in range(4))
+TURN_RIGHT = tuple((d + 1) % 4 for d in range(4))
+
+
+def pack_point(x: int, y: int) -> int:
+    """Pack cell coordinates into one int key (exact on the int32 plane)"""
+    return (x << _Y_BITS) + y
+
+
+def in_plane(x: int, y: int) -> bool:
+    """Check whether a cell lies on the int32 plane"""
+    return COORD_MIN <= x <= COORD_MAX and COORD_MIN <= y <= COORD_MAX
+
+
+def reach_in_plane(x: int, y: int, steps: int) -> bool:
+    """Check whether every cell within ``steps`` moves of (x, y) is on the plane"""
+    return (
+        COORD_MIN + steps <= x <= COORD_MAX - steps
+        and COORD_MIN + steps <= y <= COORD_MAX - steps
+    )
+
+
+def unpack_point(key: int) -> tuple[int, int]:
+    """Unpack an int key into cell coordinates"""
+    y = ((key + _Y_OFFSET) & _Y_MASK) - _Y_OFFSET
+    return (key - y) >> _Y_BITS, y
+
+
+# Coordinate change of one forward step for each direction
+STEP_X = tuple(dx for dx, _ in DIR_VECTORS)
+STEP_Y = tuple(dy for _, dy in DIR_VECTORS)
+
+# Coordinate change of a move opcode, indexed by [opcode][direction]
+MOVE_X = (STEP_X, tuple(-dx for dx in STEP_X))
+MOVE_Y = (STEP_Y, tuple(-dy for dy in STEP_Y))
+
+
+def pack_obstacles(obstacles: Iterable[Point]) -> frozenset[int]:
+    """Pack obstacles into a set of int keys.
+
+    Raises:
+        ValueError: If an obstacle lies off the int32 plane.
+    """
+    keys = set()
+    for o in obstacles:
+        if not in_plane(o.x, o.y):
+            raise ValueError(f'Obstacle ({o.x}, {o.y}) does not fit in int32')
+        keys.add(pack_point(o.x, o.y))
+    return frozenset(keys)
+
+
+def materialize(key: int, direction: int) -> Position:
+    """Build a public Position from a packed key and heading"""
+    x, y = unpack_point(key)
+    return Position(Point(x, y), DIRECTIONS[direction])
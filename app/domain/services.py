@@ -1,7 +1,37 @@
 """Domain services for robot command processing"""
 
-from app.domain.entities import Command, CommandResult, Obstacle, Position
+from collections.abc import Generator
+from itertools import groupby, repeat
+
+from app.domain.compiler import OP_BACKWARD, OP_FORWARD, OP_LEFT, OP_RIGHT
+from app.domain.entities import (
+    CanonicalCommand,
+    Command,
+    CommandResult,
+    Obstacle,
+    Position,
+    PositionPath,
+)
 from app.domain.exceptions import LandingObstacleException
+from app.domain.grid import OccupancyGrid
+from app.domain.obstacle_index import ObstacleLookup
+from app.domain.pose import (
+    MOVE_X,
+    MOVE_Y,
+    TURN_LEFT,
+    TURN_RIGHT,
+    in_plane,
+    pack_point,
+    reach_in_plane,
+)
+from app.domain.snapshot import RegionObstacles, obstacle_index, packed_keys
+from app.domain.tiles import TiledObstacles
+
+# Default number of positions per chunk yielded by execute_commands_iter
+DEFAULT_CHUNK_SIZE = 10_000
+
+# Shortest turn sequence for a net rotation in quarter turns to the right
+_TURN_CHARS = ('', 'R', 'LL', 'L')
 
 
 def execute_commands(
@@ -26,8 +56,10 @@ def execute_commands(
     Raises:
         LandingObstacleException: If obstacle is detected at starting position
     """
+    blocked = packed_keys(obstacles)
+
     # Critical safety check: verify no obstacle at landing position
-    if start_position.point in obstacles:
+    if _blocks(blocked, start_position.x, start_position.y):
         raise LandingObstacleException(start_position.coordinates())
 
     if command.is_empty():
@@ -36,43 +68,406 @@ def execute_commands(
             stopped_by_obstacle=False,
             executed_command=command,
             initial_command=command,
-            path=[],
+            path=PositionPath(),
         )
 
-    current_position = start_position
+    path = PositionPath()
+    *_, stopped_by_obstacle = _run(
+        command.program.opcodes,
+        start_position.x,
+        start_position.y,
+        int(start_position.direction),
+        blocked,
+        path,
+    )
+
+    executed_command = command.truncate(len(path)) if stopped_by_obstacle else command
+    return CommandResult(
+        final_position=path[-1] if path else start_position,
+        stopped_by_obstacle=stopped_by_obstacle,
+        path=path,
+        executed_command=executed_command,
+        initial_command=command,
+    )
+
+
+def canonicalize_command(
+    command: Command, start_position: Position, obstacles: set[Obstacle]
+) -> CanonicalCommand:
+    """
+    Rewrite command into its shortest canonical form with the same outcome.
+
+    Adjacent turns are merged into their net rotation (``LR`` and ``LLLL``
+    vanish, ``RR`` becomes the U-turn ``LL``, ``RRR`` becomes ``L``) and
+    adjacent ``F``/``B`` runs into their net move, repeatedly, so moves
+    separated only by cancelled turns merge too. A merged move covers a
+    subset of the cells of the moves it replaces, so the rewrite never meets
+    an obstacle the original avoided. If the original stops, the executed
+    prefix plus the blocked move is rewritten, which stops at the same cell.
+
+    Args:
+        command: Command object with validated command string
+        start_position: Starting position
+        obstacles: Set of obstacles
+
+    Returns:
+        CanonicalCommand with the rewritten command and the shared outcome
+
+    Raises:
+        LandingObstacleException: If obstacle is detected at starting position
+    """
+    result = execute_commands(command, start_position, obstacles)
+
+    program = command.program
+    if result.stopped_by_obstacle:
+        # Keep the blocked move so the rewrite stops at the same cell
+        program = command.program.truncate(
+            len(result.executed_command.command_string) + 1
+        )
+
+    # Stack of [is_turn, amount]: signed steps for moves, quarter turns mod 4
+    stack: list[list] = []
+    for op, _, count in program.runs():
+        is_turn = op >= OP_LEFT
+        amount = count if op in (OP_FORWARD, OP_RIGHT) else -count
+        if stack and stack[-1][0] == is_turn:
+            amount += stack.pop()[1]
+        if is_turn:
+            amount %= 4
+        if amount:
+            stack.append([is_turn, amount])
+
+    parts = []
+    for is_turn, amount in stack:
+        if is_turn:
+            parts.append(_TURN_CHARS[amount])
+        else:
+            parts.append('F' * amount if amount > 0 else 'B' * -amount)
+
+    return CanonicalCommand(
+        initial_command=command,
+        canonical_command=Command(''.join(parts)),
+        final_position=result.final_position,
+        stopped_by_obstacle=result.stopped_by_obstacle,
+    )
+
+
+def execute_commands_iter(
+    command: Command,
+    start_position: Position,
+    obstacles: set[Obstacle],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Generator[PositionPath, None, CommandResult]:
+    """
+    Execute command lazily, yielding the visited positions chunk by chunk.
+
+    Only one chunk of the path exists at a time, so callers can persist,
+    stream or discard it incrementally. The generator's return value (the
+    ``StopIteration.value``, or the result of ``yield from``) reports the
+    outcome once the command has finished or hit an obstacle.
+
+    Args:
+        command: Command object with validated command string
+        start_position: Starting position
+        obstacles: Set of obstacles
+        chunk_size: Maximum number of positions per yielded chunk
+
+    Yields:
+        Non-empty PositionPath chunks in execution order
+
+    Returns:
+        CommandResult object, same as ``execute_commands`` but without path
+
+    Raises:
+        LandingObstacleException: If obstacle is detected at starting position
+    """
+    if chunk_size <= 0:
+        raise ValueError('Chunk size must be positive')
+
+    blocked = packed_keys(obstacles)
+
+    # Critical safety check: verify no obstacle at landing position
+    if _blocks(blocked, start_position.x, start_position.y):
+        raise LandingObstacleException(start_position.coordinates())
+
+    opcodes = memoryview(command.program.opcodes)
+    x, y = start_position.coordinates()
+    direction = int(start_position.direction)
+    final_position = start_position
     executed_length = 0
-    path = []
-
-    for char in command.command_string:
-        if char == 'F':
-            new_position = current_position.move_forward()
-        elif char == 'B':
-            new_position = current_position.move_backward()
-        elif char == 'L':
-            new_position = current_position.turn_left()
-        else:  # char == 'R'
-            new_position = current_position.turn_right()
-
-        # Check for obstacles only on movement commands
-        if char in ['F', 'B']:
-            if new_position.point in obstacles:
-                executed_command = command.truncate(executed_length)
-                return CommandResult(
-                    final_position=current_position,
-                    stopped_by_obstacle=True,
-                    path=path,
-                    executed_command=executed_command,
-                    initial_command=command,
-                )
-
-        executed_length += 1
-        current_position = new_position
-        path.append(current_position)
+    stopped_by_obstacle = False
 
+    for offset in range(0, len(opcodes), chunk_size):
+        chunk = PositionPath()
+        x, y, direction, stopped_by_obstacle = _run(
+            opcodes[offset : offset + chunk_size],
+            x,
+            y,
+            direction,
+            blocked,
+            chunk,
+        )
+        executed_length += len(chunk)
+        if chunk:
+            final_position = chunk[-1]
+            yield chunk
+        if stopped_by_obstacle:
+            break
+
+    executed_command = (
+        command.truncate(executed_length) if stopped_by_obstacle else command
+    )
     return CommandResult(
-        final_position=current_position,
+        final_position=final_position,
+        stopped_by_obstacle=stopped_by_obstacle,
+        executed_command=executed_command,
+        initial_command=command,
+    )
+
+
+def _run(
+    opcodes: bytes | memoryview,
+    x: int,
+    y: int,
+    direction: int,
+    blocked: frozenset[int] | OccupancyGrid | RegionObstacles,
+    path: PositionPath,
+) -> tuple[int, int, int, bool]:
+    """Execute opcodes from a packed pose, appending each new pose to path.
+
+    Returns:
+        Final (x, y, direction) and whether an obstacle stopped the rover
+    """
+    if not reach_in_plane(x, y, len(opcodes)):
+        return _run_off_plane(opcodes, x, y, direction, blocked, path)
+    if isinstance(blocked, OccupancyGrid):
+        return _run_grid(opcodes, x, y, direction, blocked, path)
+    if isinstance(blocked, RegionObstacles):
+        return _run_index(opcodes, x, y, direction, blocked.index, path)
+
+    # Hot loop works on plain ints only; positions are materialized lazily
+    xs, ys, headings = path.xs, path.ys, path.directions
+
+    for op in opcodes:
+        if op <= OP_BACKWARD:
+            new_x, new_y = x + MOVE_X[op][direction], y + MOVE_Y[op][direction]
+            # Check for obstacles only on movement commands
+            if pack_point(new_x, new_y) in blocked:
+                return x, y, direction, True
+            x, y = new_x, new_y
+        elif op == OP_LEFT:
+            direction = TURN_LEFT[direction]
+        else:
+            direction = TURN_RIGHT[direction]
+
+        xs.append(x)
+        ys.append(y)
+        headings.append(direction)
+
+    return x, y, direction, False
+
+
+def _run_off_plane(
+    opcodes: bytes | memoryview,
+    x: int,
+    y: int,
+    direction: int,
+    blocked: frozenset[int] | OccupancyGrid | RegionObstacles,
+    path: PositionPath,
+) -> tuple[int, int, int, bool]:
+    """Same as ``_run`` for a rover that may leave the int32 plane.
+
+    No obstacle lies off the plane, so a cell there is free without a lookup
+    whose key could alias a cell on the plane.
+    """
+    for op in opcodes:
+        if op <= OP_BACKWARD:
+            new_x, new_y = x + MOVE_X[op][direction], y + MOVE_Y[op][direction]
+            if _blocks(blocked, new_x, new_y):
+                return x, y, direction, True
+            x, y = new_x, new_y
+        elif op == OP_LEFT:
+            direction = TURN_LEFT[direction]
+        else:
+            direction = TURN_RIGHT[direction]
+        path.append(x, y, direction)
+
+    return x, y, direction, False
+
+
+def _blocks(
+    blocked: frozenset[int] | OccupancyGrid | RegionObstacles, x: int, y: int
+) -> bool:
+    """Check one cell against packed keys or a prepared map"""
+    if not in_plane(x, y):
+        return False
+    if isinstance(blocked, OccupancyGrid | RegionObstacles | TiledObstacles):
+        return blocked.contains(x, y)
+    return pack_point(x, y) in blocked
+
+
+def _run_grid(
+    opcodes: bytes | memoryview,
+    x: int,
+    y: int,
+    direction: int,
+    grid: OccupancyGrid,
+    path: PositionPath,
+) -> tuple[int, int, int, bool]:
+    """Same as ``_run``, testing moves against the grid's bitmap in place"""
+    xs, ys, headings = path.xs, path.ys, path.directions
+    bits, outside = grid.bits, grid.outside
+    min_x, min_y, width, height = grid.min_x, grid.min_y, grid.width, grid.height
+
+    for op in opcodes:
+        if op <= OP_BACKWARD:
+            new_x, new_y = x + MOVE_X[op][direction], y + MOVE_Y[op][direction]
+            column, row = new_x - min_x, new_y - min_y
+            if 0 <= column < width and 0 <= row < height:
+                cell = row * width + column
+                if bits[cell >> 3] >> (cell & 7) & 1:
+                    return x, y, direction, True
+            elif pack_point(new_x, new_y) in outside:
+                return x, y, direction, True
+            x, y = new_x, new_y
+        elif op == OP_LEFT:
+            direction = TURN_LEFT[direction]
+        else:
+            direction = TURN_RIGHT[direction]
+
+        xs.append(x)
+        ys.append(y)
+        headings.append(direction)
+
+    return x, y, direction, False
+
+
+def _run_index(
+    opcodes: bytes | memoryview,
+    x: int,
+    y: int,
+    direction: int,
+    index: ObstacleLookup,
+    path: PositionPath,
+) -> tuple[int, int, int, bool]:
+    """Same as ``_run``, resolving each run of moves with one index query.
+
+    Used for maps whose regions make a per-step key lookup the slow path.
+    """
+    for op, group in groupby(opcodes):
+        steps = sum(1 for _ in group)
+        if op >= OP_LEFT:
+            turns = TURN_LEFT if op == OP_LEFT else TURN_RIGHT
+            for _ in range(steps):
+                direction = turns[direction]
+                path.append(x, y, direction)
+            continue
+
+        dx, dy = MOVE_X[op][direction], MOVE_Y[op][direction]
+        free = index.free_steps(x, y, dx, dy, steps)
+        _extend_straight(path, x, y, dx, dy, free, direction)
+        x += dx * free
+        y += dy * free
+        if free < steps:
+            return x, y, direction, True
+
+    return x, y, direction, False
+
+
+def execute_commands_runlength(
+    command: Command,
+    start_position: Position,
+    obstacles: set[Obstacle],
+    index: ObstacleLookup | None = None,
+) -> CommandResult:
+    """
+    Execute command by resolving whole runs of moves at once.
+
+    Runs of identical opcodes from the compiled command are processed as
+    segments: a run of ``F`` or ``B`` is checked against the obstacle index
+    with a single binary search, so collision detection costs
+    O(segments · log n) instead of O(steps). The result is identical to
+    ``execute_commands``.
+
+    Args:
+        command: Command object with validated command string
+        start_position: Starting position
+        obstacles: Set of obstacles
+        index: Prebuilt index of ``obstacles``; built on the fly when omitted
+
+    Returns:
+        CommandResult object, same as ``execute_commands``
+
+    Raises:
+        LandingObstacleException: If obstacle is detected at starting position
+    """
+    if not reach_in_plane(*start_position.coordinates(), len(command.program)):
+        # The index keys lines by int32 coordinates
+        return execute_commands(command, start_position, obstacles)
+
+    if index is None:
+        index = obstacle_index(obstacles)
+
+    # Critical safety check: verify no obstacle at landing position
+    if index.contains(start_position.x, start_position.y):
+        raise LandingObstacleException(start_position.coordinates())
+
+    if command.is_empty():
+        return CommandResult(
+            final_position=start_position,
+            stopped_by_obstacle=False,
+            executed_command=command,
+            initial_command=command,
+            path=PositionPath(),
+        )
+
+    x, y = start_position.coordinates()
+    direction = int(start_position.direction)
+    path = PositionPath()
+
+    for op, _, steps in command.program.runs():
+        if op >= OP_LEFT:
+            turns = TURN_LEFT if op == OP_LEFT else TURN_RIGHT
+            for _ in range(steps):
+                direction = turns[direction]
+                path.append(x, y, direction)
+            continue
+
+        dx, dy = MOVE_X[op][direction], MOVE_Y[op][direction]
+
+        free = index.free_steps(x, y, dx, dy, steps)
+        _extend_straight(path, x, y, dx, dy, free, direction)
+        x += dx * free
+        y += dy * free
+
+        if free < steps:
+            return CommandResult(
+                final_position=path[-1] if path else start_position,
+                stopped_by_obstacle=True,
+                path=path,
+                executed_command=command.truncate(len(path)),
+                initial_command=command,
+            )
+
+    return CommandResult(
+        final_position=path[-1] if path else start_position,
         stopped_by_obstacle=False,
         path=path,
         executed_command=command,
         initial_command=command,
     )
+
+
+def _extend_straight(
+    path: PositionPath, x: int, y: int, dx: int, dy: int, steps: int, direction: int
+) -> None:
+    """Append ``steps`` unit moves from (x, y) along (dx, dy) to the path"""
+    if steps <= 0:
+        return
+    if dx:
+        path.xs.extend(range(x + dx, x + dx * (steps + 1), dx))
+        path.ys.extend(repeat(y, steps))
+    else:
+        path.xs.extend(repeat(x, steps))
+        path.ys.extend(range(y + dy, y + dy * (steps + 1), dy))
+    path.directions.extend(repeat(direction, steps))
@@ -0,0 +1,334 @@
+"""Immutable obstacle map snapshots shared across requests"""
+
+from array import array
+from bisect import bisect_left
+from collections.abc import Iterable, Iterator, Sequence, Set
+
+from app.domain.entities import Obstacle, Point
+from app.domain.grid import OccupancyGrid
+from app.domain.kdtree import SpatialIndex
+from app.domain.obstacle_index import (
+    ObstacleIndex,
+    ObstacleLookup,
+    SortedObstacleIndex,
+)
+from app.domain.pose import in_plane, pack_obstacles, pack_point, unpack_point
+from app.domain.regions import Rect, RegionIndex
+from app.domain.tiles import TiledObstacles
+
+
+class ObstacleSnapshot(frozenset):
+    """Frozen set of obstacles tagged with the version of its source.
+
+    A snapshot can be passed anywhere a set of obstacles is expected. The
+    engines' derived forms (packed cell keys, sorted and unsorted, and the
+    row/column index) and the k-d tree of spatial queries are built on
+    first use and reused for the lifetime of the snapshot.
+    """
+
+    __slots__ = ('version', '_keys', '_sorted_keys', '_index', '_spatial')
+
+    def __new__(
+        cls,
+        obstacles: Iterable[Obstacle] = (),
+        version: str = '',
+        spatial: SpatialIndex | None = None,
+    ):
+        snapshot = super().__new__(cls, obstacles)
+        snapshot.version = version
+        snapshot._keys = None
+        snapshot._sorted_keys = None
+        snapshot._index = None
+        snapshot._spatial = spatial
+        return snapshot
+
+    def __repr__(self) -> str:
+        return f'ObstacleSnapshot(<{len(self)} obstacles>, version={self.version!r})'
+
+    def __reduce__(self):
+        return ObstacleSnapshot, (frozenset(self), self.version)
+
+    @property
+    def keys(self) -> frozenset[int]:
+        """Obstacles packed into int cell keys"""
+        if self._keys is None:
+            self._keys = pack_obstacles(self)
+        return self._keys
+
+    @property
+    def sorted_keys(self) -> array:
+        """Packed cell keys in ascending order, as an int64 array"""
+        if self._sorted_keys is None:
+            self._sorted_keys = array('q', sorted(self.keys))
+        return self._sorted_keys
+
+    @property
+    def index(self) -> ObstacleIndex:
+        """Row/column index of the obstacles"""
+        if self._index is None:
+            self._index = ObstacleIndex(self)
+        return self._index
+
+    @property
+    def spatial(self) -> SpatialIndex:
+        """k-d tree of the obstacles"""
+        if self._spatial is None:
+            self._spatial = SpatialIndex.from_obstacles(self)
+        return self._spatial
+
+    def spatial_after(
+        self, added: Iterable[Point], removed: Iterable[Point]
+    ) -> SpatialIndex | None:
+        """Spatial index of the map after an edit, derived from this one's.
+
+        Returns None when this snapshot's index was never built, leaving
+        the new snapshot to build its own on first use.
+        """
+        if self._spatial is None:
+            return None
+        return self._spatial.updated(added, removed)
+
+
+class SortedKeys(Sequence):
+    """Sorted packed cell keys answering membership by binary search"""
+
+    __slots__ = ('_keys',)
+
+    def __init__(self, keys: Sequence[int]):
+        self._keys = keys
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __getitem__(self, i):
+        return self._keys[i]
+
+    def __contains__(self, key: object) -> bool:
+        i = bisect_left(self._keys, key)
+        return i < len(self._keys) and self._keys[i] == key
+
+
+class PackedObstacles(Set):
+    """Read-only obstacle set backed by sorted packed cell keys.
+
+    Nothing is materialized per obstacle: membership, the engines' keys and
+    the index all bisect the two key sequences, which may be memory-mapped
+    sections of a compiled obstacle map. Iteration builds Obstacle objects
+    on the fly.
+
+    Args:
+        xy_keys: Sorted ``x * 2**32 + y`` keys, one per obstacle
+        yx_keys: Sorted ``y * 2**32 + x`` keys, one per obstacle
+        version: Version of the source map
+    """
+
+    def __init__(
+        self, xy_keys: Sequence[int], yx_keys: Sequence[int], version: str = ''
+    ):
+        self.version = version
+        self.xy_keys = xy_keys
+        self.yx_keys = yx_keys
+        self.keys = SortedKeys(xy_keys)
+        self.index = SortedObstacleIndex(xy_keys, yx_keys)
+        self._spatial: SpatialIndex | None = None
+
+    def __repr__(self) -> str:
+        return f'PackedObstacles(<{len(self)} obstacles>, version={self.version!r})'
+
+    def __reduce__(self):
+        # Memory-mapped sections cannot be pickled, so copy them out
+        return PackedObstacles, (
+            array('q', self.xy_keys),
+            array('q', self.yx_keys),
+            self.version,
+        )
+
+    @property
+    def spatial(self) -> SpatialIndex:
+        """k-d tree of the obstacles"""
+        if self._spatial is None:
+            self._spatial = SpatialIndex.from_obstacles(self)
+        return self._spatial
+
+    def __len__(self) -> int:
+        return len(self.xy_keys)
+
+    def __contains__(self, obstacle: object) -> bool:
+        if not isinstance(obstacle, Point) or not in_plane(obstacle.x, obstacle.y):
+            return False
+        return pack_point(obstacle.x, obstacle.y) in self.keys
+
+    def __iter__(self) -> Iterator[Obstacle]:
+        for key in self.xy_keys:
+            x, y = unpack_point(key)
+            yield Obstacle(x, y)
+
+    __hash__ = Set._hash
+
+
+class RegionObstacles(Set):
+    """Obstacle set of single cells plus rectangular regions.
+
+    Regions are never expanded into cells: membership and runs query the
+    cells' snapshot and the regions' RegionIndex and combine the answers,
+    so a region costs the same however large it is. Iteration yields
+    every blocked cell once, regions included.
+
+    Packed cell keys are members too, so the map stands in for the
+    engines' key set as well as their index.
+
+    Args:
+        cells: Single-cell obstacles
+        rects: Blocked rectangles; overlaps with each other and with the
+            cells are allowed
+        version: Version of the source map
+    """
+
+    def __init__(
+        self,
+        cells: Iterable[Obstacle] = (),
+        rects: Iterable[Rect] = (),
+        version: str = '',
+    ):
+        self.version = version
+        if not isinstance(cells, ObstacleSnapshot):
+            cells = ObstacleSnapshot(cells, version)
+        self.cells = cells
+        self.regions = RegionIndex(rects)
+        self.rects = self.regions.rects
+        self.keys = self
+        self.index = self
+        self._len: int | None = None
+
+    def __repr__(self) -> str:
+        return (
+            f'RegionObstacles(<{len(self.cells)} cells, {len(self.rects)} regions>, '
+            f'version={self.version!r})'
+        )
+
+    def __reduce__(self):
+        return RegionObstacles, (frozenset(self.cells), self.rects, self.version)
+
+    def within(
+        self, min_x: int, min_y: int, max_x: int, max_y: int
+    ) -> 'RegionObstacles':
+        """Part of the map inside the inclusive box, regions clipped to it.
+
+        The map itself is returned when the box covers it.
+        """
+        bounds = self.bounds()
+        if bounds is None or (
+            min_x <= bounds[0]
+            and min_y <= bounds[1]
+            and bounds[2] <= max_x
+            and bounds[3] <= max_y
+        ):
+            return self
+        cells = self.cells.index.cells_in_box(min_x, min_y, max_x, max_y)
+        clipped = (r.clip(min_x, min_y, max_x, max_y) for r in self.rects)
+        return RegionObstacles(
+            (Obstacle(x, y) for x, y in cells),
+            (r for r in clipped if r is not None),
+            self.version,
+        )
+
+    def contains(self, x: int, y: int) -> bool:
+        """Check whether cell (x, y) holds an obstacle"""
+        if not in_plane(x, y):
+            return False
+        return pack_point(x, y) in self.cells.keys or self.regions.contains(x, y)
+
+    def free_steps(self, x: int, y: int, dx: int, dy: int, steps: int) -> int:
+        """Count steps that can be taken from (x, y) along (dx, dy).
+
+        Same contract as ``ObstacleIndex.free_steps``.
+        """
+        steps = self.cells.index.free_steps(x, y, dx, dy, steps)
+        return self.regions.free_steps(x, y, dx, dy, steps)
+
+    def any_in_box(self, min_x: int, min_y: int, max_x: int, max_y: int) -> bool:
+        """Check whether any obstacle lies inside the inclusive box"""
+        return self.regions.any_in_box(
+            min_x, min_y, max_x, max_y
+        ) or self.cells.index.any_in_box(min_x, min_y, max_x, max_y)
+
+    def cells_in_box(
+        self, min_x: int, min_y: int, max_x: int, max_y: int
+    ) -> Iterator[tuple[int, int]]:
+        """Yield the (x, y) of every obstacle inside the inclusive box once"""
+        yield from self.regions.cells_in_box(min_x, min_y, max_x, max_y)
+        for x, y in self.cells.index.cells_in_box(min_x, min_y, max_x, max_y):
+            if not self.regions.contains(x, y):
+                yield x, y
+
+    def bounds(self) -> tuple[int, int, int, int] | None:
+        """Bounding box of the cells and regions, or None when there are none"""
+        boxes = [b for b in (self.cells.index.bounds(), self.regions.bounds()) if b]
+        if not boxes:
+            return None
+        return (
+            min(b[0] for b in boxes),
+            min(b[1] for b in boxes),
+            max(b[2] for b in boxes),
+            max(b[3] for b in boxes),
+        )
+
+    def __contains__(self, item: object) -> bool:
+        if isinstance(item, Point):
+            return self.contains(item.x, item.y)
+        if isinstance(item, int):
+            return self.contains(*unpack_point(item))
+        return False
+
+    def __len__(self) -> int:
+        if self._len is None:
+            self._len = len(self.regions) + sum(
+                not self.regions.contains(o.x, o.y) for o in self.cells
+            )
+        return self._len
+
+    def __iter__(self) -> Iterator[Obstacle]:
+        bounds = self.bounds()
+        if bounds is None:
+            return
+        for x, y in self.cells_in_box(*bounds):
+            yield Obstacle(x, y)
+
+    __hash__ = Set._hash
+
+
+# Obstacle maps carrying their own keys and index
+_PREPARED = (
+    ObstacleSnapshot,
+    PackedObstacles,
+    OccupancyGrid,
+    TiledObstacles,
+    RegionObstacles,
+)
+
+
+def packed_keys(
+    obstacles: Iterable[Obstacle],
+) -> frozenset[int] | SortedKeys | OccupancyGrid | TiledObstacles | RegionObstacles:
+    """Packed cell keys of obstacles, reusing a snapshot's keys"""
+    if isinstance(obstacles, _PREPARED):
+        return obstacles.keys
+    return pack_obstacles(obstacles)
+
+
+def obstacle_index(obstacles: Iterable[Obstacle]) -> ObstacleLookup:
+    """Row/column index of obstacles, reusing a snapshot's index"""
+    if isinstance(obstacles, _PREPARED):
+        return obstacles.index
+    return ObstacleIndex(obstacles)
+
+
+def spatial_index(obstacles: Iterable[Obstacle]) -> SpatialIndex | None:
+    """k-d tree of a map that keeps one, or None.
+
+    Grids, tiled maps and maps with regions answer spatial queries from
+    their box scans instead, which never enumerate the whole map.
+    """
+    if isinstance(obstacles, ObstacleSnapshot | PackedObstacles):
+        return obstacles.spatial
+    return None
@@ -0,0 +1,217 @@
+"""Obstacle maps partitioned into square tiles loaded on demand"""
+
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Iterable, Iterator, Set
+from dataclasses import dataclass
+
+from app.domain.entities import Obstacle, Point
+from app.domain.obstacle_index import ObstacleIndex, ObstacleLookup
+from app.domain.pose import unpack_point
+
+# Default number of tiles kept loaded
+DEFAULT_MAX_TILES = 256
+
+TileKey = tuple[int, int]
+
+# Tile counts larger than any run, so free_steps over tiles never truncates
+_UNBOUNDED = 1 << 62
+
+
+@dataclass(frozen=True)
+class TileCacheStats:
+    hits: int
+    loads: int
+    evictions: int
+    tiles: int
+
+
+class TiledObstacles(Set):
+    """Read-only obstacle set whose cells live in square tiles.
+
+    Tile ``(x // tile_size, y // tile_size)`` holds the obstacles of its
+    cells. Only tiles in ``tiles`` hold any; they are loaded through
+    ``load_tile`` the first time a query reaches them and kept in a bounded
+    LRU. Queries answer the ``ObstacleLookup`` protocol tile by tile, and
+    runs skip over empty tiles using an index of the occupied ones, so the
+    grid of tiles is never enumerated.
+
+    Packed cell keys are members too, so the map stands in for the
+    engines' key set as well as their index.
+
+    Args:
+        tile_size: Side of a tile in cells
+        tiles: Obstacle count of every occupied tile
+        load_tile: Loads the lookup of one occupied tile
+        max_tiles: Maximum number of tiles kept loaded
+        version: Version of the source map
+    """
+
+    def __init__(
+        self,
+        tile_size: int,
+        tiles: dict[TileKey, int],
+        load_tile: Callable[[int, int], ObstacleLookup],
+        max_tiles: int = DEFAULT_MAX_TILES,
+        version: str = '',
+    ):
+        if tile_size <= 0:
+            raise ValueError('Tile size must be positive')
+        if max_tiles <= 0:
+            raise ValueError('Tile cache size must be positive')
+        self.tile_size = tile_size
+        self.version = version
+        self.keys = self
+        self.index = self
+        self._tiles = tiles
+        self._tile_index = ObstacleIndex(Point(tx, ty) for tx, ty in tiles)
+        self._load_tile = load_tile
+        self._max_tiles = max_tiles
+        self._loaded: OrderedDict[TileKey, ObstacleLookup] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+
+    def __repr__(self) -> str:
+        return (
+            f'TiledObstacles(<{len(self)} obstacles in {len(self._tiles)} tiles>, '
+            f'version={self.version!r})'
+        )
+
+    def stats(self) -> TileCacheStats:
+        return TileCacheStats(
+            hits=self.hits,
+            loads=self.loads,
+            evictions=self.evictions,
+            tiles=len(self._loaded),
+        )
+
+    def _tile(self, tx: int, ty: int) -> ObstacleLookup | None:
+        key = (tx, ty)
+        if key not in self._tiles:
+            return None
+        with self._lock:
+            tile = self._loaded.get(key)
+            if tile is not None:
+                self._loaded.move_to_end(key)
+                self.hits += 1
+                return tile
+
+            tile = self._load_tile(tx, ty)
+            self.loads += 1
+            self._loaded[key] = tile
+            if len(self._loaded) > self._max_tiles:
+                self._loaded.popitem(last=False)
+                self.evictions += 1
+            return tile
+
+    def contains(self, x: int, y: int) -> bool:
+        """Check whether cell (x, y) holds an obstacle"""
+        tile = self._tile(x // self.tile_size, y // self.tile_size)
+        return tile is not None and tile.contains(x, y)
+
+    def free_steps(self, x: int, y: int, dx: int, dy: int, steps: int) -> int:
+        """Count steps that can be taken from (x, y) along (dx, dy).
+
+        Same contract as ``ObstacleIndex.free_steps``.
+        """
+        size = self.tile_size
+        taken = 0
+        while taken < steps:
+            # Cell the next step enters and the tile holding it
+            nx, ny = x + dx * (taken + 1), y + dy * (taken + 1)
+            tx, ty = nx // size, ny // size
+            if dx > 0:
+                span = (tx + 1) * size - nx
+            elif dx < 0:
+                span = nx - tx * size + 1
+            elif dy > 0:
+                span = (ty + 1) * size - ny
+            else:
+                span = ny - ty * size + 1
+
+            tile = self._tile(tx, ty)
+            if tile is None:
+                # Skip every empty tile up to the next occupied one in line
+                empty = self._tile_index.free_steps(tx, ty, dx, dy, _UNBOUNDED)
+                taken += min(steps - taken, span + empty * size)
+                continue
+
+            want = min(steps - taken, span)
+            free = tile.free_steps(x + dx * taken, y + dy * taken, dx, dy, want)
+            if free < want:
+                return taken + free
+            taken += want
+        return steps
+
+    def any_in_box(self, min_x: int, min_y: int, max_x: int, max_y: int) -> bool:
+        """Check whether any obstacle lies inside the inclusive box"""
+        return any(
+            tile.any_in_box(min_x, min_y, max_x, max_y)
+            for tile in self._tiles_in_box(min_x, min_y, max_x, max_y)
+        )
+
+    def cells_in_box(
+        self, min_x: int, min_y: int, max_x: int, max_y: int
+    ) -> Iterator[tuple[int, int]]:
+        """Yield the (x, y) of every obstacle inside the inclusive box"""
+        for tile in self._tiles_in_box(min_x, min_y, max_x, max_y):
+            yield from tile.cells_in_box(min_x, min_y, max_x, max_y)
+
+    def bounds(self) -> tuple[int, int, int, int] | None:
+        """Box of the occupied tiles, enclosing every obstacle"""
+        tiles = self._tile_index.bounds()
+        if tiles is None:
+            return None
+        size = self.tile_size
+        min_tx, min_ty, max_tx, max_ty = tiles
+        return (
+            min_tx * size,
+            min_ty * size,
+            (max_tx + 1) * size - 1,
+            (max_ty + 1) * size - 1,
+        )
+
+    def _tiles_in_box(
+        self, min_x: int, min_y: int, max_x: int, max_y: int
+    ) -> Iterator[ObstacleLookup]:
+        size = self.tile_size
+        for tx, ty in self._tile_index.cells_in_box(
+            min_x // size, min_y // size, max_x // size, max_y // size
+        ):
+            yield self._tile(tx, ty)
+
+    def __contains__(self, item: object) -> bool:
+        if isinstance(item, Point):
+            return self.contains(item.x, item.y)
+        if isinstance(item, int):
+            return self.contains(*unpack_point(item))
+        return False
+
+    def __len__(self) -> int:
+        return sum(self._tiles.values())
+
+    def __iter__(self) -> Iterator[Obstacle]:
+        # Tiles are read one at a time without filling the cache
+        size = self.tile_size
+        for tx, ty in self._tiles:
+            tile = self._load_tile(tx, ty)
+            for x, y in tile.cells_in_box(
+                tx * size, ty * size, (tx + 1) * size - 1, (ty + 1) * size - 1
+            ):
+                yield Obstacle(x, y)
+
+    __hash__ = Set._hash
+
+
+def tile_of(x: int, y: int, tile_size: int) -> TileKey:
+    return x // tile_size, y // tile_size
+
+
+def partition(obstacles: Iterable[Point], tile_size: int) -> dict[TileKey, list[Point]]:
+    """Group obstacles by the tile holding them"""
+    tiles: dict[TileKey, list[Point]] = {}
+    for o in obstacles:
+        tiles.setdefault(tile_of(o.x, o.y, tile_size), []).append(o)
+    return tiles
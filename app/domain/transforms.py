@@ -0,0 +1,230 @@
+"""Composable rover transforms for pose queries over executed commands.
+
+Every opcode moves the rover by a fixed amount relative to its own heading,
+so a sequence of opcodes reduces to one rigid transform: a displacement in
+the rover frame (``forward``, ``right``) and a number of quarter turns to the
+right. Transforms compose associatively, which lets prefix and range queries
+be answered from a segment tree instead of replaying the command.
+"""
+
+from array import array
+from dataclasses import dataclass
+
+from app.domain.compiler import (
+    OP_BACKWARD,
+    OP_FORWARD,
+    OP_LEFT,
+    OP_RIGHT,
+    CompactNode,
+    CompiledCommand,
+    RunNode,
+)
+from app.domain.entities import (
+    DIR_VECTORS,
+    Command,
+    CompactCommand,
+    Direction,
+    Point,
+    Position,
+)
+
+
+def _rotate(forward: int, right: int, turns: int) -> tuple[int, int]:
+    """Express a vector given in a frame turned right ``turns`` times"""
+    turns %= 4
+    if turns == 0:
+        return forward, right
+    if turns == 1:
+        return -right, forward
+    if turns == 2:
+        return -forward, -right
+    return right, -forward
+
+
+@dataclass(frozen=True, slots=True)
+class Transform:
+    """Net effect of a sequence of steps in the rover frame"""
+
+    forward: int = 0
+    right: int = 0
+    rotation: int = 0
+
+    def then(self, other: 'Transform') -> 'Transform':
+        """Transform of these steps followed by ``other``"""
+        forward, right = _rotate(other.forward, other.right, self.rotation)
+        return Transform(
+            self.forward + forward,
+            self.right + right,
+            (self.rotation + other.rotation) % 4,
+        )
+
+    def inverse(self) -> 'Transform':
+        """Transform that undoes this one"""
+        forward, right = _rotate(-self.forward, -self.right, -self.rotation)
+        return Transform(forward, right, -self.rotation % 4)
+
+    def power(self, times: int) -> 'Transform':
+        """Transform of ``times`` back-to-back copies, by repeated squaring"""
+        result, base = IDENTITY, self
+        while times:
+            if times & 1:
+                result = result.then(base)
+            base = base.then(base)
+            times >>= 1
+        return result
+
+    def apply(self, position: Position) -> Position:
+        """Pose reached from ``position`` after these steps"""
+        heading = int(position.direction)
+        fx, fy = DIR_VECTORS[heading]
+        rx, ry = DIR_VECTORS[(heading + 1) % 4]
+        return Position(
+            Point(
+                position.x + self.forward * fx + self.right * rx,
+                position.y + self.forward * fy + self.right * ry,
+            ),
+            Direction((heading + self.rotation) % 4),
+        )
+
+
+IDENTITY = Transform()
+
+# Transform of a single opcode
+OP_TRANSFORMS = {
+    OP_FORWARD: Transform(1, 0, 0),
+    OP_BACKWARD: Transform(-1, 0, 0),
+    OP_LEFT: Transform(0, 0, 3),
+    OP_RIGHT: Transform(0, 0, 1),
+}
+
+
+class TransformTree:
+    """Segment tree of composed transforms over the opcodes of a command.
+
+    Built in O(n); ``range`` and ``prefix`` are answered in O(log n). Nodes
+    are stored in flat arrays: leaves at ``n..2n-1`` and node ``i`` composed
+    from ``2i`` and ``2i+1``.
+    """
+
+    def __init__(self, program: CompiledCommand):
+        n = len(program)
+        forward = array('q', bytes(16 * n))
+        right = array('q', bytes(16 * n))
+        rotation = bytearray(2 * n)
+
+        for i, op in enumerate(program.opcodes, n):
+            leaf = OP_TRANSFORMS[op]
+            forward[i], right[i], rotation[i] = leaf.forward, leaf.right, leaf.rotation
+
+        for i in range(n - 1, 0, -1):
+            left, child = 2 * i, 2 * i + 1
+            f, r = _rotate(forward[child], right[child], rotation[left])
+            forward[i] = forward[left] + f
+            right[i] = right[left] + r
+            rotation[i] = (rotation[left] + rotation[child]) % 4
+
+        self._n = n
+        self._forward = forward
+        self._right = right
+        self._rotation = rotation
+
+    def __len__(self) -> int:
+        return self._n
+
+    def _node(self, i: int) -> Transform:
+        return Transform(self._forward[i], self._right[i], self._rotation[i])
+
+    def range(self, start: int, stop: int) -> Transform:
+        """Net transform of steps ``start`` (inclusive) to ``stop`` (exclusive)"""
+        _check_range(start, stop, self._n)
+
+        head, tail = IDENTITY, IDENTITY
+        lo, hi = start + self._n, stop + self._n
+        while lo < hi:
+            if lo & 1:
+                head = head.then(self._node(lo))
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                tail = self._node(hi).then(tail)
+            lo >>= 1
+            hi >>= 1
+        return head.then(tail)
+
+    def prefix(self, steps: int) -> Transform:
+        """Net transform of the first ``steps`` steps"""
+        return self.range(0, steps)
+
+
+class CompactTransforms:
+    """Prefix and range transforms over a compact program without expanding it.
+
+    Each node's transform is computed once; a repeated group is reduced with
+    ``Transform.power``, so a prefix query costs O(depth · (nodes + log count)).
+    """
+
+    def __init__(self, program: tuple[CompactNode, ...]):
+        self._program = program
+        self._transforms: dict[int, Transform] = {}
+        self._n = sum(node.steps for node in program)
+
+    def __len__(self) -> int:
+        return self._n
+
+    def _transform(self, node: CompactNode) -> Transform:
+        # Programs are immutable and held by this object, so identity is a safe key
+        transform = self._transforms.get(id(node))
+        if transform is None:
+            if isinstance(node, RunNode):
+                transform = OP_TRANSFORMS[node.op].power(node.count)
+            else:
+                body = IDENTITY
+                for child in node.body:
+                    body = body.then(self._transform(child))
+                transform = body.power(node.count)
+            self._transforms[id(node)] = transform
+        return transform
+
+    def _prefix(self, nodes: tuple[CompactNode, ...], steps: int) -> Transform:
+        transform = IDENTITY
+        for node in nodes:
+            if steps <= 0:
+                break
+            if node.steps <= steps:
+                transform = transform.then(self._transform(node))
+                steps -= node.steps
+            elif isinstance(node, RunNode):
+                return transform.then(OP_TRANSFORMS[node.op].power(steps))
+            else:
+                body_steps = node.steps // node.count
+                full, rest = divmod(steps, body_steps)
+                body = IDENTITY
+                for child in node.body:
+                    body = body.then(self._transform(child))
+                transform = transform.then(body.power(full))
+                return transform.then(self._prefix(node.body, rest))
+        return transform
+
+    def prefix(self, steps: int) -> Transform:
+        """Net transform of the first ``steps`` steps"""
+        _check_range(0, steps, self._n)
+        return self._prefix(self._program, steps)
+
+    def range(self, start: int, stop: int) -> Transform:
+        """Net transform of steps ``start`` (inclusive) to ``stop`` (exclusive)"""
+        _check_range(start, stop, self._n)
+        return self.prefix(start).inverse().then(self.prefix(stop))
+
+
+def _check_range(start: int, stop: int, length: int) -> None:
+    if not 0 <= start <= stop <= length:
+        raise ValueError(f'Step range {start}..{stop} is outside 0..{length}')
+
+
+def build_transforms(
+    command: Command | CompactCommand,
+) -> TransformTree | CompactTransforms:
+    """Build the transform index matching the command representation"""
+    if isinstance(command, CompactCommand):
+        return CompactTransforms(command.program)
+    return TransformTree(command.program)
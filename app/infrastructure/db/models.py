@@ -7,6 +7,7 @@ from sqlalchemy import (
     Boolean,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
     String,
     func,
@@ -69,6 +70,7 @@ class CommandORM(Base):
     stopped_by_obstacle: Mapped[bool] = mapped_column(
         Boolean, default=False, nullable=False
     )
+    obstacle_map_version: Mapped[str | None] = mapped_column(String, nullable=True)
     created_at: Mapped[created_at]
     updated_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
@@ -79,3 +81,28 @@ class CommandORM(Base):
     positions: Mapped[list['PositionORM']] = relationship(
         back_populates='command', cascade='all, delete-orphan'
     )
+
+
+class ObstacleORM(Base):
+    """Obstacle table model - one row per blocked cell"""
+
+    __tablename__ = 'obstacles'
+    __table_args__ = (
+        Index('ix_obstacles_coord_x_coord_y', 'coord_x', 'coord_y', unique=True),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    coord_x: Mapped[int] = mapped_column(Integer, nullable=False)
+    coord_y: Mapped[int] = mapped_column(Integer, nullable=False)
+
+
+class ObstacleMapORM(Base):
+    """Obstacle map table model - single row holding the map version.
+
+    Every write to ``obstacles`` bumps the version in the same transaction.
+    """
+
+    __tablename__ = 'obstacle_map'
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False, server_default='0')
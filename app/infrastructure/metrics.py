@@ -0,0 +1,113 @@
+from collections.abc import Iterator
+
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.registry import Collector
+
+from app.application.execution_cache import ExecutionCache
+from app.application.route_service import PlannerStats
+from app.infrastructure.repositories.repo_obstacle_tiles import TiledObstacleRepository
+
+
+class ExecutionCacheCollector(Collector):
+    """Exports execution cache counters on the /metrics endpoint"""
+
+    def __init__(self, cache: ExecutionCache):
+        self._cache = cache
+
+    def collect(self) -> Iterator:
+        stats = self._cache.stats()
+        yield CounterMetricFamily(
+            'rover_execution_cache_hits', 'Execution cache hits', value=stats.hits
+        )
+        yield CounterMetricFamily(
+            'rover_execution_cache_misses',
+            'Execution cache misses',
+            value=stats.misses,
+        )
+        yield CounterMetricFamily(
+            'rover_execution_cache_evictions',
+            'Execution cache evictions',
+            value=stats.evictions,
+        )
+        yield GaugeMetricFamily(
+            'rover_execution_cache_entries',
+            'Results held by the execution cache',
+            value=stats.entries,
+        )
+        yield GaugeMetricFamily(
+            'rover_execution_cache_positions',
+            'Path positions held by the execution cache',
+            value=stats.positions,
+        )
+
+
+class TileCacheCollector(Collector):
+    """Exports tile cache counters of a tiled obstacle map"""
+
+    def __init__(self, repo: TiledObstacleRepository):
+        self._repo = repo
+
+    def collect(self) -> Iterator:
+        try:
+            stats = self._repo.get_obstacles().stats()
+        except (OSError, ValueError):
+            return
+        yield CounterMetricFamily(
+            'rover_obstacle_tile_hits', 'Tile cache hits', value=stats.hits
+        )
+        yield CounterMetricFamily(
+            'rover_obstacle_tile_loads',
+            'Obstacle tiles loaded from disk',
+            value=stats.loads,
+        )
+        yield CounterMetricFamily(
+            'rover_obstacle_tile_evictions',
+            'Obstacle tiles evicted from the cache',
+            value=stats.evictions,
+        )
+        yield GaugeMetricFamily(
+            'rover_obstacle_tiles_loaded',
+            'Obstacle tiles held by the cache',
+            value=stats.tiles,
+        )
+
+
+class RoutePlannerCollector(Collector):
+    """Exports route planning totals"""
+
+    def __init__(self, stats: PlannerStats):
+        self._stats = stats
+
+    def collect(self) -> Iterator:
+        stats = self._stats
+        yield CounterMetricFamily(
+            'rover_route_plans', 'Routes planned', value=stats.plans
+        )
+        yield CounterMetricFamily(
+            'rover_route_failures',
+            'Route requests with no route to the target',
+            value=stats.failures,
+        )
+        yield CounterMetricFamily(
+            'rover_route_budget_exhausted',
+            'Route requests that ran out of expansions',
+            value=stats.budget_exhausted,
+        )
+        yield CounterMetricFamily(
+            'rover_route_expansions',
+            'Poses expanded by the route planner',
+            value=stats.expansions,
+        )
+        yield CounterMetricFamily(
+            'rover_route_planning_seconds',
+            'Time spent planning routes',
+            value=stats.seconds,
+        )
+        yield CounterMetricFamily(
+            'rover_route_replans', 'Active route replans', value=stats.replans
+        )
+        yield CounterMetricFamily(
+            'rover_route_changed_cells',
+            'Changed cells handed to active route searches',
+            value=stats.changed_cells,
+        )
@@ -0,0 +1,444 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections.abc import AsyncIterable, Callable, Iterable, Iterator, Set
+from pathlib import Path
+
+from app.domain.entities import Obstacle, ObstacleEdit, Point
+from app.domain.exceptions import ObstacleMapReadOnlyException
+from app.domain.grid import Bounds, OccupancyGrid
+from app.domain.kdtree import SpatialIndex
+from app.domain.obstacle_index import ObstacleLookup, obstacles_in_box
+from app.domain.obstacle_stream import Cell
+from app.domain.regions import Rect
+from app.domain.snapshot import ObstacleSnapshot, PackedObstacles, RegionObstacles
+from app.infrastructure.repositories.repo_obstacle import parse_obstacle_map
+from app.infrastructure.repositories.repo_obstacle_map import (
+    is_compiled_map,
+    load_map,
+)
+
+logger = logging.getLogger(__name__)
+
+# Seconds between checks of the obstacle file
+DEFAULT_POLL_INTERVAL = 2.0
+
+
+ObstacleMap = ObstacleSnapshot | PackedObstacles | OccupancyGrid | RegionObstacles
+
+
+def parse_bounds(value: str) -> Bounds:
+    """Parse grid bounds written as ``min_x,min_y,max_x,max_y``
+
+    Raises:
+        ValueError: If the value is not four integers.
+    """
+    parts = value.split(',')
+    if len(parts) != 4:
+        raise ValueError(f'Invalid grid bounds {value!r}, expected four integers')
+    min_x, min_y, max_x, max_y = (int(part) for part in parts)
+    return min_x, min_y, max_x, max_y
+
+
+class FileObstacleProvider:
+    """Process-wide obstacle map loaded from a JSON or compiled map file.
+
+    Serves one immutable ObstacleSnapshot to every request. A background
+    task polls the file's mtime and size; when they change, the file is
+    read, hashed and parsed in a worker thread and the new snapshot is
+    swapped in with a single assignment, so readers never see a partial
+    map. The snapshot version is the content hash, so touching the file
+    without changing it keeps the version and all downstream caches.
+
+    A compiled map (see ``repo_obstacle_map``) is memory-mapped instead of
+    parsed and versioned by the digest in its header. With ``grid_bounds``
+    a JSON map is stored as an OccupancyGrid bitmap of that rectangle. A
+    JSON map holding rectangles is served as RegionObstacles, which never
+    expands them into cells, with or without grid bounds.
+
+    JSON maps are writable. A write builds the new obstacle set, its
+    snapshot and the snapshot's index in a worker thread, replaces the file
+    atomically and then publishes the snapshot, so readers keep using the
+    previous one until the swap. A k-d tree already built for spatial
+    queries is updated with the edit rather than rebuilt. Writers in other
+    processes are serialized by a lock file, and their providers pick the
+    new file up on their next poll.
+
+    An import is written to a temporary file as it streams in and then
+    published by a background task once its snapshot and index are built;
+    writes made after an import wait for it to be published.
+    """
+
+    def __init__(
+        self,
+        json_path: str | Path | None = None,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        grid_bounds: Bounds | None = None,
+    ):
+        if json_path is None:
+            json_path = os.getenv('OBSTACLES_JSON_PATH', '/config/obstacles.json')
+        if grid_bounds is None and os.getenv('OBSTACLES_GRID_BOUNDS'):
+            grid_bounds = parse_bounds(os.environ['OBSTACLES_GRID_BOUNDS'])
+        self._path = Path(json_path)
+        self._grid_bounds = grid_bounds
+        self._poll_interval = poll_interval
+        self._snapshot: ObstacleMap | None = None
+        self._signature: tuple[int, int] | None = None
+        self._load_lock = threading.Lock()
+        self._task: asyncio.Task | None = None
+        self._import: asyncio.Task | None = None
+
+    def get_obstacles(self) -> ObstacleMap:
+        """Current snapshot, loaded synchronously on first use.
+
+        Raises:
+            FileNotFoundError: If the JSON file does not exist.
+            ValueError: If the JSON content has an invalid structure.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self.reload()
+        return snapshot
+
+    def get_obstacle_index(self) -> ObstacleLookup:
+        return self.get_obstacles().index
+
+    def get_version(self) -> str:
+        """Version of the current snapshot, a hash of the file content"""
+        return self.get_obstacles().version
+
+    def contains(self, x: int, y: int) -> bool:
+        """Check whether cell (x, y) holds an obstacle"""
+        return self.get_obstacle_index().contains(x, y)
+
+    def get_obstacles_in_box(
+        self, min_x: int, min_y: int, max_x: int, max_y: int
+    ) -> Set[Obstacle]:
+        """Obstacles inside the inclusive box; the whole map when it covers it"""
+        obstacles = self.get_obstacles()
+        if isinstance(obstacles, RegionObstacles):
+            return obstacles.within(min_x, min_y, max_x, max_y)
+        return obstacles_in_box(
+            obstacles.index, min_x, min_y, max_x, max_y, whole=obstacles
+        )
+
+    def reload(self, force: bool = True) -> ObstacleMap:
+        """Load the file into a new snapshot if it changed.
+
+        Args:
+            force: Re-read the file even if its mtime and size are unchanged
+
+        Returns:
+            The current snapshot after the check
+        """
+        with self._load_lock:
+            return self._reload(force)
+
+    def _reload(self, force: bool) -> ObstacleMap:
+        signature = self._stat()
+        if not force and self._snapshot is not None and signature == self._signature:
+            return self._snapshot
+
+        snapshot = self._load()
+        if self._snapshot is None or snapshot.version != self._snapshot.version:
+            self._snapshot = snapshot
+            logger.info(
+                'Obstacle map loaded: %d obstacles, version %s',
+                len(snapshot),
+                snapshot.version,
+            )
+        self._signature = signature
+        return self._snapshot
+
+    def _load(self) -> ObstacleMap:
+        if is_compiled_map(self._path):
+            return load_map(self._path)
+        raw = self._path.read_bytes()
+        version = hashlib.blake2b(raw, digest_size=8).hexdigest()
+        if self._snapshot is not None and version == self._snapshot.version:
+            return self._snapshot
+        return self._build(*parse_obstacle_map(json.loads(raw)), version)
+
+    def _build(
+        self,
+        obstacles: Iterable[Obstacle],
+        rects: Iterable[Rect],
+        version: str,
+        spatial: SpatialIndex | None = None,
+    ) -> ObstacleMap:
+        rects = tuple(rects)
+        if rects:
+            cells = ObstacleSnapshot(obstacles, version, spatial)
+            return RegionObstacles(cells, rects, version)
+        if self._grid_bounds is not None:
+            return OccupancyGrid(obstacles, self._grid_bounds, version)
+        return ObstacleSnapshot(obstacles, version, spatial)
+
+    async def add_obstacles(
+        self,
+        obstacles: Iterable[Point],
+        on_edit: Callable[[ObstacleEdit], None] | None = None,
+    ) -> str:
+        """Block cells and publish the new map; regions are kept.
+
+        Args:
+            obstacles: Cells to block
+            on_edit: Called with the cells that changed, if any did
+
+        Returns:
+            Version of the published map
+
+        Raises:
+            ObstacleMapReadOnlyException: If the map is a compiled map.
+        """
+        added = {Obstacle(o.x, o.y) for o in obstacles}
+        await self.settle()
+        edit = await asyncio.to_thread(self._write, added=added)
+        return _report(edit, on_edit)
+
+    async def remove_obstacles(
+        self,
+        obstacles: Iterable[Point],
+        on_edit: Callable[[ObstacleEdit], None] | None = None,
+    ) -> str:
+        """Clear cells and publish the new map.
+
+        Regions are kept, so a cell inside one stays blocked.
+
+        Args:
+            obstacles: Cells to clear
+            on_edit: Called with the cells that changed, if any did
+
+        Returns:
+            Version of the published map
+
+        Raises:
+            ObstacleMapReadOnlyException: If the map is a compiled map.
+        """
+        removed = {Obstacle(o.x, o.y) for o in obstacles}
+        await self.settle()
+        edit = await asyncio.to_thread(self._write, removed=removed)
+        return _report(edit, on_edit)
+
+    async def replace_obstacles(self, obstacles: Iterable[Point]) -> str:
+        """Publish a map holding exactly the given obstacles.
+
+        Returns:
+            Version of the published map
+
+        Raises:
+            ObstacleMapReadOnlyException: If the map is a compiled map.
+        """
+        replacement = frozenset(Obstacle(o.x, o.y) for o in obstacles)
+        await self.settle()
+        edit = await asyncio.to_thread(self._write, replacement=replacement)
+        return edit.version
+
+    async def import_obstacles(self, batches: AsyncIterable[list[Cell]]) -> str:
+        """Replace the map with streamed cells, publishing it in the background.
+
+        Each batch is appended to a temporary JSON file as it arrives, so
+        only one batch is held at a time, and the file's hash becomes the
+        version. Parsing the file and building the snapshot and its index
+        happen in a background task, which then swaps the file and the
+        snapshot in; readers keep the current map until then. ``settle``
+        waits for that task.
+
+        Returns:
+            Version the imported map is published under
+
+        Raises:
+            ObstacleMapReadOnlyException: If the map is a compiled map.
+        """
+        await self.settle()
+        if isinstance(self.get_obstacles(), PackedObstacles):
+            raise ObstacleMapReadOnlyException()
+
+        fd, name = tempfile.mkstemp(
+            prefix=f'.{self._path.name}.', suffix='.import', dir=self._path.parent
+        )
+        partial = Path(name)
+        digest = hashlib.blake2b(digest_size=8)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                separator = b'['
+                async for batch in batches:
+                    if not batch:
+                        continue
+                    data = separator + ','.join(f'[{x},{y}]' for x, y in batch).encode()
+                    separator = b','
+                    digest.update(data)
+                    await asyncio.to_thread(f.write, data)
+                tail = b'[]' if separator == b'[' else b']'
+                digest.update(tail)
+                f.write(tail)
+        except BaseException:
+            partial.unlink(missing_ok=True)
+            raise
+
+        version = digest.hexdigest()
+        # Imports that finished streaming together are published in order
+        self._import = asyncio.create_task(
+            self._publish_after(self._import, partial, version)
+        )
+        return version
+
+    async def settle(self) -> None:
+        """Wait until the imports in progress are published"""
+        task = self._import
+        if task is not None:
+            await asyncio.shield(task)
+            if self._import is task:
+                self._import = None
+
+    async def _publish_after(
+        self, previous: asyncio.Task | None, partial: Path, version: str
+    ) -> None:
+        if previous is not None:
+            await previous
+        await asyncio.to_thread(self._publish_import, partial, version)
+
+    def _publish_import(self, partial: Path, version: str) -> None:
+        try:
+            raw = partial.read_bytes()
+            snapshot = self._build(*parse_obstacle_map(json.loads(raw)), version)
+            # Build the index before the swap, off the request that uploaded it
+            _ = snapshot.index
+            with self._load_lock, self._file_lock():
+                os.replace(partial, self._path)
+                self._snapshot = snapshot
+                self._signature = self._stat()
+        except (OSError, ValueError) as e:
+            partial.unlink(missing_ok=True)
+            logger.error('Obstacle map import %s failed: %s', version, e)
+            return
+        logger.info(
+            'Obstacle map imported: %d obstacles, version %s', len(snapshot), version
+        )
+
+    def _write(
+        self,
+        added: Set[Obstacle] = frozenset(),
+        removed: Set[Obstacle] = frozenset(),
+        replacement: frozenset[Obstacle] | None = None,
+    ) -> ObstacleEdit:
+        # Cells are added and removed around the regions; a replacement
+        # drops the regions too. The edit lists the cells blocked and
+        # cleared on top of the map it was applied to; a replacement lists
+        # none, as its regions cannot be told apart cell by cell
+        with self._load_lock, self._file_lock():
+            # Start from the file on disk, which another process may have changed
+            current = self._reload(force=False)
+            if isinstance(current, PackedObstacles):
+                raise ObstacleMapReadOnlyException()
+            rects: tuple[Rect, ...] = ()
+            if isinstance(current, RegionObstacles):
+                base, rects = current.cells, current.rects
+            elif isinstance(current, frozenset):
+                base = current
+            else:
+                base = frozenset(current)
+
+            spatial = None
+            if replacement is None:
+                added, removed = added - base, removed & base
+                if not added and not removed:
+                    return ObstacleEdit(
+                        current.version, current.version, frozenset(), frozenset()
+                    )
+                obstacles = (base - removed) | added
+                if isinstance(base, ObstacleSnapshot):
+                    # Carry a built k-d tree over instead of rebuilding it
+                    spatial = base.spatial_after(added, removed)
+            elif replacement == base and not rects:
+                return ObstacleEdit(
+                    current.version, current.version, frozenset(), frozenset()
+                )
+            else:
+                obstacles, rects = replacement, ()
+                added, removed = frozenset(), frozenset()
+
+            items = sorted([o.x, o.y] for o in obstacles)
+            items.extend({'rect': r.as_list()} for r in rects)
+            raw = json.dumps(items).encode()
+            version = hashlib.blake2b(raw, digest_size=8).hexdigest()
+            snapshot = self._build(obstacles, rects, version, spatial)
+            # Build the index now so the first command after the swap does not
+            _ = snapshot.index
+
+            partial = self._path.with_name(f'.{self._path.name}.partial')
+            partial.write_bytes(raw)
+            os.replace(partial, self._path)
+            self._snapshot = snapshot
+            self._signature = self._stat()
+            logger.info(
+                'Obstacle map written: %d obstacles, version %s',
+                len(snapshot),
+                version,
+            )
+            if rects:
+                # A cleared cell inside a region stays blocked
+                removed = {o for o in removed if o not in snapshot}
+            return ObstacleEdit(
+                current.version, version, frozenset(added), frozenset(removed)
+            )
+
+    @contextlib.contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        lock_path = self._path.with_name(f'.{self._path.name}.lock')
+        with lock_path.open('a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    async def refresh(self) -> ObstacleMap:
+        """Reload off the event loop if the file changed"""
+        return await asyncio.to_thread(self.reload, False)
+
+    async def start(self) -> None:
+        """Load the map and start polling the file for changes"""
+        await asyncio.to_thread(self.reload)
+        if self._task is None:
+            self._task = asyncio.create_task(self._poll())
+
+    async def stop(self) -> None:
+        await self.settle()
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def _poll(self) -> None:
+        while True:
+            await asyncio.sleep(self._poll_interval)
+            try:
+                await self.refresh()
+            except (OSError, ValueError) as e:
+                # Keep serving the last good snapshot
+                logger.error('Obstacle map reload failed: %s', e)
+
+    def _stat(self) -> tuple[int, int]:
+        try:
+            stat = self._path.stat()
+        except FileNotFoundError:
+            raise FileNotFoundError(
+                f'Obstacles JSON file not found: {self._path}'
+            ) from None
+        return stat.st_mtime_ns, stat.st_size
+
+
+def _report(edit: ObstacleEdit, on_edit: Callable[[ObstacleEdit], None] | None) -> str:
+    if on_edit is not None and edit.version != edit.previous:
+        on_edit(edit)
+    return edit.version
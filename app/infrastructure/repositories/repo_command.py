@@ -1,10 +1,18 @@
-from sqlalchemy import insert
+from sqlalchemy import insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.domain.entities import CommandResult
+from app.domain.entities import Command, CommandResult, CompactCommand, StoredCommand
 from app.infrastructure.db.models import CommandORM, CommandStatus
 
 
+def _to_command(command_string: str) -> Command | CompactCommand:
+    """Rebuild a stored command, which is plain or in compact syntax"""
+    try:
+        return Command(command_string)
+    except ValueError:
+        return CompactCommand(command_string)
+
+
 class RDBCommandRepository:
     """SQLAlchemy implementation of CommandRepository"""
 
@@ -21,8 +29,63 @@ class RDBCommandRepository:
                 executed_command=command_result.executed_command.command_string,
                 status=CommandStatus.COMPLETED,
                 stopped_by_obstacle=command_result.stopped_by_obstacle,
+                obstacle_map_version=command_result.obstacle_map_version,
+            )
+            .returning(CommandORM.id)
+        )
+
+        return result.scalar_one()
+
+    async def create_command(self, command: Command) -> int:
+        """Insert a command that is still executing and return its ID."""
+
+        result = await self.session.execute(
+            insert(CommandORM)
+            .values(
+                received_command=command.command_string,
+                executed_command='',
+                status=CommandStatus.EXECUTING,
+                stopped_by_obstacle=False,
             )
             .returning(CommandORM.id)
         )
 
         return result.scalar_one()
+
+    async def complete_command(
+        self, command_id: int, command_result: CommandResult
+    ) -> None:
+        """Record the outcome of a command created with create_command."""
+
+        await self.session.execute(
+            update(CommandORM)
+            .where(CommandORM.id == command_id)
+            .values(
+                executed_command=command_result.executed_command.command_string,
+                status=CommandStatus.COMPLETED,
+                stopped_by_obstacle=command_result.stopped_by_obstacle,
+                obstacle_map_version=command_result.obstacle_map_version,
+            )
+        )
+
+    async def get_command(self, command_id: int) -> StoredCommand | None:
+        """Fetch a stored command by ID."""
+
+        result = await self.session.execute(
+            select(
+                CommandORM.received_command,
+                CommandORM.executed_command,
+                CommandORM.stopped_by_obstacle,
+            ).where(CommandORM.id == command_id)
+        )
+        row = result.one_or_none()
+
+        if row is None:
+            return None
+
+        return StoredCommand(
+            id=command_id,
+            received_command=_to_command(row.received_command),
+            executed_command=_to_command(row.executed_command),
+            stopped_by_obstacle=row.stopped_by_obstacle,
+        )
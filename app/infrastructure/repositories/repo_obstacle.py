@@ -2,9 +2,71 @@ from __future__ import annotations
 
 import json
 import os
+from collections.abc import Set
 from pathlib import Path
 
 from app.domain.entities import Obstacle
+from app.domain.obstacle_index import ObstacleIndex, obstacles_in_box
+from app.domain.pose import in_plane
+from app.domain.regions import Rect
+
+
+def parse_obstacles(data: object) -> set[Obstacle]:
+    """Validate decoded obstacles JSON and build the obstacle set.
+
+    Raises:
+        ValueError: If the JSON content has an invalid structure.
+    """
+    if not isinstance(data, list):
+        raise ValueError('Obstacles JSON must be a list of [x, y] pairs')
+
+    obstacles: set[Obstacle] = set()
+    for item in data:
+        if not isinstance(item, list | tuple) or len(item) != 2:
+            raise ValueError('Each obstacle must be a 2-item list/tuple [x, y]')
+
+        x, y = item
+        if not isinstance(x, int) or not isinstance(y, int):
+            raise ValueError('Obstacle coordinates must be integers')
+        if not in_plane(x, y):
+            raise ValueError('Obstacle coordinates must fit in int32')
+
+        obstacles.add(Obstacle(x=x, y=y))
+    return obstacles
+
+
+def parse_obstacle_map(data: object) -> tuple[set[Obstacle], list[Rect]]:
+    """Validate decoded obstacles JSON holding cells and rectangles.
+
+    Besides ``[x, y]`` pairs the list may hold rectangles written as
+    ``{"rect": [min_x, min_y, max_x, max_y]}`` with inclusive bounds; a
+    region is the union of its rectangles.
+
+    Raises:
+        ValueError: If the JSON content has an invalid structure.
+    """
+    if not isinstance(data, list):
+        raise ValueError('Obstacles JSON must be a list of [x, y] pairs')
+
+    cells = [item for item in data if not isinstance(item, dict)]
+    rects = []
+    for item in data:
+        if not isinstance(item, dict):
+            continue
+        bounds = item.get('rect')
+        if (
+            len(item) != 1
+            or not isinstance(bounds, list)
+            or len(bounds) != 4
+            or not all(type(b) is int for b in bounds)
+        ):
+            raise ValueError(
+                'Each region must be {"rect": [min_x, min_y, max_x, max_y]}'
+            )
+        if not in_plane(*bounds[:2]) or not in_plane(*bounds[2:]):
+            raise ValueError('Region bounds must fit in int32')
+        rects.append(Rect(*bounds))
+    return parse_obstacles(cells), rects
 
 
 class JSONObstacleRepository:
@@ -20,6 +82,22 @@ class JSONObstacleRepository:
             json_path = os.getenv('OBSTACLES_JSON_PATH', '/config/obstacles.json')
         self._path = Path(json_path)
         self._cache: set[Obstacle] | None = None
+        self._index_cache: ObstacleIndex | None = None
+        self._cache_version: str | None = None
+
+    def get_version(self) -> str:
+        """Version of the obstacle map, derived from the file's mtime and size.
+
+        Raises:
+            FileNotFoundError: If the JSON file does not exist.
+        """
+        try:
+            stat = self._path.stat()
+        except FileNotFoundError:
+            raise FileNotFoundError(
+                f'Obstacles JSON file not found: {self._path}'
+            ) from None
+        return f'{stat.st_mtime_ns:x}-{stat.st_size:x}'
 
     def get_obstacles(self) -> set[Obstacle]:
         """Read obstacles from the JSON file and return as a set of tuples.
@@ -29,31 +107,44 @@ class JSONObstacleRepository:
             ValueError: If the JSON content has an invalid structure.
             json.JSONDecodeError: If the file is not valid JSON.
         """
-        if self._cache is not None:
+        # A changed file invalidates the cached obstacles and index
+        version = self.get_version()
+        if self._cache is not None and version == self._cache_version:
             return self._cache
-
-        if not self._path.exists():
-            raise FileNotFoundError(f'Obstacles JSON file not found: {self._path}')
+        self.invalidate_cache()
 
         with self._path.open('r', encoding='utf-8') as f:
-            data = json.load(f)
-
-        if not isinstance(data, list):
-            raise ValueError('Obstacles JSON must be a list of [x, y] pairs')
-
-        obstacles: set[Obstacle] = set()
-        for item in data:
-            if not isinstance(item, list | tuple) or len(item) != 2:
-                raise ValueError('Each obstacle must be a 2-item list/tuple [x, y]')
-
-            x, y = item
-            if not isinstance(x, int) or not isinstance(y, int):
-                raise ValueError('Obstacle coordinates must be integers')
-
-            obstacles.add(Obstacle(x=x, y=y))
+            obstacles = parse_obstacles(json.load(f))
 
         self._cache = obstacles
+        self._cache_version = version
         return obstacles
 
+    def get_obstacle_index(self) -> ObstacleIndex:
+        """Return the row/column index of the obstacles, built once per load."""
+        obstacles = self.get_obstacles()
+        if self._index_cache is None:
+            self._index_cache = ObstacleIndex(obstacles)
+        return self._index_cache
+
+    def contains(self, x: int, y: int) -> bool:
+        """Check whether cell (x, y) holds an obstacle"""
+        return self.get_obstacle_index().contains(x, y)
+
+    def get_obstacles_in_box(
+        self, min_x: int, min_y: int, max_x: int, max_y: int
+    ) -> Set[Obstacle]:
+        """Obstacles inside the inclusive box; the whole map when it covers it"""
+        return obstacles_in_box(
+            self.get_obstacle_index(),
+            min_x,
+            min_y,
+            max_x,
+            max_y,
+            whole=self.get_obstacles(),
+        )
+
     def invalidate_cache(self) -> None:
         self._cache = None
+        self._index_cache = None
+        self._cache_version = None
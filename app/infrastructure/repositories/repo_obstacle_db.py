@@ -0,0 +1,216 @@
+from collections.abc import AsyncIterable, Callable, Iterable
+
+from sqlalchemy import (
+    Integer,
+    bindparam,
+    column,
+    delete,
+    exists,
+    func,
+    select,
+    table,
+    text,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.domain.entities import Obstacle, ObstacleEdit, Point
+from app.domain.obstacle_stream import Cell
+from app.infrastructure.db.models import ObstacleMapORM, ObstacleORM
+
+# Id of the single obstacle_map row
+_MAP_ID = 1
+
+# Session-local table imports are copied into before the swap
+_STAGING = table('obstacles_import', column('coord_x'), column('coord_y'))
+
+
+class RDBObstacleRepository:
+    """SQLAlchemy implementation of ObstacleRepository.
+
+    Obstacles live in the ``obstacles`` table, indexed on (coord_x, coord_y),
+    so a command loads only the cells inside its reach envelope instead of
+    the whole map.
+
+    The map version is a counter in ``obstacle_map`` that every write bumps
+    in its own transaction. Readers never lock: they see the last committed
+    map, and the row lock taken by the bump serializes writers across
+    processes.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_version(self) -> str:
+        """Version of the committed map, bumped by every write"""
+        result = await self.session.execute(
+            select(ObstacleMapORM.version).where(ObstacleMapORM.id == _MAP_ID)
+        )
+        return str(result.scalar_one())
+
+    async def contains(self, x: int, y: int) -> bool:
+        """Check whether cell (x, y) holds an obstacle"""
+        result = await self.session.execute(
+            select(exists().where(ObstacleORM.coord_x == x, ObstacleORM.coord_y == y))
+        )
+        return bool(result.scalar())
+
+    async def get_obstacles_in_box(
+        self, min_x: int, min_y: int, max_x: int, max_y: int
+    ) -> set[Obstacle]:
+        """Obstacles inside the inclusive box, as one index range scan"""
+        result = await self.session.execute(
+            select(ObstacleORM.coord_x, ObstacleORM.coord_y).where(
+                ObstacleORM.coord_x.between(min_x, max_x),
+                ObstacleORM.coord_y.between(min_y, max_y),
+            )
+        )
+        return {Obstacle(x, y) for x, y in result}
+
+    async def add_obstacles(
+        self,
+        obstacles: Iterable[Point],
+        on_edit: Callable[[ObstacleEdit], None] | None = None,
+    ) -> str:
+        """Block cells, skipping those already blocked, and commit.
+
+        Args:
+            obstacles: Cells to block
+            on_edit: Called after the commit with the cells asked for, which
+                may include some that were already blocked
+
+        Returns:
+            Version of the committed map
+        """
+        obstacles = list(obstacles)
+        version = await self._bump_version()
+        await self._insert(obstacles)
+        await self.session.commit()
+        if on_edit is not None:
+            on_edit(_edit(version, added=obstacles))
+        return version
+
+    async def remove_obstacles(
+        self,
+        obstacles: Iterable[Point],
+        on_edit: Callable[[ObstacleEdit], None] | None = None,
+    ) -> str:
+        """Clear cells and commit.
+
+        Args:
+            obstacles: Cells to clear
+            on_edit: Called after the commit with the cells asked for, which
+                may include some that were already clear
+
+        Returns:
+            Version of the committed map
+        """
+        obstacles = list(obstacles)
+        version = await self._bump_version()
+        xs, ys = _columns(obstacles)
+        if xs:
+            cells = select(
+                func.unnest(bindparam('xs', xs, type_=ARRAY(Integer))),
+                func.unnest(bindparam('ys', ys, type_=ARRAY(Integer))),
+            )
+            await self.session.execute(
+                delete(ObstacleORM).where(
+                    tuple_(ObstacleORM.coord_x, ObstacleORM.coord_y).in_(cells)
+                )
+            )
+        await self.session.commit()
+        if on_edit is not None:
+            on_edit(_edit(version, removed=obstacles))
+        return version
+
+    async def replace_obstacles(self, obstacles: Iterable[Point]) -> str:
+        """Replace the whole map and commit.
+
+        Returns:
+            Version of the committed map
+        """
+        version = await self._bump_version()
+        await self.session.execute(delete(ObstacleORM))
+        await self._insert(obstacles)
+        await self.session.commit()
+        return version
+
+    async def import_obstacles(self, batches: AsyncIterable[list[Cell]]) -> str:
+        """Replace the whole map with streamed cells and commit.
+
+        Batches are copied into a temporary staging table with COPY as they
+        arrive. The map is then swapped in one transaction, so readers see
+        the old map until the commit and the new one after it.
+
+        Returns:
+            Version of the committed map
+        """
+        await self.session.execute(
+            text(
+                f'CREATE TEMPORARY TABLE {_STAGING.name} '
+                '(coord_x integer NOT NULL, coord_y integer NOT NULL) '
+                'ON COMMIT DROP'
+            )
+        )
+        connection = await self.session.connection()
+        raw = await connection.get_raw_connection()
+        async for batch in batches:
+            await raw.driver_connection.copy_records_to_table(
+                _STAGING.name, records=batch, columns=['coord_x', 'coord_y']
+            )
+
+        version = await self._bump_version()
+        await self.session.execute(delete(ObstacleORM))
+        await self.session.execute(
+            insert(ObstacleORM).from_select(
+                ['coord_x', 'coord_y'],
+                select(_STAGING.c.coord_x, _STAGING.c.coord_y)
+                .distinct()
+                .order_by(_STAGING.c.coord_x, _STAGING.c.coord_y),
+            )
+        )
+        await self.session.commit()
+        return version
+
+    async def _insert(self, obstacles: Iterable[Point]) -> None:
+        payload = [{'coord_x': o.x, 'coord_y': o.y} for o in obstacles]
+        if not payload:
+            return
+        await self.session.execute(
+            insert(ObstacleORM).on_conflict_do_nothing(
+                index_elements=['coord_x', 'coord_y']
+            ),
+            payload,
+        )
+
+    async def _bump_version(self) -> str:
+        # Locks the map row until commit, so concurrent writers queue up here
+        result = await self.session.execute(
+            update(ObstacleMapORM)
+            .where(ObstacleMapORM.id == _MAP_ID)
+            .values(version=ObstacleMapORM.version + 1)
+            .returning(ObstacleMapORM.version)
+        )
+        return str(result.scalar_one())
+
+
+def _columns(obstacles: Iterable[Point]) -> tuple[list[int], list[int]]:
+    xs, ys = [], []
+    for o in obstacles:
+        xs.append(o.x)
+        ys.append(o.y)
+    return xs, ys
+
+
+def _edit(
+    version: str, added: Iterable[Point] = (), removed: Iterable[Point] = ()
+) -> ObstacleEdit:
+    # The row lock taken by the bump makes the previous version one less
+    return ObstacleEdit(
+        str(int(version) - 1),
+        version,
+        frozenset(Obstacle(o.x, o.y) for o in added),
+        frozenset(Obstacle(o.x, o.y) for o in removed),
+    )
@@ -0,0 +1,201 @@
+"""Compiled binary obstacle maps.
+
+A compiled map is a fixed 64-byte header followed by two little-endian int64
+sections of ``count`` keys each: the ``x * 2**32 + y`` keys sorted ascending,
+then the ``y * 2**32 + x`` keys sorted ascending. The header holds the key
+count, the bounding box of the obstacles and a digest of both sections, which
+serves as the map version.
+
+Maps are memory-mapped read-only, so loading is independent of the map size
+and the pages are shared by every process that maps the same file.
+"""
+
+import csv
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Iterable
+from pathlib import Path
+
+from app.domain.entities import Obstacle
+from app.domain.pose import pack_point
+from app.domain.snapshot import PackedObstacles
+from app.infrastructure.repositories.repo_obstacle import parse_obstacle_map
+
+MAGIC = b'RVOBSMAP'
+FORMAT_VERSION = 1
+
+# magic, format version, reserved, count, min x, min y, max x, max y, digest
+_HEADER = struct.Struct('<8sIIQiiii16s')
+HEADER_SIZE = 64
+_KEY_SIZE = 8
+_INT32_MIN, _INT32_MAX = -(2**31), 2**31 - 1
+
+
+class MapHeader:
+    """Decoded header of a compiled obstacle map"""
+
+    __slots__ = ('count', 'bounds', 'digest')
+
+    def __init__(self, count: int, bounds: tuple[int, int, int, int], digest: bytes):
+        self.count = count
+        self.bounds = bounds
+        self.digest = digest
+
+    @property
+    def version(self) -> str:
+        return self.digest.hex()
+
+
+def encode_map(obstacles: Iterable[Obstacle]) -> bytes:
+    """Encode obstacles into the compiled map format.
+
+    Raises:
+        ValueError: If a coordinate does not fit in int32.
+    """
+    cells = {(o.x, o.y) for o in obstacles}
+    if cells:
+        xs = [x for x, _ in cells]
+        ys = [y for _, y in cells]
+        bounds = (min(xs), min(ys), max(xs), max(ys))
+        if min(bounds) < _INT32_MIN or max(bounds) > _INT32_MAX:
+            raise ValueError('Obstacle coordinates must fit in int32')
+    else:
+        bounds = (0, 0, -1, -1)
+
+    xy = array('q', sorted(pack_point(x, y) for x, y in cells))
+    yx = array('q', sorted(pack_point(y, x) for x, y in cells))
+    if sys.byteorder != 'little':  # pragma: no cover
+        xy.byteswap()
+        yx.byteswap()
+    body = xy.tobytes() + yx.tobytes()
+
+    digest = hashlib.blake2b(body, digest_size=16).digest()
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(cells), *bounds, digest)
+    return header.ljust(HEADER_SIZE, b'\0') + body
+
+
+def read_header(data: bytes) -> MapHeader:
+    """Decode and validate the header of a compiled map.
+
+    Raises:
+        ValueError: If the data is not a compiled map of a supported version.
+    """
+    if len(data) < HEADER_SIZE or data[: len(MAGIC)] != MAGIC:
+        raise ValueError('Not a compiled obstacle map')
+    _, version, _, count, *bounds, digest = _HEADER.unpack_from(data)
+    if version != FORMAT_VERSION:
+        raise ValueError(f'Unsupported obstacle map format version {version}')
+    return MapHeader(count, tuple(bounds), digest)
+
+
+def is_compiled_map(path: str | Path) -> bool:
+    """Check whether a file starts with the compiled map magic"""
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def load_map(path: str | Path) -> PackedObstacles:
+    """Memory-map a compiled obstacle map.
+
+    The returned obstacles view the file's key sections without copying them.
+    The mapping stays open as long as the obstacles are referenced.
+
+    Raises:
+        FileNotFoundError: If the file does not exist.
+        ValueError: If the file is not a valid compiled map.
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < HEADER_SIZE:
+            raise ValueError(f'Not a compiled obstacle map: {path}')
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return decode_map(memoryview(mapped), path)
+
+
+def decode_map(buffer: memoryview, source: object = '') -> PackedObstacles:
+    """View the key sections of a compiled map held in a buffer.
+
+    Args:
+        buffer: Compiled map, possibly followed by padding
+        source: Name of the buffer's origin for error messages
+
+    Raises:
+        ValueError: If the buffer is not a valid compiled map.
+    """
+    try:
+        header = read_header(buffer)
+    except ValueError as e:
+        raise ValueError(f'{e}: {source}') from None
+    end = HEADER_SIZE + 2 * header.count * _KEY_SIZE
+    if len(buffer) < end:
+        raise ValueError(f'Truncated obstacle map: {source}')
+
+    keys = buffer[HEADER_SIZE:end]
+    if sys.byteorder == 'little':
+        keys = keys.cast('q')
+    else:  # pragma: no cover - big-endian hosts copy and swap the sections
+        keys = array('q', keys.tobytes())
+        keys.byteswap()
+    return PackedObstacles(
+        keys[: header.count], keys[header.count :], version=header.version
+    )
+
+
+def read_source(path: str | Path) -> set[Obstacle]:
+    """Read an obstacle map from JSON or CSV, chosen by file extension.
+
+    CSV files hold one ``x,y`` pair per row; a non-numeric first row is
+    taken as a header and rows starting with ``#`` are skipped. Compiled
+    maps hold cells only, so a JSON map with ``{"rect": ...}`` regions is
+    rejected rather than expanded.
+
+    Raises:
+        ValueError: If the content has an invalid structure or regions.
+    """
+    path = Path(path)
+    if path.suffix.lower() != '.csv':
+        with path.open('r', encoding='utf-8') as f:
+            obstacles, rects = parse_obstacle_map(json.load(f))
+        if rects:
+            raise ValueError(
+                f'{path}: compiled maps do not support regions; '
+                'serve the JSON map directly'
+            )
+        return obstacles
+
+    obstacles: set[Obstacle] = set()
+    with path.open('r', encoding='utf-8', newline='') as f:
+        for number, row in enumerate(csv.reader(f), 1):
+            if not row or row[0].lstrip().startswith('#'):
+                continue
+            try:
+                x, y = (int(value) for value in row)
+            except ValueError as e:
+                if number == 1:
+                    continue
+                raise ValueError(
+                    f'{path}:{number}: expected an integer x,y pair'
+                ) from e
+            obstacles.add(Obstacle(x=x, y=y))
+    return obstacles
+
+
+def compile_map(source: str | Path, target: str | Path) -> MapHeader:
+    """Compile a JSON or CSV obstacle map into the binary format.
+
+    The target is written to a temporary file and renamed into place, so
+    readers never map a partially written file.
+
+    Returns:
+        Header of the compiled map
+    """
+    data = encode_map(read_source(source))
+    target = Path(target)
+    partial = target.with_name(f'.{target.name}.partial')
+    partial.write_bytes(data)
+    os.replace(partial, target)
+    return read_header(data)
@@ -0,0 +1,218 @@
+"""Obstacle maps published once into shared memory for every worker process.
+
+A publisher writes the compiled map (see ``repo_obstacle_map``) into a
+segment named ``<name>.<generation>`` and then bumps the generation counter
+held in a small control segment ``<name>``. Workers attach read-only and
+check the counter on every read, so a republished map is picked up by the
+next request. The previous generation is unlinked once the next one is
+published; workers still attached to it keep their mapping until they let
+it go, so the map's memory does not scale with the number of workers.
+"""
+
+import mmap
+import os
+import struct
+from collections.abc import Set
+from pathlib import Path
+
+from app.domain.entities import Obstacle
+from app.domain.obstacle_index import SortedObstacleIndex, obstacles_in_box
+from app.domain.snapshot import PackedObstacles
+from app.infrastructure.repositories.repo_obstacle_map import (
+    decode_map,
+    encode_map,
+    is_compiled_map,
+    read_source,
+)
+
+CONTROL_MAGIC = b'RVOBSSHM'
+
+# POSIX shared memory segments are files on this tmpfs. Opening them
+# directly keeps segments out of the multiprocessing resource tracker,
+# which would unlink them when the process that touched them exits.
+SHM_DIR = Path('/dev/shm')
+
+# magic, generation
+_CONTROL = struct.Struct('<8sQ')
+
+# Attempts to attach when a generation is replaced while attaching
+_ATTACH_RETRIES = 3
+
+
+def _segment_name(name: str, generation: int) -> str:
+    return f'{name}.{generation}'
+
+
+def _segment_path(name: str) -> Path:
+    if not name or '/' in name:
+        raise ValueError(f'Invalid shared memory name: {name!r}')
+    return SHM_DIR / name
+
+
+def _map_segment(name: str, writable: bool = False) -> mmap.mmap:
+    """Map a segment; the mapping outlives the descriptor and an unlink"""
+    fd = os.open(_segment_path(name), os.O_RDWR if writable else os.O_RDONLY)
+    try:
+        access = mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ
+        return mmap.mmap(fd, os.fstat(fd).st_size, access=access)
+    finally:
+        os.close(fd)
+
+
+def _create_segment(name: str, data: bytes) -> None:
+    """Create a segment holding ``data``; fails if the name is taken"""
+    fd = os.open(_segment_path(name), os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+
+
+def read_generation(name: str) -> int:
+    """Generation of the map currently published under ``name``.
+
+    Raises:
+        FileNotFoundError: If nothing is published under the name.
+        ValueError: If the control segment is not an obstacle map's.
+    """
+    control = _map_segment(name)
+    try:
+        return _read_control(control, name)
+    finally:
+        control.close()
+
+
+def _read_control(control: mmap.mmap, name: str) -> int:
+    if len(control) < _CONTROL.size:
+        raise ValueError(f'Not an obstacle map control segment: {name}')
+    magic, generation = _CONTROL.unpack_from(control)
+    if magic != CONTROL_MAGIC:
+        raise ValueError(f'Not an obstacle map control segment: {name}')
+    return generation
+
+
+def publish_map(data: bytes, name: str) -> int:
+    """Publish a compiled map under ``name`` as its next generation.
+
+    Returns:
+        The new generation
+    """
+    decode_map(memoryview(data), 'published map')
+
+    try:
+        control = _map_segment(name, writable=True)
+    except FileNotFoundError:
+        _create_segment(name, _CONTROL.pack(CONTROL_MAGIC, 0))
+        control = _map_segment(name, writable=True)
+
+    try:
+        previous = _read_control(control, name)
+        generation = previous + 1
+        _create_segment(_segment_name(name, generation), data)
+
+        # A single aligned write makes the new generation visible to readers
+        _CONTROL.pack_into(control, 0, CONTROL_MAGIC, generation)
+    finally:
+        control.close()
+
+    if previous:
+        _unlink(_segment_name(name, previous))
+    return generation
+
+
+def publish_source(source: str | Path, name: str) -> int:
+    """Publish a JSON, CSV or compiled obstacle map file under ``name``"""
+    if is_compiled_map(source):
+        data = Path(source).read_bytes()
+    else:
+        data = encode_map(read_source(source))
+    return publish_map(data, name)
+
+
+def unpublish(name: str) -> None:
+    """Remove the map published under ``name`` and its control segment"""
+    generation = read_generation(name)
+    if generation:
+        _unlink(_segment_name(name, generation))
+    _unlink(name)
+
+
+def _unlink(name: str) -> None:
+    _segment_path(name).unlink(missing_ok=True)
+
+
+class SharedObstacleRepository:
+    """Attaches read-only to an obstacle map published in shared memory.
+
+    The generation counter is read on every call; the current generation's
+    segment is attached once and its key sections are bisected in place.
+    """
+
+    def __init__(self, name: str | None = None):
+        if name is None:
+            name = os.getenv('OBSTACLES_SHM_NAME', 'moon-rover-obstacles')
+        self._name = name
+        self._control: mmap.mmap | None = None
+        self._obstacles: PackedObstacles | None = None
+        self._generation = 0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get_obstacles(self) -> PackedObstacles:
+        """Obstacles of the current generation.
+
+        Raises:
+            FileNotFoundError: If no map is published under the name.
+            ValueError: If the published segments are not valid.
+        """
+        if self._control is None:
+            self._control = _map_segment(self._name)
+
+        for _ in range(_ATTACH_RETRIES):
+            generation = _read_control(self._control, self._name)
+            if self._obstacles is not None and generation == self._generation:
+                return self._obstacles
+            if generation == 0:
+                break
+            segment_name = _segment_name(self._name, generation)
+            try:
+                mapped = _map_segment(segment_name)
+            except FileNotFoundError:
+                # Replaced between reading the counter and attaching
+                continue
+            self._obstacles = decode_map(memoryview(mapped), segment_name)
+            self._generation = generation
+            return self._obstacles
+        raise FileNotFoundError(f'No obstacle map published as {self._name}')
+
+    def get_obstacle_index(self) -> SortedObstacleIndex:
+        return self.get_obstacles().index
+
+    def get_version(self) -> str:
+        """Version of the published map, the digest stored in its header"""
+        return self.get_obstacles().version
+
+    def contains(self, x: int, y: int) -> bool:
+        """Check whether cell (x, y) holds an obstacle"""
+        return self.get_obstacle_index().contains(x, y)
+
+    def get_obstacles_in_box(
+        self, min_x: int, min_y: int, max_x: int, max_y: int
+    ) -> Set[Obstacle]:
+        """Obstacles inside the inclusive box; the whole map when it covers it"""
+        obstacles = self.get_obstacles()
+        return obstacles_in_box(
+            obstacles.index, min_x, min_y, max_x, max_y, whole=obstacles
+        )
+
+    async def start(self) -> None:
+        """Attach eagerly so a missing map fails at startup"""
+        self.get_obstacles()
+
+    async def stop(self) -> None:
+        # Obstacles already handed out keep their own mapping alive
+        if self._control is not None:
+            self._control.close()
+        self._control = None
+        self._obstacles = None
+        self._generation = 0
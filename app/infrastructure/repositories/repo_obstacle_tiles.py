@@ -0,0 +1,189 @@
+"""Disk-backed obstacle maps split into square tiles.
+
+A tiled map is a directory holding ``manifest.json`` and one compiled map
+(see ``repo_obstacle_map``) per occupied tile under ``tiles/``. The manifest
+lists the tile size, the occupied tiles with their obstacle counts and a
+version derived from the tiles' digests. Tiles are memory-mapped when a
+query first reaches them and kept in a bounded LRU.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from collections.abc import Iterable, Set
+from pathlib import Path
+
+from app.domain.entities import Obstacle
+from app.domain.obstacle_index import obstacles_in_box
+from app.domain.tiles import DEFAULT_MAX_TILES, TiledObstacles, partition
+from app.infrastructure.repositories.repo_obstacle_map import (
+    encode_map,
+    load_map,
+    read_header,
+)
+
+MANIFEST = 'manifest.json'
+TILES_FORMAT_VERSION = 1
+DEFAULT_TILE_SIZE = 1024
+
+
+def _tile_path(directory: Path, tx: int, ty: int) -> Path:
+    return directory / 'tiles' / f'{tx}_{ty}.rvmap'
+
+
+def write_tiles(
+    obstacles: Iterable[Obstacle],
+    directory: str | Path,
+    tile_size: int = DEFAULT_TILE_SIZE,
+) -> dict:
+    """Write obstacles as a tiled map, replacing any map in the directory.
+
+    The map is written next to the target and renamed into place, so
+    readers never see a partially written map.
+
+    Returns:
+        The manifest of the written map
+    """
+    if tile_size <= 0:
+        raise ValueError('Tile size must be positive')
+
+    directory = Path(directory)
+    partial = directory.with_name(f'.{directory.name}.partial')
+    shutil.rmtree(partial, ignore_errors=True)
+    (partial / 'tiles').mkdir(parents=True)
+
+    tiles = []
+    digest = hashlib.blake2b(digest_size=16)
+    for (tx, ty), cells in sorted(partition(obstacles, tile_size).items()):
+        data = encode_map(cells)
+        _tile_path(partial, tx, ty).write_bytes(data)
+        header = read_header(data)
+        tiles.append([tx, ty, header.count])
+        digest.update(header.digest)
+
+    manifest = {
+        'format': TILES_FORMAT_VERSION,
+        'tile_size': tile_size,
+        'version': digest.hexdigest(),
+        'tiles': tiles,
+    }
+    (partial / MANIFEST).write_text(json.dumps(manifest))
+
+    previous = directory.with_name(f'.{directory.name}.previous')
+    shutil.rmtree(previous, ignore_errors=True)
+    if directory.exists():
+        directory.rename(previous)
+    partial.rename(directory)
+    shutil.rmtree(previous, ignore_errors=True)
+    return manifest
+
+
+def read_manifest(directory: str | Path) -> dict:
+    """Read and validate the manifest of a tiled map.
+
+    Raises:
+        FileNotFoundError: If the directory holds no manifest.
+        ValueError: If the manifest is invalid.
+    """
+    with (Path(directory) / MANIFEST).open('r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if not isinstance(manifest, dict) or manifest.get('format') != TILES_FORMAT_VERSION:
+        raise ValueError(f'Unsupported tiled obstacle map: {directory}')
+    return manifest
+
+
+def load_tiles(
+    directory: str | Path, max_tiles: int = DEFAULT_MAX_TILES
+) -> TiledObstacles:
+    """Open a tiled map; tiles are memory-mapped on first use.
+
+    Raises:
+        FileNotFoundError: If the directory holds no manifest.
+        ValueError: If the manifest is invalid.
+    """
+    directory = Path(directory)
+    manifest = read_manifest(directory)
+
+    def load_tile(tx: int, ty: int):
+        return load_map(_tile_path(directory, tx, ty)).index
+
+    return TiledObstacles(
+        tile_size=manifest['tile_size'],
+        tiles={(tx, ty): count for tx, ty, count in manifest['tiles']},
+        load_tile=load_tile,
+        max_tiles=max_tiles,
+        version=manifest['version'],
+    )
+
+
+class TiledObstacleRepository:
+    """Serves a tiled map from disk, holding only recently used tiles.
+
+    The map is reopened when its manifest is replaced; counters of tile
+    loads and evictions restart with it.
+    """
+
+    def __init__(
+        self, directory: str | Path | None = None, max_tiles: int | None = None
+    ):
+        if directory is None:
+            directory = os.getenv('OBSTACLES_TILES_PATH', '/config/obstacles.tiles')
+        if max_tiles is None:
+            max_tiles = int(os.getenv('OBSTACLES_MAX_TILES', DEFAULT_MAX_TILES))
+        self._directory = Path(directory)
+        self._max_tiles = max_tiles
+        self._cache: TiledObstacles | None = None
+        self._cache_signature: tuple[int, int, int] | None = None
+
+    def get_obstacles(self) -> TiledObstacles:
+        """Open the tiled map, or return it if the manifest is unchanged.
+
+        Raises:
+            FileNotFoundError: If the directory holds no manifest.
+            ValueError: If the manifest is invalid.
+        """
+        signature = self._signature()
+        if self._cache is not None and signature == self._cache_signature:
+            return self._cache
+
+        self._cache = load_tiles(self._directory, self._max_tiles)
+        self._cache_signature = signature
+        return self._cache
+
+    def get_obstacle_index(self) -> TiledObstacles:
+        return self.get_obstacles()
+
+    def get_version(self) -> str:
+        """Version of the tiled map, derived from its tiles' digests"""
+        return self.get_obstacles().version
+
+    def contains(self, x: int, y: int) -> bool:
+        """Check whether cell (x, y) holds an obstacle"""
+        return self.get_obstacles().contains(x, y)
+
+    def get_obstacles_in_box(
+        self, min_x: int, min_y: int, max_x: int, max_y: int
+    ) -> Set[Obstacle]:
+        """Obstacles inside the inclusive box, loading only the tiles it covers.
+
+        The whole map is returned when the box covers it.
+        """
+        obstacles = self.get_obstacles()
+        return obstacles_in_box(obstacles, min_x, min_y, max_x, max_y, whole=obstacles)
+
+    async def start(self) -> None:
+        """Open the map eagerly so a missing map fails at startup"""
+        self.get_obstacles()
+
+    async def stop(self) -> None:
+        self._cache = None
+        self._cache_signature = None
+
+    def _signature(self) -> tuple[int, int, int]:
+        path = self._directory / MANIFEST
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            raise FileNotFoundError(f'Tiled obstacle map not found: {path}') from None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
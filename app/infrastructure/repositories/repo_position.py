@@ -1,10 +1,24 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from sqlalchemy import desc, insert, select
+from sqlalchemy import (
+    BigInteger,
+    Integer,
+    String,
+    bindparam,
+    cast,
+    desc,
+    func,
+    insert,
+    literal,
+    select,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.domain.entities import Direction, Point, Position
+from app.domain.entities import Direction, Point, Position, PositionPath
 from app.infrastructure.db.models import PositionORM
 
+_DIRECTION_NAMES = tuple(d.name for d in Direction)
+
 
 class StartPositionEnvSettings(BaseSettings):
     START_POSITION_X: int = 0
@@ -43,12 +57,34 @@ class RDBPositionRepository:
             direction=position_orm.direction,
         )
 
+    async def get_position_before_command(self, command_id: int) -> Position | None:
+        """Fetch the last position saved by commands preceding ``command_id``."""
+        result = await self.session.execute(
+            select(PositionORM)
+            .where(PositionORM.command_id < command_id)
+            .order_by(desc(PositionORM.id))
+            .limit(1)
+        )
+        position_orm: PositionORM | None = result.scalar_one_or_none()
+
+        if position_orm is None:
+            return None
+
+        return Position(
+            point=Point(position_orm.coord_x, position_orm.coord_y),
+            direction=position_orm.direction,
+        )
+
     async def save_positions_bulk(
-        self, command_id: int, positions: list[Position]
+        self, command_id: int, positions: PositionPath | list[Position]
     ) -> None:
         if not positions:
             return
 
+        if isinstance(positions, PositionPath):
+            await self._save_path_columns(command_id, positions)
+            return
+
         payload = [
             {
                 'coord_x': p.x,
@@ -59,3 +95,30 @@ class RDBPositionRepository:
             for p in positions
         ]
         await self.session.execute(insert(PositionORM), payload)
+
+    async def _save_path_columns(self, command_id: int, path: PositionPath) -> None:
+        """Insert a path as three array parameters unnested by Postgres.
+
+        Each column is converted to one list for the driver, so no per-row
+        dict payload is built.
+        """
+        rows = select(
+            func.unnest(bindparam('xs', path.xs.tolist(), type_=ARRAY(Integer))),
+            func.unnest(bindparam('ys', path.ys.tolist(), type_=ARRAY(Integer))),
+            cast(
+                func.unnest(
+                    bindparam(
+                        'directions',
+                        [_DIRECTION_NAMES[d] for d in path.directions],
+                        type_=ARRAY(String),
+                    )
+                ),
+                PositionORM.direction.type,
+            ),
+            literal(command_id, BigInteger),
+        )
+        await self.session.execute(
+            insert(PositionORM).from_select(
+                ['coord_x', 'coord_y', 'direction', 'command_id'], rows
+            )
+        )
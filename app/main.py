@@ -1,20 +1,47 @@
 import logging.config
+import os
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
 
 import uvicorn
 from fastapi import FastAPI
 from fastapi_structlog.middleware import StructlogMiddleware
+from prometheus_client import REGISTRY
 from prometheus_fastapi_instrumentator import Instrumentator
 
 from app.config import application_settings
+from app.domain.vectorized import np
 from app.infrastructure.db.engine import dispose_db_engine
+from app.infrastructure.metrics import (
+    ExecutionCacheCollector,
+    RoutePlannerCollector,
+    TileCacheCollector,
+)
+from app.infrastructure.repositories.repo_obstacle_tiles import TiledObstacleRepository
 from app.logging import LOGGING
 from app.presentation import routes
+from app.presentation.dependencies import (
+    execution_cache,
+    obstacle_provider,
+    route_planner_stats,
+)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    await obstacle_provider.start()
+    # Threads share the loaded map, so simulations never pickle it. Only the
+    # NumPy lockstep simulator releases the GIL, so without NumPy there is no
+    # pool and batches run in a single thread
+    app.state.simulation_executor = (
+        ThreadPoolExecutor(max_workers=os.cpu_count(), thread_name_prefix='simulation')
+        if np is not None
+        else None
+    )
     yield
+    if app.state.simulation_executor is not None:
+        app.state.simulation_executor.shutdown()
+    await obstacle_provider.stop()
     await dispose_db_engine()
 
 
@@ -31,6 +58,10 @@ app.add_middleware(StructlogMiddleware)
 
 instrumentator = Instrumentator().instrument(app)
 instrumentator.expose(app)
+REGISTRY.register(ExecutionCacheCollector(execution_cache))
+REGISTRY.register(RoutePlannerCollector(route_planner_stats))
+if isinstance(obstacle_provider, TiledObstacleRepository):
+    REGISTRY.register(TileCacheCollector(obstacle_provider))
 
 app.include_router(routes.router)
 
@@ -0,0 +1,71 @@
+"""Compile JSON or CSV obstacle maps into the memory-mappable binary format.
+
+Examples:
+    python -m app.map_compiler config/obstacles.json config/obstacles.rvmap
+    python -m app.map_compiler cells.csv obstacles.rvmap
+    python -m app.map_compiler survey.csv obstacles.tiles --tile-size 1024
+"""
+
+import argparse
+import sys
+import time
+from collections.abc import Sequence
+
+from app.infrastructure.repositories.repo_obstacle_map import compile_map, read_source
+from app.infrastructure.repositories.repo_obstacle_tiles import write_tiles
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='moon-rover-compile-map',
+        description='Compile an obstacle map into the binary format.',
+    )
+    parser.add_argument('source', help='JSON list of [x, y] pairs or x,y CSV')
+    parser.add_argument('target', help='Path of the compiled map')
+    parser.add_argument(
+        '--tile-size',
+        type=int,
+        help='Write a directory of tiles with this side in cells instead',
+    )
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.tile_size is not None and args.tile_size <= 0:
+        parser.error('--tile-size must be positive')
+
+    started = time.perf_counter()
+    try:
+        if args.tile_size is not None:
+            manifest = write_tiles(
+                read_source(args.source), args.target, args.tile_size
+            )
+        else:
+            header = compile_map(args.source, args.target)
+    except (OSError, ValueError) as e:
+        print(f'error: {e}', file=sys.stderr)
+        return 1
+
+    if args.tile_size is not None:
+        count = sum(count for *_, count in manifest['tiles'])
+        print(
+            f'{args.target}: {count} obstacles in {len(manifest["tiles"])} tiles, '
+            f'version {manifest["version"]}, '
+            f'{time.perf_counter() - started:.3f}s'
+        )
+        return 0
+
+    min_x, min_y, max_x, max_y = header.bounds
+    print(
+        f'{args.target}: {header.count} obstacles, '
+        f'bounds ({min_x}, {min_y})..({max_x}, {max_y}), '
+        f'version {header.version}, '
+        f'{time.perf_counter() - started:.3f}s'
+    )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""Publish an obstacle map into shared memory for all server processes.
+
+Server processes attach to the published map when ``OBSTACLES_SHM_NAME`` is
+set. With ``--watch`` the source file is polled and republished when it
+changes; workers pick up the new generation on their next request.
+
+Examples:
+    python -m app.map_publisher config/obstacles.json
+    python -m app.map_publisher obstacles.rvmap --name rover-map --watch 2
+    python -m app.map_publisher --unpublish --name rover-map
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections.abc import Sequence
+
+from app.infrastructure.repositories.repo_obstacle_shm import (
+    publish_source,
+    unpublish,
+)
+
+
+def _signature(path: str) -> tuple[int, int]:
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='moon-rover-publish-map',
+        description='Publish an obstacle map into shared memory.',
+    )
+    parser.add_argument(
+        'source', nargs='?', help='JSON, x,y CSV or compiled obstacle map'
+    )
+    parser.add_argument(
+        '--name',
+        default=os.getenv('OBSTACLES_SHM_NAME', 'moon-rover-obstacles'),
+        help='Shared memory name the servers attach to',
+    )
+    parser.add_argument(
+        '--watch',
+        type=float,
+        metavar='SECONDS',
+        help='Keep polling the source and republish it when it changes',
+    )
+    parser.add_argument(
+        '--unpublish', action='store_true', help='Remove the published map'
+    )
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.unpublish:
+        try:
+            unpublish(args.name)
+        except (OSError, ValueError) as e:
+            print(f'error: {e}', file=sys.stderr)
+            return 1
+        print(f'{args.name}: unpublished')
+        return 0
+    if args.source is None:
+        parser.error('a source map is required')
+    if args.watch is not None and args.watch <= 0:
+        parser.error('--watch must be positive')
+
+    published = None
+    while True:
+        try:
+            signature = _signature(args.source)
+            if signature != published:
+                generation = publish_source(args.source, args.name)
+                published = signature
+                print(f'{args.name}: published generation {generation}', flush=True)
+        except (OSError, ValueError) as e:
+            print(f'error: {e}', file=sys.stderr)
+            if args.watch is None:
+                return 1
+
+        if args.watch is None:
+            return 0
+        try:
+            time.sleep(args.watch)
+        except KeyboardInterrupt:
+            return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
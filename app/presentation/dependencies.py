@@ -1,16 +1,30 @@
-from fastapi import Depends, HTTPException, status
+import os
+
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.application.auth_service import BasicAuthService, UnauthorizedError
 from app.application.command_service import CommandService
+from app.application.execution_cache import ExecutionCache
 from app.application.health_service import HealthStatusService
+from app.application.history_service import CommandHistoryService, TransformCache
+from app.application.obstacle_service import ObstacleService
 from app.application.position_service import PositionService
+from app.application.replanning_service import ActiveRoutes, ReplanningService
+from app.application.route_service import PlannerStats, RoutePlannerService
+from app.application.simulation_service import SimulationService
+from app.application.spatial_service import SpatialQueryService
 from app.infrastructure.db.engine import get_session
 from app.infrastructure.repositories.auth_provider import BasicAuthSettings
+from app.infrastructure.repositories.obstacle_provider import FileObstacleProvider
 from app.infrastructure.repositories.repo_command import RDBCommandRepository
 from app.infrastructure.repositories.repo_health import RDBHealthChecker
-from app.infrastructure.repositories.repo_obstacle import JSONObstacleRepository
+from app.infrastructure.repositories.repo_obstacle_db import RDBObstacleRepository
+from app.infrastructure.repositories.repo_obstacle_shm import SharedObstacleRepository
+from app.infrastructure.repositories.repo_obstacle_tiles import (
+    TiledObstacleRepository,
+)
 from app.infrastructure.repositories.repo_position import (
     RDBPositionRepository,
     StartPositionEnvSettings,
@@ -20,6 +34,27 @@ from app.infrastructure.repositories.unit_of_work import AsyncUoW
 position_settings = StartPositionEnvSettings()
 basic_auth_settings = BasicAuthSettings()
 security = HTTPBasic()
+execution_cache = ExecutionCache()
+transform_cache = TransformCache()
+route_planner_stats = PlannerStats()
+active_routes = ActiveRoutes()
+
+
+def _create_obstacle_provider() -> (
+    SharedObstacleRepository | TiledObstacleRepository | FileObstacleProvider
+):
+    """Shared memory or tiled map when configured, else the obstacle file"""
+    if os.getenv('OBSTACLES_SHM_NAME'):
+        return SharedObstacleRepository()
+    if os.getenv('OBSTACLES_TILES_PATH'):
+        return TiledObstacleRepository()
+    return FileObstacleProvider()
+
+
+obstacle_provider = _create_obstacle_provider()
+
+# Commands read obstacles from the obstacles table instead of the map above
+OBSTACLES_FROM_DATABASE = os.getenv('OBSTACLES_BACKEND') == 'database'
 
 
 async def get_auth_service() -> BasicAuthService:
@@ -67,10 +102,109 @@ def get_command_service(
 ) -> CommandService:
     """Dependency for command service"""
     repo = RDBCommandRepository(session)
-    obstacle_repo = JSONObstacleRepository()
     position_repo = RDBPositionRepository(session)
     start_position_provider = StartPositionEnvSettings()
     uow = AsyncUoW(session)
+    obstacle_repo = (
+        RDBObstacleRepository(session) if OBSTACLES_FROM_DATABASE else obstacle_provider
+    )
     return CommandService(
-        repo, obstacle_repo, position_repo, start_position_provider, uow
+        repo,
+        obstacle_repo,
+        position_repo,
+        start_position_provider,
+        uow,
+        execution_cache=execution_cache,
+        prune_obstacles=OBSTACLES_FROM_DATABASE,
+    )
+
+
+def get_command_history_service(
+    session: AsyncSession = Depends(get_session),
+) -> CommandHistoryService:
+    """Dependency for command history service"""
+    command_repo = RDBCommandRepository(session)
+    position_repo = RDBPositionRepository(session)
+    return CommandHistoryService(
+        command_repo, position_repo, position_settings, transform_cache
+    )
+
+
+def get_simulation_service(
+    request: Request,
+    session: AsyncSession = Depends(get_session),
+) -> SimulationService:
+    """Dependency for read-only simulation service; batches share the app's pool"""
+    position_service = PositionService(
+        RDBPositionRepository(session), position_settings
+    )
+    obstacle_repo = (
+        RDBObstacleRepository(session) if OBSTACLES_FROM_DATABASE else obstacle_provider
+    )
+    executor = getattr(request.app.state, 'simulation_executor', None)
+    return SimulationService(
+        position_service,
+        obstacle_repo,
+        executor,
+        prune_obstacles=OBSTACLES_FROM_DATABASE,
+    )
+
+
+def get_obstacle_service(
+    session: AsyncSession = Depends(get_session),
+) -> ObstacleService:
+    """Dependency for obstacle map service; only JSON and database maps are writable.
+
+    Edits are queued on the active routes of this process.
+    """
+    if OBSTACLES_FROM_DATABASE:
+        repo = RDBObstacleRepository(session)
+        return ObstacleService(repo, repo, active_routes.record)
+    store = (
+        obstacle_provider
+        if isinstance(obstacle_provider, FileObstacleProvider)
+        else None
+    )
+    return ObstacleService(obstacle_provider, store, active_routes.record)
+
+
+def get_spatial_query_service(
+    session: AsyncSession = Depends(get_session),
+) -> SpatialQueryService:
+    """Dependency for spatial obstacle queries; in-memory maps use their k-d tree"""
+    if OBSTACLES_FROM_DATABASE:
+        return SpatialQueryService(RDBObstacleRepository(session))
+    return SpatialQueryService(obstacle_provider, obstacle_provider.get_obstacles)
+
+
+def get_route_planner_service(
+    session: AsyncSession = Depends(get_session),
+) -> RoutePlannerService:
+    """Dependency for route planning; routes execute through the command service"""
+    position_service = PositionService(
+        RDBPositionRepository(session), position_settings
+    )
+    obstacle_repo = (
+        RDBObstacleRepository(session) if OBSTACLES_FROM_DATABASE else obstacle_provider
+    )
+    return RoutePlannerService(
+        position_service,
+        obstacle_repo,
+        get_command_service(session),
+        stats=route_planner_stats,
+    )
+
+
+def get_replanning_service(
+    session: AsyncSession = Depends(get_session),
+) -> ReplanningService:
+    """Dependency for active routes; their search state lives in this process"""
+    position_service = PositionService(
+        RDBPositionRepository(session), position_settings
+    )
+    obstacle_repo = (
+        RDBObstacleRepository(session) if OBSTACLES_FROM_DATABASE else obstacle_provider
+    )
+    return ReplanningService(
+        position_service, obstacle_repo, active_routes, stats=route_planner_stats
     )
@@ -1,24 +1,83 @@
+import heapq
 import logging
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 
-from app.domain.exceptions import LandingObstacleException
+from app.application.obstacle_service import WHOLE_MAP
+from app.application.replanning_service import Replan
+from app.application.spatial_service import SpatialResult
+from app.domain.entities import CompactCommand
+from app.domain.exceptions import (
+    CommandNotFoundException,
+    LandingObstacleException,
+    MissionException,
+    NoRouteException,
+    ObstacleMapReadOnlyException,
+    OffMapException,
+    RouteBudgetExceededException,
+    RouteNotFoundException,
+)
+from app.domain.obstacle_stream import CSV, NDJSON
+from app.domain.planner import DEFAULT_MAX_EXPANSIONS
+from app.domain.snapshot import RegionObstacles
 from app.presentation.dependencies import (
+    get_command_history_service,
     get_command_service,
     get_health_status_service,
+    get_obstacle_service,
     get_position_service,
+    get_replanning_service,
+    get_route_planner_service,
+    get_simulation_service,
+    get_spatial_query_service,
     verify_credentials,
 )
 from app.presentation.schemas import (
+    MAX_OBSTACLES_PER_REQUEST,
+    MAX_ROUTE_EXPANSIONS,
+    ActiveRouteFailure,
+    ActiveRouteRequest,
+    ActiveRouteResponse,
+    ActiveRoutesResponse,
+    CanonicalCommandResponse,
     CommandRequest,
     CommandResponse,
     HealthResponse,
+    ObstacleImportResponse,
+    ObstacleMapResponse,
+    ObstacleMapVersionResponse,
+    ObstaclesRequest,
+    PoseResponse,
     PositionResponse,
+    RouteRequest,
+    RouteResponse,
+    SimulationRequest,
+    SimulationResponse,
+    SimulationResult,
+    SpatialQueryResponse,
+    TransformResponse,
 )
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Content types accepted by the obstacle import
+IMPORT_FORMATS = {
+    'application/x-ndjson': NDJSON,
+    'application/jsonl': NDJSON,
+    'text/csv': CSV,
+}
+
+# Obstacles returned by a viewport or radius query without a limit
+SPATIAL_DEFAULT_LIMIT = 1_000
+
+# Failures a route request reports instead of a route
+PLANNING_ERRORS = (
+    LandingObstacleException,
+    NoRouteException,
+    RouteBudgetExceededException,
+)
+
 
 @router.get('/health', response_model=HealthResponse)
 async def health_check(health_service=Depends(get_health_status_service)):
@@ -44,6 +103,20 @@ async def get_position(
     )
 
 
+def _landing_error(e: LandingObstacleException) -> HTTPException:
+    """HTTP error for a rover that starts on an obstacle"""
+    logger.error('MISSION START FAILURE: %s', e)
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail={
+            'error': 'Mission start failure',
+            'message': str(e),
+            'position': e.position,
+            'type': 'landing_obstacle',
+        },
+    )
+
+
 @router.post('/commands', response_model=CommandResponse)
 async def execute_commands(
     request: CommandRequest,
@@ -52,7 +125,7 @@ async def execute_commands(
 ):
     try:
         logger.info('Executing command: %s', request.command)
-        command_result = await command_service.execute_command(request.command)
+        command_result = await command_service.execute_command(request.to_command())
         logger.info(
             'Executed command: %s', command_result.executed_command.command_string
         )
@@ -62,15 +135,419 @@ async def execute_commands(
             direction=command_result.final_position.direction.name,
             stopped_by_obstacle=command_result.stopped_by_obstacle,
             message=f'Command {command_result.executed_command.command_string} executed successfully',
+            obstacle_map_version=command_result.obstacle_map_version,
         )
     except LandingObstacleException as e:
-        logger.error('MISSION START FAILURE: %s', e)
+        raise _landing_error(e) from e
+    except OffMapException as e:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
             detail={
-                'error': 'Mission start failure',
+                'error': 'Command leaves the map',
                 'message': str(e),
                 'position': e.position,
-                'type': 'landing_obstacle',
+                'type': 'off_map',
             },
         ) from e
+
+
+@router.post('/commands/canonical', response_model=CanonicalCommandResponse)
+async def canonicalize_command(
+    request: CommandRequest,
+    command_service=Depends(get_command_service),
+    _: str = Depends(verify_credentials),
+):
+    command = request.to_command()
+    if isinstance(command, CompactCommand):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail='Canonicalization supports plain L, R, B, F commands only',
+        )
+
+    try:
+        canonical = await command_service.canonicalize_command(command)
+    except LandingObstacleException as e:
+        raise _landing_error(e) from e
+
+    return CanonicalCommandResponse(
+        x=canonical.final_position.x,
+        y=canonical.final_position.y,
+        direction=canonical.final_position.direction.name,
+        stopped_by_obstacle=canonical.stopped_by_obstacle,
+        command=canonical.initial_command.command_string,
+        canonical_command=canonical.canonical_command.command_string,
+        saved_steps=canonical.saved_steps,
+    )
+
+
+@router.post('/commands/simulate', response_model=SimulationResponse)
+async def simulate_commands(
+    request: SimulationRequest,
+    simulation_service=Depends(get_simulation_service),
+    _: str = Depends(verify_credentials),
+):
+    logger.info('Simulating %d candidate commands', len(request.commands))
+    try:
+        results = await simulation_service.simulate(
+            request.to_commands(),
+            request.start.to_position() if request.start else None,
+        )
+    except LandingObstacleException as e:
+        raise _landing_error(e) from e
+
+    return SimulationResponse(
+        results=[
+            SimulationResult(
+                command=result.initial_command.command_string,
+                executed_command=result.executed_command.command_string,
+                x=result.final_position.x,
+                y=result.final_position.y,
+                direction=result.final_position.direction.name,
+                stopped_by_obstacle=result.stopped_by_obstacle,
+            )
+            for result in results
+        ]
+    )
+
+
+@router.post('/routes/plan', response_model=RouteResponse)
+async def plan_route(
+    request: RouteRequest,
+    route_service=Depends(get_route_planner_service),
+    _: str = Depends(verify_credentials),
+):
+    """Plan an obstacle-avoiding command to a target cell and optionally drive it"""
+    logger.info('Planning route to (%d, %d)', request.x, request.y)
+    try:
+        route = await route_service.plan(
+            request.to_target(),
+            request.to_direction(),
+            execute=request.execute,
+            max_expansions=request.max_expansions,
+            weight=request.weight,
+        )
+    except PLANNING_ERRORS as e:
+        raise _planning_error(e) from e
+
+    final_position = route.plan.final_position
+    if route.result is not None:
+        final_position = route.result.final_position
+    return RouteResponse(
+        x=final_position.x,
+        y=final_position.y,
+        direction=final_position.direction.name,
+        command=route.plan.command.command_string,
+        expansions=route.plan.expansions,
+        obstacle_map_version=route.obstacle_map_version,
+        executed=route.result is not None,
+        stopped_by_obstacle=route.result is not None
+        and route.result.stopped_by_obstacle,
+    )
+
+
+@router.post('/routes/active', response_model=ActiveRouteResponse)
+async def start_active_route(
+    request: ActiveRouteRequest,
+    replanning_service=Depends(get_replanning_service),
+    _: str = Depends(verify_credentials),
+):
+    """Plan a route and keep its search so later replans only repair it"""
+    try:
+        replan = await replanning_service.start(
+            request.to_target(),
+            request.to_direction(),
+            max_expansions=request.max_expansions,
+        )
+    except PLANNING_ERRORS as e:
+        raise _planning_error(e) from e
+    return _active_route_response(replan)
+
+
+@router.post('/routes/active/replan', response_model=ActiveRoutesResponse)
+async def replan_active_routes(
+    max_expansions: int = Query(DEFAULT_MAX_EXPANSIONS, ge=1, le=MAX_ROUTE_EXPANSIONS),
+    replanning_service=Depends(get_replanning_service),
+    _: str = Depends(verify_credentials),
+):
+    """Repair every active route for the current pose and obstacle map"""
+    results = await replanning_service.replan_all(max_expansions)
+    routes, failures = [], []
+    for route_id, result in results.items():
+        if isinstance(result, MissionException):
+            failures.append(
+                ActiveRouteFailure(
+                    route_id=route_id,
+                    type=_planning_error_type(result),
+                    message=str(result),
+                )
+            )
+        else:
+            routes.append(_active_route_response(result))
+    return ActiveRoutesResponse(routes=routes, failures=failures)
+
+
+@router.post('/routes/active/{route_id}/replan', response_model=ActiveRouteResponse)
+async def replan_active_route(
+    route_id: int,
+    max_expansions: int = Query(DEFAULT_MAX_EXPANSIONS, ge=1, le=MAX_ROUTE_EXPANSIONS),
+    replanning_service=Depends(get_replanning_service),
+    _: str = Depends(verify_credentials),
+):
+    """Repair one active route for the current pose and obstacle map"""
+    try:
+        replan = await replanning_service.replan(route_id, max_expansions)
+    except RouteNotFoundException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e)) from e
+    except PLANNING_ERRORS as e:
+        raise _planning_error(e) from e
+    return _active_route_response(replan)
+
+
+@router.delete('/routes/active/{route_id}', status_code=status.HTTP_204_NO_CONTENT)
+async def stop_active_route(
+    route_id: int,
+    replanning_service=Depends(get_replanning_service),
+    _: str = Depends(verify_credentials),
+):
+    try:
+        replanning_service.stop(route_id)
+    except RouteNotFoundException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e)) from e
+
+
+def _active_route_response(replan: Replan) -> ActiveRouteResponse:
+    final_position = replan.plan.final_position
+    return ActiveRouteResponse(
+        x=final_position.x,
+        y=final_position.y,
+        direction=final_position.direction.name,
+        route_id=replan.route_id,
+        command=replan.plan.command.command_string,
+        expansions=replan.plan.expansions,
+        obstacle_map_version=replan.obstacle_map_version,
+        changed_cells=replan.changed_cells,
+    )
+
+
+def _planning_error_type(e: MissionException) -> str:
+    if isinstance(e, LandingObstacleException):
+        return 'landing_obstacle'
+    if isinstance(e, NoRouteException):
+        return 'no_route'
+    if isinstance(e, RouteBudgetExceededException):
+        return 'planning_budget_exceeded'
+    return 'route_not_found'
+
+
+def _planning_error(
+    e: LandingObstacleException | NoRouteException | RouteBudgetExceededException,
+) -> HTTPException:
+    """HTTP error for a route that could not be planned"""
+    if isinstance(e, LandingObstacleException):
+        return _landing_error(e)
+    return HTTPException(
+        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        detail={
+            'error': 'No route'
+            if isinstance(e, NoRouteException)
+            else 'Planning budget exceeded',
+            'message': str(e),
+            'position': e.target,
+            'type': _planning_error_type(e),
+        },
+    )
+
+
+@router.get('/commands/{command_id}/poses/{step}', response_model=PoseResponse)
+async def get_command_pose(
+    command_id: int,
+    step: int,
+    history_service=Depends(get_command_history_service),
+    _: str = Depends(verify_credentials),
+):
+    try:
+        position = await history_service.get_pose(command_id, step)
+    except CommandNotFoundException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e)) from e
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e)
+        ) from e
+
+    return PoseResponse(
+        command_id=command_id,
+        step=step,
+        x=position.x,
+        y=position.y,
+        direction=position.direction.name,
+    )
+
+
+@router.get('/commands/{command_id}/transforms', response_model=TransformResponse)
+async def get_command_transform(
+    command_id: int,
+    start: int = 0,
+    stop: int | None = None,
+    history_service=Depends(get_command_history_service),
+    _: str = Depends(verify_credentials),
+):
+    try:
+        transform, stop = await history_service.get_transform(command_id, start, stop)
+    except CommandNotFoundException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e)) from e
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e)
+        ) from e
+
+    return TransformResponse(
+        command_id=command_id,
+        start=start,
+        stop=stop,
+        forward=transform.forward,
+        right=transform.right,
+        rotation=transform.rotation,
+    )
+
+
+@router.get('/obstacles', response_model=ObstacleMapResponse)
+async def get_obstacles(
+    min_x: int = WHOLE_MAP[0],
+    min_y: int = WHOLE_MAP[1],
+    max_x: int = WHOLE_MAP[2],
+    max_y: int = WHOLE_MAP[3],
+    limit: int = Query(SPATIAL_DEFAULT_LIMIT, ge=1, le=MAX_OBSTACLES_PER_REQUEST),
+    obstacle_service=Depends(get_obstacle_service),
+    _: str = Depends(verify_credentials),
+):
+    """Obstacles inside the box, the whole map by default, at most ``limit`` cells"""
+    obstacles, version = await obstacle_service.get_obstacles(
+        (min_x, min_y, max_x, max_y)
+    )
+    regions = []
+    if isinstance(obstacles, RegionObstacles):
+        # Rectangles are listed as such rather than expanded into cells
+        regions = [tuple(r.as_list()) for r in obstacles.rects]
+        obstacles = obstacles.cells
+    cells = heapq.nsmallest(limit + 1, ((o.x, o.y) for o in obstacles))
+    return ObstacleMapResponse(
+        version=version,
+        obstacles=cells[:limit],
+        regions=regions,
+        truncated=len(cells) > limit,
+    )
+
+
+@router.get('/obstacles/box', response_model=SpatialQueryResponse)
+async def get_obstacles_in_box(
+    min_x: int,
+    min_y: int,
+    max_x: int,
+    max_y: int,
+    limit: int = Query(SPATIAL_DEFAULT_LIMIT, ge=1, le=MAX_OBSTACLES_PER_REQUEST),
+    spatial_service=Depends(get_spatial_query_service),
+    _: str = Depends(verify_credentials),
+):
+    """Obstacles inside a viewport, at most ``limit`` of them"""
+    result = await spatial_service.in_box((min_x, min_y, max_x, max_y), limit)
+    return _spatial_response(result)
+
+
+@router.get('/obstacles/within', response_model=SpatialQueryResponse)
+async def get_obstacles_within(
+    x: int,
+    y: int,
+    radius: int = Query(..., ge=0),
+    limit: int = Query(SPATIAL_DEFAULT_LIMIT, ge=1, le=MAX_OBSTACLES_PER_REQUEST),
+    spatial_service=Depends(get_spatial_query_service),
+    _: str = Depends(verify_credentials),
+):
+    """Obstacles within ``radius`` of (x, y), nearest first"""
+    result = await spatial_service.within_radius(x, y, radius, limit)
+    return _spatial_response(result)
+
+
+@router.get('/obstacles/nearest', response_model=SpatialQueryResponse)
+async def get_nearest_obstacles(
+    x: int,
+    y: int,
+    k: int = Query(1, ge=1, le=MAX_OBSTACLES_PER_REQUEST),
+    spatial_service=Depends(get_spatial_query_service),
+    _: str = Depends(verify_credentials),
+):
+    """The k obstacles closest to (x, y), nearest first"""
+    result = await spatial_service.nearest(x, y, k)
+    return _spatial_response(result)
+
+
+def _spatial_response(result: SpatialResult) -> SpatialQueryResponse:
+    return SpatialQueryResponse(
+        version=result.version, obstacles=result.cells, truncated=result.truncated
+    )
+
+
+async def _edit_obstacles(
+    edit, request: ObstaclesRequest
+) -> ObstacleMapVersionResponse:
+    try:
+        version = await edit(request.to_obstacles())
+    except ObstacleMapReadOnlyException as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e)) from e
+    return ObstacleMapVersionResponse(version=version)
+
+
+@router.post('/obstacles', response_model=ObstacleMapVersionResponse)
+async def add_obstacles(
+    request: ObstaclesRequest,
+    obstacle_service=Depends(get_obstacle_service),
+    _: str = Depends(verify_credentials),
+):
+    logger.info('Adding %d obstacles', len(request.obstacles))
+    return await _edit_obstacles(obstacle_service.add_obstacles, request)
+
+
+@router.put('/obstacles', response_model=ObstacleMapVersionResponse)
+async def replace_obstacles(
+    request: ObstaclesRequest,
+    obstacle_service=Depends(get_obstacle_service),
+    _: str = Depends(verify_credentials),
+):
+    logger.info('Replacing obstacle map with %d obstacles', len(request.obstacles))
+    return await _edit_obstacles(obstacle_service.replace_obstacles, request)
+
+
+@router.delete('/obstacles', response_model=ObstacleMapVersionResponse)
+async def remove_obstacles(
+    request: ObstaclesRequest,
+    obstacle_service=Depends(get_obstacle_service),
+    _: str = Depends(verify_credentials),
+):
+    logger.info('Removing %d obstacles', len(request.obstacles))
+    return await _edit_obstacles(obstacle_service.remove_obstacles, request)
+
+
+@router.post('/obstacles/import', response_model=ObstacleImportResponse)
+async def import_obstacles(
+    request: Request,
+    obstacle_service=Depends(get_obstacle_service),
+    _: str = Depends(verify_credentials),
+):
+    """Replace the obstacle map with an NDJSON or CSV upload, read as it streams"""
+    content_type = request.headers.get('content-type', '').split(';')[0].strip()
+    fmt = IMPORT_FORMATS.get(content_type.lower())
+    if fmt is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f'Expected one of: {", ".join(IMPORT_FORMATS)}',
+        )
+
+    logger.info('Importing obstacle map from %s stream', fmt)
+    try:
+        result = await obstacle_service.import_obstacles(request.stream(), fmt)
+    except ObstacleMapReadOnlyException as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e)) from e
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e)
+        ) from e
+    return ObstacleImportResponse(version=result.version, rows=result.rows)
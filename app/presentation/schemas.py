@@ -1,7 +1,36 @@
-import re
 from datetime import datetime
+from typing import Annotated, Literal
 
-from pydantic import BaseModel, ConfigDict, Field, field_validator
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, model_validator
+
+from app.domain.entities import (
+    Command,
+    CompactCommand,
+    Direction,
+    Obstacle,
+    Point,
+    Position,
+)
+from app.domain.planner import DEFAULT_MAX_EXPANSIONS
+from app.domain.pose import COORD_MAX, COORD_MIN
+
+# Maximum number of candidates in one what-if simulation request
+MAX_SIMULATION_CANDIDATES = 1000
+
+# Maximum length of each candidate command string
+MAX_SIMULATION_COMMAND_LENGTH = 10_000
+
+# Maximum number of cells in one obstacle edit request
+MAX_OBSTACLES_PER_REQUEST = 100_000
+
+# Largest expansion budget a route request may ask for
+MAX_ROUTE_EXPANSIONS = 5_000_000
+
+# Weighted search finds routes within a few percent of the shortest far faster
+DEFAULT_ROUTE_WEIGHT = 1.2
+
+# Obstacles lie on the int32 plane
+Coordinate = Annotated[int, Field(ge=COORD_MIN, le=COORD_MAX)]
 
 
 class HealthResponse(BaseModel):
@@ -16,21 +45,229 @@ class PositionResponse(BaseModel):
     direction: str
 
 
+def _parse_command(command: str, compact: bool) -> Command | CompactCommand:
+    """Validate a command string and compile it once"""
+    if not command:
+        raise ValueError('Command string cannot be empty')
+    if compact:
+        try:
+            return CompactCommand(command)
+        except ValueError as e:
+            raise ValueError(f'Invalid compact command: {e}') from e
+    try:
+        return Command(command)
+    except ValueError as e:
+        raise ValueError('Command must contain only L, R, B, F letters') from e
+
+
 class CommandRequest(BaseModel):
-    command: str = Field(..., example="FRLBF")
+    command: str = Field(..., example='FRLBF')
+    compact: bool = Field(
+        False,
+        description='Accept counts and repeated groups, e.g. F100(FFRFFR)x500',
+    )
 
     model_config = ConfigDict(extra='forbid')
 
+    _command: Command | CompactCommand = PrivateAttr()
+
     # Check that string contains only L, R, B, F letters, STRICTLY.
-    @field_validator('command')
-    def validate_command(cls, v):
-        if not v:
-            raise ValueError('Command string cannot be empty')
-        if not re.match(r'^[LRBF]+$', v):
-            raise ValueError('Command must contain only L, R, B, F letters')
-        return v
+    # The compiled command is kept so the string is scanned only once.
+    @model_validator(mode='after')
+    def validate_command(self):
+        self._command = _parse_command(self.command, self.compact)
+        return self
+
+    def to_command(self) -> Command | CompactCommand:
+        """Compiled domain command for the validated string"""
+        return self._command
 
 
 class CommandResponse(PositionResponse):
     stopped_by_obstacle: bool
     message: str | None = None
+    obstacle_map_version: str | None = None
+
+
+class CanonicalCommandResponse(PositionResponse):
+    command: str
+    canonical_command: str
+    saved_steps: int
+    stopped_by_obstacle: bool
+
+
+class PoseResponse(PositionResponse):
+    command_id: int
+    step: int
+
+
+class TransformResponse(BaseModel):
+    command_id: int
+    start: int
+    stop: int
+    forward: int
+    right: int
+    rotation: int = Field(..., description='Net quarter turns to the right, 0-3')
+
+
+class PositionRequest(BaseModel):
+    x: int
+    y: int
+    direction: Literal['NORTH', 'EAST', 'SOUTH', 'WEST']
+
+    model_config = ConfigDict(extra='forbid')
+
+    def to_position(self) -> Position:
+        return Position(Point(self.x, self.y), Direction[self.direction])
+
+
+class SimulationRequest(BaseModel):
+    commands: list[str] = Field(
+        ...,
+        min_length=1,
+        max_length=MAX_SIMULATION_CANDIDATES,
+        example=['FFRFF', 'FRFLF'],
+    )
+    compact: bool = False
+    start: PositionRequest | None = Field(
+        None, description='Start pose; the current rover position when omitted'
+    )
+
+    model_config = ConfigDict(extra='forbid')
+
+    _commands: list[Command | CompactCommand] = PrivateAttr()
+
+    # Same rules as CommandRequest, applied to every candidate
+    @model_validator(mode='after')
+    def validate_commands(self):
+        commands = []
+        for i, command in enumerate(self.commands):
+            if len(command) > MAX_SIMULATION_COMMAND_LENGTH:
+                raise ValueError(
+                    f'Candidate {i}: longer than '
+                    f'{MAX_SIMULATION_COMMAND_LENGTH} characters'
+                )
+            try:
+                commands.append(_parse_command(command, self.compact))
+            except ValueError as e:
+                raise ValueError(f'Candidate {i}: {e}') from e
+        self._commands = commands
+        return self
+
+    def to_commands(self) -> list[Command | CompactCommand]:
+        """Compiled domain commands for the validated candidates"""
+        return self._commands
+
+
+class SimulationResult(PositionResponse):
+    command: str
+    executed_command: str
+    stopped_by_obstacle: bool
+
+
+class SimulationResponse(BaseModel):
+    results: list[SimulationResult]
+
+
+class ObstaclesRequest(BaseModel):
+    obstacles: list[tuple[Coordinate, Coordinate]] = Field(
+        ..., max_length=MAX_OBSTACLES_PER_REQUEST, example=[[1, 2], [3, 4]]
+    )
+
+    model_config = ConfigDict(extra='forbid')
+
+    def to_obstacles(self) -> list[Obstacle]:
+        return [Obstacle(x, y) for x, y in self.obstacles]
+
+
+class ObstacleMapResponse(BaseModel):
+    version: str
+    obstacles: list[tuple[int, int]]
+    # Blocked rectangles as (min_x, min_y, max_x, max_y), bounds inclusive
+    regions: list[tuple[int, int, int, int]] = []
+    # More cells matched than the requested limit
+    truncated: bool = False
+
+
+class ObstacleMapVersionResponse(BaseModel):
+    version: str
+
+
+class ObstacleImportResponse(ObstacleMapVersionResponse):
+    rows: int
+
+
+class SpatialQueryResponse(BaseModel):
+    version: str
+    obstacles: list[tuple[int, int]]
+    # More obstacles matched than the requested limit
+    truncated: bool = False
+
+
+class RouteRequest(BaseModel):
+    x: int
+    y: int
+    direction: Literal['NORTH', 'EAST', 'SOUTH', 'WEST'] | None = Field(
+        None, description='Heading on arrival; any when omitted'
+    )
+    execute: bool = Field(False, description='Drive the route once planned')
+    max_expansions: int = Field(DEFAULT_MAX_EXPANSIONS, ge=1, le=MAX_ROUTE_EXPANSIONS)
+    weight: float = Field(
+        DEFAULT_ROUTE_WEIGHT,
+        ge=1.0,
+        le=10.0,
+        description='1 finds the shortest route; larger values plan faster',
+    )
+
+    model_config = ConfigDict(extra='forbid')
+
+    def to_target(self) -> Point:
+        return Point(self.x, self.y)
+
+    def to_direction(self) -> Direction | None:
+        return Direction[self.direction] if self.direction else None
+
+
+class RouteResponse(PositionResponse):
+    command: str
+    expansions: int
+    obstacle_map_version: str
+    executed: bool
+    stopped_by_obstacle: bool = False
+
+
+class ActiveRouteRequest(BaseModel):
+    x: int
+    y: int
+    direction: Literal['NORTH', 'EAST', 'SOUTH', 'WEST'] | None = Field(
+        None, description='Heading on arrival; any when omitted'
+    )
+    max_expansions: int = Field(DEFAULT_MAX_EXPANSIONS, ge=1, le=MAX_ROUTE_EXPANSIONS)
+
+    model_config = ConfigDict(extra='forbid')
+
+    def to_target(self) -> Point:
+        return Point(self.x, self.y)
+
+    def to_direction(self) -> Direction | None:
+        return Direction[self.direction] if self.direction else None
+
+
+class ActiveRouteResponse(PositionResponse):
+    route_id: int
+    command: str
+    expansions: int
+    obstacle_map_version: str
+    # Cells inside the route's search box that changed since its last plan
+    changed_cells: int = 0
+
+
+class ActiveRouteFailure(BaseModel):
+    route_id: int
+    type: str
+    message: str
+
+
+class ActiveRoutesResponse(BaseModel):
+    routes: list[ActiveRouteResponse]
+    failures: list[ActiveRouteFailure] = []
@@ -0,0 +1,336 @@
+"""Headless Monte-Carlo simulator for capacity and risk analysis.
+
+Runs the domain engine (the run-length variant of ``execute_commands``, with
+one obstacle index per worker) over generated or file-supplied commands and
+obstacle maps on all cores, without FastAPI or Postgres, and reports throughput,
+collision rates and distributions.
+
+Examples:
+    python -m app.simulator --runs 100000 --length 500 --random-obstacles 5000
+    python -m app.simulator --commands routes.txt --obstacles config/obstacles.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from array import array
+from collections.abc import Sequence, Set
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+from app.domain.entities import Command, Direction, Obstacle, Point, Position
+from app.domain.exceptions import LandingObstacleException
+from app.domain.obstacle_index import ObstacleLookup
+from app.domain.services import execute_commands_runlength
+from app.domain.snapshot import obstacle_index
+from app.infrastructure.repositories.obstacle_provider import FileObstacleProvider
+
+# Runs per task handed to a worker process
+DEFAULT_BATCH_SIZE = 1000
+
+_PERCENTILES = (50, 90, 99)
+
+
+@dataclass(frozen=True)
+class Scenario:
+    """Settings shared by every simulated run"""
+
+    obstacles: Set[Obstacle]
+    start: Position | None
+    extent: int
+    length: int
+    alphabet: str
+    seed: int
+
+
+@dataclass
+class BatchStats:
+    """Outcome of a batch of runs"""
+
+    runs: int = 0
+    steps: int = 0
+    collisions: int = 0
+    landing_failures: int = 0
+    executed: array = field(default_factory=lambda: array('q'))
+    distances: array = field(default_factory=lambda: array('q'))
+    collision_steps: array = field(default_factory=lambda: array('q'))
+
+    def merge(self, other: 'BatchStats') -> None:
+        self.runs += other.runs
+        self.steps += other.steps
+        self.collisions += other.collisions
+        self.landing_failures += other.landing_failures
+        self.executed.extend(other.executed)
+        self.distances.extend(other.distances)
+        self.collision_steps.extend(other.collision_steps)
+
+
+_scenario: Scenario | None = None
+_index: ObstacleLookup | None = None
+
+
+def _init_worker(scenario: Scenario) -> None:
+    # The index is built once per process and shared by all its runs
+    global _scenario, _index
+    _scenario = scenario
+    _index = obstacle_index(scenario.obstacles)
+
+
+def _random_start(rng: random.Random, extent: int) -> Position:
+    return Position(
+        Point(rng.randint(-extent, extent), rng.randint(-extent, extent)),
+        Direction(rng.randrange(4)),
+    )
+
+
+def run_batch(batch: int, commands: Sequence[str] | None, count: int) -> BatchStats:
+    """Simulate one batch of runs in a worker process.
+
+    Args:
+        batch: Batch number, which seeds generated commands and starts
+        commands: Commands of the batch; generated when omitted
+        count: Number of runs when commands are generated
+
+    Returns:
+        BatchStats of the batch
+    """
+    scenario = _scenario
+    rng = random.Random(scenario.seed * 1_000_003 + batch)
+    if commands is None:
+        commands = [
+            ''.join(rng.choices(scenario.alphabet, k=scenario.length))
+            for _ in range(count)
+        ]
+
+    stats = BatchStats()
+    for command_string in commands:
+        start = scenario.start or _random_start(rng, scenario.extent)
+        stats.runs += 1
+        try:
+            result = execute_commands_runlength(
+                Command(command_string), start, scenario.obstacles, _index
+            )
+        except LandingObstacleException:
+            stats.landing_failures += 1
+            continue
+
+        executed = len(result.path)
+        stats.steps += executed
+        stats.executed.append(executed)
+        final = result.final_position
+        stats.distances.append(abs(final.x - start.x) + abs(final.y - start.y))
+        if result.stopped_by_obstacle:
+            stats.collisions += 1
+            stats.collision_steps.append(executed)
+    return stats
+
+
+def percentiles(values: Sequence[int]) -> dict[str, int]:
+    """Nearest-rank percentiles with min and max"""
+    if not values:
+        return {}
+    ordered = sorted(values)
+    summary = {'min': ordered[0]}
+    for p in _PERCENTILES:
+        summary[f'p{p}'] = ordered[min(len(ordered) - 1, len(ordered) * p // 100)]
+    summary['max'] = ordered[-1]
+    return summary
+
+
+def load_commands(path: str) -> list[str]:
+    """Read one command per line, skipping blank lines and # comments
+
+    Raises:
+        ValueError: If a line is not a valid command
+    """
+    commands = []
+    with open(path, encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            try:
+                Command(line)
+            except ValueError as e:
+                raise ValueError(f'{path}:{number}: {e}') from e
+            commands.append(line)
+    return commands
+
+
+def random_obstacles(count: int, extent: int, seed: int) -> frozenset[Obstacle]:
+    """Generate up to ``count`` distinct obstacles inside the extent"""
+    rng = random.Random(seed)
+    return frozenset(
+        Obstacle(rng.randint(-extent, extent), rng.randint(-extent, extent))
+        for _ in range(count)
+    )
+
+
+def parse_start(value: str) -> Position:
+    """Parse a start pose written as ``x,y,DIRECTION``"""
+    try:
+        x, y, direction = value.split(',')
+        return Position(Point(int(x), int(y)), Direction[direction.strip().upper()])
+    except (ValueError, KeyError) as e:
+        raise argparse.ArgumentTypeError(
+            f'Invalid start {value!r}, expected x,y,DIRECTION'
+        ) from e
+
+
+def simulate(
+    scenario: Scenario,
+    commands: list[str] | None,
+    runs: int,
+    workers: int,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> tuple[BatchStats, float]:
+    """Run every batch across a process pool.
+
+    Returns:
+        Merged BatchStats and the wall-clock time in seconds
+    """
+    if commands is not None:
+        batches = [
+            (i, commands[start : start + batch_size], 0)
+            for i, start in enumerate(range(0, len(commands), batch_size))
+        ]
+    else:
+        batches = [
+            (i, None, min(batch_size, runs - start))
+            for i, start in enumerate(range(0, runs, batch_size))
+        ]
+
+    total = BatchStats()
+    started = time.perf_counter()
+    if workers <= 1:
+        _init_worker(scenario)
+        for batch in batches:
+            total.merge(run_batch(*batch))
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(scenario,)
+        ) as pool:
+            for stats in pool.map(run_batch, *zip(*batches, strict=True)):
+                total.merge(stats)
+    return total, time.perf_counter() - started
+
+
+def build_report(stats: BatchStats, elapsed: float, workers: int) -> dict:
+    simulated = stats.runs - stats.landing_failures
+    return {
+        'runs': stats.runs,
+        'workers': workers,
+        'elapsed_seconds': round(elapsed, 3),
+        'steps': stats.steps,
+        'steps_per_second': round(stats.steps / elapsed) if elapsed else None,
+        'runs_per_second': round(stats.runs / elapsed) if elapsed else None,
+        'collisions': stats.collisions,
+        'collision_rate': stats.collisions / simulated if simulated else 0.0,
+        'landing_failures': stats.landing_failures,
+        'executed_steps': percentiles(stats.executed),
+        'collision_step': percentiles(stats.collision_steps),
+        'manhattan_distance': percentiles(stats.distances),
+    }
+
+
+def _print_report(report: dict) -> None:
+    for key, value in report.items():
+        if isinstance(value, dict):
+            value = ' '.join(f'{k}={v}' for k, v in value.items()) or '-'
+        elif isinstance(value, float):
+            value = f'{value:.4f}'
+        print(f'{key:>20}: {value}')
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='moon-rover-sim',
+        description='Headless Monte-Carlo simulator for the rover command engine.',
+    )
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--commands', help='File with one command per line')
+    source.add_argument(
+        '--runs', type=int, default=10_000, help='Number of generated commands'
+    )
+    parser.add_argument(
+        '--length', type=int, default=200, help='Length of generated commands'
+    )
+    parser.add_argument(
+        '--alphabet',
+        default='FFBLR',
+        help='Letters drawn for generated commands, repeated to weight them',
+    )
+
+    obstacles = parser.add_mutually_exclusive_group()
+    obstacles.add_argument(
+        '--obstacles', help='Obstacle map file, JSON or compiled, as the server reads'
+    )
+    obstacles.add_argument(
+        '--random-obstacles', type=int, default=0, help='Number of random obstacles'
+    )
+    parser.add_argument(
+        '--extent',
+        type=int,
+        default=1000,
+        help='Half-width of the square for random obstacles and starts',
+    )
+    parser.add_argument(
+        '--start',
+        type=parse_start,
+        help='Start pose x,y,DIRECTION; random inside the extent when omitted',
+    )
+
+    parser.add_argument(
+        '--workers', type=int, default=os.cpu_count() or 1, help='Worker processes'
+    )
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if not args.alphabet or args.alphabet.strip('FBLR'):
+        parser.error('--alphabet must only contain F, B, L, R')
+    if args.runs <= 0 or args.batch_size <= 0 or args.length < 0:
+        parser.error('--runs and --batch-size must be positive')
+
+    try:
+        commands = load_commands(args.commands) if args.commands else None
+        if args.obstacles:
+            # Same loader as the server, so regions and compiled maps work
+            obstacles = FileObstacleProvider(args.obstacles).get_obstacles()
+        else:
+            obstacles = random_obstacles(args.random_obstacles, args.extent, args.seed)
+    except (OSError, ValueError) as e:
+        print(f'error: {e}', file=sys.stderr)
+        return 1
+
+    scenario = Scenario(
+        obstacles=obstacles,
+        start=args.start,
+        extent=args.extent,
+        length=args.length,
+        alphabet=args.alphabet,
+        seed=args.seed,
+    )
+    stats, elapsed = simulate(
+        scenario, commands, args.runs, args.workers, args.batch_size
+    )
+    report = build_report(stats, elapsed, args.workers)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        _print_report(report)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,41 @@
+"""Add obstacles table
+
+Revision ID: 5b8e2f4a9c13
+Revises: 1cecc2d16dce
+Create Date: 2026-10-16 10:12:40.318214
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '5b8e2f4a9c13'
+down_revision: str | Sequence[str] | None = '1cecc2d16dce'
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'obstacles',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('coord_x', sa.Integer(), nullable=False),
+        sa.Column('coord_y', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'ix_obstacles_coord_x_coord_y',
+        'obstacles',
+        ['coord_x', 'coord_y'],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_obstacles_coord_x_coord_y', table_name='obstacles')
+    op.drop_table('obstacles')
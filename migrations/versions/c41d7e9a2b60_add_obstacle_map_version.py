@@ -0,0 +1,38 @@
+"""Add obstacle map version
+
+Revision ID: c41d7e9a2b60
+Revises: 5b8e2f4a9c13
+Create Date: 2026-10-17 09:41:05.127733
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41d7e9a2b60'
+down_revision: str | Sequence[str] | None = '5b8e2f4a9c13'
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'obstacle_map',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.BigInteger(), server_default='0', nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.execute('INSERT INTO obstacle_map (id, version) VALUES (1, 0)')
+    op.add_column(
+        'commands', sa.Column('obstacle_map_version', sa.String(), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('commands', 'obstacle_map_version')
+    op.drop_table('obstacle_map')
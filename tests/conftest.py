@@ -61,6 +61,8 @@ def mock_obstacle_repo():
 
     mock = Mock(spec=ObstacleRepository)
     mock.get_obstacles.return_value = set()
+    # Box queries are answered with the whole map unless a test overrides them
+    mock.get_obstacles_in_box.side_effect = lambda *box: mock.get_obstacles()
     return mock
 
 
@@ -1,3 +1,4 @@
+import json
 from unittest.mock import patch
 
 from httpx import AsyncClient
@@ -286,3 +287,321 @@ async def test_api_performance_basic(async_client: AsyncClient):
     assert response.status_code == 200
     # API should respond quickly (less than 2 seconds for health check with real DB)
     assert (end_time - start_time) < 2.0
+
+
+async def test_simulate_commands_does_not_move_rover(
+    async_client: AsyncClient, auth_headers_valid: dict
+):
+    """Test what-if simulation returns outcomes without persisting anything"""
+    before = await async_client.get('/positions', headers=auth_headers_valid)
+
+    payload = {
+        'commands': ['FF', 'RFF', 'LLFF'],
+        'start': {'x': 0, 'y': 0, 'direction': 'NORTH'},
+    }
+    response = await async_client.post(
+        '/commands/simulate', json=payload, headers=auth_headers_valid
+    )
+
+    assert response.status_code == 200
+    results = response.json()['results']
+    assert [r['command'] for r in results] == ['FF', 'RFF', 'LLFF']
+    for result in results:
+        assert isinstance(result['stopped_by_obstacle'], bool)
+        assert result['direction'] in ['NORTH', 'SOUTH', 'EAST', 'WEST']
+
+    after = await async_client.get('/positions', headers=auth_headers_valid)
+    assert after.json() == before.json()
+
+
+async def test_simulate_commands_invalid_candidate(
+    async_client: AsyncClient, auth_headers_valid: dict
+):
+    """Test that one invalid or overlong candidate rejects the request"""
+    from app.presentation.schemas import MAX_SIMULATION_COMMAND_LENGTH
+
+    for payload in [
+        {'commands': ['FF', 'FX']},
+        {'commands': []},
+        {'commands': ['FF', 'F' * (MAX_SIMULATION_COMMAND_LENGTH + 1)]},
+    ]:
+        response = await async_client.post(
+            '/commands/simulate', json=payload, headers=auth_headers_valid
+        )
+
+        assert response.status_code == 422
+
+
+async def test_obstacle_map_edits_publish_new_versions(
+    async_client: AsyncClient, auth_headers_valid: dict, tmp_path
+):
+    """Test that obstacle edits are served by reads and recorded on commands"""
+    from app.application.obstacle_service import ObstacleService
+    from app.infrastructure.repositories.obstacle_provider import (
+        FileObstacleProvider,
+    )
+    from app.main import app
+    from app.presentation.dependencies import get_obstacle_service
+
+    path = tmp_path / 'obstacles.json'
+    path.write_text('[[1, 2]]')
+    provider = FileObstacleProvider(path)
+    app.dependency_overrides[get_obstacle_service] = lambda: ObstacleService(
+        provider, provider
+    )
+
+    response = await async_client.get('/obstacles', headers=auth_headers_valid)
+    assert response.status_code == 200
+    first = response.json()
+    assert first['obstacles'] == [[1, 2]]
+    assert first['truncated'] is False
+
+    response = await async_client.post(
+        '/obstacles', json={'obstacles': [[3, 4]]}, headers=auth_headers_valid
+    )
+    assert response.status_code == 200
+    added = response.json()['version']
+    assert added != first['version']
+
+    response = await async_client.get(
+        '/obstacles',
+        params={'min_x': 2, 'min_y': 0, 'max_x': 5, 'max_y': 5},
+        headers=auth_headers_valid,
+    )
+    assert response.json() == {
+        'version': added,
+        'obstacles': [[3, 4]],
+        'regions': [],
+        'truncated': False,
+    }
+
+    response = await async_client.get(
+        '/obstacles', params={'limit': 1}, headers=auth_headers_valid
+    )
+    assert response.json()['obstacles'] == [[1, 2]]
+    assert response.json()['truncated'] is True
+
+    response = await async_client.request(
+        'DELETE',
+        '/obstacles',
+        json={'obstacles': [[1, 2]]},
+        headers=auth_headers_valid,
+    )
+    assert response.status_code == 200
+
+    response = await async_client.put(
+        '/obstacles', json={'obstacles': []}, headers=auth_headers_valid
+    )
+    assert response.status_code == 200
+    assert json.loads(path.read_text()) == []
+
+
+async def test_rectangular_regions_block_commands(
+    async_client: AsyncClient, auth_headers_valid: dict, tmp_path
+):
+    """Test that rectangles are listed as such and clipped to the query box"""
+    from app.application.obstacle_service import ObstacleService
+    from app.infrastructure.repositories.obstacle_provider import (
+        FileObstacleProvider,
+    )
+    from app.main import app
+    from app.presentation.dependencies import get_obstacle_service
+
+    path = tmp_path / 'obstacles.json'
+    path.write_text(json.dumps([[1, 2], {'rect': [-50, 3, 50, 1_000_000]}]))
+    provider = FileObstacleProvider(path)
+    app.dependency_overrides[get_obstacle_service] = lambda: ObstacleService(
+        provider, provider
+    )
+
+    response = await async_client.get('/obstacles', headers=auth_headers_valid)
+    assert response.status_code == 200
+    assert response.json()['obstacles'] == [[1, 2]]
+    assert response.json()['regions'] == [[-50, 3, 50, 1_000_000]]
+
+    response = await async_client.get(
+        '/obstacles',
+        params={'min_x': 0, 'min_y': 0, 'max_x': 1, 'max_y': 3},
+        headers=auth_headers_valid,
+    )
+    assert response.json()['regions'] == [[0, 3, 1, 3]]
+
+
+async def test_spatial_obstacle_queries(
+    async_client: AsyncClient, auth_headers_valid: dict
+):
+    """Test viewport, radius and nearest queries against the k-d tree"""
+    from app.application.spatial_service import SpatialQueryService
+    from app.domain.entities import Obstacle
+    from app.domain.snapshot import ObstacleSnapshot
+    from app.main import app
+    from app.presentation.dependencies import get_spatial_query_service
+
+    snapshot = ObstacleSnapshot(
+        {Obstacle(0, 5), Obstacle(3, 4), Obstacle(-2, -2), Obstacle(40, 40)}, 'v1'
+    )
+    app.dependency_overrides[get_spatial_query_service] = lambda: SpatialQueryService(
+        None, lambda: snapshot
+    )
+
+    response = await async_client.get(
+        '/obstacles/box',
+        params={'min_x': -5, 'min_y': -5, 'max_x': 5, 'max_y': 5, 'limit': 2},
+        headers=auth_headers_valid,
+    )
+    assert response.status_code == 200
+    assert response.json()['truncated'] is True
+    assert len(response.json()['obstacles']) == 2
+
+    response = await async_client.get(
+        '/obstacles/within',
+        params={'x': 0, 'y': 0, 'radius': 5},
+        headers=auth_headers_valid,
+    )
+    assert response.json() == {
+        'version': 'v1',
+        'obstacles': [[-2, -2], [0, 5], [3, 4]],
+        'truncated': False,
+    }
+
+    response = await async_client.get(
+        '/obstacles/nearest',
+        params={'x': 39, 'y': 39, 'k': 1},
+        headers=auth_headers_valid,
+    )
+    assert response.json()['obstacles'] == [[40, 40]]
+
+    response = await async_client.get(
+        '/obstacles/within',
+        params={'x': 0, 'y': 0, 'radius': -1},
+        headers=auth_headers_valid,
+    )
+    assert response.status_code == 422
+
+
+async def test_execute_command_reports_obstacle_map_version(
+    async_client: AsyncClient, auth_headers_valid: dict
+):
+    """Test that command results record the map version they ran against"""
+    version = (await async_client.get('/obstacles', headers=auth_headers_valid)).json()[
+        'version'
+    ]
+
+    response = await async_client.post(
+        '/commands', json={'command': 'R'}, headers=auth_headers_valid
+    )
+
+    assert response.status_code == 200
+    assert response.json()['obstacle_map_version'] == version
+
+
+async def test_import_obstacle_stream(
+    async_client: AsyncClient, auth_headers_valid: dict, tmp_path
+):
+    """Test that an NDJSON or CSV upload replaces the obstacle map"""
+    from app.application.obstacle_service import ObstacleService
+    from app.infrastructure.repositories.obstacle_provider import (
+        FileObstacleProvider,
+    )
+    from app.main import app
+    from app.presentation.dependencies import get_obstacle_service
+
+    path = tmp_path / 'obstacles.json'
+    path.write_text('[[1, 2]]')
+    provider = FileObstacleProvider(path)
+    app.dependency_overrides[get_obstacle_service] = lambda: ObstacleService(
+        provider, provider
+    )
+
+    response = await async_client.post(
+        '/obstacles/import',
+        content=b'x,y\n3,4\n5,6\n',
+        headers={**auth_headers_valid, 'Content-Type': 'text/csv'},
+    )
+    assert response.status_code == 200
+    assert response.json()['rows'] == 2
+    await provider.settle()
+    assert json.loads(path.read_text()) == [[3, 4], [5, 6]]
+
+    response = await async_client.post(
+        '/obstacles/import',
+        content=b'[7, 8]\n[7,',
+        headers={**auth_headers_valid, 'Content-Type': 'application/x-ndjson'},
+    )
+    assert response.status_code == 422
+
+    response = await async_client.post(
+        '/obstacles/import',
+        content=b'<obstacles/>',
+        headers={**auth_headers_valid, 'Content-Type': 'application/xml'},
+    )
+    assert response.status_code == 415
+
+
+async def test_plan_route_to_current_cell(
+    async_client: AsyncClient, auth_headers_valid: dict
+):
+    """Test that a route to the current cell only turns to the requested heading"""
+    position = (await async_client.get('/positions', headers=auth_headers_valid)).json()
+    opposite = {'NORTH': 'SOUTH', 'SOUTH': 'NORTH', 'EAST': 'WEST', 'WEST': 'EAST'}
+
+    response = await async_client.post(
+        '/routes/plan',
+        json={
+            'x': position['x'],
+            'y': position['y'],
+            'direction': opposite[position['direction']],
+        },
+        headers=auth_headers_valid,
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data['command'] in ('LL', 'RR')
+    assert data['direction'] == opposite[position['direction']]
+    assert data['executed'] is False
+
+    response = await async_client.post(
+        '/routes/plan',
+        json={'x': 0, 'y': 0, 'direction': 'UP'},
+        headers=auth_headers_valid,
+    )
+    assert response.status_code == 422
+
+
+async def test_active_route_lifecycle(
+    async_client: AsyncClient, auth_headers_valid: dict
+):
+    """Test that an active route can be replanned and stopped"""
+    position = (await async_client.get('/positions', headers=auth_headers_valid)).json()
+    target = {'x': position['x'], 'y': position['y'], 'direction': 'NORTH'}
+
+    response = await async_client.post(
+        '/routes/active', json=target, headers=auth_headers_valid
+    )
+    assert response.status_code == 200
+    route = response.json()
+    assert set(route['command']) <= {'L', 'R'}
+
+    response = await async_client.post(
+        f'/routes/active/{route["route_id"]}/replan', headers=auth_headers_valid
+    )
+    assert response.status_code == 200
+    assert response.json()['command'] == route['command']
+    assert response.json()['changed_cells'] == 0
+
+    response = await async_client.post(
+        '/routes/active/replan', headers=auth_headers_valid
+    )
+    assert response.status_code == 200
+    assert route['route_id'] in [r['route_id'] for r in response.json()['routes']]
+
+    response = await async_client.delete(
+        f'/routes/active/{route["route_id"]}', headers=auth_headers_valid
+    )
+    assert response.status_code == 204
+
+    response = await async_client.post(
+        f'/routes/active/{route["route_id"]}/replan', headers=auth_headers_valid
+    )
+    assert response.status_code == 404
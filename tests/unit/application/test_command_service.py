@@ -1,21 +1,25 @@
 """Tests for CommandService"""
 
-from unittest.mock import Mock
+from unittest.mock import AsyncMock, Mock, patch
 
 import pytest
 
 from app.application.command_service import (
     CommandService,
 )
+from app.application.execution_cache import ExecutionCache
 from app.domain.entities import (
     Command,
     CommandResult,
+    CompactCommand,
     Direction,
     Obstacle,
     Point,
     Position,
 )
-from app.domain.exceptions import LandingObstacleException
+from app.domain.exceptions import LandingObstacleException, OffMapException
+from app.domain.services import execute_commands
+from app.domain.snapshot import ObstacleSnapshot
 
 
 # Fixtures
@@ -193,6 +197,21 @@ async def test_execute_command_no_path_in_result(
         mock_uow.positions.save_positions_bulk.assert_not_called()
 
 
+async def test_execute_command_rejects_positions_off_the_map(
+    command_service, mock_position_repo, mock_uow
+):
+    """Test that a path the int32 position columns cannot store is not saved"""
+    mock_position_repo.get_current_position.return_value = Position(
+        Point(0, 2**31 - 2), Direction.NORTH
+    )
+
+    with pytest.raises(OffMapException) as exc_info:
+        await command_service.execute_command('FFF')
+
+    assert exc_info.value.position == (0, 2**31)
+    mock_uow.commands.save_command.assert_not_called()
+
+
 async def test_get_current_position_exists(command_service, mock_position_repo):
     """Test _get_current_position when position exists"""
 
@@ -219,3 +238,290 @@ async def test_get_current_position_none_returns_start(
     assert result == start_position
     mock_position_repo.get_current_position.assert_called_once()
     mock_start_provider.get_start_position.assert_called_once()
+
+
+async def test_execute_command_streams_long_commands(
+    mock_command_repo,
+    mock_obstacle_repo,
+    mock_position_repo,
+    mock_start_provider,
+    mock_uow,
+):
+    """Test that commands above the threshold are persisted chunk by chunk"""
+
+    service = CommandService(
+        repo=mock_command_repo,
+        obstacle_repo=mock_obstacle_repo,
+        position_repo=mock_position_repo,
+        start_position_provider=mock_start_provider,
+        uow=mock_uow,
+        stream_threshold=3,
+        chunk_size=2,
+    )
+    mock_position_repo.get_current_position.return_value = Position(
+        Point(0, 0), Direction.NORTH
+    )
+    mock_obstacle_repo.get_obstacles.return_value = {Obstacle(0, 5)}
+    mock_uow.commands.create_command.return_value = 321
+
+    result = await service.execute_command('FFFFFFF')
+
+    assert result.stopped_by_obstacle is True
+    assert result.executed_command == Command('FFFF')
+    assert result.final_position == Position(Point(0, 4), Direction.NORTH)
+    assert result.path is None
+
+    mock_uow.commands.create_command.assert_called_once_with(Command('FFFFFFF'))
+    mock_uow.commands.save_command.assert_not_called()
+    mock_uow.commands.complete_command.assert_called_once_with(321, result)
+
+    chunks = [c.args[1] for c in mock_uow.positions.save_positions_bulk.call_args_list]
+    assert [len(chunk) for chunk in chunks] == [2, 2]
+    assert all(
+        c.args[0] == 321 for c in mock_uow.positions.save_positions_bulk.call_args_list
+    )
+    assert chunks[-1][-1] == result.final_position
+
+
+async def test_execute_command_short_commands_are_not_streamed(
+    command_service, mock_position_repo, mock_uow
+):
+    """Test that commands below the threshold use a single save"""
+
+    mock_position_repo.get_current_position.return_value = Position(
+        Point(0, 0), Direction.NORTH
+    )
+
+    await command_service.execute_command('FF')
+
+    mock_uow.commands.save_command.assert_called_once()
+    mock_uow.commands.create_command.assert_not_called()
+
+
+async def test_execute_command_compact(
+    command_service, mock_position_repo, mock_obstacle_repo, mock_uow
+):
+    """Test that compact commands run unexpanded and save only the final pose"""
+
+    mock_position_repo.get_current_position.return_value = Position(
+        Point(0, 0), Direction.NORTH
+    )
+    mock_obstacle_repo.get_obstacles.return_value = {Obstacle(0, 5)}
+
+    result = await command_service.execute_command(CompactCommand('(FR2)x4F10'))
+
+    assert result.stopped_by_obstacle is True
+    assert result.final_position == Position(Point(0, 4), Direction.NORTH)
+    assert result.executed_command == CompactCommand('(FR2)x4F4')
+
+    mock_uow.commands.save_command.assert_called_once_with(result)
+    mock_uow.positions.save_positions_bulk.assert_called_once()
+    assert list(mock_uow.positions.save_positions_bulk.call_args.args[1]) == [
+        result.final_position
+    ]
+
+
+async def test_canonicalize_command_does_not_save(
+    command_service, mock_position_repo, mock_uow
+):
+    """Test that canonicalization is computed from the current position only"""
+
+    mock_position_repo.get_current_position.return_value = Position(
+        Point(0, 0), Direction.NORTH
+    )
+
+    canonical = await command_service.canonicalize_command('FFBLR')
+
+    assert canonical.canonical_command == Command('F')
+    assert canonical.saved_steps == 4
+    mock_uow.commands.save_command.assert_not_called()
+    mock_uow.positions.save_positions_bulk.assert_not_called()
+
+
+async def test_execute_command_uses_execution_cache(
+    mock_command_repo,
+    mock_obstacle_repo,
+    mock_position_repo,
+    mock_start_provider,
+    mock_uow,
+):
+    """Test that repeated commands reuse the result for the same map version"""
+
+    cache = ExecutionCache()
+    service = CommandService(
+        repo=mock_command_repo,
+        obstacle_repo=mock_obstacle_repo,
+        position_repo=mock_position_repo,
+        start_position_provider=mock_start_provider,
+        uow=mock_uow,
+        execution_cache=cache,
+    )
+    mock_position_repo.get_current_position.return_value = Position(
+        Point(0, 0), Direction.NORTH
+    )
+    mock_obstacle_repo.get_version.return_value = 'v1'
+
+    first = await service.execute_command('FFR')
+    second = await service.execute_command('FFR')
+
+    assert second is first
+    assert mock_uow.commands.save_command.call_count == 2
+
+    mock_obstacle_repo.get_version.return_value = 'v2'
+    third = await service.execute_command('FFR')
+
+    assert third is not first
+    assert third == first
+    assert (cache.stats().hits, cache.stats().misses) == (1, 2)
+
+
+async def test_execute_command_loads_obstacles_within_reach(
+    mock_command_repo,
+    mock_obstacle_repo,
+    mock_position_repo,
+    mock_start_provider,
+    mock_uow,
+):
+    """Test that a pruning service loads only the command's reach envelope"""
+
+    service = CommandService(
+        repo=mock_command_repo,
+        obstacle_repo=mock_obstacle_repo,
+        position_repo=mock_position_repo,
+        start_position_provider=mock_start_provider,
+        uow=mock_uow,
+        prune_obstacles=True,
+    )
+    mock_position_repo.get_current_position.return_value = Position(
+        Point(10, 20), Direction.EAST
+    )
+    mock_obstacle_repo.get_obstacles_in_box.side_effect = None
+    mock_obstacle_repo.get_obstacles_in_box.return_value = {Obstacle(13, 20)}
+
+    result = await service.execute_command('FFFFLB')
+
+    mock_obstacle_repo.get_obstacles_in_box.assert_called_once_with(10, 19, 14, 20)
+    mock_obstacle_repo.get_obstacles.assert_not_called()
+    assert result.stopped_by_obstacle is True
+    assert result.final_position == Position(Point(12, 20), Direction.EAST)
+
+
+async def test_execute_command_passes_prepared_map_through(
+    command_service, mock_position_repo, mock_obstacle_repo
+):
+    """Test that in-memory maps reach the engine whole, without a box copy"""
+
+    snapshot = ObstacleSnapshot({Obstacle(0, 2), Obstacle(50, 50)}, 'v1')
+    mock_obstacle_repo.get_obstacles.return_value = snapshot
+    mock_obstacle_repo.get_version.return_value = 'v1'
+    mock_position_repo.get_current_position.return_value = Position(
+        Point(0, 0), Direction.NORTH
+    )
+
+    with patch(
+        'app.application.command_service.execute_commands',
+        wraps=execute_commands,
+    ) as execute:
+        result = await command_service.execute_command('FF')
+
+    assert execute.call_args.kwargs['obstacles'] is snapshot
+    mock_obstacle_repo.get_obstacles_in_box.assert_not_called()
+    assert result.stopped_by_obstacle is True
+
+
+async def test_execute_command_cache_hit_reads_no_obstacles(
+    mock_command_repo,
+    mock_obstacle_repo,
+    mock_position_repo,
+    mock_start_provider,
+    mock_uow,
+):
+    """Test that a cached result is found from the map version alone"""
+
+    service = CommandService(
+        repo=mock_command_repo,
+        obstacle_repo=mock_obstacle_repo,
+        position_repo=mock_position_repo,
+        start_position_provider=mock_start_provider,
+        uow=mock_uow,
+        execution_cache=ExecutionCache(),
+    )
+    mock_position_repo.get_current_position.return_value = Position(
+        Point(0, 0), Direction.NORTH
+    )
+    mock_obstacle_repo.get_version.return_value = 'v1'
+
+    first = await service.execute_command('FFR')
+    mock_obstacle_repo.get_obstacles.reset_mock()
+    second = await service.execute_command('FFR')
+
+    assert second is first
+    mock_obstacle_repo.get_obstacles.assert_not_called()
+    mock_obstacle_repo.get_obstacles_in_box.assert_not_called()
+
+
+async def test_execute_command_awaits_async_obstacle_repository(
+    mock_command_repo,
+    mock_position_repo,
+    mock_start_provider,
+    mock_uow,
+):
+    """Test that database-backed obstacle queries are awaited"""
+
+    obstacle_repo = AsyncMock()
+    obstacle_repo.get_version.return_value = 'v1'
+    obstacle_repo.get_obstacles_in_box.return_value = {Obstacle(0, 2)}
+    service = CommandService(
+        repo=mock_command_repo,
+        obstacle_repo=obstacle_repo,
+        position_repo=mock_position_repo,
+        start_position_provider=mock_start_provider,
+        uow=mock_uow,
+        execution_cache=ExecutionCache(),
+        prune_obstacles=True,
+    )
+    mock_position_repo.get_current_position.return_value = Position(
+        Point(0, 0), Direction.NORTH
+    )
+
+    result = await service.execute_command(CompactCommand('F5'))
+
+    obstacle_repo.get_obstacles_in_box.assert_awaited_once_with(0, 0, 0, 5)
+    # Read before and after the query to detect a concurrent map change
+    assert obstacle_repo.get_version.await_count == 2
+    assert result.final_position == Position(Point(0, 1), Direction.NORTH)
+    assert result.obstacle_map_version == 'v1'
+
+
+async def test_execute_command_records_obstacle_map_version(
+    command_service, mock_position_repo, mock_obstacle_repo, mock_uow
+):
+    """Test that the result carries the map version the command ran against"""
+
+    mock_position_repo.get_current_position.return_value = Position(
+        Point(0, 0), Direction.NORTH
+    )
+    mock_obstacle_repo.get_version.return_value = 'v7'
+
+    result = await command_service.execute_command('FF')
+
+    assert result.obstacle_map_version == 'v7'
+    mock_uow.commands.save_command.assert_called_once_with(result)
+
+
+async def test_execute_command_retries_when_map_changes_during_query(
+    command_service, mock_position_repo, mock_obstacle_repo
+):
+    """Test that obstacles and version come from the same map"""
+
+    mock_position_repo.get_current_position.return_value = Position(
+        Point(0, 0), Direction.NORTH
+    )
+    mock_obstacle_repo.get_version.side_effect = ['v1', 'v2', 'v2']
+    mock_obstacle_repo.get_obstacles.side_effect = [set(), {Obstacle(0, 1)}]
+
+    result = await command_service.execute_command('FF')
+
+    assert mock_obstacle_repo.get_obstacles.call_count == 2
+    assert result.obstacle_map_version == 'v2'
+    assert result.stopped_by_obstacle is True
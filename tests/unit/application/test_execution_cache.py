@@ -0,0 +1,76 @@
+"""Tests for ExecutionCache"""
+
+from app.application.execution_cache import ExecutionCache, command_digest
+from app.domain.entities import (
+    Command,
+    CommandResult,
+    CompactCommand,
+    Direction,
+    Point,
+    Position,
+    PositionPath,
+)
+
+START = Position(Point(0, 0), Direction.NORTH)
+
+
+def _result(command_string: str, positions: int) -> CommandResult:
+    path = PositionPath.from_positions(
+        [Position(Point(0, i + 1), Direction.NORTH) for i in range(positions)]
+    )
+    command = Command(command_string)
+    return CommandResult(
+        executed_command=command,
+        initial_command=command,
+        final_position=path[-1] if path else START,
+        stopped_by_obstacle=False,
+        path=path,
+    )
+
+
+def test_command_digest_distinguishes_syntax():
+    assert command_digest(Command('FF')) == command_digest(Command('FF'))
+    assert command_digest(Command('FF')) != command_digest(Command('FFF'))
+    assert command_digest(Command('FF')) != command_digest(CompactCommand('FF'))
+
+
+def test_get_and_put_count_hits_and_misses():
+    cache = ExecutionCache()
+    key = ExecutionCache.key(START, Command('FF'), 'v1')
+    result = _result('FF', 2)
+
+    assert cache.get(key) is None
+    cache.put(key, result)
+    assert cache.get(key) is result
+    assert cache.get(ExecutionCache.key(START, Command('FF'), 'v2')) is None
+
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.entries, stats.positions) == (1, 2, 1, 2)
+
+
+def test_evicts_least_recently_used_entry():
+    cache = ExecutionCache(max_entries=2)
+    keys = [ExecutionCache.key(START, Command('F' * n), 'v') for n in (1, 2, 3)]
+
+    cache.put(keys[0], _result('F', 1))
+    cache.put(keys[1], _result('FF', 2))
+    cache.get(keys[0])
+    cache.put(keys[2], _result('FFF', 3))
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None
+    assert cache.stats().evictions == 1
+
+
+def test_bounded_by_positions():
+    cache = ExecutionCache(max_positions=5)
+    small = ExecutionCache.key(START, Command('FFF'), 'v')
+    large = ExecutionCache.key(START, Command('F' * 6), 'v')
+
+    cache.put(large, _result('F' * 6, 6))
+    cache.put(small, _result('FFF', 3))
+    cache.put(ExecutionCache.key(START, Command('FFFF'), 'v'), _result('FFFF', 4))
+
+    assert cache.get(large) is None
+    assert cache.get(small) is None
+    assert cache.stats().positions == 4
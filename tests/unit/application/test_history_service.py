@@ -0,0 +1,120 @@
+"""Tests for CommandHistoryService"""
+
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.application.history_service import (
+    CommandHistoryRepository,
+    CommandHistoryService,
+    PositionHistoryRepository,
+    TransformCache,
+)
+from app.domain.entities import (
+    Command,
+    CompactCommand,
+    Direction,
+    Point,
+    Position,
+    StoredCommand,
+)
+from app.domain.exceptions import CommandNotFoundException
+from app.domain.transforms import Transform
+
+
+# Fixtures
+@pytest.fixture
+def mock_history_command_repo():
+    return AsyncMock(spec=CommandHistoryRepository)
+
+
+@pytest.fixture
+def mock_history_position_repo():
+    mock = AsyncMock(spec=PositionHistoryRepository)
+    mock.get_position_before_command.return_value = Position(
+        Point(1, 1), Direction.EAST
+    )
+    return mock
+
+
+@pytest.fixture
+def history_service(
+    mock_history_command_repo, mock_history_position_repo, mock_start_provider
+):
+    return CommandHistoryService(
+        mock_history_command_repo, mock_history_position_repo, mock_start_provider
+    )
+
+
+def _stored(command: Command | CompactCommand) -> StoredCommand:
+    return StoredCommand(
+        id=5,
+        received_command=command,
+        executed_command=command,
+        stopped_by_obstacle=False,
+    )
+
+
+async def test_get_pose(history_service, mock_history_command_repo):
+    """Test that a pose is computed from the start pose of the command"""
+
+    mock_history_command_repo.get_command.return_value = _stored(Command('FFLF'))
+
+    assert await history_service.get_pose(5, 0) == Position(Point(1, 1), Direction.EAST)
+    assert await history_service.get_pose(5, 4) == Position(
+        Point(3, 2), Direction.NORTH
+    )
+
+
+async def test_get_pose_first_command_uses_start_position(
+    history_service, mock_history_command_repo, mock_history_position_repo
+):
+    """Test that the first command starts from the configured start position"""
+
+    mock_history_command_repo.get_command.return_value = _stored(
+        CompactCommand('(FR)x2')
+    )
+    mock_history_position_repo.get_position_before_command.return_value = None
+
+    assert await history_service.get_pose(5, 3) == Position(Point(1, 1), Direction.EAST)
+
+
+async def test_get_transform(history_service, mock_history_command_repo):
+    """Test range transforms, defaulting to every executed step"""
+
+    mock_history_command_repo.get_command.return_value = _stored(Command('FFLF'))
+
+    assert await history_service.get_transform(5) == (Transform(2, -1, 3), 4)
+    assert await history_service.get_transform(5, 2, 3) == (Transform(0, 0, 3), 3)
+
+
+async def test_get_pose_errors(history_service, mock_history_command_repo):
+    """Test missing commands and out of range steps"""
+
+    mock_history_command_repo.get_command.return_value = None
+    with pytest.raises(CommandNotFoundException):
+        await history_service.get_pose(5, 0)
+
+    mock_history_command_repo.get_command.return_value = _stored(Command('F'))
+    with pytest.raises(ValueError):
+        await history_service.get_pose(5, 2)
+
+
+def test_transform_cache_keyed_by_command_id():
+    """Test that indexes are reused per command ID and bounded by length"""
+
+    cache = TransformCache(max_entries=8, max_length=6)
+    first = _stored(Command('FFLF'))
+
+    assert cache.get(first) is cache.get(first)
+    assert len(cache) == 1
+
+    second = StoredCommand(7, Command('RRR'), Command('RRR'), False)
+    cache.get(second)
+    # 4 + 3 letters exceed the bound, so the older index was dropped
+    assert len(cache) == 1
+    assert cache.get(second) is cache.get(second)
+
+    long_command = StoredCommand(9, Command('F' * 7), Command('F' * 7), False)
+    assert len(cache.get(long_command)) == 7
+    assert len(cache) == 1
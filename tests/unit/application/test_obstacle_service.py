@@ -0,0 +1,82 @@
+"""Tests for ObstacleService"""
+
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from app.application import obstacle_service
+from app.application.obstacle_service import WHOLE_MAP, ObstacleService
+from app.domain.entities import Obstacle
+from app.domain.exceptions import ObstacleMapReadOnlyException
+
+
+async def test_get_obstacles_defaults_to_whole_map(mock_obstacle_repo):
+    mock_obstacle_repo.get_obstacles.return_value = {Obstacle(1, 2)}
+    mock_obstacle_repo.get_version.return_value = 'v1'
+    service = ObstacleService(mock_obstacle_repo)
+
+    obstacles, version = await service.get_obstacles()
+
+    assert obstacles == {Obstacle(1, 2)}
+    assert version == 'v1'
+    mock_obstacle_repo.get_obstacles_in_box.assert_called_once_with(*WHOLE_MAP)
+
+
+async def test_writes_go_to_store(mock_obstacle_repo):
+    store = AsyncMock()
+    store.add_obstacles.return_value = 'v2'
+    store.remove_obstacles.return_value = 'v3'
+    store.replace_obstacles.return_value = 'v4'
+    on_edit = Mock()
+    service = ObstacleService(mock_obstacle_repo, store, on_edit)
+    obstacles = [Obstacle(1, 2)]
+
+    assert await service.add_obstacles(obstacles) == 'v2'
+    assert await service.remove_obstacles(obstacles) == 'v3'
+    assert await service.replace_obstacles(obstacles) == 'v4'
+    store.add_obstacles.assert_awaited_once_with(obstacles, on_edit)
+    store.remove_obstacles.assert_awaited_once_with(obstacles, on_edit)
+    store.replace_obstacles.assert_awaited_once_with(obstacles)
+
+
+async def test_writes_without_store_are_rejected(mock_obstacle_repo):
+    service = ObstacleService(mock_obstacle_repo)
+
+    with pytest.raises(ObstacleMapReadOnlyException):
+        await service.add_obstacles([Obstacle(1, 2)])
+
+
+async def _chunks(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+class _RecordingStore:
+    def __init__(self):
+        self.batches = []
+
+    async def import_obstacles(self, batches):
+        async for batch in batches:
+            self.batches.append(batch)
+        return 'v9'
+
+
+async def test_import_streams_batches_to_store(mock_obstacle_repo, monkeypatch):
+    monkeypatch.setattr(obstacle_service, 'IMPORT_BATCH_SIZE', 2)
+    store = _RecordingStore()
+    service = ObstacleService(mock_obstacle_repo, store)
+
+    result = await service.import_obstacles(
+        _chunks(b'[1, 2]\n[3,', b' 4]\n[5, 6]\n', b'[7, 8]'), 'ndjson'
+    )
+
+    assert result.version == 'v9'
+    assert result.rows == 4
+    assert store.batches == [[(1, 2), (3, 4), (5, 6)], [(7, 8)]]
+
+
+async def test_import_rejects_invalid_stream(mock_obstacle_repo):
+    service = ObstacleService(mock_obstacle_repo, _RecordingStore())
+
+    with pytest.raises(ValueError, match='Line 2'):
+        await service.import_obstacles(_chunks(b'1,2\n3\n'), 'csv')
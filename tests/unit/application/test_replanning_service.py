@@ -0,0 +1,219 @@
+"""Tests for ReplanningService"""
+
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.application.replanning_service import ActiveRoutes, ReplanningService
+from app.application.route_service import PlannerStats
+from app.domain.entities import Direction, Obstacle, ObstacleEdit, Point, Position
+from app.domain.exceptions import (
+    NoRouteException,
+    RouteBudgetExceededException,
+    RouteNotFoundException,
+)
+
+START = Position(Point(0, 0), Direction.NORTH)
+
+
+class _VersionedRepository:
+    """In-memory map whose version changes on every edit"""
+
+    def __init__(self, obstacles=()):
+        self.obstacles = set(obstacles)
+        self.version = 0
+        self.boxes = []
+
+    def edit(self, added=(), removed=(), routes=None):
+        previous = f'v{self.version}'
+        self.obstacles = (self.obstacles | set(added)) - set(removed)
+        self.version += 1
+        if routes is not None:
+            routes.record(
+                ObstacleEdit(
+                    previous, f'v{self.version}', frozenset(added), frozenset(removed)
+                )
+            )
+
+    async def get_version(self) -> str:
+        return f'v{self.version}'
+
+    async def get_obstacles_in_box(self, min_x, min_y, max_x, max_y):
+        self.boxes.append((min_x, min_y, max_x, max_y))
+        return {
+            o for o in self.obstacles if min_x <= o.x <= max_x and min_y <= o.y <= max_y
+        }
+
+
+def _service(repo, routes=None, stats=None):
+    position_service = AsyncMock()
+    position_service.get_current_position.return_value = START
+    service = ReplanningService(
+        position_service,
+        repo,
+        routes if routes is not None else ActiveRoutes(),
+        stats=stats,
+        margin=4,
+    )
+    return service, position_service
+
+
+async def test_replan_repairs_only_changed_cells():
+    stats = PlannerStats()
+    repo = _VersionedRepository()
+    service, _ = _service(repo, stats=stats)
+
+    first = await service.start(Point(0, 6))
+    assert first.plan.command.command_string == 'FFFFFF'
+    assert first.obstacle_map_version == 'v0'
+
+    unchanged = await service.replan(first.route_id)
+    assert unchanged.changed_cells == 0
+    assert unchanged.plan.expansions == 0
+
+    repo.edit(added=[Obstacle(0, 3), Obstacle(50, 50)])
+    repaired = await service.replan(first.route_id)
+
+    assert repaired.changed_cells == 1
+    assert repaired.obstacle_map_version == 'v1'
+    assert 'FFFFFF' not in repaired.plan.command.command_string
+    assert repaired.plan.final_position.point == Point(0, 6)
+    assert stats.replans == 2
+    assert stats.changed_cells == 1
+
+
+async def test_replan_without_map_change_reads_no_obstacles():
+    repo = _VersionedRepository()
+    service, _ = _service(repo)
+    route = await service.start(Point(0, 6))
+    boxes = len(repo.boxes)
+
+    replanned = await service.replan(route.route_id)
+
+    assert replanned.changed_cells == 0
+    assert len(repo.boxes) == boxes
+
+
+async def test_replan_applies_recorded_edits_without_reading_the_box():
+    routes = ActiveRoutes()
+    repo = _VersionedRepository()
+    service, _ = _service(repo, routes)
+    route = await service.start(Point(0, 6))
+    boxes = len(repo.boxes)
+
+    repo.edit(added=[Obstacle(0, 3), Obstacle(50, 50)], routes=routes)
+    repo.edit(added=[Obstacle(1, 3)], removed=[Obstacle(0, 3)], routes=routes)
+    repaired = await service.replan(route.route_id)
+
+    assert len(repo.boxes) == boxes
+    assert repaired.obstacle_map_version == 'v2'
+    assert repaired.changed_cells == 3
+    assert repaired.plan.command.command_string == 'FFFFFF'
+
+    repo.edit(added=[Obstacle(0, 4)], routes=routes)
+    blocked = await service.replan(route.route_id)
+    assert len(repo.boxes) == boxes
+    assert 'FFFFFF' not in blocked.plan.command.command_string
+
+
+async def test_replan_reads_the_box_when_an_edit_was_missed():
+    routes = ActiveRoutes()
+    repo = _VersionedRepository()
+    service, _ = _service(repo, routes)
+    route = await service.start(Point(0, 6))
+
+    # Written elsewhere, so never recorded here
+    repo.edit(added=[Obstacle(0, 3)])
+    repo.edit(added=[Obstacle(2, 2)], routes=routes)
+    repaired = await service.replan(route.route_id)
+
+    assert repo.boxes[-1] == (-4, -4, 4, 10)
+    assert repaired.changed_cells == 2
+    assert 'FFFFFF' not in repaired.plan.command.command_string
+
+    # The queue starts over from the version read
+    repo.edit(removed=[Obstacle(0, 3)], routes=routes)
+    boxes = len(repo.boxes)
+    cleared = await service.replan(route.route_id)
+    assert len(repo.boxes) == boxes
+    assert cleared.plan.command.command_string == 'FFFFFF'
+
+
+async def test_replan_follows_the_rover():
+    repo = _VersionedRepository()
+    service, position_service = _service(repo)
+    route = await service.start(Point(0, 6))
+
+    position_service.get_current_position.return_value = Position(
+        Point(0, 4), Direction.NORTH
+    )
+    moved = await service.replan(route.route_id)
+    assert moved.plan.command.command_string == 'FF'
+
+    # Leaving the box starts a new search around the rover
+    position_service.get_current_position.return_value = Position(
+        Point(100, 6), Direction.WEST
+    )
+    far = await service.replan(route.route_id)
+    assert len(far.plan.command.command_string) == 100
+    assert repo.boxes[-1] == (-4, 2, 104, 10)
+
+
+async def test_replan_all_reports_failures_per_route():
+    repo = _VersionedRepository()
+    service, _ = _service(repo)
+    reachable = await service.start(Point(0, 6))
+    blocked = await service.start(Point(3, 3))
+
+    repo.edit(added=[Obstacle(3, 3)])
+    results = await service.replan_all()
+
+    assert results[reachable.route_id].plan.command.command_string == 'FFFFFF'
+    assert isinstance(results[blocked.route_id], NoRouteException)
+
+    # The blocked route stays active and recovers once the cell clears
+    repo.edit(removed=[Obstacle(3, 3)])
+    recovered = await service.replan(blocked.route_id)
+    assert recovered.plan.final_position.point == Point(3, 3)
+
+
+async def test_budget_exhaustion_resumes_on_next_replan():
+    stats = PlannerStats()
+    repo = _VersionedRepository()
+    service, _ = _service(repo, stats=stats)
+    route = await service.start(Point(0, 6))
+
+    repo.edit(added=[Obstacle(0, 3)])
+    with pytest.raises(RouteBudgetExceededException):
+        await service.replan(route.route_id, max_expansions=1)
+    assert stats.budget_exhausted == 1
+
+    resumed = await service.replan(route.route_id)
+    assert resumed.changed_cells == 0
+    assert resumed.plan.final_position.point == Point(0, 6)
+
+
+async def test_start_widens_box_when_walled_off():
+    wall = {Obstacle(x, 3) for x in range(-10, 10)}
+    repo = _VersionedRepository(wall)
+    service, _ = _service(repo)
+
+    route = await service.start(Point(0, 6))
+
+    assert len(repo.boxes) > 1
+    assert route.plan.final_position.point == Point(0, 6)
+
+
+async def test_routes_are_bounded_and_removable():
+    routes = ActiveRoutes(max_routes=2)
+    service, _ = _service(_VersionedRepository(), routes)
+    ids = [(await service.start(Point(0, i))).route_id for i in range(1, 4)]
+
+    assert list(routes) == ids[1:]
+    with pytest.raises(RouteNotFoundException):
+        await service.replan(ids[0])
+
+    service.stop(ids[1])
+    assert list(routes) == ids[2:]
+    with pytest.raises(RouteNotFoundException):
+        service.stop(ids[1])
@@ -0,0 +1,118 @@
+"""Tests for RoutePlannerService"""
+
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.application.route_service import PlannerStats, RoutePlannerService
+from app.domain.entities import Command, Direction, Obstacle, Point, Position
+from app.domain.exceptions import NoRouteException, RouteBudgetExceededException
+from app.domain.services import execute_commands
+
+START = Position(Point(0, 0), Direction.NORTH)
+
+
+class _BoxRepository:
+    """Answers box queries only, like the database repository"""
+
+    def __init__(self, obstacles):
+        self.obstacles = obstacles
+        self.boxes = []
+
+    async def get_version(self) -> str:
+        return 'db1'
+
+    async def get_obstacles_in_box(self, min_x, min_y, max_x, max_y):
+        self.boxes.append((min_x, min_y, max_x, max_y))
+        return {
+            o for o in self.obstacles if min_x <= o.x <= max_x and min_y <= o.y <= max_y
+        }
+
+
+def _service(obstacles, margin=2, stats=None):
+    position_service = AsyncMock()
+    position_service.get_current_position.return_value = START
+    command_service = AsyncMock()
+    command_service.execute_command.side_effect = lambda command: execute_commands(
+        command, START, obstacles
+    )
+    repo = _BoxRepository(obstacles)
+    service = RoutePlannerService(
+        position_service, repo, command_service, stats=stats, margin=margin
+    )
+    return service, repo, command_service
+
+
+async def test_plan_without_execution():
+    stats = PlannerStats()
+    service, _, command_service = _service({Obstacle(0, 2)}, stats=stats)
+
+    route = await service.plan(Point(0, 4), Direction.EAST)
+
+    assert route.start == START
+    assert route.obstacle_map_version == 'db1'
+    assert route.result is None
+    assert route.plan.final_position == Position(Point(0, 4), Direction.EAST)
+    command_service.execute_command.assert_not_called()
+    assert stats.plans == 1
+    assert stats.expansions == route.plan.expansions > 0
+
+
+async def test_plan_and_execute():
+    obstacles = {Obstacle(0, 2)}
+    service, _, command_service = _service(obstacles)
+
+    route = await service.plan(Point(0, 4), execute=True)
+
+    command_service.execute_command.assert_awaited_once_with(route.plan.command)
+    assert route.result.final_position.point == Point(0, 4)
+    assert not route.result.stopped_by_obstacle
+
+
+async def test_empty_route_is_not_executed():
+    service, _, command_service = _service(set())
+
+    route = await service.plan(Point(0, 0), execute=True)
+
+    assert route.plan.command == Command('')
+    assert route.result is None
+    command_service.execute_command.assert_not_called()
+
+
+async def test_search_widens_when_box_is_walled_off():
+    # A wall across the first box, open only far to the east
+    wall = {Obstacle(x, 2) for x in range(-100, 20)}
+    service, repo, _ = _service(wall)
+
+    route = await service.plan(Point(0, 4))
+
+    assert len(repo.boxes) > 1
+    assert repo.boxes[0] == (-2, -2, 2, 6)
+    result = execute_commands(route.plan.command, START, wall)
+    assert result.final_position.point == Point(0, 4)
+    assert not result.stopped_by_obstacle
+
+
+async def test_blocked_target_fails_without_search():
+    stats = PlannerStats()
+    service, repo, _ = _service({Obstacle(3, 3)}, stats=stats)
+
+    with pytest.raises(NoRouteException):
+        await service.plan(Point(3, 3))
+
+    assert len(repo.boxes) == 1
+    assert stats.failures == 1
+
+
+async def test_budget_is_shared_across_attempts():
+    stats = PlannerStats()
+    wall = {Obstacle(x, 2) for x in range(-100, 20)}
+    service, _, _ = _service(wall, stats=stats)
+
+    with pytest.raises(RouteBudgetExceededException) as error:
+        await service.plan(Point(0, 4), max_expansions=20)
+
+    assert error.value.expansions == 20
+    assert stats.budget_exhausted == 1
+    assert stats.expansions == 20
+    assert stats.plans == 0
@@ -0,0 +1,110 @@
+"""Tests for SimulationService"""
+
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.application.simulation_service import SimulationService
+from app.domain.compact import execute_compact
+from app.domain.entities import (
+    Command,
+    CompactCommand,
+    Direction,
+    Obstacle,
+    Point,
+    Position,
+)
+from app.domain.exceptions import LandingObstacleException
+from app.domain.services import execute_commands
+
+
+# Fixtures
+@pytest.fixture
+def mock_position_service():
+    mock = AsyncMock()
+    mock.get_current_position.return_value = Position(Point(0, 0), Direction.NORTH)
+    return mock
+
+
+@pytest.fixture
+def simulation_service(mock_position_service, mock_obstacle_repo):
+    mock_obstacle_repo.get_obstacles.return_value = {Obstacle(0, 3), Obstacle(2, 0)}
+    return SimulationService(mock_position_service, mock_obstacle_repo)
+
+
+async def test_simulate_from_current_position(simulation_service, mock_obstacle_repo):
+    """Test that plain and compact candidates keep their input order"""
+
+    start = Position(Point(0, 0), Direction.NORTH)
+    obstacles = mock_obstacle_repo.get_obstacles.return_value
+    commands = [Command('FFFF'), CompactCommand('(RF)x2'), Command('RFF'), Command('')]
+
+    results = await simulation_service.simulate(commands)
+
+    assert results == [
+        execute_commands(commands[0], start, obstacles),
+        execute_compact(commands[1], start, obstacles),
+        execute_commands(commands[2], start, obstacles),
+        execute_commands(commands[3], start, obstacles),
+    ]
+    assert results[0].stopped_by_obstacle is True
+
+
+async def test_simulate_from_supplied_position(
+    simulation_service, mock_position_service
+):
+    """Test that a supplied start pose overrides the current position"""
+
+    start = Position(Point(5, 5), Direction.EAST)
+
+    results = await simulation_service.simulate([Command('FF')], start)
+
+    assert results[0].final_position == Position(Point(7, 5), Direction.EAST)
+    mock_position_service.get_current_position.assert_not_called()
+
+
+async def test_simulate_landing_obstacle(simulation_service):
+    with pytest.raises(LandingObstacleException):
+        await simulation_service.simulate(
+            [Command('F')], Position(Point(0, 3), Direction.NORTH)
+        )
+
+
+async def test_simulate_shards_across_executor(
+    mock_position_service, mock_obstacle_repo
+):
+    """Test that a large batch is split across the supplied pool"""
+
+    obstacles = {Obstacle(0, 3), Obstacle(2, 0)}
+    mock_obstacle_repo.get_obstacles.return_value = obstacles
+    start = Position(Point(0, 0), Direction.NORTH)
+    commands = [Command('F' * i + 'RF') for i in range(10)]
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        service = SimulationService(
+            mock_position_service, mock_obstacle_repo, executor, shard_size=3
+        )
+        results = await service.simulate(commands)
+
+    assert results == [
+        execute_commands(command, start, obstacles) for command in commands
+    ]
+
+
+async def test_simulate_prunes_database_obstacles(mock_position_service):
+    """Test that a pruning service queries the box all candidates can reach"""
+
+    obstacle_repo = AsyncMock()
+    obstacle_repo.get_version.return_value = 'v1'
+    obstacle_repo.get_obstacles_in_box.return_value = {Obstacle(0, 2)}
+    service = SimulationService(
+        mock_position_service, obstacle_repo, prune_obstacles=True
+    )
+
+    results = await service.simulate([Command('FFF'), CompactCommand('RF4')])
+
+    obstacle_repo.get_obstacles_in_box.assert_awaited_once_with(0, 0, 4, 3)
+    obstacle_repo.get_obstacles.assert_not_called()
+    assert results[0].final_position == Position(Point(0, 1), Direction.NORTH)
+    assert results[1].final_position == Position(Point(4, 0), Direction.EAST)
@@ -0,0 +1,91 @@
+"""Tests for SpatialQueryService"""
+
+import pytest
+
+from app.application.spatial_service import SpatialQueryService
+from app.domain.entities import Obstacle
+from app.domain.grid import OccupancyGrid
+from app.domain.snapshot import ObstacleSnapshot
+
+CELLS = {(0, 5), (3, 4), (-2, -2), (10, 0), (40, 40)}
+OBSTACLES = {Obstacle(x, y) for x, y in CELLS}
+
+
+class _BoxRepository:
+    """Answers box queries only, like the database repository"""
+
+    def __init__(self, obstacles):
+        self.obstacles = obstacles
+        self.boxes = []
+
+    async def get_version(self) -> str:
+        return 'db1'
+
+    async def get_obstacles_in_box(self, min_x, min_y, max_x, max_y):
+        self.boxes.append((min_x, min_y, max_x, max_y))
+        return {
+            o for o in self.obstacles if min_x <= o.x <= max_x and min_y <= o.y <= max_y
+        }
+
+
+def _services():
+    snapshot = ObstacleSnapshot(OBSTACLES, 'v1')
+    grid = OccupancyGrid(OBSTACLES, (-5, -5, 50, 50), 'g1')
+    return [
+        SpatialQueryService(_BoxRepository(OBSTACLES), lambda: snapshot),
+        # Grids have no k-d tree and fall back to box queries
+        SpatialQueryService(_BoxRepository(grid), lambda: grid),
+        SpatialQueryService(_BoxRepository(OBSTACLES)),
+    ]
+
+
+@pytest.mark.parametrize('service', _services())
+async def test_queries_agree_across_backends(service):
+    box = await service.in_box((-5, -5, 5, 5), limit=10)
+    assert box.cells == [(-2, -2), (0, 5), (3, 4)]
+    assert not box.truncated
+
+    within = await service.within_radius(0, 0, 5, limit=10)
+    assert within.cells == [(-2, -2), (0, 5), (3, 4)]
+
+    nearest = await service.nearest(9, 1, k=2)
+    assert nearest.cells == [(10, 0), (3, 4)]
+
+    everything = await service.nearest(0, 0, k=10)
+    assert len(everything.cells) == len(CELLS)
+
+
+async def test_indexed_queries_report_map_version():
+    snapshot = ObstacleSnapshot(OBSTACLES, 'v1')
+    service = SpatialQueryService(_BoxRepository(set()), lambda: snapshot)
+
+    result = await service.nearest(0, 0, k=1)
+
+    assert result.version == 'v1'
+    assert result.cells == [(-2, -2)]
+
+
+async def test_results_are_truncated_to_limit():
+    service = SpatialQueryService(_BoxRepository(OBSTACLES))
+
+    box = await service.in_box((-100, -100, 100, 100), limit=2)
+    within = await service.within_radius(0, 0, 100, limit=2)
+
+    assert box.truncated and len(box.cells) == 2
+    assert box.version == 'db1'
+    assert within.truncated and within.cells == [(-2, -2), (0, 5)]
+
+
+async def test_nearest_widens_box_until_enough_cells():
+    repo = _BoxRepository(OBSTACLES)
+    service = SpatialQueryService(repo)
+
+    result = await service.nearest(40, 39, k=1)
+
+    assert result.cells == [(40, 40)]
+    assert repo.boxes[0] == (39, 38, 41, 40)
+    assert len(repo.boxes) == 1
+
+    far = await service.nearest(100, 100, k=1)
+    assert far.cells == [(40, 40)]
+    assert len(repo.boxes) > 2
@@ -0,0 +1,128 @@
+import pytest
+
+from app.domain.compact import execute_compact, reach_envelope
+from app.domain.compiler import OPCODE_CHARS, RunNode
+from app.domain.entities import (
+    Command,
+    CompactCommand,
+    Direction,
+    Obstacle,
+    Point,
+    Position,
+)
+from app.domain.exceptions import LandingObstacleException
+from app.domain.services import execute_commands
+
+
+def _expand(nodes) -> str:
+    parts = []
+    for node in nodes:
+        if isinstance(node, RunNode):
+            parts.append(OPCODE_CHARS[node.op] * node.count)
+        else:
+            parts.append(_expand(node.body) * node.count)
+    return ''.join(parts)
+
+
+START = Position(Point(0, 0), Direction.NORTH)
+
+OBSTACLE_SETS = [
+    set(),
+    {Obstacle(0, 7)},
+    {Obstacle(3, 2), Obstacle(-1, 5), Obstacle(2, -2)},
+    {Obstacle(x, 9) for x in range(-10, 11)},
+]
+
+
+@pytest.mark.parametrize(
+    'command_string',
+    [
+        'F100',
+        'F3R2B4L',
+        '(FFRFFR)x50',
+        '(FR)x7',
+        '(FL2)x9',
+        '(F2R)x21L(BR3F)x5',
+        '((FB)x2R3)x7',
+        '(F(RF)x3L2)x13',
+        '(FFRFL)x40',
+    ],
+)
+@pytest.mark.parametrize('obstacles', OBSTACLE_SETS)
+def test_execute_compact_matches_expanded_execution(command_string, obstacles):
+    command = CompactCommand(command_string)
+    expanded = execute_commands(Command(_expand(command.program)), START, obstacles)
+
+    result = execute_compact(command, START, obstacles)
+
+    assert result.final_position == expanded.final_position
+    assert result.stopped_by_obstacle == expanded.stopped_by_obstacle
+    assert (
+        _expand(result.executed_command.program)
+        == expanded.executed_command.command_string
+    )
+    assert result.initial_command == command
+
+
+def test_execute_compact_skips_long_loops():
+    # Closed square repeated 10**8 times, then a long drifting staircase
+    command = CompactCommand('(FFRFFRFFRFFR)x100000000(FRFL)x10000000')
+
+    result = execute_compact(command, START, {Obstacle(-5, -5)})
+
+    assert result.stopped_by_obstacle is False
+    assert result.final_position == Position(
+        Point(10_000_000, 10_000_000), Direction.NORTH
+    )
+    assert list(result.path) == [result.final_position]
+
+
+def test_execute_compact_stops_inside_drifting_loop():
+    command = CompactCommand('(FRFL)x1000000')
+
+    result = execute_compact(command, START, {Obstacle(500, 500)})
+
+    assert result.stopped_by_obstacle is True
+    assert result.final_position == Position(Point(499, 500), Direction.EAST)
+    assert result.executed_command == CompactCommand('(FRFL)x499FR')
+
+
+def test_execute_compact_empty_and_landing():
+    result = execute_compact(CompactCommand(''), START, set())
+    assert result.final_position == START
+    assert len(result.path) == 0
+
+    with pytest.raises(LandingObstacleException):
+        execute_compact(CompactCommand('F'), START, {Obstacle(0, 0)})
+
+
+@pytest.mark.parametrize(
+    'command',
+    [
+        Command('FFRFF'),
+        Command('BBLLFFFRB'),
+        CompactCommand('(F2R)x4'),
+        CompactCommand('(FFRFL)x40B3'),
+        CompactCommand('(F(RF)x3L2)x13'),
+    ],
+)
+def test_reach_envelope_covers_unobstructed_route(command):
+    start = Position(Point(5, -2), Direction.EAST)
+    expanded = Command(
+        command.command_string
+        if isinstance(command, Command)
+        else _expand(command.program)
+    )
+    path = execute_commands(expanded, start, set()).path
+    cells = [start.point] + [p.point for p in path]
+
+    assert reach_envelope(command, start) == (
+        min(c.x for c in cells),
+        min(c.y for c in cells),
+        max(c.x for c in cells),
+        max(c.y for c in cells),
+    )
+
+
+def test_reach_envelope_of_turns_is_start_cell():
+    assert reach_envelope(Command('LRRL'), START) == (0, 0, 0, 0)
@@ -0,0 +1,129 @@
+import pickle
+
+import pytest
+
+from app.domain.compiler import (
+    OP_BACKWARD,
+    OP_FORWARD,
+    OP_LEFT,
+    OP_RIGHT,
+    RepeatNode,
+    RunNode,
+    compile_command,
+    format_compact,
+    parse_compact,
+    truncate_compact,
+)
+from app.domain.entities import Command, CompactCommand
+
+
+def test_compile_command_encodes_opcodes():
+    program = compile_command('FBLRF')
+
+    assert bytes(program.opcodes) == bytes(
+        [OP_FORWARD, OP_BACKWARD, OP_LEFT, OP_RIGHT, OP_FORWARD]
+    )
+    assert len(program) == 5
+    assert program.decode() == 'FBLRF'
+
+
+@pytest.mark.parametrize('invalid_input', ['FfLR', 'FFXLR', 'F1', 'FЖ', ' F'])
+def test_compile_command_rejects_invalid_characters(invalid_input):
+    with pytest.raises(ValueError, match='Invalid command characters'):
+        compile_command(invalid_input)
+
+
+def test_runs_metadata():
+    program = compile_command('FFFLLBR')
+
+    assert program.runs() == [
+        (OP_FORWARD, 0, 3),
+        (OP_LEFT, 3, 2),
+        (OP_BACKWARD, 5, 1),
+        (OP_RIGHT, 6, 1),
+    ]
+    assert compile_command('').runs() == []
+
+
+def test_truncate_is_a_view():
+    program = compile_command('FFRBB')
+
+    truncated = program.truncate(3)
+
+    assert isinstance(truncated.opcodes, memoryview)
+    assert truncated.opcodes.obj is program.opcodes
+    assert truncated.decode() == 'FFR'
+    assert truncated.runs() == [(OP_FORWARD, 0, 2), (OP_RIGHT, 2, 1)]
+    with pytest.raises(ValueError):
+        program.truncate(-1)
+
+
+def test_compiled_command_pickles_truncated_view():
+    truncated = compile_command('FFRBB').truncate(2)
+
+    restored = pickle.loads(pickle.dumps(truncated))
+
+    assert restored.decode() == 'FF'
+
+
+def test_command_truncate_reuses_program():
+    command = Command('FFLRB')
+
+    truncated = command.truncate(2)
+
+    assert truncated == Command('FF')
+    assert truncated.program.opcodes.obj is command.program.opcodes
+    assert pickle.loads(pickle.dumps(truncated)) == truncated
+
+
+def test_parse_compact_runs_and_groups():
+    nodes = parse_compact('F100(FFRFFR)x500L')
+
+    assert nodes[0] == RunNode(OP_FORWARD, 100)
+    assert nodes[1] == RepeatNode(
+        (RunNode(OP_FORWARD, 1), RunNode(OP_FORWARD, 1), RunNode(OP_RIGHT, 1)) * 2,
+        500,
+        3000,
+    )
+    assert nodes[2] == RunNode(OP_LEFT, 1)
+    assert sum(node.steps for node in nodes) == 3101
+
+
+@pytest.mark.parametrize(
+    'command_string', ['F100(FFRFFR)x500L', '((FB)x2R3)x7', 'B(L)', '']
+)
+def test_format_compact_round_trip(command_string):
+    assert format_compact(parse_compact(command_string)) == command_string
+
+
+@pytest.mark.parametrize(
+    'invalid_input,message',
+    [
+        ('F0', 'Count must be positive'),
+        ('(F', r'Unmatched "\("'),
+        ('F)', r'Unmatched "\)"'),
+        ('()x2', 'Empty group'),
+        ('Fx2', 'Invalid compact command character'),
+        ('f', 'Invalid compact command character'),
+        ('(F1000000)x1000000', 'expands to more than'),
+    ],
+)
+def test_parse_compact_rejects_invalid_input(invalid_input, message):
+    with pytest.raises(ValueError, match=message):
+        parse_compact(invalid_input)
+
+
+def test_truncate_compact_keeps_whole_iterations():
+    nodes = parse_compact('F100(FFRFFR)x500')
+
+    assert format_compact(truncate_compact(nodes, 120)) == 'F100(FFRFFR)x3FF'
+    assert format_compact(truncate_compact(nodes, 50)) == 'F50'
+    assert truncate_compact(nodes, 0) == ()
+
+
+def test_compact_command_truncate():
+    command = CompactCommand('(FL)x10')
+
+    assert command.steps == 20
+    assert command.truncate(5) == CompactCommand('(FL)x2F')
+    assert CompactCommand('').is_empty()
@@ -0,0 +1,123 @@
+import random
+
+import pytest
+
+from app.domain.dstar import DStarLite
+from app.domain.entities import Direction, Obstacle, Point, Position
+from app.domain.exceptions import (
+    LandingObstacleException,
+    NoRouteException,
+    RouteBudgetExceededException,
+)
+from app.domain.services import execute_commands
+
+from .test_planner import BOX, _shortest
+
+
+def _obstacles(cells):
+    return {Obstacle(x, y) for x, y in cells}
+
+
+def test_route_follows_turn_semantics():
+    start = Position(Point(0, 0), Direction.NORTH)
+    planner = DStarLite(start, Point(3, 0), BOX, [], Direction.EAST)
+
+    assert planner.plan(start).command.command_string == 'RFFF'
+
+
+def test_blocking_the_route_repairs_it():
+    start = Position(Point(0, 0), Direction.NORTH)
+    planner = DStarLite(start, Point(0, 4), BOX, [])
+    assert planner.plan(start).command.command_string == 'FFFF'
+
+    assert planner.update_obstacles(added=[Obstacle(0, 2)]) == 1
+    plan = planner.plan(start)
+
+    assert len(plan.command.command_string) == _shortest(
+        start, (0, 4), {(0, 2)}, BOX, None
+    )
+    result = execute_commands(plan.command, start, {Obstacle(0, 2)})
+    assert result.final_position.point == Point(0, 4)
+
+    assert planner.update_obstacles(removed=[Obstacle(0, 2)]) == 1
+    assert planner.plan(start).command.command_string == 'FFFF'
+
+
+def test_unrelated_changes_cost_no_expansions():
+    start = Position(Point(0, 0), Direction.NORTH)
+    planner = DStarLite(start, Point(0, 4), BOX, [])
+    planner.plan(start)
+
+    # Outside the box, already blocked, or off every shortest route
+    assert planner.update_obstacles(added=[Obstacle(100, 100)]) == 0
+    planner.update_obstacles(added=[Obstacle(8, -5)])
+    assert planner.plan(start).expansions < 10
+    moved = Position(Point(0, 2), Direction.NORTH)
+    assert planner.plan(moved).command.command_string == 'FF'
+
+
+def test_failures():
+    start = Position(Point(0, 0), Direction.NORTH)
+    planner = DStarLite(start, Point(0, 4), BOX, [Obstacle(0, 4)])
+
+    with pytest.raises(NoRouteException):
+        planner.plan(start)
+    planner.update_obstacles(removed=[Obstacle(0, 4)], added=[Obstacle(0, 0)])
+    with pytest.raises(LandingObstacleException):
+        planner.plan(start)
+    with pytest.raises(ValueError):
+        planner.plan(Position(Point(50, 0), Direction.NORTH))
+
+
+def test_search_resumes_after_budget():
+    start = Position(Point(-6, -5), Direction.NORTH)
+    planner = DStarLite(start, Point(8, 7), BOX, [])
+
+    with pytest.raises(RouteBudgetExceededException):
+        planner.plan(start, max_expansions=10)
+    plan = planner.plan(start)
+
+    assert len(plan.command.command_string) == 14 + 12 + 1
+
+
+@pytest.mark.parametrize('seed', range(30))
+def test_repaired_routes_are_shortest(seed):
+    rng = random.Random(seed)
+    min_x, min_y, max_x, max_y = BOX
+    cells = {
+        (rng.randint(min_x, max_x), rng.randint(min_y, max_y))
+        for _ in range(rng.randint(0, 60))
+    }
+    free = [
+        (x, y)
+        for x in range(min_x, max_x + 1)
+        for y in range(min_y, max_y + 1)
+        if (x, y) not in cells
+    ]
+    source, target = rng.sample(free, 2)
+    start = Position(Point(*source), rng.choice(list(Direction)))
+    direction = rng.choice([None, *Direction])
+    planner = DStarLite(start, Point(*target), BOX, _obstacles(cells), direction)
+
+    for _ in range(5):
+        expected = _shortest(start, target, cells, BOX, direction)
+        if expected is None:
+            with pytest.raises(NoRouteException):
+                planner.plan(start)
+        else:
+            plan = planner.plan(start)
+            assert len(plan.command.command_string) == expected
+            result = execute_commands(plan.command, start, _obstacles(cells))
+            assert not result.stopped_by_obstacle
+            assert result.final_position == plan.final_position
+            assert result.final_position.coordinates() == target
+            # Drive part of the way before the map changes
+            if result.path:
+                start = rng.choice(list(result.path))
+
+        added = {
+            (rng.randint(min_x, max_x), rng.randint(min_y, max_y)) for _ in range(4)
+        } - {(start.x, start.y)}
+        removed = set(rng.sample(sorted(cells), min(len(cells), 4)))
+        cells = (cells | added) - removed
+        planner.update_obstacles(_obstacles(added), _obstacles(removed))
@@ -0,0 +1,164 @@
+import random
+from concurrent.futures import Executor, ThreadPoolExecutor
+from unittest.mock import Mock
+
+import pytest
+
+from app.domain import fleet
+from app.domain.entities import Command, Direction, Obstacle, Point, Position
+from app.domain.exceptions import LandingObstacleException
+from app.domain.fleet import simulate_fleet
+from app.domain.grid import OccupancyGrid
+from app.domain.services import execute_commands
+from app.domain.snapshot import ObstacleSnapshot
+
+
+def _random_fleet(rng: random.Random, size: int, obstacles: set[Obstacle]):
+    rovers = []
+    while len(rovers) < size:
+        start = Position(
+            Point(rng.randint(-15, 15), rng.randint(-15, 15)),
+            Direction(rng.randint(0, 3)),
+        )
+        if start.point in obstacles:
+            continue
+        command = Command(''.join(rng.choices('FFBLR', k=rng.randint(0, 40))))
+        rovers.append((start, command))
+    return rovers
+
+
+@pytest.fixture
+def scenario():
+    rng = random.Random(11)
+    obstacles = {
+        Obstacle(rng.randint(-15, 15), rng.randint(-15, 15)) for _ in range(80)
+    }
+    return _random_fleet(rng, 60, obstacles), obstacles
+
+
+def test_simulate_fleet_matches_single_rover_execution(scenario):
+    pytest.importorskip('numpy')
+    rovers, obstacles = scenario
+
+    results = simulate_fleet(rovers, obstacles)
+
+    assert results == [
+        execute_commands(command, start, obstacles) for start, command in rovers
+    ]
+
+
+def test_simulate_fleet_on_snapshot_and_grid(scenario, monkeypatch):
+    """Snapshots reuse their sorted keys; grids are never encoded"""
+    pytest.importorskip('numpy')
+    rovers, obstacles = scenario
+    expected = [
+        execute_commands(command, start, obstacles) for start, command in rovers
+    ]
+    snapshot = ObstacleSnapshot(obstacles, 'v1')
+
+    assert simulate_fleet(rovers, snapshot) == expected
+    assert simulate_fleet(rovers, snapshot) == expected
+    assert list(snapshot.sorted_keys) == sorted(snapshot.keys)
+
+    def fail(obstacles):
+        raise AssertionError('grid was encoded')
+
+    monkeypatch.setattr(fleet, 'encode_obstacles', fail)
+    grid = OccupancyGrid(obstacles, (-16, -16, 16, 16))
+
+    assert simulate_fleet(rovers, grid) == expected
+
+
+def test_simulate_fleet_without_numpy(scenario, monkeypatch):
+    rovers, obstacles = scenario
+    monkeypatch.setattr(fleet, 'np', None)
+
+    results = simulate_fleet(rovers, obstacles)
+
+    assert results == [
+        execute_commands(command, start, obstacles) for start, command in rovers
+    ]
+
+
+def test_simulate_fleet_sharded_across_processes(scenario):
+    rovers, obstacles = scenario
+
+    results = simulate_fleet(rovers, obstacles, processes=2, shard_size=25)
+
+    assert results == simulate_fleet(rovers, obstacles)
+
+
+def test_simulate_fleet_ships_map_once_per_worker(scenario, monkeypatch):
+    rovers, obstacles = scenario
+    pools = []
+
+    class RecordingPool(ThreadPoolExecutor):
+        def __init__(self, max_workers, initializer, initargs):
+            super().__init__(max_workers, initializer=initializer, initargs=initargs)
+            self.initargs = initargs
+            self.tasks = []
+            pools.append(self)
+
+        def map(self, fn, *iterables):
+            self.tasks.extend(zip(*iterables, strict=True))
+            return super().map(fn, *iterables)
+
+    monkeypatch.setattr(fleet, 'ProcessPoolExecutor', RecordingPool)
+    # The pool's threads set the worker map of this process
+    monkeypatch.setattr(fleet, '_worker_obstacles', None)
+
+    results = simulate_fleet(rovers, obstacles, processes=2, shard_size=25)
+
+    (pool,) = pools
+    assert pool.initargs == (obstacles,)
+    # Tasks carry only their shard
+    assert [task for (task,) in pool.tasks] == [
+        rovers[i : i + 25] for i in range(0, len(rovers), 25)
+    ]
+    assert results == simulate_fleet(rovers, obstacles)
+
+
+def test_simulate_fleet_executor_only_for_lockstep(scenario, monkeypatch):
+    rovers, obstacles = scenario
+    executor = Mock(spec=Executor)
+    grid = OccupancyGrid(obstacles, (-16, -16, 16, 16))
+
+    # Per-rover execution holds the GIL, so the pool is bypassed
+    results = simulate_fleet(rovers, grid, shard_size=25, executor=executor)
+    monkeypatch.setattr(fleet, 'np', None)
+    plain = simulate_fleet(rovers, obstacles, shard_size=25, executor=executor)
+
+    executor.map.assert_not_called()
+    assert (
+        results
+        == plain
+        == [execute_commands(command, start, obstacles) for start, command in rovers]
+    )
+
+
+def test_simulate_fleet_landing_obstacle():
+    rovers = [
+        (Position(Point(0, 0), Direction.NORTH), Command('F')),
+        (Position(Point(2, 2), Direction.NORTH), Command('F')),
+    ]
+
+    with pytest.raises(LandingObstacleException):
+        simulate_fleet(rovers, {Obstacle(2, 2)})
+
+
+def test_simulate_fleet_empty():
+    assert simulate_fleet([], set()) == []
+
+
+def test_simulate_fleet_off_the_plane():
+    """Test that rovers crossing the int32 edge match execute_commands"""
+    obstacles = {Obstacle(1, -(2**31)), Obstacle(5, 5)}
+    rovers = [
+        (Position(Point(0, 2**31 - 1), Direction.NORTH), Command('FF')),
+        (Position(Point(5, 3), Direction.NORTH), Command('FFF')),
+    ]
+
+    results = simulate_fleet(rovers, obstacles)
+
+    assert results == [execute_commands(c, p, obstacles) for p, c in rovers]
+    assert results[0].final_position.point == Point(0, 2**31 + 1)
@@ -0,0 +1,111 @@
+import pickle
+import random
+
+import pytest
+
+from app.domain.compact import execute_compact
+from app.domain.entities import (
+    Command,
+    CompactCommand,
+    Direction,
+    Obstacle,
+    Point,
+    Position,
+)
+from app.domain.exceptions import LandingObstacleException
+from app.domain.grid import OccupancyGrid
+from app.domain.pose import pack_point
+from app.domain.services import (
+    execute_commands,
+    execute_commands_iter,
+    execute_commands_runlength,
+)
+
+OBSTACLES = {Obstacle(0, 3), Obstacle(2, 2), Obstacle(-1, 0), Obstacle(50, 50)}
+
+
+@pytest.fixture
+def grid():
+    """Grid around the origin; (50, 50) lies outside and stays sparse"""
+    return OccupancyGrid(OBSTACLES, bounds=(-5, -5, 5, 5), version='v1')
+
+
+def test_grid_is_a_set(grid):
+    assert grid == OBSTACLES
+    assert set(grid) == OBSTACLES
+    assert len(grid) == 4
+    assert grid.outside == {pack_point(50, 50)}
+    assert Obstacle(2, 2) in grid
+    assert Obstacle(2, 3) not in grid
+    assert 'v1' in repr(grid)
+
+
+def test_contains(grid):
+    assert grid.contains(0, 3)
+    assert grid.contains(50, 50)
+    assert not grid.contains(5, 5)
+    assert not grid.contains(-6, 0)
+    assert pack_point(-1, 0) in grid
+    assert pack_point(1, 0) not in grid
+
+
+def test_bounds_default_to_obstacles():
+    grid = OccupancyGrid(OBSTACLES)
+
+    assert grid.bounds == (-1, 0, 50, 50)
+    assert not grid.outside
+    assert grid == OBSTACLES
+
+
+def test_empty_grid():
+    grid = OccupancyGrid([])
+
+    assert len(grid) == 0
+    assert not grid.contains(0, 0)
+
+
+@pytest.mark.parametrize('bounds', [(1, 0, 0, 0), (0, 0, 2**20, 2**20)])
+def test_invalid_bounds(bounds):
+    with pytest.raises(ValueError):
+        OccupancyGrid(OBSTACLES, bounds=bounds)
+
+
+def test_pickle(grid):
+    restored = pickle.loads(pickle.dumps(grid))
+
+    assert restored == OBSTACLES
+    assert restored.bounds == grid.bounds
+    assert restored.version == 'v1'
+
+
+def test_landing_on_obstacle(grid):
+    start = Position(Point(2, 2), Direction.NORTH)
+
+    with pytest.raises(LandingObstacleException):
+        execute_commands(Command('F'), start, grid)
+
+
+def test_engines_match_set_across_bounds():
+    rng = random.Random(3)
+    obstacles = {
+        Obstacle(rng.randint(-15, 15), rng.randint(-15, 15)) for _ in range(60)
+    }
+    obstacles.discard(Obstacle(0, 0))
+    grid = OccupancyGrid(obstacles, bounds=(-8, -6, 8, 6))
+    start = Position(Point(0, 0), Direction.NORTH)
+
+    for _ in range(100):
+        command = Command(''.join(rng.choices('FFFBLR', k=60)))
+        expected = execute_commands(command, start, obstacles)
+
+        result = execute_commands(command, start, grid)
+        assert result.path == expected.path
+        assert result.stopped_by_obstacle == expected.stopped_by_obstacle
+        runlength = execute_commands_runlength(command, start, grid)
+        assert runlength.final_position == expected.final_position
+        chunks = list(execute_commands_iter(command, start, grid, chunk_size=7))
+        assert sum(len(chunk) for chunk in chunks) == len(expected.path)
+
+    compact = execute_compact(CompactCommand('F20'), start, grid)
+    expected = execute_commands(Command('F' * 20), start, obstacles)
+    assert compact.final_position == expected.final_position
@@ -0,0 +1,94 @@
+import random
+
+import pytest
+
+from app.domain.entities import Obstacle
+from app.domain.kdtree import KDTree, SpatialIndex, distance2
+
+
+def _by_distance(x, y):
+    return lambda cell: (distance2(x, y, cell), cell[0], cell[1])
+
+
+def _random_cells(rng: random.Random, n: int) -> set[tuple[int, int]]:
+    return {(rng.randint(-30, 30), rng.randint(-30, 30)) for _ in range(n)}
+
+
+def test_empty_tree():
+    tree = KDTree(())
+
+    assert len(tree) == 0
+    assert list(tree.in_box(-10, -10, 10, 10)) == []
+    assert tree.nearest(0, 0, 3) == []
+
+
+def test_nearest_breaks_ties_by_coordinates():
+    tree = KDTree([(1, 0), (0, 1), (-1, 0), (0, -1), (5, 5)])
+
+    assert tree.nearest(0, 0, 3) == [(-1, 0), (0, -1), (0, 1)]
+    assert tree.nearest(0, 0, 2, skip={(-1, 0)}) == [(0, -1), (0, 1)]
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_queries_match_brute_force(seed):
+    rng = random.Random(seed)
+    cells = _random_cells(rng, rng.randint(0, 400))
+    index = SpatialIndex.from_obstacles(Obstacle(x, y) for x, y in cells)
+
+    for _ in range(20):
+        x, y = rng.randint(-40, 40), rng.randint(-40, 40)
+        min_x, max_x = sorted(rng.sample(range(-35, 35), 2))
+        min_y, max_y = sorted(rng.sample(range(-35, 35), 2))
+        radius, k = rng.randint(0, 20), rng.randint(1, 20)
+        key = _by_distance(x, y)
+
+        assert index.in_box(min_x, min_y, max_x, max_y) == sorted(
+            c for c in cells if min_x <= c[0] <= max_x and min_y <= c[1] <= max_y
+        )
+        assert index.within_radius(x, y, radius) == sorted(
+            (c for c in cells if distance2(x, y, c) <= radius * radius), key=key
+        )
+        assert index.nearest(x, y, k) == sorted(cells, key=key)[:k]
+
+
+def test_limits_truncate_results():
+    index = SpatialIndex.from_obstacles(Obstacle(x, 0) for x in range(100))
+
+    assert len(index.in_box(0, 0, 99, 0, limit=10)) == 10
+    assert index.within_radius(50, 0, 10, limit=3) == [(50, 0), (49, 0), (51, 0)]
+
+
+@pytest.mark.parametrize('delta_limit', [0, 5, 1_000])
+def test_updates_follow_edits(delta_limit):
+    rng = random.Random(delta_limit)
+    cells = _random_cells(rng, 200)
+    index = SpatialIndex.from_obstacles(
+        (Obstacle(x, y) for x, y in cells), delta_limit=delta_limit
+    )
+
+    for _ in range(10):
+        added = _random_cells(rng, 8) - cells
+        removed = set(rng.sample(sorted(cells), 8))
+        index = index.updated(
+            [Obstacle(*c) for c in added], [Obstacle(*c) for c in removed]
+        )
+        cells = (cells - removed) | added
+
+        assert len(index) == len(cells)
+        assert index.pending <= delta_limit
+        assert index.in_box(-30, -30, 30, 30) == sorted(cells)
+        assert index.nearest(0, 0, 10) == sorted(cells, key=_by_distance(0, 0))[:10]
+
+
+def test_update_leaves_previous_index_unchanged():
+    index = SpatialIndex.from_obstacles([Obstacle(1, 1), Obstacle(2, 2)])
+
+    updated = index.updated([Obstacle(3, 3)], [Obstacle(1, 1)])
+
+    assert index.in_box(0, 0, 5, 5) == [(1, 1), (2, 2)]
+    assert updated.in_box(0, 0, 5, 5) == [(2, 2), (3, 3)]
+    assert updated.pending == 2
+    # Re-adding a removed cell unmasks it instead of adding it twice
+    restored = updated.updated([Obstacle(1, 1)], [Obstacle(3, 3)])
+    assert restored.pending == 0
+    assert restored.in_box(0, 0, 5, 5) == [(1, 1), (2, 2)]
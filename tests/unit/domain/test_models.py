@@ -2,6 +2,8 @@
 
 import pytest
 
+from app.domain import entities
+from app.domain.compiler import compile_command
 from app.domain.entities import (
     Command,
     CommandResult,
@@ -9,6 +11,7 @@ from app.domain.entities import (
     Obstacle,
     Point,
     Position,
+    PositionPath,
 )
 
 
@@ -98,6 +101,20 @@ def test_command_validation_errors(invalid_input, expected_error):
         Command(invalid_input)
 
 
+def test_command_validates_supplied_program(monkeypatch):
+    """Test that a supplied program never bypasses validation"""
+    with pytest.raises(ValueError):
+        Command('ff', compile_command('FF'))
+    assert Command('FF', compile_command('LL')).program.decode() == 'FF'
+
+    # Truncation reuses the validated opcodes without compiling again
+    command = Command('FFLR')
+    monkeypatch.setattr(entities, 'compile_command', None)
+    truncated = command.truncate(3)
+    assert truncated.command_string == 'FFL'
+    assert truncated.program.decode() == 'FFL'
+
+
 def test_command_result_basic_functionality():
     """Test CommandResult creation and basic functionality"""
     point = Point(1, 2)
@@ -115,3 +132,43 @@ def test_command_result_basic_functionality():
     assert result.stopped_by_obstacle is False
     assert result.executed_command == command
     assert result.initial_command == command
+
+
+def test_position_path_sequence_behaviour():
+    """Test PositionPath length, indexing, iteration and slicing"""
+    positions = [
+        Position(Point(0, 1), Direction.NORTH),
+        Position(Point(0, 1), Direction.EAST),
+        Position(Point(-1, 1), Direction.EAST),
+    ]
+    path = PositionPath.from_positions(positions)
+
+    assert len(path) == 3
+    assert path[0] == positions[0]
+    assert path[-1] == positions[-1]
+    assert path[-1].direction is Direction.EAST
+    assert list(path) == positions
+    assert path == positions
+
+    head = path[:2]
+    assert isinstance(head, PositionPath)
+    assert head == positions[:2]
+    assert head != path
+
+
+def test_position_path_storage_and_equality():
+    """Test PositionPath column storage and comparison with other types"""
+    path = PositionPath()
+    assert not path
+    assert path == []
+
+    path.append(2, -3, Direction.SOUTH)
+    assert path
+    assert path.xs.typecode == 'q'
+    assert path.xs.tolist() == [2]
+    assert path.ys.tolist() == [-3]
+    assert bytes(path.directions) == bytes([Direction.SOUTH])
+    assert path == PositionPath.from_positions(
+        [Position(Point(2, -3), Direction.SOUTH)]
+    )
+    assert path != 'F'
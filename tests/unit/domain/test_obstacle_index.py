@@ -0,0 +1,113 @@
+import random
+
+import pytest
+
+from app.domain.entities import Obstacle
+from app.domain.obstacle_index import (
+    ObstacleIndex,
+    SortedObstacleIndex,
+    obstacles_in_box,
+)
+
+
+@pytest.fixture(params=[ObstacleIndex, SortedObstacleIndex.from_obstacles])
+def index(request):
+    """Index with obstacles on row 0 and column 0"""
+    return request.param({Obstacle(5, 0), Obstacle(-3, 0), Obstacle(0, 4)})
+
+
+def test_contains(index):
+    assert index.contains(5, 0)
+    assert index.contains(0, 4)
+    assert not index.contains(4, 0)
+    assert not index.contains(100, 100)
+    assert len(index) == 3
+
+
+@pytest.mark.parametrize(
+    'dx,dy,steps,expected',
+    [
+        (1, 0, 10, 4),  # East: obstacle at x=5
+        (-1, 0, 10, 2),  # West: obstacle at x=-3
+        (0, 1, 10, 3),  # North: obstacle at y=4
+        (0, -1, 10, 10),  # South: free column
+        (1, 0, 2, 2),  # Run shorter than distance to obstacle
+    ],
+)
+def test_free_steps_from_origin(index, dx, dy, steps, expected):
+    assert index.free_steps(0, 0, dx, dy, steps) == expected
+
+
+def test_free_steps_ignores_obstacles_behind(index):
+    # Moving east from beyond the obstacle at x=5
+    assert index.free_steps(6, 0, 1, 0, 100) == 100
+    # Moving west from beyond the obstacle at x=-3
+    assert index.free_steps(-4, 0, -1, 0, 100) == 100
+
+
+def test_free_steps_adjacent_obstacle(index):
+    assert index.free_steps(4, 0, 1, 0, 3) == 0
+
+
+@pytest.mark.parametrize(
+    'box,expected',
+    [
+        ((-2, -2, 2, 2), False),  # Around the origin
+        ((-3, 0, -3, 0), True),  # Single obstacle cell
+        ((0, 1, 0, 10), True),  # Column through (0, 4)
+        ((1, -5, 100, -1), False),  # Empty quadrant
+        ((4, -1, 6, 5), True),  # Box around (5, 0)
+    ],
+)
+def test_any_in_box(index, box, expected):
+    assert index.any_in_box(*box) is expected
+
+
+def test_sorted_index_matches_line_index():
+    rng = random.Random(7)
+    obstacles = {
+        Obstacle(rng.randint(-20, 20), rng.randint(-20, 20)) for _ in range(150)
+    }
+    expected = ObstacleIndex(obstacles)
+    index = SortedObstacleIndex.from_obstacles(obstacles)
+
+    for _ in range(2000):
+        x, y = rng.randint(-25, 25), rng.randint(-25, 25)
+        dx, dy = rng.choice([(1, 0), (-1, 0), (0, 1), (0, -1)])
+        steps = rng.randint(0, 50)
+        assert index.contains(x, y) == expected.contains(x, y)
+        assert index.free_steps(x, y, dx, dy, steps) == expected.free_steps(
+            x, y, dx, dy, steps
+        )
+        box = (x, y, x + rng.randint(0, 8), y + rng.randint(0, 8))
+        assert index.any_in_box(*box) == expected.any_in_box(*box)
+
+
+def test_sorted_index_keeps_lines_apart():
+    # Neighbouring columns hold the extreme y values of the int32 range
+    index = SortedObstacleIndex.from_obstacles(
+        {Obstacle(0, 2**31 - 1), Obstacle(1, -(2**31))}
+    )
+
+    assert index.free_steps(0, 0, 0, 1, 10) == 10
+    assert index.free_steps(1, 0, 0, -1, 10) == 10
+    assert index.contains(1, -(2**31))
+    assert not index.any_in_box(0, -5, 1, 5)
+
+
+def test_bounds(index):
+    assert index.bounds() == (-3, 0, 5, 4)
+    assert ObstacleIndex(set()).bounds() is None
+    assert SortedObstacleIndex.from_obstacles(set()).bounds() is None
+
+
+def test_obstacles_in_box(index):
+    whole = frozenset({Obstacle(5, 0), Obstacle(-3, 0), Obstacle(0, 4)})
+
+    assert obstacles_in_box(index, 0, 0, 10, 10) == {Obstacle(5, 0), Obstacle(0, 4)}
+    # A box covering the whole map returns the map itself
+    assert obstacles_in_box(index, -3, 0, 5, 4, whole=whole) is whole
+    assert obstacles_in_box(index, -3, 0, 5, 3, whole=whole) == {
+        Obstacle(5, 0),
+        Obstacle(-3, 0),
+    }
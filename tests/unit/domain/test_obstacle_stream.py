@@ -0,0 +1,59 @@
+import pytest
+
+from app.domain.obstacle_stream import MAX_LINE_LENGTH, ObstacleStreamParser
+
+
+def _parse(fmt: str, data: bytes, chunk_size: int) -> list[tuple[int, int]]:
+    parser = ObstacleStreamParser(fmt)
+    cells = []
+    for i in range(0, len(data), chunk_size):
+        cells += parser.feed(data[i : i + chunk_size])
+    return cells + parser.close()
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 7, 1024])
+def test_ndjson_lines_split_across_chunks(chunk_size):
+    data = b'[1, 2]\n{"x": -3, "y": 4}\n\n[5,6]\r\n[7,8]'
+
+    assert _parse('ndjson', data, chunk_size) == [(1, 2), (-3, 4), (5, 6), (7, 8)]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 5, 1024])
+def test_csv_header_and_comments(chunk_size):
+    data = b'x,y\n1,2\n# survey 7\n\n-3,4\n'
+
+    assert _parse('csv', data, chunk_size) == [(1, 2), (-3, 4)]
+
+
+def test_counts_lines_and_rows():
+    parser = ObstacleStreamParser('csv')
+    parser.feed(b'x,y\n1,2\n3,4\n')
+
+    assert (parser.lines, parser.rows) == (3, 2)
+
+
+@pytest.mark.parametrize(
+    'fmt, data',
+    [
+        ('ndjson', b'[1, 2]\n[1, 2, 3]\n'),
+        ('ndjson', b'{"x": 1.5, "y": 2}\n'),
+        ('ndjson', b'[1, 2147483648]\n'),
+        ('csv', b'1,2\nx,y\n'),
+        ('csv', b'1;2\n3;4\n'),
+    ],
+)
+def test_invalid_lines(fmt, data):
+    with pytest.raises(ValueError, match='Line 2|Line 1'):
+        _parse(fmt, data, 1024)
+
+
+def test_line_too_long():
+    parser = ObstacleStreamParser('ndjson')
+
+    with pytest.raises(ValueError, match='too long'):
+        parser.feed(b'1' * (MAX_LINE_LENGTH + 1))
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        ObstacleStreamParser('xml')
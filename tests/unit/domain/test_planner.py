@@ -0,0 +1,166 @@
+import random
+from collections import deque
+
+import pytest
+
+from app.domain.entities import DIR_VECTORS, Direction, Obstacle, Point, Position
+from app.domain.exceptions import (
+    LandingObstacleException,
+    NoRouteException,
+    RouteBudgetExceededException,
+)
+from app.domain.planner import plan_route
+from app.domain.regions import Rect
+from app.domain.services import execute_commands
+from app.domain.snapshot import ObstacleSnapshot, RegionObstacles
+
+BOX = (-6, -5, 8, 7)
+
+
+def _shortest(start, target, blocked, box, direction):
+    """Length of the shortest command by breadth-first search over poses"""
+    min_x, min_y, max_x, max_y = box
+    origin = (start.x, start.y, int(start.direction))
+    seen = {origin: 0}
+    queue = deque([origin])
+    while queue:
+        pose = queue.popleft()
+        x, y, d = pose
+        if (x, y) == target and (direction is None or d == direction):
+            return seen[pose]
+        dx, dy = DIR_VECTORS[d]
+        for nxt in (
+            (x, y, (d + 1) % 4),
+            (x, y, (d - 1) % 4),
+            (x + dx, y + dy, d),
+            (x - dx, y - dy, d),
+        ):
+            inside = min_x <= nxt[0] <= max_x and min_y <= nxt[1] <= max_y
+            if inside and (nxt[0], nxt[1]) not in blocked and nxt not in seen:
+                seen[nxt] = seen[pose] + 1
+                queue.append(nxt)
+    return None
+
+
+def _drive(plan, start, obstacles):
+    result = execute_commands(plan.command, start, obstacles)
+    assert not result.stopped_by_obstacle
+    assert result.final_position == plan.final_position
+    return result
+
+
+def test_open_ground_is_crossed_in_few_expansions():
+    start = Position(Point(0, 0), Direction.NORTH)
+    target = Point(1_000_000, -500_000)
+
+    plan = plan_route(start, target, set(), (-10, -500_010, 1_000_010, 10))
+
+    assert len(plan.command.command_string) == 1_500_001
+    assert plan.expansions < 10
+    assert _drive(plan, start, set()).final_position.point == target
+
+
+def test_turns_follow_position_semantics():
+    start = Position(Point(0, 0), Direction.NORTH)
+
+    plan = plan_route(start, Point(0, 0), set(), BOX, Direction.WEST)
+    assert plan.command.command_string == 'L'
+
+    plan = plan_route(start, Point(3, 0), set(), BOX, Direction.EAST)
+    assert plan.command.command_string == 'RFFF'
+
+
+def test_routes_around_a_long_region():
+    obstacles = RegionObstacles(rects=[Rect(500, -100_000, 510, 100_000)])
+    start = Position(Point(0, 0), Direction.EAST)
+    target = Point(1_000, 0)
+
+    plan = plan_route(start, target, obstacles, (-10, -100_100, 1_100, 100_100))
+
+    assert plan.expansions < 100
+    assert len(plan.command.command_string) == 1_000 + 2 * 100_001 + 3
+    assert _drive(plan, start, obstacles).final_position.point == target
+
+
+def test_start_and_target_checks():
+    obstacles = {Obstacle(1, 0)}
+    start = Position(Point(0, 0), Direction.NORTH)
+
+    with pytest.raises(LandingObstacleException):
+        plan_route(Position(Point(1, 0), Direction.NORTH), Point(0, 0), obstacles, BOX)
+    with pytest.raises(NoRouteException):
+        plan_route(start, Point(1, 0), obstacles, BOX)
+    with pytest.raises(ValueError):
+        plan_route(start, Point(100, 0), obstacles, BOX)
+
+
+def test_enclosed_target_is_unreachable():
+    ring = {Obstacle(x, y) for x in range(2, 7) for y in range(-1, 4)} - {
+        Obstacle(x, y) for x in range(3, 6) for y in range(0, 3)
+    }
+    start = Position(Point(0, 0), Direction.NORTH)
+
+    with pytest.raises(NoRouteException) as error:
+        plan_route(start, Point(4, 1), ring, BOX)
+    assert error.value.expansions > 0
+
+
+def test_budget_is_enforced():
+    wall = {Obstacle(2, y) for y in range(-5, 7)}
+    start = Position(Point(0, 0), Direction.NORTH)
+
+    with pytest.raises(RouteBudgetExceededException) as error:
+        plan_route(start, Point(5, 0), wall, BOX, max_expansions=3)
+    assert error.value.expansions == 3
+
+
+@pytest.mark.parametrize('seed', range(40))
+def test_routes_are_shortest(seed):
+    rng = random.Random(seed)
+    min_x, min_y, max_x, max_y = BOX
+    cells = {
+        (rng.randint(min_x, max_x), rng.randint(min_y, max_y))
+        for _ in range(rng.randint(0, 70))
+    }
+    rects = []
+    if seed % 2:
+        for _ in range(3):
+            x, y = rng.randint(min_x, max_x), rng.randint(min_y, max_y)
+            rects.append(Rect(x, y, x + rng.randint(0, 4), y + rng.randint(0, 3)))
+    blocked = set(cells)
+    for r in rects:
+        blocked.update(
+            (x, y)
+            for x in range(r.min_x, r.max_x + 1)
+            for y in range(r.min_y, r.max_y + 1)
+        )
+    free = [
+        (x, y)
+        for x in range(min_x, max_x + 1)
+        for y in range(min_y, max_y + 1)
+        if (x, y) not in blocked
+    ]
+    source, target = rng.sample(free, 2)
+    start = Position(Point(*source), rng.choice(list(Direction)))
+    direction = rng.choice([None, *Direction])
+    obstacles = (
+        RegionObstacles({Obstacle(*c) for c in cells}, rects)
+        if rects
+        else ObstacleSnapshot(Obstacle(*c) for c in cells)
+    )
+    expected = _shortest(start, target, blocked, BOX, direction)
+
+    if expected is None:
+        with pytest.raises(NoRouteException):
+            plan_route(start, Point(*target), obstacles, BOX, direction)
+        return
+    plan = plan_route(start, Point(*target), obstacles, BOX, direction)
+    assert len(plan.command.command_string) == expected
+    result = _drive(plan, start, obstacles)
+    assert result.final_position.coordinates() == target
+    assert direction is None or result.final_position.direction == direction
+    assert all(min_x <= p.x <= max_x and min_y <= p.y <= max_y for p in result.path)
+
+    weighted = plan_route(start, Point(*target), obstacles, BOX, direction, weight=2)
+    assert len(weighted.command.command_string) <= 2 * expected
+    _drive(weighted, start, obstacles)
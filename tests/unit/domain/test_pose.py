@@ -0,0 +1,55 @@
+import pytest
+
+from app.domain.entities import DIR_VECTORS, Direction, Point, Position
+from app.domain.pose import (
+    STEP_X,
+    STEP_Y,
+    TURN_LEFT,
+    TURN_RIGHT,
+    in_plane,
+    materialize,
+    pack_obstacles,
+    pack_point,
+    reach_in_plane,
+    unpack_point,
+)
+
+
+@pytest.mark.parametrize(
+    'x,y',
+    [(0, 0), (1, 2), (-1, 2), (3, -4), (-5, -6), (2**31 - 1, -(2**31))],
+)
+def test_pack_unpack_roundtrip(x, y):
+    assert unpack_point(pack_point(x, y)) == (x, y)
+
+
+def test_step_tables_match_direction_vectors():
+    assert tuple(zip(STEP_X, STEP_Y, strict=True)) == DIR_VECTORS
+
+
+def test_turn_tables_match_position_turns():
+    for direction in Direction:
+        position = Position(Point(0, 0), direction)
+        assert TURN_LEFT[direction] == position.turn_left().direction
+        assert TURN_RIGHT[direction] == position.turn_right().direction
+
+
+def test_pack_obstacles_and_materialize():
+    keys = pack_obstacles({Point(1, -1), Point(-2, 3)})
+
+    assert keys == {pack_point(1, -1), pack_point(-2, 3)}
+    assert materialize(pack_point(-2, 3), 3) == Position(Point(-2, 3), Direction.WEST)
+    assert materialize(pack_point(0, 0), 0).direction is Direction.NORTH
+
+
+def test_pack_obstacles_rejects_cells_off_the_plane():
+    # (0, 2**32) would share the key of (1, 0)
+    with pytest.raises(ValueError, match='int32'):
+        pack_obstacles({Point(0, 2**32)})
+
+
+def test_plane_checks():
+    assert in_plane(2**31 - 1, -(2**31))
+    assert not in_plane(0, 2**31)
+    assert reach_in_plane(0, 0, 10)
+    assert not reach_in_plane(0, 2**31 - 5, 10)
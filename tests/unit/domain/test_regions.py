@@ -0,0 +1,200 @@
+import pickle
+import random
+
+import pytest
+
+from app.domain.compact import execute_compact
+from app.domain.entities import (
+    Command,
+    CompactCommand,
+    Direction,
+    Obstacle,
+    Point,
+    Position,
+)
+from app.domain.exceptions import LandingObstacleException
+from app.domain.fleet import simulate_fleet
+from app.domain.pose import pack_point
+from app.domain.regions import Rect, RegionIndex, merge_spans
+from app.domain.services import (
+    execute_commands,
+    execute_commands_iter,
+    execute_commands_runlength,
+)
+from app.domain.snapshot import ObstacleSnapshot, RegionObstacles
+
+
+def _expand(cells, rects) -> set[Obstacle]:
+    expanded = set(cells)
+    for r in rects:
+        for x in range(r.min_x, r.max_x + 1):
+            for y in range(r.min_y, r.max_y + 1):
+                expanded.add(Obstacle(x, y))
+    return expanded
+
+
+def _random_map(rng: random.Random) -> tuple[set[Obstacle], list[Rect]]:
+    rects = []
+    for _ in range(rng.randint(0, 6)):
+        x, y = rng.randint(-15, 15), rng.randint(-15, 15)
+        rects.append(Rect(x, y, x + rng.randint(0, 6), y + rng.randint(0, 6)))
+    cells = {
+        Obstacle(rng.randint(-20, 20), rng.randint(-20, 20))
+        for _ in range(rng.randint(0, 30))
+    }
+    return cells, rects
+
+
+def test_rect_rejects_empty_bounds():
+    with pytest.raises(ValueError):
+        Rect(1, 0, 0, 0)
+
+
+def test_rect_clip():
+    rect = Rect(0, 0, 9, 9)
+
+    assert rect.clip(5, -5, 20, 3) == Rect(5, 0, 9, 3)
+    assert rect.clip(10, 0, 20, 9) is None
+
+
+def test_merge_spans_joins_overlapping_and_adjacent():
+    assert merge_spans([(5, 6), (0, 2), (3, 3), (8, 9), (9, 12)]) == [
+        (0, 3),
+        (5, 6),
+        (8, 12),
+    ]
+
+
+def test_region_index_runs():
+    index = RegionIndex([Rect(2, 0, 4, 0), Rect(3, -2, 3, 5)])
+
+    assert index.contains(3, 5)
+    assert not index.contains(5, 0)
+    assert index.free_steps(0, 0, 1, 0, 10) == 1
+    assert index.free_steps(9, 0, -1, 0, 10) == 4
+    assert index.free_steps(3, 9, 0, -1, 10) == 3
+    assert index.free_steps(3, 9, 0, -1, 2) == 2
+    assert index.free_steps(0, 1, 1, 0, 10) == 2
+    assert index.free_steps(0, 6, 1, 0, 10) == 10
+    assert index.bounds() == (2, -2, 4, 5)
+    assert len(index) == 10
+
+
+def test_region_obstacles_is_a_set():
+    obstacles = RegionObstacles(
+        [Obstacle(0, 0), Obstacle(1, 1)], [Rect(1, 1, 2, 2)], version='v1'
+    )
+
+    assert obstacles == {
+        Obstacle(0, 0),
+        Obstacle(1, 1),
+        Obstacle(1, 2),
+        Obstacle(2, 1),
+        Obstacle(2, 2),
+    }
+    assert len(obstacles) == 5
+    assert Obstacle(2, 2) in obstacles
+    assert pack_point(2, 1) in obstacles
+    assert Obstacle(3, 3) not in obstacles
+    assert 'v1' in repr(obstacles)
+    assert pickle.loads(pickle.dumps(obstacles)) == obstacles
+
+
+def test_region_obstacles_within_clips_regions():
+    obstacles = RegionObstacles([Obstacle(9, 9)], [Rect(0, 0, 1_000_000, 1)])
+
+    within = obstacles.within(-5, -5, 5, 5)
+
+    assert within.rects == (Rect(0, 0, 5, 1),)
+    assert within == {Obstacle(x, y) for x in range(6) for y in range(2)}
+    assert obstacles.within(-5, -5, 1_000_000, 10) is obstacles
+
+
+def test_large_region_is_not_expanded():
+    obstacles = RegionObstacles(rects=[Rect(1_000, -(10**9), 2_000, 10**9)])
+    start = Position(Point(0, 0), Direction.EAST)
+
+    result = execute_commands(Command('F' * 5_000), start, obstacles)
+
+    assert result.stopped_by_obstacle
+    assert result.final_position == Position(Point(999, 0), Direction.EAST)
+
+
+def test_landing_in_region_is_rejected():
+    obstacles = RegionObstacles(rects=[Rect(-1, -1, 1, 1)])
+
+    with pytest.raises(LandingObstacleException):
+        execute_commands(
+            Command('F'), Position(Point(0, 0), Direction.NORTH), obstacles
+        )
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_lookups_match_expanded_cells(seed):
+    rng = random.Random(seed)
+    cells, rects = _random_map(rng)
+    obstacles = RegionObstacles(cells, rects)
+    expected = _expand(cells, rects)
+
+    assert obstacles == expected
+    assert len(obstacles) == len(expected)
+    for _ in range(50):
+        x, y = rng.randint(-25, 25), rng.randint(-25, 25)
+        assert obstacles.contains(x, y) == (Obstacle(x, y) in expected)
+        for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+            steps = rng.randint(0, 40)
+            free = 0
+            while free < steps and (
+                Obstacle(x + dx * (free + 1), y + dy * (free + 1)) not in expected
+            ):
+                free += 1
+            assert obstacles.free_steps(x, y, dx, dy, steps) == free
+
+    min_x, max_x = sorted(rng.sample(range(-25, 25), 2))
+    min_y, max_y = sorted(rng.sample(range(-25, 25), 2))
+    inside = {o for o in expected if min_x <= o.x <= max_x and min_y <= o.y <= max_y}
+    assert obstacles.within(min_x, min_y, max_x, max_y) == inside
+    assert obstacles.any_in_box(min_x, min_y, max_x, max_y) == bool(inside)
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_engines_match_expanded_cells(seed):
+    rng = random.Random(seed)
+    cells, rects = _random_map(rng)
+    obstacles = RegionObstacles(cells, rects)
+    expanded = ObstacleSnapshot(_expand(cells, rects))
+
+    for _ in range(10):
+        start = Position(
+            Point(rng.randint(-25, 25), rng.randint(-25, 25)),
+            rng.choice(list(Direction)),
+        )
+        if Obstacle(start.x, start.y) in expanded:
+            continue
+        command = Command(''.join(rng.choices('FFFBLR', k=rng.randint(0, 60))))
+        expected = execute_commands(command, start, expanded)
+
+        for result in (
+            execute_commands(command, start, obstacles),
+            execute_commands_runlength(command, start, obstacles),
+        ):
+            assert result == expected
+            assert list(result.path) == list(expected.path)
+        compact = execute_compact(
+            CompactCommand(command.command_string), start, obstacles
+        )
+        assert compact.final_position == expected.final_position
+        assert compact.stopped_by_obstacle == expected.stopped_by_obstacle
+        assert simulate_fleet([(start, command)], obstacles) == [expected]
+
+        stream = execute_commands_iter(command, start, obstacles, chunk_size=7)
+        path = []
+        while True:
+            try:
+                path.extend(next(stream))
+            except StopIteration as stop:
+                result = stop.value
+                break
+        assert path == list(expected.path)
+        assert result.final_position == expected.final_position
+        assert result.executed_command == expected.executed_command
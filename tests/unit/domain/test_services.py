@@ -1,8 +1,16 @@
+import random
+
 import pytest
 
 from app.domain.entities import Command, Direction, Obstacle, Point, Position
 from app.domain.exceptions import LandingObstacleException
-from app.domain.services import execute_commands
+from app.domain.obstacle_index import ObstacleIndex
+from app.domain.services import (
+    canonicalize_command,
+    execute_commands,
+    execute_commands_iter,
+    execute_commands_runlength,
+)
 
 
 def test_execute_empty_command():
@@ -456,3 +464,178 @@ def test_only_turn_commands():
     assert result.stopped_by_obstacle is False
     assert result.initial_command == command
     assert len(result.path) == 6
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_runlength_engine_matches_scalar_engine(seed):
+    """Run-length engine returns the same result as the step-by-step engine"""
+    rng = random.Random(seed)
+    obstacles = {
+        Obstacle(rng.randint(-10, 10), rng.randint(-10, 10)) for _ in range(30)
+    }
+    obstacles.discard(Obstacle(0, 0))
+    start_position = Position(Point(0, 0), Direction(rng.randrange(4)))
+    command = Command(
+        ''.join(rng.choice('FFFFBBLR') * rng.randint(1, 6) for _ in range(20))
+    )
+
+    expected = execute_commands(command, start_position, obstacles)
+    result = execute_commands_runlength(command, start_position, obstacles)
+
+    assert result == expected
+
+
+def test_runlength_engine_with_prebuilt_index():
+    start_position = Position(Point(0, 0), Direction.NORTH)
+    obstacles = {Obstacle(0, 5)}
+    index = ObstacleIndex(obstacles)
+
+    result = execute_commands_runlength(
+        Command('F' * 20), start_position, obstacles, index=index
+    )
+
+    assert result.stopped_by_obstacle is True
+    assert result.executed_command.command_string == 'FFFF'
+    assert result.final_position == Position(Point(0, 4), Direction.NORTH)
+    assert len(result.path) == 4
+
+
+def test_runlength_engine_landing_obstacle():
+    start_position = Position(Point(2, 3), Direction.EAST)
+    obstacles = {Obstacle(2, 3)}
+
+    with pytest.raises(LandingObstacleException) as exc_info:
+        execute_commands_runlength(Command(''), start_position, obstacles)
+
+    assert exc_info.value.position == (2, 3)
+
+
+def _drain(steps):
+    """Collect yielded chunks and the returned result of execute_commands_iter"""
+    chunks = []
+    while True:
+        try:
+            chunks.append(next(steps))
+        except StopIteration as stop:
+            return chunks, stop.value
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 7, 1000])
+def test_iter_engine_matches_execute_commands(chunk_size):
+    """Chunks concatenate to the full path and the outcome matches"""
+    start_position = Position(Point(0, 0), Direction.NORTH)
+    obstacles = {Obstacle(0, 5), Obstacle(-3, 2)}
+    command = Command('FFLFFRFFFFFFRBB')
+
+    expected = execute_commands(command, start_position, obstacles)
+    chunks, result = _drain(
+        execute_commands_iter(command, start_position, obstacles, chunk_size)
+    )
+
+    assert all(0 < len(chunk) <= chunk_size for chunk in chunks)
+    assert [p for chunk in chunks for p in chunk] == list(expected.path)
+    assert result.path is None
+    assert result.final_position == expected.final_position
+    assert result.stopped_by_obstacle == expected.stopped_by_obstacle
+    assert result.executed_command == expected.executed_command
+    assert result.initial_command == command
+
+
+def test_iter_engine_empty_command():
+    start_position = Position(Point(1, 1), Direction.EAST)
+
+    chunks, result = _drain(execute_commands_iter(Command(''), start_position, set()))
+
+    assert chunks == []
+    assert result.final_position == start_position
+    assert result.stopped_by_obstacle is False
+
+
+def test_iter_engine_landing_obstacle_and_invalid_chunk_size():
+    start_position = Position(Point(0, 0), Direction.NORTH)
+
+    with pytest.raises(LandingObstacleException):
+        next(execute_commands_iter(Command('F'), start_position, {Obstacle(0, 0)}))
+
+    with pytest.raises(ValueError):
+        next(execute_commands_iter(Command('F'), start_position, set(), 0))
+
+
+@pytest.mark.parametrize(
+    'command_string,expected',
+    [
+        ('FLRF', 'FF'),
+        ('RRRR', ''),
+        ('RR', 'LL'),
+        ('RRR', 'L'),
+        ('FFFBB', 'F'),
+        ('FBLRBF', ''),
+        ('FRBBLRFL', 'FRBL'),
+        ('LLLLFFLRBRRRRF', 'FF'),
+    ],
+)
+def test_canonicalize_command(command_string, expected):
+    start_position = Position(Point(0, 0), Direction.NORTH)
+
+    canonical = canonicalize_command(Command(command_string), start_position, set())
+
+    assert canonical.canonical_command == Command(expected)
+    assert canonical.saved_steps == len(command_string) - len(expected)
+    assert canonical.stopped_by_obstacle is False
+
+
+def test_canonicalize_command_keeps_blocked_move():
+    start_position = Position(Point(0, 0), Direction.NORTH)
+    obstacles = {Obstacle(0, 3)}
+
+    canonical = canonicalize_command(Command('FFBFLRFFFRR'), start_position, obstacles)
+
+    assert canonical.canonical_command == Command('FFF')
+    assert canonical.stopped_by_obstacle is True
+    assert canonical.final_position == Position(Point(0, 2), Direction.NORTH)
+
+
+def test_canonicalize_command_preserves_outcome_randomized():
+    rng = random.Random(8)
+    start_position = Position(Point(0, 0), Direction.EAST)
+
+    for _ in range(300):
+        command = Command(''.join(rng.choices('FFBLR', k=rng.randint(0, 30))))
+        obstacles = {
+            Obstacle(rng.randint(-4, 4), rng.randint(-4, 4)) for _ in range(6)
+        } - {Obstacle(0, 0)}
+
+        canonical = canonicalize_command(command, start_position, obstacles)
+        original = execute_commands(command, start_position, obstacles)
+        rewritten = execute_commands(
+            canonical.canonical_command, start_position, obstacles
+        )
+
+        assert rewritten.final_position == original.final_position
+        assert rewritten.stopped_by_obstacle == original.stopped_by_obstacle
+        assert canonical.final_position == original.final_position
+
+
+def test_execute_commands_rejects_obstacles_off_the_plane():
+    """Test that an obstacle outside int32 is not aliased onto another cell"""
+    with pytest.raises(ValueError, match='int32'):
+        execute_commands(
+            Command('RF'),
+            Position(Point(0, 0), Direction.NORTH),
+            {Obstacle(0, 2**32)},
+        )
+
+
+def test_execute_commands_off_the_plane():
+    """Test that a rover crossing y = 2**31 is not blocked by an aliased key"""
+    start = Position(Point(0, 2**31 - 1), Direction.NORTH)
+    # (0, 2**31) packs to the key of (1, -2**31)
+    obstacles = {Obstacle(1, -(2**31))}
+
+    result = execute_commands(Command('FF'), start, obstacles)
+
+    assert not result.stopped_by_obstacle
+    assert result.final_position.point == Point(0, 2**31 + 1)
+    assert [p.y for p in result.path] == [2**31, 2**31 + 1]
+    runlength = execute_commands_runlength(Command('FF'), start, obstacles)
+    assert runlength.final_position == result.final_position
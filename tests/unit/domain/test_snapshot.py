@@ -0,0 +1,132 @@
+import pickle
+
+from app.domain.compact import execute_compact
+from app.domain.entities import (
+    Command,
+    CompactCommand,
+    Direction,
+    Obstacle,
+    Point,
+    Position,
+)
+from app.domain.grid import OccupancyGrid
+from app.domain.pose import pack_obstacles, pack_point
+from app.domain.services import execute_commands, execute_commands_runlength
+from app.domain.snapshot import (
+    ObstacleSnapshot,
+    PackedObstacles,
+    obstacle_index,
+    packed_keys,
+    spatial_index,
+)
+
+OBSTACLES = {Obstacle(0, 3), Obstacle(2, 2)}
+
+
+def test_snapshot_is_a_frozen_set_with_version():
+    snapshot = ObstacleSnapshot(OBSTACLES, 'v1')
+
+    assert snapshot == OBSTACLES
+    assert Obstacle(0, 3) in snapshot
+    assert snapshot.version == 'v1'
+    assert 'v1' in repr(snapshot)
+
+
+def test_derived_forms_are_built_once():
+    snapshot = ObstacleSnapshot(OBSTACLES, 'v1')
+
+    assert snapshot.keys == pack_obstacles(OBSTACLES)
+    assert packed_keys(snapshot) is snapshot.keys
+    assert obstacle_index(snapshot) is snapshot.index
+    assert snapshot.index.contains(2, 2)
+
+
+def test_helpers_accept_plain_sets():
+    assert packed_keys(OBSTACLES) == pack_obstacles(OBSTACLES)
+    assert obstacle_index(OBSTACLES).contains(0, 3)
+
+
+def test_snapshot_pickles_without_derived_forms():
+    snapshot = ObstacleSnapshot(OBSTACLES, 'v1')
+    assert snapshot.index.contains(0, 3)
+
+    restored = pickle.loads(pickle.dumps(snapshot))
+
+    assert restored == snapshot
+    assert restored.version == 'v1'
+    assert restored._index is None
+
+
+def test_engines_accept_snapshot():
+    snapshot = ObstacleSnapshot(OBSTACLES, 'v1')
+    start = Position(Point(0, 0), Direction.NORTH)
+
+    expected = execute_commands(Command('FFFRFF'), start, OBSTACLES)
+
+    for execute in (execute_commands, execute_commands_runlength):
+        result = execute(Command('FFFRFF'), start, snapshot)
+        assert result.final_position == expected.final_position
+        assert result.stopped_by_obstacle
+    compact = execute_compact(CompactCommand('F3RF2'), start, snapshot)
+    assert compact.final_position == expected.final_position
+
+
+def _packed(obstacles, version='v1') -> PackedObstacles:
+    xy = sorted(pack_point(o.x, o.y) for o in obstacles)
+    yx = sorted(pack_point(o.y, o.x) for o in obstacles)
+    return PackedObstacles(xy, yx, version)
+
+
+def test_packed_obstacles_is_a_set():
+    packed = _packed(OBSTACLES)
+
+    assert packed == OBSTACLES
+    assert set(packed) == OBSTACLES
+    assert len(packed) == 2
+    assert Obstacle(2, 2) in packed
+    assert Obstacle(2, 3) not in packed
+    assert (2, 2) not in packed
+    assert pack_point(0, 3) in packed_keys(packed)
+    assert obstacle_index(packed) is packed.index
+
+
+def test_packed_obstacles_pickle():
+    restored = pickle.loads(pickle.dumps(_packed(OBSTACLES)))
+
+    assert restored == OBSTACLES
+    assert restored.version == 'v1'
+
+
+def test_engines_accept_packed_obstacles():
+    packed = _packed(OBSTACLES)
+    start = Position(Point(0, 0), Direction.NORTH)
+
+    expected = execute_commands(Command('FFFRFF'), start, OBSTACLES)
+
+    for execute in (execute_commands, execute_commands_runlength):
+        result = execute(Command('FFFRFF'), start, packed)
+        assert result.final_position == expected.final_position
+        assert result.path == expected.path
+    compact = execute_compact(CompactCommand('F3RF2'), start, packed)
+    assert compact.final_position == expected.final_position
+
+
+def test_spatial_index_is_built_on_first_use():
+    snapshot = ObstacleSnapshot(OBSTACLES, 'v1')
+
+    assert snapshot.spatial_after([Obstacle(5, 5)], []) is None
+    assert spatial_index(snapshot) is snapshot.spatial
+    assert snapshot.spatial.nearest(0, 0, 1) == [(2, 2)]
+    assert spatial_index(OccupancyGrid(OBSTACLES, (0, 0, 9, 9))) is None
+
+
+def test_spatial_index_is_carried_across_edits():
+    snapshot = ObstacleSnapshot(OBSTACLES, 'v1')
+    _ = snapshot.spatial
+
+    spatial = snapshot.spatial_after([Obstacle(5, 5)], [Obstacle(2, 2)])
+    edited = ObstacleSnapshot({Obstacle(0, 3), Obstacle(5, 5)}, 'v2', spatial)
+
+    assert edited.spatial is spatial
+    assert edited.spatial.pending == 2
+    assert edited.spatial.in_box(0, 0, 9, 9) == [(0, 3), (5, 5)]
@@ -0,0 +1,129 @@
+import random
+
+import pytest
+
+from app.domain.compact import execute_compact
+from app.domain.entities import (
+    Command,
+    CompactCommand,
+    Direction,
+    Obstacle,
+    Point,
+    Position,
+)
+from app.domain.obstacle_index import ObstacleIndex, SortedObstacleIndex
+from app.domain.pose import pack_point
+from app.domain.services import execute_commands, execute_commands_runlength
+from app.domain.tiles import TiledObstacles, partition
+
+
+def _tiled(obstacles, tile_size=4, max_tiles=8) -> TiledObstacles:
+    tiles = partition(obstacles, tile_size)
+
+    def load_tile(tx, ty):
+        return SortedObstacleIndex.from_obstacles(tiles[tx, ty])
+
+    return TiledObstacles(
+        tile_size,
+        {key: len(cells) for key, cells in tiles.items()},
+        load_tile,
+        max_tiles=max_tiles,
+        version='v1',
+    )
+
+
+OBSTACLES = {Obstacle(0, 3), Obstacle(-1, -1), Obstacle(9, 0), Obstacle(100, 0)}
+
+
+def test_tiled_obstacles_is_a_set():
+    tiled = _tiled(OBSTACLES)
+
+    assert tiled == OBSTACLES
+    assert set(tiled) == OBSTACLES
+    assert len(tiled) == 4
+    assert Obstacle(-1, -1) in tiled
+    assert Obstacle(-1, 0) not in tiled
+    assert pack_point(100, 0) in tiled
+    assert 'v1' in repr(tiled)
+
+
+def test_bounds_cover_occupied_tiles():
+    assert _tiled(OBSTACLES).bounds() == (-4, -4, 103, 3)
+    assert _tiled(set()).bounds() is None
+
+
+def test_tiles_load_on_demand():
+    tiled = _tiled(OBSTACLES)
+
+    assert tiled.contains(0, 3)
+    assert not tiled.contains(50, 50)
+    assert tiled.contains(0, 3)
+
+    stats = tiled.stats()
+    assert (stats.loads, stats.hits, stats.tiles) == (1, 1, 1)
+
+
+def test_lru_evicts_least_recently_used_tile():
+    tiled = _tiled(OBSTACLES, max_tiles=2)
+
+    tiled.contains(0, 3)
+    tiled.contains(-1, -1)
+    tiled.contains(0, 3)
+    tiled.contains(9, 0)
+
+    stats = tiled.stats()
+    assert (stats.loads, stats.evictions, stats.tiles) == (3, 1, 2)
+    # (-1, -1) was evicted and is loaded again
+    tiled.contains(-1, -1)
+    assert tiled.stats().loads == 4
+
+
+def test_free_steps_skips_empty_tiles():
+    tiled = _tiled(OBSTACLES)
+
+    assert tiled.free_steps(10, 0, 1, 0, 1000) == 89
+    assert tiled.free_steps(101, 0, 1, 0, 10**9) == 10**9
+    assert tiled.free_steps(0, -50, 0, 1, 1000) == 52
+    # Only the tiles on the run's line are loaded
+    assert tiled.stats().loads == 3
+
+
+def test_queries_match_line_index():
+    rng = random.Random(11)
+    obstacles = {
+        Obstacle(rng.randint(-30, 30), rng.randint(-30, 30)) for _ in range(200)
+    }
+    expected = ObstacleIndex(obstacles)
+    tiled = _tiled(obstacles, tile_size=5, max_tiles=3)
+
+    for _ in range(2000):
+        x, y = rng.randint(-35, 35), rng.randint(-35, 35)
+        dx, dy = rng.choice([(1, 0), (-1, 0), (0, 1), (0, -1)])
+        steps = rng.randint(0, 70)
+        assert tiled.contains(x, y) == expected.contains(x, y)
+        assert tiled.free_steps(x, y, dx, dy, steps) == expected.free_steps(
+            x, y, dx, dy, steps
+        )
+        box = (x, y, x + rng.randint(0, 12), y + rng.randint(0, 12))
+        assert tiled.any_in_box(*box) == expected.any_in_box(*box)
+        assert set(tiled.cells_in_box(*box)) == set(expected.cells_in_box(*box))
+
+
+def test_engines_accept_tiled_obstacles():
+    tiled = _tiled(OBSTACLES)
+    start = Position(Point(0, 0), Direction.EAST)
+
+    expected = execute_commands(Command('FFFFFFFFFFLF'), start, OBSTACLES)
+
+    for execute in (execute_commands, execute_commands_runlength):
+        result = execute(Command('FFFFFFFFFFLF'), start, tiled)
+        assert result.final_position == expected.final_position
+        assert result.stopped_by_obstacle
+    compact = execute_compact(CompactCommand('F10LF'), start, tiled)
+    assert compact.final_position == expected.final_position
+
+
+@pytest.mark.parametrize('tile_size,max_tiles', [(0, 1), (4, 0)])
+def test_invalid_settings(tile_size, max_tiles):
+    with pytest.raises(ValueError):
+        TiledObstacles(tile_size, {}, lambda tx, ty: None, max_tiles=max_tiles)
@@ -0,0 +1,85 @@
+import random
+
+import pytest
+
+from app.domain.compact import execute_compact
+from app.domain.entities import (
+    Command,
+    CompactCommand,
+    Direction,
+    Point,
+    Position,
+)
+from app.domain.services import execute_commands
+from app.domain.transforms import (
+    IDENTITY,
+    CompactTransforms,
+    Transform,
+    TransformTree,
+    build_transforms,
+)
+
+START = Position(Point(3, -2), Direction.WEST)
+
+
+def _poses(command_string: str) -> list[Position]:
+    result = execute_commands(Command(command_string), START, set())
+    return [START, *result.path]
+
+
+def test_transform_compose_and_inverse():
+    step = Transform(2, -1, 1)
+
+    assert step.then(step.inverse()) == IDENTITY
+    assert step.inverse().then(step) == IDENTITY
+    assert step.power(4) == step.then(step).then(step).then(step)
+    assert step.power(0) == IDENTITY
+
+
+def test_transform_apply():
+    # Two steps forward and one to the right, then face right
+    position = Transform(2, 1, 1).apply(Position(Point(0, 0), Direction.NORTH))
+
+    assert position == Position(Point(1, 2), Direction.EAST)
+
+
+def test_transform_tree_matches_replay():
+    rng = random.Random(9)
+
+    for _ in range(50):
+        command_string = ''.join(rng.choices('FBLR', k=rng.randint(0, 80)))
+        poses = _poses(command_string)
+        tree = TransformTree(Command(command_string).program)
+
+        assert len(tree) == len(command_string)
+        for _ in range(20):
+            start = rng.randint(0, len(command_string))
+            stop = rng.randint(start, len(command_string))
+            assert tree.prefix(stop).apply(START) == poses[stop]
+            assert tree.range(start, stop).apply(poses[start]) == poses[stop]
+
+
+@pytest.mark.parametrize(
+    'command_string', ['(FFRFFR)x50', '((FB)x2R3)x7(F2L)x5', '(F(RF)x3L2)x13']
+)
+def test_compact_transforms_match_execution(command_string):
+    command = CompactCommand(command_string)
+    transforms = build_transforms(command)
+
+    assert isinstance(transforms, CompactTransforms)
+    for step in range(command.steps + 1):
+        expected = execute_compact(command.truncate(step), START, set())
+        assert transforms.prefix(step).apply(START) == expected.final_position
+
+    middle = transforms.prefix(10).apply(START)
+    assert transforms.range(10, 30).apply(middle) == transforms.prefix(30).apply(START)
+
+
+@pytest.mark.parametrize('start,stop', [(-1, 2), (2, 1), (0, 6)])
+def test_transform_range_out_of_bounds(start, stop):
+    command = Command('FFRFF')
+
+    with pytest.raises(ValueError, match='outside'):
+        TransformTree(command.program).range(start, stop)
+    with pytest.raises(ValueError, match='outside'):
+        CompactTransforms(CompactCommand('FFRFF').program).range(start, stop)
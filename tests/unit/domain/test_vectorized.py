@@ -0,0 +1,74 @@
+import random
+
+import pytest
+
+from app.domain.entities import Command, Direction, Obstacle, Point, Position
+from app.domain.exceptions import LandingObstacleException
+from app.domain.services import execute_commands
+
+pytest.importorskip('numpy')
+
+from app.domain.vectorized import (  # noqa: E402
+    encode_obstacles,
+    execute_commands_vectorized,
+)
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_vectorized_engine_matches_scalar_engine(seed):
+    """Vectorized engine returns the same result as the step-by-step engine"""
+    rng = random.Random(seed)
+    obstacles = {
+        Obstacle(rng.randint(-10, 10), rng.randint(-10, 10)) for _ in range(30)
+    }
+    obstacles.discard(Obstacle(0, 0))
+    start_position = Position(Point(0, 0), Direction(rng.randrange(4)))
+    command = Command(''.join(rng.choice('FFFBLR') for _ in range(200)))
+
+    expected = execute_commands(command, start_position, obstacles)
+    result = execute_commands_vectorized(command, start_position, obstacles)
+
+    assert result == expected
+
+
+def test_vectorized_engine_negative_coordinates():
+    start_position = Position(Point(-5, -5), Direction.SOUTH)
+    obstacles = {Obstacle(-5, -9), Obstacle(-4, -5)}
+
+    result = execute_commands_vectorized(Command('FFFFF'), start_position, obstacles)
+
+    assert result.stopped_by_obstacle is True
+    assert result.executed_command.command_string == 'FFF'
+    assert result.final_position == Position(Point(-5, -8), Direction.SOUTH)
+
+
+def test_vectorized_engine_with_precomputed_keys():
+    start_position = Position(Point(0, 0), Direction.NORTH)
+    obstacles = {Obstacle(1, 1)}
+    keys = encode_obstacles(obstacles)
+
+    result = execute_commands_vectorized(
+        Command('FRF'), start_position, obstacles, obstacle_keys=keys
+    )
+
+    assert result.stopped_by_obstacle is True
+    assert result.executed_command.command_string == 'FR'
+    assert len(result.path) == 2
+
+
+def test_vectorized_engine_empty_command_and_empty_map():
+    start_position = Position(Point(0, 0), Direction.NORTH)
+
+    result = execute_commands_vectorized(Command(''), start_position, set())
+    assert result.path == []
+    assert result.final_position == start_position
+
+    result = execute_commands_vectorized(Command('LLB'), start_position, set())
+    assert result.final_position == Position(Point(0, 1), Direction.SOUTH)
+
+
+def test_vectorized_engine_landing_obstacle():
+    start_position = Position(Point(0, 0), Direction.NORTH)
+
+    with pytest.raises(LandingObstacleException):
+        execute_commands_vectorized(Command('F'), start_position, {Obstacle(0, 0)})
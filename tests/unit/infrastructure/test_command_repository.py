@@ -1,6 +1,13 @@
 from unittest.mock import AsyncMock, Mock
 
-from app.domain.entities import Command, CommandResult, Direction, Point, Position
+from app.domain.entities import (
+    Command,
+    CommandResult,
+    CompactCommand,
+    Direction,
+    Point,
+    Position,
+)
 from app.infrastructure.repositories.repo_command import RDBCommandRepository
 
 
@@ -24,3 +31,75 @@ async def test_save_command_returns_new_id():
 
     assert new_id == 99
     session.execute.assert_called_once()
+
+
+async def test_create_command_returns_new_id():
+    session = AsyncMock()
+    result_mock = Mock()
+    result_mock.scalar_one.return_value = 5
+    session.execute.return_value = result_mock
+
+    repo = RDBCommandRepository(session)
+
+    new_id = await repo.create_command(Command('FFL'))
+
+    assert new_id == 5
+    params = session.execute.call_args.args[0].compile().params
+    assert params['received_command'] == 'FFL'
+    assert params['executed_command'] == ''
+
+
+async def test_complete_command_updates_outcome():
+    session = AsyncMock()
+    repo = RDBCommandRepository(session)
+
+    command_result = CommandResult(
+        executed_command=Command('F'),
+        initial_command=Command('FF'),
+        final_position=Position(Point(0, 1), Direction.NORTH),
+        stopped_by_obstacle=True,
+    )
+
+    await repo.complete_command(5, command_result)
+
+    session.execute.assert_called_once()
+    params = session.execute.call_args.args[0].compile().params
+    assert params['executed_command'] == 'F'
+    assert params['stopped_by_obstacle'] is True
+
+
+async def test_get_command_rebuilds_plain_and_compact_commands():
+    session = AsyncMock()
+    result_mock = Mock()
+    result_mock.one_or_none.return_value = Mock(
+        received_command='(FR)x10',
+        executed_command='(FR)x3F',
+        stopped_by_obstacle=True,
+    )
+    session.execute.return_value = result_mock
+
+    repo = RDBCommandRepository(session)
+    stored = await repo.get_command(3)
+
+    assert stored.id == 3
+    assert stored.received_command == CompactCommand('(FR)x10')
+    assert stored.executed_command == CompactCommand('(FR)x3F')
+    assert stored.stopped_by_obstacle is True
+
+    result_mock.one_or_none.return_value = Mock(
+        received_command='FFR', executed_command='FFR', stopped_by_obstacle=False
+    )
+    stored = await repo.get_command(4)
+
+    assert stored.executed_command == Command('FFR')
+
+
+async def test_get_command_missing():
+    session = AsyncMock()
+    result_mock = Mock()
+    result_mock.one_or_none.return_value = None
+    session.execute.return_value = result_mock
+
+    repo = RDBCommandRepository(session)
+
+    assert await repo.get_command(3) is None
@@ -0,0 +1,143 @@
+from unittest.mock import AsyncMock, Mock
+
+from sqlalchemy.dialects import postgresql
+
+from app.domain.entities import Obstacle, ObstacleEdit
+from app.infrastructure.repositories.repo_obstacle_db import RDBObstacleRepository
+
+
+async def test_get_obstacles_in_box(mock_session):
+    mock_session.execute.return_value = [(1, 2), (3, 4)]
+
+    repo = RDBObstacleRepository(mock_session)
+    obstacles = await repo.get_obstacles_in_box(0, 0, 5, 5)
+
+    assert obstacles == {Obstacle(1, 2), Obstacle(3, 4)}
+    statement = mock_session.execute.call_args.args[0]
+    sql = str(statement.compile(compile_kwargs={'literal_binds': True}))
+    assert 'obstacles.coord_x BETWEEN 0 AND 5' in sql
+    assert 'obstacles.coord_y BETWEEN 0 AND 5' in sql
+
+
+async def test_get_version(mock_session):
+    result_mock = Mock()
+    result_mock.scalar_one.return_value = 7
+    mock_session.execute.return_value = result_mock
+
+    repo = RDBObstacleRepository(mock_session)
+
+    assert await repo.get_version() == '7'
+
+
+async def test_contains(mock_session):
+    result_mock = Mock()
+    result_mock.scalar.return_value = True
+    mock_session.execute.return_value = result_mock
+
+    repo = RDBObstacleRepository(mock_session)
+
+    assert await repo.contains(1, 2) is True
+
+
+def _compiled(statement) -> str:
+    return str(statement.compile(dialect=postgresql.dialect()))
+
+
+async def test_add_obstacles_bumps_version_and_commits(mock_session):
+    result_mock = Mock()
+    result_mock.scalar_one.return_value = 4
+    mock_session.execute.return_value = result_mock
+
+    repo = RDBObstacleRepository(mock_session)
+    version = await repo.add_obstacles([Obstacle(1, 2), Obstacle(3, 4)])
+
+    assert version == '4'
+    bump, insert = mock_session.execute.call_args_list
+    # The version row is locked before any obstacle is written
+    assert _compiled(bump.args[0]).startswith('UPDATE obstacle_map')
+    assert 'ON CONFLICT (coord_x, coord_y) DO NOTHING' in _compiled(insert.args[0])
+    assert insert.args[1] == [
+        {'coord_x': 1, 'coord_y': 2},
+        {'coord_x': 3, 'coord_y': 4},
+    ]
+    mock_session.commit.assert_awaited_once()
+
+
+async def test_remove_obstacles(mock_session):
+    result_mock = Mock()
+    result_mock.scalar_one.return_value = 5
+    mock_session.execute.return_value = result_mock
+
+    repo = RDBObstacleRepository(mock_session)
+    version = await repo.remove_obstacles([Obstacle(1, 2)])
+
+    assert version == '5'
+    _bump, delete = mock_session.execute.call_args_list
+    sql = _compiled(delete.args[0])
+    assert sql.startswith('DELETE FROM obstacles')
+    assert 'unnest' in sql
+    mock_session.commit.assert_awaited_once()
+
+
+async def test_writes_report_edits_after_commit(mock_session):
+    result_mock = Mock()
+    result_mock.scalar_one.return_value = 7
+    mock_session.execute.return_value = result_mock
+    edits = []
+    mock_session.commit.side_effect = lambda: edits.append('commit')
+
+    repo = RDBObstacleRepository(mock_session)
+    await repo.remove_obstacles(iter([Obstacle(1, 2)]), edits.append)
+
+    assert edits == [
+        'commit',
+        ObstacleEdit('6', '7', frozenset(), frozenset({Obstacle(1, 2)})),
+    ]
+
+
+async def test_replace_obstacles_with_empty_map(mock_session):
+    result_mock = Mock()
+    result_mock.scalar_one.return_value = 6
+    mock_session.execute.return_value = result_mock
+
+    repo = RDBObstacleRepository(mock_session)
+    version = await repo.replace_obstacles([])
+
+    assert version == '6'
+    _bump, delete = mock_session.execute.call_args_list
+    assert _compiled(delete.args[0]) == 'DELETE FROM obstacles'
+    mock_session.commit.assert_awaited_once()
+
+
+async def test_import_obstacles_copies_into_staging_then_swaps(mock_session):
+    result_mock = Mock()
+    result_mock.scalar_one.return_value = 8
+    mock_session.execute.return_value = result_mock
+    driver = AsyncMock()
+    raw = Mock(driver_connection=driver)
+    mock_session.connection.return_value.get_raw_connection = AsyncMock(
+        return_value=raw
+    )
+
+    async def batches():
+        yield [(1, 2), (3, 4)]
+        yield [(5, 6)]
+
+    repo = RDBObstacleRepository(mock_session)
+    version = await repo.import_obstacles(batches())
+
+    assert version == '8'
+    assert [
+        call.kwargs['records'] for call in driver.copy_records_to_table.await_args_list
+    ] == [
+        [(1, 2), (3, 4)],
+        [(5, 6)],
+    ]
+    create, bump, delete, insert = (
+        call.args[0] for call in mock_session.execute.call_args_list
+    )
+    assert 'CREATE TEMPORARY TABLE obstacles_import' in str(create)
+    assert _compiled(bump).startswith('UPDATE obstacle_map')
+    assert _compiled(delete) == 'DELETE FROM obstacles'
+    assert 'SELECT DISTINCT' in _compiled(insert)
+    mock_session.commit.assert_awaited_once()
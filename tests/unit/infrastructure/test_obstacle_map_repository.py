@@ -0,0 +1,106 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from app.domain.entities import Obstacle
+from app.infrastructure.repositories.repo_obstacle_map import (
+    HEADER_SIZE,
+    compile_map,
+    encode_map,
+    is_compiled_map,
+    load_map,
+    read_source,
+)
+
+OBSTACLES = {Obstacle(1, 2), Obstacle(3, 4), Obstacle(-5, 2)}
+
+
+@pytest.fixture()
+def map_file(tmp_path: Path):
+    file_path = tmp_path / 'obstacles.rvmap'
+    file_path.write_bytes(encode_map(OBSTACLES))
+    return file_path
+
+
+def test_encode_layout():
+    data = encode_map(OBSTACLES)
+
+    assert len(data) == HEADER_SIZE + 2 * 8 * len(OBSTACLES)
+    assert encode_map(reversed(list(OBSTACLES))) == data
+
+
+def test_load_map(map_file: Path):
+    obstacles = load_map(map_file)
+
+    assert obstacles == OBSTACLES
+    assert list(obstacles.xy_keys) == sorted(obstacles.xy_keys)
+    assert list(obstacles.yx_keys) == sorted(obstacles.yx_keys)
+    assert obstacles.index.free_steps(-10, 2, 1, 0, 20) == 4
+    assert obstacles.index.contains(3, 4)
+    assert obstacles.version == load_map(map_file).version
+
+
+def test_load_empty_map(tmp_path: Path):
+    file_path = tmp_path / 'empty.rvmap'
+    file_path.write_bytes(encode_map([]))
+
+    obstacles = load_map(file_path)
+
+    assert len(obstacles) == 0
+    assert not obstacles.index.contains(0, 0)
+
+
+def test_load_rejects_invalid_files(tmp_path: Path, map_file: Path):
+    not_a_map = tmp_path / 'obstacles.json'
+    not_a_map.write_text('[[1, 2]]' + ' ' * HEADER_SIZE)
+    truncated = tmp_path / 'truncated.rvmap'
+    truncated.write_bytes(map_file.read_bytes()[:-8])
+
+    assert is_compiled_map(map_file)
+    assert not is_compiled_map(not_a_map)
+    with pytest.raises(ValueError, match='Not a compiled'):
+        load_map(not_a_map)
+    with pytest.raises(ValueError, match='Truncated'):
+        load_map(truncated)
+
+
+def test_encode_rejects_out_of_range_coordinates():
+    with pytest.raises(ValueError):
+        encode_map({Obstacle(0, 2**31)})
+
+
+def test_read_csv_source(tmp_path: Path):
+    source = tmp_path / 'cells.csv'
+    source.write_text('x,y\n1,2\n# comment\n\n3,4\n-5,2\n')
+
+    assert read_source(source) == OBSTACLES
+
+    source.write_text('1,2\n3,oops\n')
+    with pytest.raises(ValueError, match=':2:'):
+        read_source(source)
+
+
+def test_read_source_rejects_regions(tmp_path: Path):
+    source = tmp_path / 'regions.json'
+    source.write_text(json.dumps([[1, 2], {'rect': [0, 0, 9, 9]}]))
+
+    with pytest.raises(ValueError, match='do not support regions'):
+        read_source(source)
+    with pytest.raises(ValueError, match='do not support regions'):
+        compile_map(source, tmp_path / 'regions.rvmap')
+    assert not (tmp_path / 'regions.rvmap').exists()
+
+
+def test_compile_map(tmp_path: Path):
+    source = tmp_path / 'obstacles.json'
+    source.write_text(json.dumps([[1, 2], [3, 4], [-5, 2], [1, 2]]))
+    target = tmp_path / 'obstacles.rvmap'
+
+    header = compile_map(source, target)
+
+    assert header.count == 3
+    assert header.bounds == (-5, 2, 3, 4)
+    assert load_map(target) == OBSTACLES
+    assert load_map(target).version == header.version
+    assert not any(p.name.endswith('.partial') for p in tmp_path.iterdir())
@@ -0,0 +1,363 @@
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from app.domain.entities import Obstacle, ObstacleEdit
+from app.domain.exceptions import ObstacleMapReadOnlyException
+from app.domain.grid import OccupancyGrid
+from app.domain.regions import Rect
+from app.domain.snapshot import ObstacleSnapshot, PackedObstacles, RegionObstacles
+from app.infrastructure.repositories.obstacle_provider import (
+    FileObstacleProvider,
+    parse_bounds,
+)
+from app.infrastructure.repositories.repo_obstacle_map import encode_map
+
+
+@pytest.fixture()
+def obstacle_file(tmp_path: Path):
+    file_path = tmp_path / 'obstacles.json'
+    file_path.write_text(json.dumps([[1, 2], [3, 4]]))
+    return file_path
+
+
+def _rewrite(path: Path, data) -> None:
+    _rewrite_bytes(path, json.dumps(data).encode())
+
+
+def _rewrite_bytes(path: Path, data: bytes) -> None:
+    # Bump the mtime so the change is seen even on coarse-grained clocks
+    stat = path.stat()
+    path.write_bytes(data)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_snapshot_is_loaded_once(obstacle_file: Path):
+    provider = FileObstacleProvider(obstacle_file)
+
+    snapshot = provider.get_obstacles()
+
+    assert isinstance(snapshot, ObstacleSnapshot)
+    assert {o.coordinates() for o in snapshot} == {(1, 2), (3, 4)}
+    assert provider.get_obstacles() is snapshot
+    assert provider.get_obstacle_index() is snapshot.index
+    assert provider.get_version() == snapshot.version
+
+
+def test_missing_file(tmp_path: Path):
+    provider = FileObstacleProvider(tmp_path / 'missing.json')
+
+    with pytest.raises(FileNotFoundError):
+        provider.get_obstacles()
+
+
+async def test_refresh_swaps_in_changed_file(obstacle_file: Path):
+    provider = FileObstacleProvider(obstacle_file)
+    old = provider.get_obstacles()
+
+    _rewrite(obstacle_file, [[5, 6]])
+    new = await provider.refresh()
+
+    assert new is not old
+    assert {o.coordinates() for o in new} == {(5, 6)}
+    assert provider.get_obstacles() is new
+    assert provider.get_version() != old.version
+    # Readers holding the old snapshot keep a consistent map
+    assert {o.coordinates() for o in old} == {(1, 2), (3, 4)}
+
+
+async def test_refresh_without_change_keeps_snapshot(obstacle_file: Path):
+    provider = FileObstacleProvider(obstacle_file)
+    snapshot = provider.get_obstacles()
+
+    assert await provider.refresh() is snapshot
+
+    # Same content with a new mtime keeps the version and the snapshot
+    _rewrite(obstacle_file, [[1, 2], [3, 4]])
+    assert await provider.refresh() is snapshot
+
+
+async def test_invalid_file_keeps_last_snapshot(obstacle_file: Path):
+    provider = FileObstacleProvider(obstacle_file)
+    snapshot = provider.get_obstacles()
+
+    _rewrite(obstacle_file, {'not': 'a list'})
+    with pytest.raises(ValueError):
+        await provider.refresh()
+
+    assert provider.get_obstacles() is snapshot
+
+
+async def test_start_and_stop_polling(obstacle_file: Path):
+    provider = FileObstacleProvider(obstacle_file, poll_interval=0.01)
+
+    await provider.start()
+    snapshot = provider.get_obstacles()
+    await provider.stop()
+
+    assert {o.coordinates() for o in snapshot} == {(1, 2), (3, 4)}
+
+
+async def test_compiled_map_is_memory_mapped(tmp_path: Path):
+    file_path = tmp_path / 'obstacles.rvmap'
+    file_path.write_bytes(encode_map({Obstacle(1, 2)}))
+    provider = FileObstacleProvider(file_path)
+
+    obstacles = provider.get_obstacles()
+
+    assert isinstance(obstacles, PackedObstacles)
+    assert obstacles == {Obstacle(1, 2)}
+    assert provider.get_version() == obstacles.version
+
+    _rewrite_bytes(file_path, encode_map({Obstacle(1, 2)}))
+    assert await provider.refresh() is obstacles
+    _rewrite_bytes(file_path, encode_map({Obstacle(3, 4)}))
+    assert await provider.refresh() == {Obstacle(3, 4)}
+
+
+def test_grid_bounds_build_occupancy_grid(obstacle_file: Path):
+    provider = FileObstacleProvider(obstacle_file, grid_bounds=(0, 0, 2, 2))
+
+    obstacles = provider.get_obstacles()
+
+    assert isinstance(obstacles, OccupancyGrid)
+    assert obstacles == {Obstacle(1, 2), Obstacle(3, 4)}
+    assert obstacles.contains(1, 2)
+
+
+def test_grid_bounds_from_environment(obstacle_file: Path, monkeypatch):
+    monkeypatch.setenv('OBSTACLES_GRID_BOUNDS', '-10,-10,10,10')
+
+    provider = FileObstacleProvider(obstacle_file)
+
+    assert provider.get_obstacles().bounds == (-10, -10, 10, 10)
+
+
+@pytest.mark.parametrize('value', ['1,2,3', '1,2,3,x'])
+def test_parse_bounds_rejects_invalid_values(value):
+    with pytest.raises(ValueError):
+        parse_bounds(value)
+
+
+def test_point_and_box_queries(obstacle_file: Path):
+    provider = FileObstacleProvider(obstacle_file)
+
+    assert provider.contains(3, 4)
+    assert not provider.contains(4, 3)
+    assert provider.get_obstacles_in_box(2, 2, 5, 5) == {Obstacle(3, 4)}
+    # A box covering the map returns the snapshot with its prepared index
+    snapshot = provider.get_obstacles()
+    assert provider.get_obstacles_in_box(-100, -100, 100, 100) is snapshot
+
+
+async def test_writes_publish_new_snapshots(obstacle_file: Path):
+    provider = FileObstacleProvider(obstacle_file)
+    before = provider.get_obstacles()
+
+    version = await provider.add_obstacles([Obstacle(5, 6)])
+
+    after = provider.get_obstacles()
+    assert after is not before
+    assert after.version == version != before.version
+    assert after == {Obstacle(1, 2), Obstacle(3, 4), Obstacle(5, 6)}
+    # The published snapshot is immutable
+    assert before == {Obstacle(1, 2), Obstacle(3, 4)}
+
+    await provider.remove_obstacles([Obstacle(1, 2)])
+    assert provider.get_obstacles() == {Obstacle(3, 4), Obstacle(5, 6)}
+
+    await provider.replace_obstacles([Obstacle(0, 0)])
+    assert json.loads(obstacle_file.read_text()) == [[0, 0]]
+
+
+async def test_write_without_change_keeps_version(obstacle_file: Path):
+    provider = FileObstacleProvider(obstacle_file)
+    snapshot = provider.get_obstacles()
+
+    assert await provider.add_obstacles([Obstacle(1, 2)]) == snapshot.version
+    assert await provider.remove_obstacles([Obstacle(9, 9)]) == snapshot.version
+    assert provider.get_obstacles() is snapshot
+
+
+async def test_writes_report_changed_cells(obstacle_file: Path):
+    _rewrite(obstacle_file, [[12, 2], [5, 5], {'rect': [0, 0, 9, 9]}])
+    provider = FileObstacleProvider(obstacle_file)
+    first = provider.get_version()
+    edits = []
+
+    second = await provider.add_obstacles(
+        [Obstacle(12, 2), Obstacle(20, 20)], edits.append
+    )
+    # A cell inside a region stays blocked, so only (12, 2) is cleared
+    third = await provider.remove_obstacles(
+        [Obstacle(12, 2), Obstacle(5, 5)], edits.append
+    )
+    await provider.add_obstacles([Obstacle(20, 20)], edits.append)
+
+    assert edits == [
+        ObstacleEdit(first, second, frozenset({Obstacle(20, 20)}), frozenset()),
+        ObstacleEdit(second, third, frozenset(), frozenset({Obstacle(12, 2)})),
+    ]
+
+
+async def test_write_is_seen_by_other_providers(obstacle_file: Path):
+    writer = FileObstacleProvider(obstacle_file)
+    reader = FileObstacleProvider(obstacle_file)
+    reader.get_obstacles()
+
+    version = await writer.add_obstacles([Obstacle(7, 7)])
+    await reader.refresh()
+
+    assert reader.get_version() == version
+    assert reader.contains(7, 7)
+    # The reader's next write starts from the map on disk
+    await reader.add_obstacles([Obstacle(8, 8)])
+    assert FileObstacleProvider(obstacle_file).get_obstacles() == {
+        Obstacle(1, 2),
+        Obstacle(3, 4),
+        Obstacle(7, 7),
+        Obstacle(8, 8),
+    }
+
+
+async def test_write_keeps_occupancy_grid(obstacle_file: Path):
+    provider = FileObstacleProvider(obstacle_file, grid_bounds=(0, 0, 9, 9))
+
+    await provider.add_obstacles([Obstacle(5, 5)])
+
+    grid = provider.get_obstacles()
+    assert isinstance(grid, OccupancyGrid)
+    assert grid.contains(5, 5)
+
+
+async def test_compiled_map_is_read_only(tmp_path: Path):
+    file_path = tmp_path / 'obstacles.rvmap'
+    file_path.write_bytes(encode_map({Obstacle(1, 2)}))
+    provider = FileObstacleProvider(file_path)
+
+    with pytest.raises(ObstacleMapReadOnlyException):
+        await provider.add_obstacles([Obstacle(3, 4)])
+
+
+async def test_import_replaces_map(obstacle_file: Path):
+    provider = FileObstacleProvider(obstacle_file)
+    provider.get_obstacles()
+
+    async def batches():
+        yield [(5, 5), (6, 6)]
+        yield [(6, 6), (7, 7)]
+
+    version = await provider.import_obstacles(batches())
+    await provider.settle()
+
+    snapshot = provider.get_obstacles()
+    assert snapshot.version == version
+    assert snapshot == {Obstacle(5, 5), Obstacle(6, 6), Obstacle(7, 7)}
+    # Batches are written as they arrive, duplicates included
+    assert json.loads(obstacle_file.read_text()) == [
+        [5, 5],
+        [6, 6],
+        [6, 6],
+        [7, 7],
+    ]
+    # Another process computes the same version from the file
+    assert FileObstacleProvider(obstacle_file).get_version() == version
+
+
+async def test_import_is_published_in_the_background(obstacle_file: Path):
+    provider = FileObstacleProvider(obstacle_file)
+    before = provider.get_obstacles()
+
+    async def batches():
+        yield [(5, 5)]
+
+    version = await provider.import_obstacles(batches())
+    # Readers keep the current map until the import is published
+    assert provider.get_obstacles() is before
+
+    # A later write waits for the import and builds on it
+    await provider.add_obstacles([Obstacle(6, 6)])
+    assert provider.get_obstacles() == {Obstacle(5, 5), Obstacle(6, 6)}
+    assert version != before.version
+
+
+async def test_failed_import_keeps_map(obstacle_file: Path):
+    provider = FileObstacleProvider(obstacle_file)
+    before = provider.get_obstacles()
+
+    async def batches():
+        yield [(5, 5)]
+        raise ValueError('Line 2: expected an int32 x,y pair')
+
+    with pytest.raises(ValueError):
+        await provider.import_obstacles(batches())
+    await provider.settle()
+
+    assert provider.get_obstacles() is before
+    assert list(obstacle_file.parent.glob('*.import')) == []
+
+
+def test_rectangles_build_region_map(obstacle_file: Path):
+    _rewrite(obstacle_file, [[1, 2], {'rect': [10, 0, 1_000_000, 3]}])
+    provider = FileObstacleProvider(obstacle_file, grid_bounds=(0, 0, 9, 9))
+
+    regions = provider.get_obstacles()
+
+    assert isinstance(regions, RegionObstacles)
+    assert regions.rects == (Rect(10, 0, 1_000_000, 3),)
+    assert provider.contains(500_000, 3)
+    assert not provider.contains(500_000, 4)
+    box = provider.get_obstacles_in_box(0, 0, 11, 0)
+    assert box == {Obstacle(10, 0), Obstacle(11, 0)}
+
+
+@pytest.mark.parametrize(
+    'item',
+    [
+        {'rect': [0, 0, 1]},
+        {'rect': [2, 0, 1, 0]},
+        {'box': [0, 0, 1, 1]},
+        {'rect': [0, 0, 1, 2**31]},
+        [0, 2**32],
+    ],
+)
+def test_invalid_rectangles_are_rejected(obstacle_file: Path, item):
+    _rewrite(obstacle_file, [item])
+
+    with pytest.raises(ValueError):
+        FileObstacleProvider(obstacle_file).get_obstacles()
+
+
+async def test_cell_writes_keep_regions(obstacle_file: Path):
+    _rewrite(obstacle_file, [{'rect': [0, 0, 9, 9]}])
+    provider = FileObstacleProvider(obstacle_file)
+
+    await provider.add_obstacles([Obstacle(20, 20)])
+    # A cell inside a region stays blocked
+    await provider.remove_obstacles([Obstacle(5, 5)])
+
+    regions = provider.get_obstacles()
+    assert regions.rects == (Rect(0, 0, 9, 9),)
+    assert regions.contains(20, 20) and regions.contains(5, 5)
+    assert json.loads(obstacle_file.read_text()) == [
+        [20, 20],
+        {'rect': [0, 0, 9, 9]},
+    ]
+
+    await provider.replace_obstacles([Obstacle(1, 1)])
+    assert provider.get_obstacles() == {Obstacle(1, 1)}
+    assert json.loads(obstacle_file.read_text()) == [[1, 1]]
+
+
+async def test_writes_update_built_spatial_index(obstacle_file: Path):
+    provider = FileObstacleProvider(obstacle_file)
+    _ = provider.get_obstacles().spatial
+
+    await provider.add_obstacles([Obstacle(5, 6)])
+    await provider.remove_obstacles([Obstacle(1, 2)])
+
+    spatial = provider.get_obstacles().spatial
+    assert spatial.pending == 2
+    assert spatial.nearest(0, 0, 2) == [(3, 4), (5, 6)]
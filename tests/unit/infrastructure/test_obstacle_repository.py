@@ -3,6 +3,7 @@ from pathlib import Path
 
 import pytest
 
+from app.domain.entities import Obstacle
 from app.infrastructure.repositories.repo_obstacle import JSONObstacleRepository
 
 
@@ -35,3 +36,44 @@ def test_get_obstacles_file_not_found(tmp_path: Path):
     repo = JSONObstacleRepository(json_path=missing_path)
     with pytest.raises(FileNotFoundError):
         repo.get_obstacles()
+
+
+def test_get_obstacle_index_is_cached(obstacle_file: Path):
+    repo = JSONObstacleRepository(json_path=obstacle_file)
+
+    index = repo.get_obstacle_index()
+
+    assert index.contains(1, 2)
+    assert index.contains(3, 4)
+    assert repo.get_obstacle_index() is index
+
+    repo.invalidate_cache()
+    assert repo.get_obstacle_index() is not index
+
+
+def test_changed_file_is_reloaded(obstacle_file: Path):
+    repo = JSONObstacleRepository(json_path=obstacle_file)
+
+    version = repo.get_version()
+    assert {o.coordinates() for o in repo.get_obstacles()} == {(1, 2), (3, 4)}
+    index = repo.get_obstacle_index()
+
+    obstacle_file.write_text(json.dumps([[5, 6], [7, 8], [9, 10]]))
+
+    assert repo.get_version() != version
+    assert {o.coordinates() for o in repo.get_obstacles()} == {
+        (5, 6),
+        (7, 8),
+        (9, 10),
+    }
+    assert repo.get_obstacle_index() is not index
+    assert repo.get_obstacle_index().contains(9, 10)
+
+
+def test_point_and_box_queries(obstacle_file: Path):
+    repo = JSONObstacleRepository(json_path=obstacle_file)
+
+    assert repo.contains(1, 2)
+    assert not repo.contains(2, 1)
+    assert repo.get_obstacles_in_box(0, 0, 2, 2) == {Obstacle(1, 2)}
+    assert repo.get_obstacles_in_box(0, 0, 10, 10) == repo.get_obstacles()
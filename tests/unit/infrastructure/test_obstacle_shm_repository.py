@@ -0,0 +1,110 @@
+import os
+import uuid
+
+import pytest
+
+from app.domain.entities import Obstacle
+from app.infrastructure.repositories.repo_obstacle_map import encode_map
+from app.infrastructure.repositories.repo_obstacle_shm import (
+    SharedObstacleRepository,
+    publish_map,
+    publish_source,
+    read_generation,
+    unpublish,
+)
+
+
+@pytest.fixture()
+def name():
+    name = f'rover-test-{uuid.uuid4().hex[:12]}'
+    yield name
+    try:
+        unpublish(name)
+    except FileNotFoundError:
+        pass
+
+
+def test_publish_bumps_generation(name):
+    assert publish_map(encode_map({Obstacle(1, 2)}), name) == 1
+    assert publish_map(encode_map({Obstacle(3, 4)}), name) == 2
+    assert read_generation(name) == 2
+
+
+def test_publish_rejects_invalid_map(name):
+    with pytest.raises(ValueError):
+        publish_map(b'not a map', name)
+
+    with pytest.raises(FileNotFoundError):
+        read_generation(name)
+
+
+def test_repository_attaches_to_published_map(name):
+    publish_map(encode_map({Obstacle(1, 2), Obstacle(3, 4)}), name)
+    repo = SharedObstacleRepository(name)
+
+    obstacles = repo.get_obstacles()
+
+    assert obstacles == {Obstacle(1, 2), Obstacle(3, 4)}
+    assert repo.get_obstacles() is obstacles
+    assert repo.get_obstacle_index().contains(3, 4)
+    assert repo.get_version() == obstacles.version
+    assert repo.generation == 1
+
+
+def test_repository_picks_up_republished_map(name):
+    publish_map(encode_map({Obstacle(1, 2)}), name)
+    repo = SharedObstacleRepository(name)
+    old = repo.get_obstacles()
+
+    publish_map(encode_map({Obstacle(5, 6)}), name)
+    new = repo.get_obstacles()
+
+    assert new == {Obstacle(5, 6)}
+    assert repo.generation == 2
+    assert new.version != old.version
+    # The unlinked previous generation stays readable while referenced
+    assert old == {Obstacle(1, 2)}
+
+
+def test_repository_without_published_map(name):
+    with pytest.raises(FileNotFoundError):
+        SharedObstacleRepository(name).get_obstacles()
+
+
+async def test_start_and_stop(name):
+    repo = SharedObstacleRepository(name)
+    with pytest.raises(FileNotFoundError):
+        await repo.start()
+
+    publish_map(encode_map({Obstacle(1, 2)}), name)
+    await repo.start()
+    obstacles = repo.get_obstacles()
+    await repo.stop()
+
+    assert obstacles == {Obstacle(1, 2)}
+
+
+def test_publish_source_and_unpublish(tmp_path, name):
+    source = tmp_path / 'obstacles.csv'
+    source.write_text('1,2\n3,4\n')
+
+    assert publish_source(source, name) == 1
+    assert SharedObstacleRepository(name).get_obstacles() == {
+        Obstacle(1, 2),
+        Obstacle(3, 4),
+    }
+
+    unpublish(name)
+    assert not any(entry.startswith(name) for entry in _shm_entries())
+
+
+def _shm_entries() -> list[str]:
+    return os.listdir('/dev/shm') if os.path.isdir('/dev/shm') else []
+
+
+def test_repository_queries(name):
+    publish_map(encode_map({Obstacle(1, 2), Obstacle(3, 4)}), name)
+    repo = SharedObstacleRepository(name)
+
+    assert repo.contains(1, 2)
+    assert repo.get_obstacles_in_box(0, 0, 2, 2) == {Obstacle(1, 2)}
@@ -0,0 +1,89 @@
+from pathlib import Path
+
+import pytest
+
+from app.domain.entities import Obstacle
+from app.domain.tiles import TiledObstacles
+from app.infrastructure.repositories.repo_obstacle_tiles import (
+    TiledObstacleRepository,
+    load_tiles,
+    read_manifest,
+    write_tiles,
+)
+
+OBSTACLES = {Obstacle(1, 2), Obstacle(3, 4), Obstacle(-5, 2), Obstacle(40, -40)}
+
+
+@pytest.fixture()
+def tiles_dir(tmp_path: Path):
+    directory = tmp_path / 'obstacles.tiles'
+    write_tiles(OBSTACLES, directory, tile_size=8)
+    return directory
+
+
+def test_write_tiles(tiles_dir: Path):
+    manifest = read_manifest(tiles_dir)
+
+    assert manifest['tile_size'] == 8
+    assert sorted((tx, ty) for tx, ty, _ in manifest['tiles']) == [
+        (-1, 0),
+        (0, 0),
+        (5, -5),
+    ]
+    assert sum(count for *_, count in manifest['tiles']) == 4
+    assert len(list((tiles_dir / 'tiles').iterdir())) == 3
+
+
+def test_rewrite_replaces_map(tiles_dir: Path):
+    version = read_manifest(tiles_dir)['version']
+
+    write_tiles({Obstacle(0, 0)}, tiles_dir, tile_size=8)
+
+    assert read_manifest(tiles_dir)['version'] != version
+    assert load_tiles(tiles_dir) == {Obstacle(0, 0)}
+    assert not any(p.name.startswith('.') for p in tiles_dir.parent.iterdir())
+
+
+def test_load_tiles(tiles_dir: Path):
+    tiled = load_tiles(tiles_dir, max_tiles=1)
+
+    assert isinstance(tiled, TiledObstacles)
+    assert tiled == OBSTACLES
+    assert tiled.contains(40, -40)
+    assert tiled.free_steps(-10, 2, 1, 0, 100) == 4
+
+
+def test_invalid_manifest(tmp_path: Path):
+    (tmp_path / 'manifest.json').write_text('{"format": 99}')
+
+    with pytest.raises(ValueError):
+        read_manifest(tmp_path)
+
+
+def test_repository_queries(tiles_dir: Path):
+    repo = TiledObstacleRepository(tiles_dir, max_tiles=2)
+
+    assert repo.contains(3, 4)
+    assert not repo.contains(3, 5)
+    assert repo.get_obstacles_in_box(-5, 0, 3, 3) == {Obstacle(1, 2), Obstacle(-5, 2)}
+    assert repo.get_obstacles_in_box(100, 100, 200, 200) == set()
+    assert repo.get_obstacle_index() is repo.get_obstacles()
+    assert repo.get_version() == read_manifest(tiles_dir)['version']
+    assert repo.get_obstacles().stats().loads == 2
+
+
+def test_repository_reopens_rewritten_map(tiles_dir: Path):
+    repo = TiledObstacleRepository(tiles_dir)
+    tiled = repo.get_obstacles()
+    assert repo.get_obstacles() is tiled
+
+    write_tiles({Obstacle(7, 7)}, tiles_dir, tile_size=8)
+
+    assert repo.get_obstacles() == {Obstacle(7, 7)}
+
+
+async def test_repository_start_without_map(tmp_path: Path):
+    repo = TiledObstacleRepository(tmp_path / 'missing')
+
+    with pytest.raises(FileNotFoundError):
+        await repo.start()
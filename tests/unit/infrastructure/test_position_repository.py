@@ -1,6 +1,6 @@
 from unittest.mock import Mock
 
-from app.domain.entities import Direction, Point, Position
+from app.domain.entities import Direction, Point, Position, PositionPath
 from app.infrastructure.repositories.repo_position import RDBPositionRepository
 
 
@@ -57,3 +57,47 @@ async def test_save_positions_bulk_inserts_payload(mock_session):
         assert p_dict['coord_y'] == p_obj.y
         assert p_dict['direction'] == p_obj.direction
         assert p_dict['command_id'] == 42
+
+
+async def test_save_positions_bulk_sends_path_columns(mock_session):
+    repo = RDBPositionRepository(mock_session)
+
+    path = PositionPath.from_positions(
+        [
+            Position(Point(0, 1), Direction.NORTH),
+            Position(Point(0, 1), Direction.WEST),
+        ]
+    )
+
+    await repo.save_positions_bulk(7, path)
+
+    # Single INSERT ... SELECT unnest(...) statement without a row payload
+    mock_session.execute.assert_called_once()
+    args, _kwargs = mock_session.execute.call_args
+    assert len(args) == 1
+    params = args[0].compile().params
+    assert params['xs'] == [0, 0]
+    assert params['ys'] == [1, 1]
+    assert params['directions'] == ['NORTH', 'WEST']
+    assert 7 in params.values()
+
+
+async def test_save_positions_bulk_empty_path(mock_session):
+    repo = RDBPositionRepository(mock_session)
+    await repo.save_positions_bulk(1, PositionPath())
+
+    mock_session.execute.assert_not_called()
+
+
+async def test_get_position_before_command(mock_session):
+    dummy_orm = Mock(coord_x=-1, coord_y=4, direction=Direction.SOUTH)
+    result_mock = Mock()
+    result_mock.scalar_one_or_none.return_value = dummy_orm
+    mock_session.execute.return_value = result_mock
+
+    repo = RDBPositionRepository(mock_session)
+    pos = await repo.get_position_before_command(7)
+
+    assert pos == Position(Point(-1, 4), Direction.SOUTH)
+    params = mock_session.execute.call_args.args[0].compile().params
+    assert params['command_id_1'] == 7
@@ -0,0 +1,36 @@
+import json
+
+from app.domain.entities import Obstacle
+from app.infrastructure.repositories.repo_obstacle_map import load_map
+from app.infrastructure.repositories.repo_obstacle_tiles import load_tiles
+from app.map_compiler import main
+
+
+def test_main_compiles_map(tmp_path, capsys):
+    source = tmp_path / 'obstacles.json'
+    source.write_text(json.dumps([[1, 2], [-3, 4]]))
+    target = tmp_path / 'obstacles.rvmap'
+
+    assert main([str(source), str(target)]) == 0
+
+    assert load_map(target) == {Obstacle(1, 2), Obstacle(-3, 4)}
+    assert '2 obstacles, bounds (-3, 2)..(1, 4)' in capsys.readouterr().out
+
+
+def test_main_reports_invalid_source(tmp_path, capsys):
+    source = tmp_path / 'obstacles.json'
+    source.write_text(json.dumps({'not': 'a list'}))
+
+    assert main([str(source), str(tmp_path / 'out.rvmap')]) == 1
+    assert 'error:' in capsys.readouterr().err
+
+
+def test_main_writes_tiles(tmp_path, capsys):
+    source = tmp_path / 'cells.csv'
+    source.write_text('1,2\n-3,4\n500,500\n')
+    target = tmp_path / 'obstacles.tiles'
+
+    assert main([str(source), str(target), '--tile-size', '64']) == 0
+
+    assert load_tiles(target) == {Obstacle(1, 2), Obstacle(-3, 4), Obstacle(500, 500)}
+    assert '3 obstacles in 3 tiles' in capsys.readouterr().out
@@ -0,0 +1,27 @@
+import json
+import uuid
+
+from app.domain.entities import Obstacle
+from app.infrastructure.repositories.repo_obstacle_shm import SharedObstacleRepository
+from app.map_publisher import main
+
+
+def test_publish_and_unpublish(tmp_path, capsys):
+    name = f'rover-test-{uuid.uuid4().hex[:12]}'
+    source = tmp_path / 'obstacles.json'
+    source.write_text(json.dumps([[1, 2]]))
+
+    assert main([str(source), '--name', name]) == 0
+    assert 'published generation 1' in capsys.readouterr().out
+    assert SharedObstacleRepository(name).get_obstacles() == {Obstacle(1, 2)}
+
+    assert main(['--unpublish', '--name', name]) == 0
+    assert main(['--unpublish', '--name', name]) == 1
+
+
+def test_invalid_source(tmp_path, capsys):
+    source = tmp_path / 'obstacles.json'
+    source.write_text('{}')
+
+    assert main([str(source), '--name', f'rover-test-{uuid.uuid4().hex[:12]}']) == 1
+    assert 'error:' in capsys.readouterr().err
@@ -0,0 +1,138 @@
+import json
+
+import pytest
+
+from app.domain.entities import Direction, Obstacle, Point, Position
+from app.simulator import (
+    Scenario,
+    build_report,
+    load_commands,
+    main,
+    parse_start,
+    percentiles,
+    simulate,
+)
+
+
+def _scenario(**overrides) -> Scenario:
+    settings = {
+        'obstacles': frozenset({Obstacle(0, 3)}),
+        'start': Position(Point(0, 0), Direction.NORTH),
+        'extent': 10,
+        'length': 20,
+        'alphabet': 'FFBLR',
+        'seed': 1,
+    }
+    settings.update(overrides)
+    return Scenario(**settings)
+
+
+def test_simulate_file_commands():
+    stats, _ = simulate(_scenario(), ['FFFF', 'RFF', 'LLFF'], runs=0, workers=1)
+
+    assert stats.runs == 3
+    assert stats.collisions == 1
+    assert stats.steps == 2 + 3 + 4
+    assert list(stats.collision_steps) == [2]
+
+
+def test_simulate_generated_commands_is_reproducible():
+    scenario = _scenario(start=None)
+
+    first, _ = simulate(scenario, None, runs=250, workers=1, batch_size=100)
+    second, _ = simulate(scenario, None, runs=250, workers=2, batch_size=100)
+
+    assert first.runs == 250
+    assert first == second
+
+
+def test_build_report():
+    stats, _ = simulate(_scenario(), ['FFFF', 'FF'], runs=0, workers=1)
+
+    report = build_report(stats, elapsed=2.0, workers=1)
+
+    assert report['collision_rate'] == 0.5
+    assert report['steps_per_second'] == 2
+    assert report['executed_steps'] == {
+        'min': 2,
+        'p50': 2,
+        'p90': 2,
+        'p99': 2,
+        'max': 2,
+    }
+
+
+def test_percentiles():
+    assert percentiles([]) == {}
+    assert percentiles(range(1, 101)) == {
+        'min': 1,
+        'p50': 51,
+        'p90': 91,
+        'p99': 100,
+        'max': 100,
+    }
+
+
+def test_parse_start():
+    assert parse_start('3,-4,west') == Position(Point(3, -4), Direction.WEST)
+
+
+def test_load_commands_rejects_invalid_line(tmp_path):
+    path = tmp_path / 'commands.txt'
+    path.write_text('# patrols\nFFR\n\nFX\n')
+
+    with pytest.raises(ValueError, match='commands.txt:4'):
+        load_commands(str(path))
+
+
+def test_main_prints_json_report(tmp_path, capsys):
+    obstacles = tmp_path / 'obstacles.json'
+    obstacles.write_text(json.dumps([[0, 2]]))
+
+    code = main(
+        [
+            '--runs',
+            '10',
+            '--length',
+            '5',
+            '--obstacles',
+            str(obstacles),
+            '--start',
+            '0,0,NORTH',
+            '--workers',
+            '1',
+            '--json',
+        ]
+    )
+
+    assert code == 0
+    report = json.loads(capsys.readouterr().out)
+    assert report['runs'] == 10
+    assert 0.0 <= report['collision_rate'] <= 1.0
+
+
+def test_main_accepts_region_maps(tmp_path, capsys):
+    """Test that the CLI reads the same region maps as the server"""
+    obstacles = tmp_path / 'obstacles.json'
+    obstacles.write_text(json.dumps([[5, 5], {'rect': [-1, 2, 1, 3]}]))
+    commands = tmp_path / 'commands.txt'
+    commands.write_text('FFFF\nRFF\n')
+
+    code = main(
+        [
+            '--commands',
+            str(commands),
+            '--obstacles',
+            str(obstacles),
+            '--start',
+            '0,0,NORTH',
+            '--workers',
+            '1',
+            '--json',
+        ]
+    )
+
+    assert code == 0
+    report = json.loads(capsys.readouterr().out)
+    assert report['runs'] == 2
+    assert report['collision_rate'] == 0.5